@@ -4,9 +4,19 @@
 Deletes all provisioned resources: Postman workspace, GitHub repo,
 AWS Lambda + API Gateway + IAM role.
 
+Several projects can be torn down in one run. Every deletion is
+independent, so they run in a thread pool (``--concurrency``) that shares
+one HTTP session per provider and one set of AWS clients. The API Gateway
+and Postman workspace lists are fetched once per run, not once per
+project, and the workspace list is also cached on disk for a few minutes
+(see ``workspace_index``). Rate-limited and 5xx responses are retried with
+backoff, honouring ``Retry-After``.
+
 Usage:
     python scripts/teardown.py --project "advisor-portfolio-api"
     python scripts/teardown.py --project "advisor-portfolio-api" --dry-run
+    python scripts/teardown.py --project api-one --project api-two
+    python scripts/teardown.py --from-file projects.txt --concurrency 16
     python scripts/teardown.py --result provisioning-result.json
 """
 
@@ -15,97 +25,143 @@ import json
 import logging
 import os
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 import boto3
 import requests
+from botocore.config import Config
 from botocore.exceptions import ClientError
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from workspace_index import DEFAULT_CACHE_PATH, DEFAULT_TTL, WorkspaceIndex, WorkspaceListError
 
 load_dotenv("orchestrator/.env")
 
 logger = logging.getLogger("teardown")
 
+POSTMAN_API = os.getenv("POSTMAN_API_BASE", "https://api.getpostman.com")
+GITHUB_API = "https://api.github.com"
+DEFAULT_CONCURRENCY = 8
+
+
+class _RateLimitRetry(Retry):
+    # GitHub signals its secondary rate limit with a 403 carrying Retry-After.
+    RETRY_AFTER_STATUS_CODES = frozenset({403, 413, 429, 503})
+
+
+def _http_session(headers: dict, pool_size: int) -> requests.Session:
+    """A pooled session that retries rate limits and server errors with backoff."""
+    session = requests.Session()
+    session.headers.update(headers)
+    retry = _RateLimitRetry(
+        total=5,
+        backoff_factor=1,
+        status_forcelist=(429, 500, 502, 503, 504),
+        raise_on_status=False,
+    )
+    session.mount("https://", HTTPAdapter(pool_maxsize=pool_size, max_retries=retry))
+    return session
+
+
+class Clients:
+    """HTTP sessions and AWS clients shared by every teardown task."""
+
+    def __init__(self, postman_api_key: str, github_token: str, region: str, concurrency: int):
+        self.postman = _http_session({"X-Api-Key": postman_api_key}, concurrency)
+        self.github = _http_session({"Authorization": f"token {github_token}"}, concurrency)
+        # boto3 sessions are not thread-safe but the clients they create are,
+        # so build every client here, before the pool starts.
+        session = boto3.Session(region_name=region)
+        config = Config(retries={"max_attempts": 10, "mode": "adaptive"}, max_pool_connections=concurrency)
+        self.apigw = session.client("apigatewayv2", config=config)
+        self.lam = session.client("lambda", config=config)
+        self.iam = session.client("iam", config=config)
+        self.logs = session.client("logs", config=config)
+
 
-def teardown_postman(workspace_id: str, api_key: str, dry_run: bool = False):
-    """Delete a Postman workspace and all its contents."""
-    headers = {"X-Api-Key": api_key}
+def teardown_postman(clients: Clients, workspace_id: str, dry_run: bool = False) -> bool:
+    """Delete a Postman workspace and all its contents; True once it is gone."""
+    url = f"{POSTMAN_API}/workspaces/{workspace_id}"
 
     if dry_run:
-        resp = requests.get(
-            f"https://api.getpostman.com/workspaces/{workspace_id}",
-            headers=headers,
-        )
+        resp = clients.postman.get(url)
         if resp.ok:
             name = resp.json().get("workspace", {}).get("name", "unknown")
             logger.info("[DRY RUN] Would delete workspace: %s (%s)", name, workspace_id)
         else:
             logger.warning("[DRY RUN] Workspace %s not found", workspace_id)
-        return
+        return False
 
-    resp = requests.delete(
-        f"https://api.getpostman.com/workspaces/{workspace_id}",
-        headers=headers,
-    )
+    resp = clients.postman.delete(url)
     if resp.ok:
         logger.info("Deleted Postman workspace: %s", workspace_id)
     elif resp.status_code == 404:
         logger.info("Workspace %s already deleted", workspace_id)
     else:
         logger.warning("Failed to delete workspace %s: %s", workspace_id, resp.text)
+        return False
+    return True
 
 
-def teardown_github(repo_name: str, org: str, token: str, dry_run: bool = False):
+def teardown_github(clients: Clients, repo_name: str, org: str, dry_run: bool = False):
     """Delete a GitHub repository."""
-    headers = {"Authorization": f"token {token}"}
+    url = f"{GITHUB_API}/repos/{org}/{repo_name}"
 
     if dry_run:
-        resp = requests.get(
-            f"https://api.github.com/repos/{org}/{repo_name}",
-            headers=headers,
-        )
+        resp = clients.github.get(url)
         if resp.ok:
             logger.info("[DRY RUN] Would delete repo: %s/%s", org, repo_name)
         else:
             logger.info("[DRY RUN] Repo %s/%s not found", org, repo_name)
         return
 
-    resp = requests.delete(
-        f"https://api.github.com/repos/{org}/{repo_name}",
-        headers=headers,
-    )
+    resp = clients.github.delete(url)
     if resp.status_code in (204, 404):
         logger.info("Deleted GitHub repo: %s/%s", org, repo_name)
     else:
-        logger.warning("Failed to delete repo: %s", resp.text)
+        logger.warning("Failed to delete repo %s/%s: %s", org, repo_name, resp.text)
 
 
-def teardown_aws(function_name: str, region: str, dry_run: bool = False):
-    """Delete Lambda function, API Gateway, and IAM role."""
-    session = boto3.Session(region_name=region)
+def index_apis(clients: Clients) -> dict[str, list[str]]:
+    """Map every API Gateway API name to its IDs, reading all pages."""
+    index: dict[str, list[str]] = {}
+    kwargs = {}
+    while True:
+        page = clients.apigw.get_apis(**kwargs)
+        for api in page.get("Items", []):
+            index.setdefault(api["Name"], []).append(api["ApiId"])
+        if not page.get("NextToken"):
+            return index
+        kwargs["NextToken"] = page["NextToken"]
 
-    # Delete API Gateway
-    apigw = session.client("apigatewayv2")
+
+def teardown_api_gateway(clients: Clients, function_name: str, apis: dict[str, list[str]], dry_run: bool = False):
+    """Delete the API Gateway fronting a Lambda function."""
+    api_name = f"{function_name}-api"
     try:
-        apis = apigw.get_apis()
-        api_name = f"{function_name}-api"
-        for api in apis.get("Items", []):
-            if api["Name"] == api_name:
-                if dry_run:
-                    logger.info("[DRY RUN] Would delete API Gateway: %s", api_name)
-                else:
-                    apigw.delete_api(ApiId=api["ApiId"])
-                    logger.info("Deleted API Gateway: %s", api_name)
+        for api_id in apis.get(api_name, []):
+            if dry_run:
+                logger.info("[DRY RUN] Would delete API Gateway: %s", api_name)
+            else:
+                clients.apigw.delete_api(ApiId=api_id)
+                logger.info("Deleted API Gateway: %s", api_name)
     except ClientError as e:
-        logger.warning("API Gateway cleanup: %s", e)
+        if "NotFoundException" in str(e):
+            logger.info("API Gateway %s already deleted", api_name)
+        else:
+            logger.warning("API Gateway cleanup: %s", e)
 
-    # Delete Lambda
-    lam = session.client("lambda")
+
+def teardown_lambda(clients: Clients, function_name: str, dry_run: bool = False):
+    """Delete a Lambda function."""
     try:
         if dry_run:
-            lam.get_function(FunctionName=function_name)
+            clients.lam.get_function(FunctionName=function_name)
             logger.info("[DRY RUN] Would delete Lambda: %s", function_name)
         else:
-            lam.delete_function(FunctionName=function_name)
+            clients.lam.delete_function(FunctionName=function_name)
             logger.info("Deleted Lambda: %s", function_name)
     except ClientError as e:
         if "ResourceNotFoundException" in str(e):
@@ -113,8 +169,10 @@ def teardown_aws(function_name: str, region: str, dry_run: bool = False):
         else:
             logger.warning("Lambda cleanup: %s", e)
 
-    # Delete IAM role (with cse-lpl- prefix matching aws.py)
-    iam = session.client("iam")
+
+def teardown_iam_role(clients: Clients, function_name: str, dry_run: bool = False):
+    """Delete a Lambda's IAM role (with cse-lpl- prefix matching aws.py)."""
+    iam = clients.iam
     role_name = f"cse-lpl-{function_name}-lambda-role"
     try:
         if dry_run:
@@ -133,15 +191,16 @@ def teardown_aws(function_name: str, region: str, dry_run: bool = False):
         else:
             logger.warning("IAM role cleanup: %s", e)
 
-    # Delete CloudWatch log group (persists after Lambda deletion)
-    logs = session.client("logs")
+
+def teardown_log_group(clients: Clients, function_name: str, dry_run: bool = False):
+    """Delete a Lambda's CloudWatch log group (it persists after Lambda deletion)."""
     log_group = f"/aws/lambda/{function_name}"
     try:
         if dry_run:
-            logs.describe_log_groups(logGroupNamePrefix=log_group)
+            clients.logs.describe_log_groups(logGroupNamePrefix=log_group)
             logger.info("[DRY RUN] Would delete log group: %s", log_group)
         else:
-            logs.delete_log_group(logGroupName=log_group)
+            clients.logs.delete_log_group(logGroupName=log_group)
             logger.info("Deleted log group: %s", log_group)
     except ClientError as e:
         if "ResourceNotFoundException" in str(e):
@@ -150,62 +209,133 @@ def teardown_aws(function_name: str, region: str, dry_run: bool = False):
             logger.warning("CloudWatch cleanup: %s", e)
 
 
+def _read_projects(path: str) -> list[str]:
+    """Project names from a file, one per line; blank lines and # comments are skipped."""
+    with open(path) as f:
+        lines = (line.split("#", 1)[0].strip() for line in f)
+        return [line for line in lines if line]
+
+
+def _load_workspaces(args, clients: Clients, api_key: str) -> WorkspaceIndex:
+    try:
+        return WorkspaceIndex.load(clients.postman, api_key, POSTMAN_API, args.workspace_cache,
+                                   args.workspace_ttl, args.refresh_workspaces)
+    except WorkspaceListError as e:
+        logger.warning("Could not list Postman workspaces: %s", e)
+        return WorkspaceIndex([])
+
+
+def _resolve_targets(args, projects: list[str], workspaces: WorkspaceIndex | None) -> list[tuple[str, str, str]]:
+    """``(repo_name, function_name, workspace_id)`` for every requested project."""
+    targets = []
+    for path in args.result:
+        with open(path) as f:
+            result = json.load(f)
+        targets.append((
+            result["resources"]["github"].get("repo_url", "").rstrip("/").split("/")[-1],
+            result["resources"]["aws"]["function_name"],
+            result["resources"]["postman"]["workspace_id"],
+        ))
+
+    for project in dict.fromkeys(projects):
+        repo_name = project.lower().replace(" ", "-").replace("_", "-")
+        targets.append((repo_name, repo_name, workspaces.find(repo_name)))
+    return targets
+
+
+def teardown(targets, clients: Clients, github_org: str, concurrency: int,
+             dry_run: bool = False) -> tuple[int, list[str]]:
+    """Run every deletion for ``targets`` in a thread pool.
+
+    Returns the number of tasks that raised and the IDs of the workspaces
+    that are now gone.
+    """
+    try:
+        apis = index_apis(clients)
+    except ClientError as e:
+        # Without the list no API can be matched; every other step still runs.
+        logger.warning("Could not list API Gateway APIs, skipping API Gateway teardown: %s", e)
+        apis = {}
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="teardown") as pool:
+        tasks = []
+        workspace_tasks = []
+        for repo_name, function_name, workspace_id in targets:
+            if workspace_id:
+                future = pool.submit(teardown_postman, clients, workspace_id, dry_run)
+                workspace_tasks.append((workspace_id, future))
+                tasks.append((repo_name, future))
+            else:
+                logger.warning("No workspace ID found for %s -- skipping Postman teardown", repo_name)
+            tasks.append((repo_name, pool.submit(teardown_github, clients, repo_name, github_org, dry_run)))
+            tasks.append((repo_name, pool.submit(teardown_api_gateway, clients, function_name, apis, dry_run)))
+            for step in (teardown_lambda, teardown_iam_role, teardown_log_group):
+                tasks.append((repo_name, pool.submit(step, clients, function_name, dry_run)))
+
+        failures = 0
+        for repo_name, future in tasks:
+            try:
+                future.result()
+            except Exception as e:
+                failures += 1
+                logger.error("Teardown of %s failed: %s", repo_name, e)
+    deleted = [workspace_id for workspace_id, future in workspace_tasks if not future.exception() and future.result()]
+    return failures, deleted
+
+
 def main():
     parser = argparse.ArgumentParser(description="Teardown BRAVE-Postman demo resources")
-    parser.add_argument("--project", help="Project name (used to derive resource names)")
-    parser.add_argument("--result", help="Path to provisioning-result.json")
+    parser.add_argument("--project", action="append", default=[],
+                        help="Project name (used to derive resource names); repeatable")
+    parser.add_argument("--from-file", help="File listing project names, one per line")
+    parser.add_argument("--result", action="append", default=[],
+                        help="Path to provisioning-result.json; repeatable")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help=f"Deletions in flight at once (default {DEFAULT_CONCURRENCY})")
     parser.add_argument("--dry-run", action="store_true", help="Preview what would be deleted")
+    parser.add_argument("--workspace-cache", default=DEFAULT_CACHE_PATH,
+                        help=f"Postman workspace index cache file (default {DEFAULT_CACHE_PATH})")
+    parser.add_argument("--workspace-ttl", type=float, default=DEFAULT_TTL,
+                        help=f"Seconds before the workspace cache is re-listed (default {DEFAULT_TTL})")
+    parser.add_argument("--refresh-workspaces", action="store_true", help="Ignore the workspace cache")
     args = parser.parse_args()
 
+    if not (args.project or args.from_file or args.result):
+        parser.error("Provide --project, --from-file or --result")
+    if args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+
     logging.basicConfig(
         level=logging.INFO,
         format="%(asctime)s [%(levelname)s] %(message)s",
     )
 
     postman_api_key = os.getenv("POSTMAN_API_KEY", "")
-    github_token = os.getenv("GITHUB_TOKEN", "")
+    clients = Clients(
+        postman_api_key=postman_api_key,
+        github_token=os.getenv("GITHUB_TOKEN", ""),
+        region=os.getenv("AWS_REGION", "us-east-1"),
+        concurrency=args.concurrency,
+    )
     github_org = os.getenv("GITHUB_ORG", "postman-cs")
-    aws_region = os.getenv("AWS_REGION", "us-east-1")
-
-    if args.result:
-        with open(args.result) as f:
-            result = json.load(f)
-        workspace_id = result["resources"]["postman"]["workspace_id"]
-        repo_name = result["resources"]["github"].get("repo_url", "").rstrip("/").split("/")[-1]
-        function_name = result["resources"]["aws"]["function_name"]
-    elif args.project:
-        repo_name = args.project.lower().replace(" ", "-").replace("_", "-")
-        function_name = repo_name
-        # Need to find workspace ID by listing
-        workspace_id = _find_workspace_id(repo_name, postman_api_key)
-    else:
-        parser.error("Provide --project or --result")
-        return
 
+    start = time.monotonic()
+    projects = list(args.project)
+    if args.from_file:
+        projects += _read_projects(args.from_file)
+    # Need to find workspace IDs by listing
+    workspaces = _load_workspaces(args, clients, postman_api_key) if projects else None
+    targets = _resolve_targets(args, projects, workspaces)
     prefix = "[DRY RUN] " if args.dry_run else ""
-    logger.info("%sTearing down: %s", prefix, repo_name)
-
-    if workspace_id:
-        teardown_postman(workspace_id, postman_api_key, args.dry_run)
-    else:
-        logger.warning("No workspace ID found -- skipping Postman teardown")
-
-    teardown_github(repo_name, github_org, github_token, args.dry_run)
-    teardown_aws(function_name, aws_region, args.dry_run)
-
-    logger.info("%sTeardown complete", prefix)
+    logger.info("%sTearing down: %s", prefix, ", ".join(repo_name for repo_name, _, _ in targets))
 
+    failures, deleted = teardown(targets, clients, github_org, args.concurrency, args.dry_run)
+    if workspaces is not None and deleted and not args.dry_run:
+        workspaces.forget(deleted)
+        workspaces.save(args.workspace_cache, postman_api_key, POSTMAN_API)
 
-def _find_workspace_id(project_name: str, api_key: str) -> str:
-    """Find workspace ID by searching for the workspace name."""
-    headers = {"X-Api-Key": api_key}
-    resp = requests.get("https://api.getpostman.com/workspaces", headers=headers)
-    if not resp.ok:
-        return ""
-    for ws in resp.json().get("workspaces", []):
-        if project_name in ws.get("name", "").lower():
-            return ws["id"]
-    return ""
+    logger.info("%sTeardown complete: %d project(s) in %.1fs", prefix, len(targets), time.monotonic() - start)
+    if failures:
+        sys.exit(1)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,168 @@
+"""Tests for teardown's concurrent fan-out against in-process fakes of its clients.
+
+Run with ``python -m pytest scripts``.
+"""
+
+import logging
+import threading
+
+import pytest
+
+pytest.importorskip("boto3")
+pytest.importorskip("dotenv")
+pytest.importorskip("requests")
+
+from botocore.exceptions import ClientError  # noqa: E402
+
+import teardown  # noqa: E402
+from teardown import Clients  # noqa: E402
+
+
+def client_error(code, operation):
+    return ClientError({"Error": {"Code": code, "Message": f"{code} from {operation}"}}, operation)
+
+
+class FakeResponse:
+    def __init__(self, status):
+        self.status_code = status
+        self.ok = status < 400
+        self.text = f"status {status}"
+
+    def json(self):
+        return {}
+
+
+class FakeSession:
+    """Records requests; ``statuses`` maps a URL to the status it answers with (default 204)."""
+
+    def __init__(self, statuses=None):
+        self.statuses = statuses or {}
+        self.requests = []
+        self._lock = threading.Lock()
+
+    def _request(self, method, url):
+        with self._lock:
+            self.requests.append((method, url))
+        return FakeResponse(self.statuses.get(url, 204))
+
+    def get(self, url):
+        return self._request("GET", url)
+
+    def delete(self, url):
+        return self._request("DELETE", url)
+
+
+class FakeAWS:
+    """Records calls; ``hooks`` maps an operation to a function of its arguments, which may raise."""
+
+    def __init__(self, **hooks):
+        self.hooks = hooks
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def __getattr__(self, operation):
+        def call(**kwargs):
+            with self._lock:
+                self.calls.append((operation, kwargs))
+            hook = self.hooks.get(operation)
+            return hook(**kwargs) if hook else {}
+        return call
+
+    def called(self, operation):
+        return [kwargs for name, kwargs in self.calls if name == operation]
+
+
+def fake_clients(postman=None, github=None, **aws_hooks):
+    clients = Clients.__new__(Clients)
+    clients.postman = postman or FakeSession()
+    clients.github = github or FakeSession()
+    clients.apigw = FakeAWS(get_apis=aws_hooks.pop("get_apis", lambda **kwargs: {"Items": []}))
+    clients.lam = FakeAWS(**{k: v for k, v in aws_hooks.items() if k.endswith("_function")})
+    clients.iam = FakeAWS(list_attached_role_policies=lambda **kwargs: {"AttachedPolicies": []})
+    clients.logs = FakeAWS()
+    return clients
+
+
+TARGETS = [(f"api-{n}", f"api-{n}", f"ws-{n}") for n in range(3)]
+
+
+def test_every_target_gets_every_step_in_parallel():
+    # Each Lambda deletion waits for the others, so this only passes if they run concurrently.
+    barrier = threading.Barrier(len(TARGETS), timeout=5)
+    clients = fake_clients(delete_function=lambda **kwargs: barrier.wait())
+
+    failures, deleted = teardown.teardown(TARGETS, clients, "org", concurrency=len(TARGETS))
+
+    assert failures == 0
+    assert sorted(deleted) == ["ws-0", "ws-1", "ws-2"]
+    assert sorted(url for _, url in clients.postman.requests) == [
+        f"{teardown.POSTMAN_API}/workspaces/ws-{n}" for n in range(3)]
+    assert sorted(url for _, url in clients.github.requests) == [
+        f"{teardown.GITHUB_API}/repos/org/api-{n}" for n in range(3)]
+    assert sorted(c["FunctionName"] for c in clients.lam.called("delete_function")) == ["api-0", "api-1", "api-2"]
+    assert len(clients.iam.called("delete_role")) == 3
+    assert len(clients.logs.called("delete_log_group")) == 3
+
+
+def test_clients_and_api_listing_are_shared_by_every_target(monkeypatch):
+    created = []
+
+    class FakeBotoSession:
+        def __init__(self, region_name):
+            self.region_name = region_name
+
+        def client(self, service, config):
+            created.append((service, config.max_pool_connections))
+            return FakeAWS()
+
+    monkeypatch.setattr(teardown.boto3, "Session", FakeBotoSession)
+    clients = Clients("key", "token", "us-east-1", concurrency=4)
+    assert sorted(created) == [("apigatewayv2", 4), ("iam", 4), ("lambda", 4), ("logs", 4)]
+    assert clients.postman.adapters["https://"]._pool_maxsize == 4
+
+    pages = {None: {"Items": [{"Name": "api-0-api", "ApiId": "a0"}], "NextToken": "t"},
+             "t": {"Items": [{"Name": "api-2-api", "ApiId": "a2"}]}}
+    clients = fake_clients(get_apis=lambda **kwargs: pages[kwargs.get("NextToken")])
+    failures, _ = teardown.teardown(TARGETS, clients, "org", concurrency=4)
+
+    assert failures == 0
+    # Both pages are read once for the run, not once per target.
+    assert clients.apigw.called("get_apis") == [{}, {"NextToken": "t"}]
+    assert sorted(c["ApiId"] for c in clients.apigw.called("delete_api")) == ["a0", "a2"]
+
+
+def test_one_target_failing_does_not_stop_the_others(caplog):
+    def delete_function(FunctionName):
+        if FunctionName == "api-1":
+            raise RuntimeError("connection reset")
+
+    postman = FakeSession({f"{teardown.POSTMAN_API}/workspaces/ws-2": 500})
+    clients = fake_clients(postman=postman, delete_function=delete_function)
+
+    with caplog.at_level(logging.ERROR, logger="teardown"):
+        failures, deleted = teardown.teardown(TARGETS, clients, "org", concurrency=2)
+
+    assert failures == 1
+    assert "Teardown of api-1 failed: connection reset" in caplog.text
+    # ws-2 answered 500, so it is not reported as gone; everything else still ran.
+    assert sorted(deleted) == ["ws-0", "ws-1"]
+    assert len(clients.lam.called("delete_function")) == 3
+    assert len(clients.iam.called("delete_role")) == 3
+    assert len(clients.github.requests) == 3
+
+
+def test_api_listing_errors_skip_only_api_gateway(caplog):
+    def get_apis(**kwargs):
+        raise client_error("TooManyRequestsException", "GetApis")
+
+    clients = fake_clients(get_apis=get_apis)
+
+    with caplog.at_level(logging.WARNING, logger="teardown"):
+        failures, deleted = teardown.teardown(TARGETS, clients, "org", concurrency=2)
+
+    assert failures == 0
+    assert "Could not list API Gateway APIs" in caplog.text
+    assert clients.apigw.called("delete_api") == []
+    assert sorted(deleted) == ["ws-0", "ws-1", "ws-2"]
+    assert len(clients.lam.called("delete_function")) == 3
+    assert len(clients.github.requests) == 3
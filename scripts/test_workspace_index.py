@@ -0,0 +1,157 @@
+"""Tests for workspace_index against a local stub of the Postman workspaces API.
+
+Run with ``python -m pytest scripts``.
+"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+requests = pytest.importorskip("requests")
+
+from workspace_index import WorkspaceIndex, WorkspaceListError, fetch_workspaces  # noqa: E402
+
+
+class StubPostman(ThreadingHTTPServer):
+    """Serves ``GET /workspaces`` with cursor pagination and counts requests."""
+
+    def __init__(self, workspaces):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.workspaces = workspaces
+        self.requests = []
+        self.status = 200
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        self.server.requests.append((url.path, query, self.headers.get("X-Api-Key")))
+        if self.server.status != 200:
+            self._send(self.server.status, {"error": {"name": "serverError"}})
+            return
+        start = int(query.get("cursor", 0))
+        limit = int(query.get("limit", 100))
+        page = self.server.workspaces[start:start + limit]
+        body = {"workspaces": page}
+        if start + limit < len(self.server.workspaces):
+            body["meta"] = {"nextCursor": str(start + limit)}
+        self._send(200, body)
+
+    def _send(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub():
+    workspaces = [{"id": f"ws-{n}", "name": f"Demo API {n}", "type": "team"} for n in range(250)]
+    workspaces += [
+        {"id": "ws-exact", "name": "advisor-portfolio-api", "type": "team"},
+        {"id": "ws-long", "name": "advisor-portfolio-api (old copy)", "type": "team"},
+        {"id": "ws-prefixed", "name": "LPL advisor-portfolio-api-v2", "type": "team"},
+    ]
+    server = StubPostman(workspaces)
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def session():
+    with requests.Session() as s:
+        s.headers["X-Api-Key"] = "key-1"
+        yield s
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / "cache" / "workspaces.json")
+
+
+def test_listing_follows_every_page(stub, session):
+    workspaces = fetch_workspaces(session, stub.url, page_size=100)
+
+    assert len(workspaces) == 253
+    assert [q.get("cursor") for _, q, _ in stub.requests] == [None, "100", "200"]
+    assert workspaces[-1] == {"id": "ws-prefixed", "name": "LPL advisor-portfolio-api-v2"}
+
+
+def test_hundreds_of_lookups_share_one_listing_pass(stub, session, cache_path):
+    index = WorkspaceIndex.load(session, "key-1", stub.url, cache_path)
+    found = [index.find(f"demo-api-{n}") for n in range(250)]
+
+    assert found == [f"ws-{n}" for n in range(250)]
+    # 253 workspaces at the default page size of 100.
+    assert len(stub.requests) == 3
+
+
+def test_exact_match_wins_over_substring(stub, session, cache_path):
+    index = WorkspaceIndex.load(session, "key-1", stub.url, cache_path)
+
+    assert index.find("advisor-portfolio-api") == "ws-exact"
+    assert index.find("Advisor Portfolio_API") == "ws-exact"
+    # No exact name: the shortest name containing it.
+    assert index.find("portfolio-api") == "ws-exact"
+    assert index.find("advisor-portfolio-api-v2") == "ws-prefixed"
+    assert index.find("missing-project") == ""
+
+
+def test_cache_is_reused_until_the_ttl_expires(stub, session, cache_path):
+    WorkspaceIndex.load(session, "key-1", stub.url, cache_path, ttl=60)
+    listed = len(stub.requests)
+
+    cached = WorkspaceIndex.load(session, "key-1", stub.url, cache_path, ttl=60)
+    assert len(stub.requests) == listed
+    assert cached.find("demo-api-7") == "ws-7"
+
+    WorkspaceIndex.load(session, "key-1", stub.url, cache_path, ttl=0)
+    assert len(stub.requests) == 2 * listed
+
+    WorkspaceIndex.load(session, "key-1", stub.url, cache_path, ttl=60, refresh=True)
+    assert len(stub.requests) == 3 * listed
+
+
+def test_cache_is_not_shared_across_api_keys(stub, session, cache_path):
+    WorkspaceIndex.load(session, "key-1", stub.url, cache_path)
+    listed = len(stub.requests)
+
+    WorkspaceIndex.load(session, "key-2", stub.url, cache_path)
+    assert len(stub.requests) == 2 * listed
+    with open(cache_path) as f:
+        assert "key-2" not in f.read()
+
+
+def test_forgotten_workspaces_stay_gone_from_the_cache(stub, session, cache_path):
+    index = WorkspaceIndex.load(session, "key-1", stub.url, cache_path)
+    index.forget(["ws-exact"])
+    index.save(cache_path, "key-1", stub.url)
+
+    reloaded = WorkspaceIndex.load(session, "key-1", stub.url, cache_path)
+    assert reloaded.find("advisor-portfolio-api") == "ws-prefixed"
+    assert len(reloaded) == 252
+
+
+def test_failed_listing_raises_and_writes_no_cache(stub, session, cache_path):
+    stub.status = 500
+
+    with pytest.raises(WorkspaceListError, match="500"):
+        WorkspaceIndex.load(session, "key-1", stub.url, cache_path)
+    with pytest.raises(FileNotFoundError):
+        open(cache_path)
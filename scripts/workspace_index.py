@@ -0,0 +1,128 @@
+"""Cached index of Postman workspace names, for resolving teardown targets.
+
+The index is built from a complete listing of ``/workspaces``, following
+``meta.nextCursor`` page by page. It is saved as JSON (``--workspace-cache``,
+default ``.cache/postman-workspaces.json``) and reused until it is older
+than the TTL, so one listing pass serves any number of project lookups and
+any number of runs inside the TTL. The cache records a hash of the API key
+and the API base URL, and a different key or base URL forces a fresh
+listing.
+
+Names are normalised the way teardown derives repo names: lowercase, with
+spaces and underscores as hyphens. ``find`` returns the exact match if there
+is one. Otherwise it falls back to the shortest workspace name that
+contains the project name; this is the most specific substring match.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import time
+
+logger = logging.getLogger("teardown")
+
+DEFAULT_CACHE_PATH = ".cache/postman-workspaces.json"
+DEFAULT_TTL = 15 * 60
+PAGE_SIZE = 100
+
+
+class WorkspaceListError(RuntimeError):
+    """The workspace listing could not be fetched."""
+
+
+def normalize(name: str) -> str:
+    return name.lower().replace(" ", "-").replace("_", "-")
+
+
+def fetch_workspaces(session, base_url: str, page_size: int = PAGE_SIZE) -> list[dict]:
+    """Every workspace visible to ``session``, following cursors across pages."""
+    workspaces = []
+    params = {"limit": page_size}
+    seen = set()
+    while True:
+        resp = session.get(f"{base_url}/workspaces", params=params)
+        if not resp.ok:
+            raise WorkspaceListError(f"listing workspaces failed ({resp.status_code}): {resp.text}")
+        body = resp.json()
+        workspaces.extend({"id": ws["id"], "name": ws.get("name", "")} for ws in body.get("workspaces", []))
+        cursor = (body.get("meta") or {}).get("nextCursor")
+        # Stop on a repeated cursor too, in case a server echoes it back.
+        if not cursor or cursor in seen:
+            return workspaces
+        seen.add(cursor)
+        params = {"limit": page_size, "cursor": cursor}
+
+
+class WorkspaceIndex:
+    """Workspace IDs by normalised name."""
+
+    def __init__(self, workspaces: list[dict], fetched_at: float | None = None):
+        self.workspaces = workspaces
+        self.fetched_at = time.time() if fetched_at is None else fetched_at
+        self._reindex()
+
+    def __len__(self):
+        return len(self.workspaces)
+
+    def find(self, project_name: str) -> str:
+        """Workspace ID for ``project_name``: exact name match first, then substring; ``""`` if none."""
+        key = normalize(project_name)
+        exact = self._by_name.get(key)
+        if exact is not None:
+            return exact
+        candidates = [name for name in self._by_name if key in name]
+        if not candidates:
+            return ""
+        name = min(candidates, key=lambda n: (len(n), n))
+        logger.info("No workspace named %s; using closest match %s", key, name)
+        return self._by_name[name]
+
+    def forget(self, workspace_ids):
+        """Drop deleted workspaces so later runs inside the TTL do not find them."""
+        gone = set(workspace_ids)
+        self.workspaces = [ws for ws in self.workspaces if ws["id"] not in gone]
+        self._reindex()
+
+    def _reindex(self):
+        self._by_name: dict[str, str] = {}
+        for ws in self.workspaces:
+            self._by_name.setdefault(normalize(ws["name"]), ws["id"])
+
+    @classmethod
+    def load(cls, session, api_key: str, base_url: str, cache_path: str = DEFAULT_CACHE_PATH,
+             ttl: float = DEFAULT_TTL, refresh: bool = False) -> "WorkspaceIndex":
+        """The cached index if it is fresh and for the same key, else a new listing, which is then cached."""
+        owner = _owner(api_key, base_url)
+        if not refresh:
+            cached = _read_cache(cache_path)
+            if cached and cached.get("owner") == owner and time.time() - cached.get("fetchedAt", 0) < ttl:
+                return cls(cached["workspaces"], cached["fetchedAt"])
+        index = cls(fetch_workspaces(session, base_url))
+        index.save(cache_path, api_key, base_url)
+        return index
+
+    def save(self, cache_path: str, api_key: str, base_url: str):
+        directory = os.path.dirname(cache_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({
+                "owner": _owner(api_key, base_url),
+                "fetchedAt": self.fetched_at,
+                "workspaces": self.workspaces,
+            }, f)
+        os.replace(tmp, cache_path)
+
+
+def _owner(api_key: str, base_url: str) -> str:
+    return hashlib.sha256(f"{base_url}\0{api_key}".encode()).hexdigest()
+
+
+def _read_cache(cache_path: str):
+    try:
+        with open(cache_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
@@ -1,14 +1,64 @@
+import importlib
+import os
+import threading
+
 from flask import Flask
-from flask_cors import CORS
+
+from app import metrics
+from app.serialization import ModelJSONProvider
+
+# Modules kept off the cold-start import path and loaded on first use (NumPy
+# analytics for /performance, marshmallow and the request schemas for the
+# first validated request). STARTUP_MODE=eager imports them, and flask_cors,
+# up front for long-lived workers, where first-request latency matters more
+# than init.
+DEFERRED_MODULES = ("app.analytics", "app.schemas")
 
 
 def create_app():
     app = Flask(__name__)
-    CORS(app)
+    app.json = ModelJSONProvider(app)
+    metrics.init_app(app)
 
     from app.routes import api_bp, ops_bp
 
     app.register_blueprint(ops_bp)
     app.register_blueprint(api_bp, url_prefix="/api/v1")
 
+    if os.environ.get("STARTUP_MODE", "lazy") == "eager":
+        from flask_cors import CORS
+
+        CORS(app)
+        for name in DEFERRED_MODULES:
+            importlib.import_module(name)
+    else:
+        _cors_on_first_request(app)
+
     return app
+
+
+def _cors_on_first_request(app):
+    """Apply ``CORS(app)`` as the first request arrives, importing flask_cors then.
+
+    Flask accepts new hooks until it has handled a request, so wrapping
+    ``app.wsgi_app`` gives every response the same CORS headers as calling
+    ``CORS(app)`` in ``create_app``.
+    """
+    wsgi_app = app.wsgi_app
+    lock = threading.Lock()
+    applied = False
+
+    def first_request(environ, start_response):
+        nonlocal applied
+        if not applied:
+            with lock:
+                if not applied:
+                    from flask_cors import CORS
+
+                    CORS(app)
+                    applied = True
+                    if app.wsgi_app is first_request:
+                        app.wsgi_app = wsgi_app
+        return wsgi_app(environ, start_response)
+
+    app.wsgi_app = first_request
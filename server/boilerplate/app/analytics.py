@@ -0,0 +1,358 @@
+"""Portfolio performance analytics.
+
+Derives a daily valuation series from a portfolio's trade history and
+computes return and risk metrics over a reporting period. All work is
+NumPy-vectorized over the book's array-backed columns (see
+``TradeBook.columns``), with no per-trade or per-day Python loops.
+
+Valuation model: through the history, each position is marked at the
+last traded price of its ticker. A trade at price ``p`` on a ticker with
+prior position ``q`` and prior mark ``p0`` moves the portfolio value by a
+market gain of ``q * (p - p0)`` plus its own cash flow ``quantity * p``.
+On the valuation day, open positions are marked to their current quote
+from ``app.pricing`` instead, adding ``q * (quote - p0)``; there is no
+price history, so the move since each ticker's last fill is counted on
+that day. Daily returns use the Modified Dietz method,
+``gain / (V_start + CF / 2)``, so deposits via buys are not counted as
+performance. As in the holdings ledger (``Position``), positions never go
+short: a sell of more than is held closes the position, and only the
+quantity held counts towards its cash flow.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from app.models import PERIOD_DAYS, TradeColumns, to_micros
+from app.pricing import get_prices
+
+# Assumed long-run annual returns used to compound a benchmark return over
+# the period until a benchmark price feed is wired in. Unknown indexes
+# return 0.
+BENCHMARK_ANNUAL_RETURNS = {
+    "SPX": 0.10,
+    "S&P 500": 0.10,
+    "AGG": 0.04,
+    "BLOOMBERG US AGG": 0.04,
+    "MSCI ACWI": 0.08,
+    "60/40": 0.07,
+}
+
+RISK_FREE_RATE = 0.0
+DAYS_PER_YEAR = 365
+_DAY_US = 86_400_000_000
+
+
+def period_start(period: str, now: datetime, inception_us: int | None):
+    """Return the period start as epoch microseconds, or ``None`` for an empty history."""
+    if period == "inception":
+        return inception_us
+    if period == "ytd":
+        return to_micros(datetime(now.year, 1, 1, tzinfo=timezone.utc))
+    return to_micros(now - timedelta(days=PERIOD_DAYS[period]))
+
+
+def daily_series(columns: TradeColumns, end_us: int):
+    """Aggregate trades into per-day market gain, cash flow and closing value.
+
+    Returns ``(first_day, gains, flows, closing_values, positions)`` where
+    index ``i`` of the first three arrays is day ``first_day + i`` (days
+    since the epoch), running through the day containing ``end_us``, and
+    ``positions`` is each trade's ticker position after it.
+    """
+    ts = np.frombuffer(columns.timestamps, dtype=np.int64)
+    codes = np.asarray(columns.ticker_codes).astype(np.intp)
+    qty = np.frombuffer(columns.quantities, dtype=np.float64)
+    price = np.frombuffer(columns.prices, dtype=np.float64)
+
+    # Per-ticker running position and previous mark, via a stable group sort.
+    order, group_start, grouped_pos = _grouped_positions(codes, qty)
+    pos_after = np.empty_like(qty)
+    pos_after[order] = grouped_pos
+    pos_before = np.empty_like(qty)
+    pos_before[order] = np.where(group_start, 0.0, np.r_[0.0, grouped_pos[:-1]])
+    prev_price = np.empty_like(price)
+    prev_price[order] = np.where(group_start, 0.0, np.r_[0.0, price[order][:-1]])
+
+    gain = pos_before * (price - prev_price)
+    flow = (pos_after - pos_before) * price
+    value = np.cumsum(gain + flow)
+
+    first_day = int(ts[0] // _DAY_US)
+    day = ts // _DAY_US - first_day
+    n_days = max(int(end_us // _DAY_US) - first_day + 1, int(day[-1]) + 1)
+    gains = np.bincount(day, weights=gain, minlength=n_days)
+    flows = np.bincount(day, weights=flow, minlength=n_days)
+
+    # Closing value: value after the last trade of each day, carried forward.
+    closing = np.full(n_days, np.nan)
+    last_of_day = np.r_[day[1:] != day[:-1], True]
+    closing[day[last_of_day]] = value[last_of_day]
+    filled = np.where(np.isnan(closing), 0, np.arange(n_days))
+    np.maximum.accumulate(filled, out=filled)
+    closing = np.where(np.isnan(closing[filled]), 0.0, closing[filled])
+    return first_day, gains, flows, closing, pos_after
+
+
+def _grouped_positions(codes, qty):
+    """Trades grouped by ticker, and each one's position after it, never below zero.
+
+    Returns ``(order, group_start, positions)``: the stable sort of trades
+    by ticker code, where each ticker's run starts in it, and the position
+    after each trade in that order. A running sum floored at zero is the
+    plain running sum less its running minimum, where that is negative;
+    the minimum is taken per ticker, a loop over tickers rather than trades.
+    """
+    order = np.argsort(codes, kind="stable")
+    grouped_codes = codes[order]
+    group_start = np.r_[True, grouped_codes[1:] != grouped_codes[:-1]]
+    starts = np.flatnonzero(group_start)
+    grouped_qty = qty[order]
+    positions = np.empty_like(grouped_qty)
+    for start, end in zip(starts, np.r_[starts[1:], len(order)]):
+        running = np.cumsum(grouped_qty[start:end])
+        positions[start:end] = running - np.minimum(np.minimum.accumulate(running), 0.0)
+    return order, group_start, positions
+
+
+def mark_to_quotes(
+    positions: dict[str, float], marks: dict[str, float], quotes=None
+) -> float:
+    """Gain from re-marking ``positions`` from their last fill ``marks`` to current quotes.
+
+    ``quotes`` maps ticker to price; by default they come from ``app.pricing``.
+    """
+    held = [ticker for ticker, quantity in positions.items() if quantity]
+    if not held:
+        return 0.0
+    if quotes is None:
+        quotes = get_prices(held)
+    return sum(positions[ticker] * (quotes[ticker] - marks[ticker]) for ticker in held)
+
+
+def compute_performance(
+    columns: TradeColumns,
+    period: str,
+    benchmark_index: str = "",
+    now: datetime | None = None,
+    quotes=None,
+):
+    """Compute performance metrics (percentages) for ``period`` ending at ``now``, marked to ``quotes``."""
+    now = now or datetime.now(timezone.utc)
+    end_us = to_micros(now)
+    if not len(columns.timestamps):
+        return summarize(
+            np.zeros(0), period_days(period, now, None, end_us), benchmark_index
+        )
+
+    first_day, gains, flows, closing, pos_after = daily_series(columns, end_us)
+    positions, marks = _positions_and_marks(columns, pos_after)
+    gains[-1] += mark_to_quotes(positions, marks, quotes)
+    start_us = period_start(period, now, columns.timestamps[0])
+    start = max(0, int(start_us // _DAY_US) - first_day)
+
+    opening = np.r_[0.0, closing[:-1]]
+    denominator = opening + flows / 2
+    returns = np.divide(
+        gains, denominator, out=np.zeros_like(gains), where=denominator > 0
+    )
+    return summarize(
+        returns[start:], period_days(period, now, start_us, end_us), benchmark_index
+    )
+
+
+def _positions_and_marks(columns: TradeColumns, pos_after: np.ndarray):
+    """Final position and last fill price per ticker, given each trade's position after it."""
+    codes = np.asarray(columns.ticker_codes).astype(np.intp)
+    price = np.frombuffer(columns.prices, dtype=np.float64)
+    last = np.full(len(columns.tickers), -1)
+    np.maximum.at(last, codes, np.arange(len(codes)))
+    # ``tickers`` can list some the book never traded; they have no last trade.
+    traded = np.flatnonzero(last >= 0)
+    tickers = [columns.tickers[code] for code in traded.tolist()]
+    last = last[traded]
+    return dict(zip(tickers, pos_after[last].tolist())), dict(
+        zip(tickers, price[last].tolist())
+    )
+
+
+def period_days(period, now, start_us, end_us):
+    if start_us is None:
+        return PERIOD_DAYS.get(period) or 0
+    return max((end_us - start_us) / _DAY_US, 1.0)
+
+
+def summarize(returns: np.ndarray, days: float, benchmark_index: str):
+    """Turn a daily return series into the PerformanceMetrics fields (in percent)."""
+    n = len(returns)
+    if n:
+        growth = np.cumprod(1.0 + returns)
+        peaks = np.maximum.accumulate(np.r_[1.0, growth])
+        max_drawdown = float(np.min(np.r_[1.0, growth] / peaks - 1.0))
+        total = float(growth[-1]) - 1.0
+        mean = float(np.mean(returns))
+        std = float(np.std(returns, ddof=1)) if n > 1 else 0.0
+    else:
+        total = max_drawdown = mean = std = 0.0
+    return metrics_from_stats(total, max_drawdown, mean, std, n, days, benchmark_index)
+
+
+def metrics_from_stats(total, max_drawdown, mean, std, n, days, benchmark_index):
+    """Build the PerformanceMetrics fields from summary statistics of the daily returns."""
+    # Periods shorter than a year are reported unannualized.
+    years = days / DAYS_PER_YEAR if days else 0.0
+    annualized = (
+        (1.0 + total) ** (1.0 / years) - 1.0 if years >= 1 and total > -1.0 else total
+    )
+
+    if n > 1 and std > 0:
+        volatility = std * np.sqrt(DAYS_PER_YEAR)
+        sharpe = (mean - RISK_FREE_RATE / DAYS_PER_YEAR) / std * np.sqrt(DAYS_PER_YEAR)
+    else:
+        volatility, sharpe = 0.0, 0.0
+
+    benchmark_annual = BENCHMARK_ANNUAL_RETURNS.get(benchmark_index.upper(), 0.0)
+    benchmark = (1.0 + benchmark_annual) ** years - 1.0
+
+    return {
+        "totalReturn": round(total * 100, 2),
+        "annualizedReturn": round(annualized * 100, 2),
+        "benchmarkReturn": round(benchmark * 100, 2),
+        "alpha": round((total - benchmark) * 100, 2),
+        "sharpeRatio": round(float(sharpe), 2),
+        "maxDrawdown": round(max_drawdown * 100, 2),
+        "volatility": round(float(volatility) * 100, 2),
+    }
+
+
+class RunningPerformance:
+    """Inception-to-date metrics maintained incrementally, O(1) per trade.
+
+    Tracks the same valuation model as :func:`compute_performance`:
+    per-ticker positions and marks, the running portfolio value, the current
+    (still open) day's gain and flow, and running aggregates over closed
+    days: count, sum and sum of squares of returns, compounded growth, and
+    peak-to-trough drawdown.
+    """
+
+    def __init__(self):
+        self.positions: dict[str, float] = {}
+        self.marks: dict[str, float] = {}
+        self.value = 0.0
+        self.first_us = None
+        self.day = None
+        self.day_gain = 0.0
+        self.day_flow = 0.0
+        self.day_open = 0.0
+        self.closed_days = 0
+        self.sum_r = 0.0
+        self.sum_r2 = 0.0
+        self.growth = 1.0
+        self.peak = 1.0
+        self.max_drawdown = 0.0
+
+    @classmethod
+    def from_columns(cls, columns: TradeColumns) -> RunningPerformance:
+        """Rebuild the running state from a full history, vectorized."""
+        state = cls()
+        if not len(columns.timestamps):
+            return state
+        ts = np.frombuffer(columns.timestamps, dtype=np.int64)
+        first_day, gains, flows, closing, pos_after = daily_series(columns, int(ts[-1]))
+        state.positions, state.marks = _positions_and_marks(columns, pos_after)
+        state.first_us = int(ts[0])
+        state.day = first_day + len(gains) - 1
+        state.value = float(closing[-1])
+        state.day_gain = float(gains[-1])
+        state.day_flow = float(flows[-1])
+        state.day_open = float(closing[-2]) if len(closing) > 1 else 0.0
+        opening = np.r_[0.0, closing[:-2]]
+        denominator = opening + flows[:-1] / 2
+        closed = np.divide(
+            gains[:-1],
+            denominator,
+            out=np.zeros_like(gains[:-1]),
+            where=denominator > 0,
+        )
+        if len(closed):
+            growth = np.cumprod(1.0 + closed)
+            peaks = np.maximum.accumulate(np.r_[1.0, growth])
+            state.closed_days = len(closed)
+            state.sum_r = float(closed.sum())
+            state.sum_r2 = float(np.dot(closed, closed))
+            state.growth = float(growth[-1])
+            state.peak = float(peaks[-1])
+            state.max_drawdown = float(np.min(np.r_[1.0, growth] / peaks - 1.0))
+        return state
+
+    def apply(self, trade):
+        """Fold one trade (appended in time order) into the running state."""
+        ts = to_micros(trade.initiated_at)
+        day = ts // _DAY_US
+        if self.day is None:
+            self.first_us, self.day = ts, day
+        elif day > self.day:
+            self._close_day()
+            self.closed_days += day - self.day - 1  # idle days have zero return
+            self.day = day
+            self.day_open = self.value
+
+        price = trade.price_per_unit
+        before = self.positions.get(trade.ticker, 0.0)
+        qty = trade.quantity if trade.side == "buy" else -min(trade.quantity, before)
+        gain = before * (price - self.marks.get(trade.ticker, 0.0))
+        flow = qty * price
+        self.positions[trade.ticker] = before + qty
+        self.marks[trade.ticker] = price
+        self.value += gain + flow
+        self.day_gain += gain
+        self.day_flow += flow
+
+    def metrics(
+        self, benchmark_index: str = "", now: datetime | None = None, quotes=None
+    ):
+        """Inception-to-date metrics as of ``now``, equivalent to ``compute_performance(..., "inception")``.
+
+        The re-mark to ``quotes`` is applied here, not folded into the state.
+        """
+        now = now or datetime.now(timezone.utc)
+        end_us = to_micros(now)
+        if self.first_us is None:
+            return metrics_from_stats(0.0, 0.0, 0.0, 0.0, 0, 0, benchmark_index)
+
+        remark = mark_to_quotes(self.positions, self.marks, quotes)
+        idle_days = max(0, end_us // _DAY_US - self.day)
+        # The re-mark lands on the valuation day: the open day, or the last idle day after it.
+        returns = [self._day_return(0.0 if idle_days else remark)]
+        if idle_days:
+            returns.append(remark / self.value if self.value > 0 else 0.0)
+        growth, peak, max_drawdown = self.growth, self.peak, self.max_drawdown
+        for r in returns:
+            growth *= 1.0 + r
+            peak = max(peak, growth)
+            max_drawdown = min(max_drawdown, growth / peak - 1.0)
+        n = self.closed_days + 1 + idle_days
+        sum_r = self.sum_r + sum(returns)
+        sum_r2 = self.sum_r2 + sum(r * r for r in returns)
+        mean = sum_r / n
+        std = np.sqrt(max(0.0, (sum_r2 - n * mean * mean) / (n - 1))) if n > 1 else 0.0
+        days = max((end_us - self.first_us) / _DAY_US, 1.0)
+        return metrics_from_stats(
+            growth - 1.0, max_drawdown, mean, float(std), n, days, benchmark_index
+        )
+
+    def _day_return(self, extra_gain=0.0):
+        denominator = self.day_open + self.day_flow / 2
+        return (self.day_gain + extra_gain) / denominator if denominator > 0 else 0.0
+
+    def _close_day(self):
+        r = self._day_return()
+        self.closed_days += 1
+        self.sum_r += r
+        self.sum_r2 += r * r
+        self.growth *= 1.0 + r
+        self.peak = max(self.peak, self.growth)
+        self.max_drawdown = min(self.max_drawdown, self.growth / self.peak - 1.0)
+        self.day_gain = self.day_flow = 0.0
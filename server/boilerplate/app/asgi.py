@@ -0,0 +1,45 @@
+"""ASGI entry point: the same Flask app, served from an event loop.
+
+``app`` is an ASGI application. Install ``requirements-asgi.txt`` and run
+it under gunicorn with uvicorn workers::
+
+    gunicorn --bind 0.0.0.0:5000 --workers 2 -k uvicorn_worker.UvicornWorker app.asgi:app
+
+or, for development, ``uvicorn app.asgi:app --port 5000``.
+
+The adapter is a2wsgi's ``WSGIMiddleware``: the event loop handles
+connections, request bodies and response writes, and the route handlers in
+``app.routes``, unchanged, run in a bounded thread pool (``ASGI_THREADS``).
+Streamed responses (exports) are forwarded chunk by chunk with
+backpressure. Routes, status codes and bodies are identical to
+``app.wsgi``, and ``openapi.yaml`` describes both.
+
+Handlers are synchronous, so this buys the same request concurrency as
+gunicorn's threaded worker (``-k gthread --threads 32`` on ``app.wsgi``),
+which is what the Docker image runs: it needs no extra dependencies and
+skips the hop between the event loop and the pool, so it is the faster of
+the two (``benchmarks/bench_asgi.py`` compares sync, gthread and uvicorn
+workers). Use this entry point where an ASGI server is required; what the
+event loop adds is that idle keep-alive connections and slow clients do
+not hold a handler thread.
+
+Lambda keeps using ``app.wsgi.handler``.
+"""
+
+from __future__ import annotations
+
+import os
+
+from a2wsgi import WSGIMiddleware
+
+from app import create_app
+
+THREADS = int(os.environ.get("ASGI_THREADS", 32))
+
+
+def asgi_app(wsgi_app, threads: int = THREADS) -> WSGIMiddleware:
+    """Wrap a WSGI app for ASGI servers, running it on ``threads`` pool threads."""
+    return WSGIMiddleware(wsgi_app, workers=threads)
+
+
+app = asgi_app(create_app())
@@ -0,0 +1,163 @@
+"""Streaming bulk export of portfolios and trades.
+
+Rows are produced lazily from the store indexes and encoded in small
+chunks, so memory stays flat regardless of row count and the first chunk
+is written as soon as the first row is available.
+
+API Gateway and Lambda cannot stream: ``apig_wsgi`` buffers the whole body
+and Lambda caps response payloads at 6 MB. When running under Lambda, the
+export therefore stops once ``EXPORT_LAMBDA_MAX_BYTES`` of body has been
+produced and reports the continuation through the ``X-Export-Truncated``
+and ``X-Export-Next-Cursor`` headers; clients resume by passing the cursor
+back.
+"""
+
+from __future__ import annotations
+
+import csv
+import io
+import os
+
+from flask import Response, current_app, stream_with_context
+
+from app.pagination import decode_cursor, encode_cursor
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+PORTFOLIO_COLUMNS = [
+    "portfolioId",
+    "clientId",
+    "advisorId",
+    "portfolioName",
+    "status",
+    "investmentObjective",
+    "riskTolerance",
+    "totalValue",
+    "currency",
+    "benchmarkIndex",
+    "createdAt",
+    "updatedAt",
+]
+TRADE_COLUMNS = [
+    "tradeId",
+    "portfolioId",
+    "instrumentType",
+    "ticker",
+    "side",
+    "quantity",
+    "pricePerUnit",
+    "totalAmount",
+    "currency",
+    "status",
+    "complianceStatus",
+    "initiatedAt",
+    "executedAt",
+    "settledAt",
+]
+
+CHUNK_ROWS = 256
+LAMBDA_MAX_BYTES = int(os.environ.get("EXPORT_LAMBDA_MAX_BYTES", 5_000_000))
+
+
+def running_on_lambda() -> bool:
+    return "AWS_LAMBDA_FUNCTION_NAME" in os.environ
+
+
+# ---------------------------------------------------------------------------
+# Row sources: yield (cursor, row) pairs in oldest-first order
+# ---------------------------------------------------------------------------
+
+
+def iter_portfolio_rows(portfolio_store, status=None, after=None):
+    for portfolio in portfolio_store.iter_ordered(status=status, after=after):
+        yield encode_cursor(
+            portfolio.created_at, portfolio.portfolio_id
+        ), portfolio.to_dict()
+
+
+def decode_trade_cursor(cursor: str):
+    """Split a trade export cursor into its portfolio and trade keys; raises ``ValueError``.
+
+    A trade export cursor is ``<portfolio cursor>.<trade cursor>`` so an
+    all-portfolio export can resume inside the portfolio it stopped in.
+    """
+    portfolio_part, _, trade_part = cursor.partition(".")
+    return decode_cursor(portfolio_part), decode_cursor(trade_part)
+
+
+def iter_trade_rows(portfolio_store, trade_store, portfolio_id=None, after=None):
+    """Yield trades of one portfolio, or of every portfolio in creation order."""
+    portfolio_after, trade_after = after or (None, None)
+    if portfolio_id is not None:
+        portfolios = [portfolio_store.get(portfolio_id)]
+    else:
+        portfolios = portfolio_store.iter_ordered(after=portfolio_after, inclusive=True)
+
+    for portfolio in portfolios:
+        book = trade_store.get(portfolio.portfolio_id)
+        if book is None:
+            continue
+        resume = None
+        if portfolio_after and portfolio_after[1] == portfolio.portfolio_id:
+            resume = trade_after
+        portfolio_cursor = encode_cursor(portfolio.created_at, portfolio.portfolio_id)
+        for trade in book.iter_ordered(after=resume):
+            yield f"{portfolio_cursor}.{encode_cursor(trade.initiated_at, trade.trade_id)}", trade.to_dict()
+
+
+# ---------------------------------------------------------------------------
+# Encoding and response construction
+# ---------------------------------------------------------------------------
+
+
+def _encode_chunks(rows, fmt, columns, first_chunk_rows=1):
+    """Encode ``(cursor, row)`` pairs into ``(cursor_of_last_row, bytes)`` chunks."""
+    buf = io.StringIO()
+    if fmt == "csv":
+        writer = csv.DictWriter(
+            buf, fieldnames=columns, extrasaction="ignore", lineterminator="\n"
+        )
+        writer.writeheader()
+        write = writer.writerow
+    else:
+        dumps = current_app.json.dumps
+
+        def write(row):
+            buf.write(dumps(row))
+            buf.write("\n")
+
+    pending, limit, cursor = 0, first_chunk_rows, None
+    for cursor, row in rows:
+        write(row)
+        pending += 1
+        if pending >= limit:
+            yield cursor, buf.getvalue().encode()
+            buf.seek(0)
+            buf.truncate()
+            pending, limit = 0, CHUNK_ROWS
+    if buf.tell():
+        yield cursor, buf.getvalue().encode()
+
+
+def export_response(rows, fmt, columns, filename):
+    """Build the export response: streamed under WSGI servers, size-capped under Lambda."""
+    headers = {"Content-Disposition": f'attachment; filename="{filename}.{fmt}"'}
+    chunks = _encode_chunks(rows, fmt, columns)
+
+    if not running_on_lambda():
+        body = stream_with_context(chunk for _, chunk in chunks)
+        return Response(body, mimetype=EXPORT_FORMATS[fmt], headers=headers)
+
+    parts, size, last_cursor = [], 0, None
+    for cursor, chunk in chunks:
+        if parts and size + len(chunk) > LAMBDA_MAX_BYTES:
+            headers["X-Export-Truncated"] = "true"
+            headers["X-Export-Next-Cursor"] = last_cursor
+            break
+        parts.append(chunk)
+        size += len(chunk)
+        last_cursor = cursor
+    return Response(b"".join(parts), mimetype=EXPORT_FORMATS[fmt], headers=headers)
@@ -0,0 +1,204 @@
+"""``Idempotency-Key`` support for the create endpoints.
+
+Clients that time out (a Lambda timeout, a dropped connection) cannot
+tell whether a ``POST`` was applied. Retrying it with the same
+``Idempotency-Key`` header is safe: the first successful response is kept
+for ``IDEMPOTENCY_TTL`` seconds in a bounded LRU and replayed for every
+retry, with ``Idempotent-Replayed: true``. Keys are scoped to the method
+and path, so the same key on two portfolios names two requests.
+
+A request arriving while another with the same key is still running
+waits for it rather than doing the work twice, then replays its result.
+If the first request fails (any non-2xx response, which creates nothing),
+nothing is kept and the waiters run themselves, one at a time. Reusing a
+key with a different body is a client bug and gets 422.
+
+Keys live in this process, like the other caches: a retry that lands on
+another gunicorn worker or Lambda container is not deduplicated.
+"""
+
+from __future__ import annotations
+
+import functools
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, jsonify, request
+
+HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+CACHE_SIZE = int(os.environ.get("IDEMPOTENCY_CACHE_SIZE", 10000))
+CACHE_TTL = float(os.environ.get("IDEMPOTENCY_TTL", 24 * 3600))
+# How long a retry waits for the in-flight request with its key before giving up with 409.
+WAIT_TIMEOUT = float(os.environ.get("IDEMPOTENCY_WAIT_TIMEOUT", 30))
+
+
+class _Response:
+    __slots__ = ("fingerprint", "status", "body", "mimetype", "expires")
+
+    def __init__(self, fingerprint, status, body, mimetype, expires):
+        self.fingerprint = fingerprint
+        self.status = status
+        self.body = body
+        self.mimetype = mimetype
+        self.expires = expires
+
+
+class _InFlight:
+    __slots__ = ("fingerprint", "done", "response")
+
+    def __init__(self, fingerprint):
+        self.fingerprint = fingerprint
+        self.done = threading.Event()
+        self.response = None
+
+
+class IdempotencyStore:
+    def __init__(
+        self,
+        maxsize=CACHE_SIZE,
+        ttl=CACHE_TTL,
+        wait_timeout=WAIT_TIMEOUT,
+        clock=time.monotonic,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.wait_timeout = wait_timeout
+        self._clock = clock
+        self._entries: OrderedDict[tuple, _Response] = OrderedDict()
+        # In-flight requests are kept apart so LRU eviction never drops one that others wait on.
+        self._in_flight: dict[tuple, _InFlight] = {}
+        self._lock = threading.Lock()
+        self.replays = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def begin(self, key, fingerprint):
+        """Return ``(response, None)`` to replay, or ``(None, flight)`` once this request owns ``key``.
+
+        Blocks while another request owns ``key``, and returns ``(None, None)``
+        if it is still running after ``wait_timeout``.
+        """
+        while True:
+            with self._lock:
+                response = self._entries.get(key)
+                if response is not None and response.expires <= self._clock():
+                    del self._entries[key]
+                    response = None
+                if response is not None:
+                    self._entries.move_to_end(key)
+                    self.replays += 1
+                    return response, None
+                flight = self._in_flight.get(key)
+                if flight is None:
+                    flight = self._in_flight[key] = _InFlight(fingerprint)
+                    return None, flight
+                self.coalesced += 1
+            if not flight.done.wait(self.wait_timeout):
+                return None, None
+            if flight.response is not None:
+                return flight.response, None
+            # The owner failed and kept nothing; try to take the key over.
+
+    def finish(self, key, flight, status, body, mimetype):
+        """Release ``key``, keeping the response if it succeeded, and wake the waiters."""
+        response = None
+        with self._lock:
+            del self._in_flight[key]
+            if 200 <= status < 300:
+                response = _Response(
+                    flight.fingerprint, status, body, mimetype, self._clock() + self.ttl
+                )
+                self._entries[key] = response
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        flight.response = response
+        flight.done.set()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "inFlight": len(self._in_flight),
+                "replays": self.replays,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+idempotency_store = IdempotencyStore()
+
+
+def idempotent(view):
+    """Make a create view replay its response for retries carrying the same ``Idempotency-Key``."""
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get(HEADER)
+        if key is None:
+            return view(*args, **kwargs)
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return (
+                jsonify(
+                    {
+                        "error": "bad_request",
+                        "message": f"{HEADER} must be 1 to {MAX_KEY_LENGTH} characters",
+                    }
+                ),
+                400,
+            )
+
+        scope = (request.method, request.path, key)
+        fingerprint = hashlib.sha256(request.get_data()).digest()
+        response, flight = idempotency_store.begin(scope, fingerprint)
+        if response is not None:
+            return _replay(response, fingerprint)
+        if flight is None:
+            return (
+                jsonify(
+                    {
+                        "error": "conflict",
+                        "message": f"A request with this {HEADER} is still in progress",
+                    }
+                ),
+                409,
+            )
+
+        status, body, mimetype = 500, b"", None
+        try:
+            resp = current_app.make_response(view(*args, **kwargs))
+            status, mimetype = resp.status_code, resp.mimetype
+            if 200 <= status < 300:
+                body = resp.get_data()
+            return resp
+        finally:
+            idempotency_store.finish(scope, flight, status, body, mimetype)
+
+    return wrapper
+
+
+def _replay(response, fingerprint):
+    if response.fingerprint != fingerprint:
+        return (
+            jsonify(
+                {
+                    "error": "idempotency_key_reused",
+                    "message": f"{HEADER} was already used with a different request body",
+                }
+            ),
+            422,
+        )
+    resp = current_app.response_class(
+        response.body, status=response.status, mimetype=response.mimetype
+    )
+    resp.headers["Idempotent-Replayed"] = "true"
+    return resp
@@ -0,0 +1,402 @@
+"""Write-ahead journal for the in-memory store: group commit, snapshots, replay.
+
+``STORAGE_BACKEND=journal`` keeps the memory backend's data structures and
+adds durability. Every portfolio create and update, and every trade, is
+appended to an NDJSON journal in ``JOURNAL_DIR`` before the request that
+made it is answered, so a restarted worker comes back with its data.
+
+Each journal line is a JSON array of operations. ``["p", row]`` is a
+portfolio's full state after a create or update, and ``["t", row]`` is a
+new trade; rows follow ``PORTFOLIO_FIELDS`` and ``TRADE_FIELDS``. Writes
+made under ``locked()`` go out as one line when the lock is released, so a
+trade and the portfolio total it moved are replayed together or not at
+all. A final line torn by a crash fails to decode and is dropped.
+
+Group commit: concurrent writers queue their lines, and whichever finds no
+write in progress writes and fsyncs everything queued, then wakes the
+rest. One fsync covers every request that arrived during the previous one.
+``JOURNAL_FSYNC=0`` skips the fsync and only hands lines to the OS.
+
+Snapshots: once the current segment passes ``JOURNAL_SNAPSHOT_BYTES``, a
+background thread starts a new segment, writes every portfolio and trade
+to ``snapshot-<generation>.ndjson`` in the same line format, and deletes
+the files it supersedes. Writers are not paused, so records in the new
+segment may already be in the snapshot. Replay is idempotent (portfolio
+records are full rows and trades already present are skipped), so applying
+them twice is harmless. Startup loads the newest snapshot and replays only
+the segments after it, so restart time grows with the size of the data
+rather than the length of its history.
+
+A journal directory belongs to one process; a second one fails to open it.
+Like the memory backend, run a single gunicorn worker.
+"""
+
+from __future__ import annotations
+
+import fcntl
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from app.models import (
+    TRADE_FIELDS,
+    MemoryStorage,
+    PortfolioRepository,
+    TradeBook,
+    TradeStore,
+    portfolio_from_row,
+    portfolio_row,
+    trade_from_row,
+    trade_row,
+)
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised when orjson is not installed
+    orjson = None
+
+FSYNC = os.environ.get("JOURNAL_FSYNC", "1") != "0"
+SNAPSHOT_BYTES = int(os.environ.get("JOURNAL_SNAPSHOT_BYTES", 64 * 1024 * 1024))
+# Operations per snapshot line; larger lines decode faster but buffer more.
+SNAPSHOT_CHUNK = 1000
+_INITIATED_AT = TRADE_FIELDS.index("initiated_at")
+_NO_TRADES = -(2**63)
+
+
+def _dumps(ops) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(ops)
+    return json.dumps(ops, separators=(",", ":")).encode()
+
+
+_loads = orjson.loads if orjson is not None else json.loads
+
+
+def _path(directory, kind, generation) -> str:
+    return os.path.join(directory, f"{kind}-{generation:08d}.ndjson")
+
+
+def _generations(directory, kind) -> list[int]:
+    prefix, suffix = f"{kind}-", ".ndjson"
+    return sorted(
+        int(name[len(prefix) : -len(suffix)])
+        for name in os.listdir(directory)
+        if name.startswith(prefix) and name.endswith(suffix)
+    )
+
+
+def _fsync_dir(directory):
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class JournalError(RuntimeError):
+    """The journal could not be read or written."""
+
+
+class Journal:
+    """Append-only segment files with group commit."""
+
+    def __init__(self, directory: str, generation: int, fsync: bool = FSYNC):
+        self.directory = directory
+        self.fsync = fsync
+        self.generation = generation
+        self._file = open(_path(directory, "journal", generation), "ab")
+        _fsync_dir(directory)
+        self.bytes = self._file.tell()
+        self._cond = threading.Condition()
+        self._pending: list[bytes] = []
+        self._seq = 0
+        self._durable = 0
+        self._flushing = False
+        self._failed = None
+        self.appends = 0
+        self.commits = 0
+
+    def append(self, ops):
+        """Write one line of operations and return once it is durable."""
+        line = _dumps(ops) + b"\n"
+        with self._cond:
+            self._check()
+            self._seq += 1
+            seq = self._seq
+            self._pending.append(line)
+            self.appends += 1
+            while self._durable < seq:
+                if self._flushing:
+                    self._cond.wait()
+                    self._check()
+                else:
+                    self._flush()
+
+    def rotate(self) -> int:
+        """Make everything queued durable, then continue in a new segment; returns its generation."""
+        with self._cond:
+            while self._flushing or self._pending:
+                if self._flushing:
+                    self._cond.wait()
+                else:
+                    self._flush()
+                self._check()
+            self._file.close()
+            self.generation += 1
+            self._file = open(_path(self.directory, "journal", self.generation), "ab")
+            _fsync_dir(self.directory)
+            self.bytes = 0
+            return self.generation
+
+    def stats(self):
+        with self._cond:
+            return {
+                "generation": self.generation,
+                "bytes": self.bytes,
+                "appends": self.appends,
+                "commits": self.commits,
+            }
+
+    def close(self):
+        with self._cond:
+            while self._flushing:
+                self._cond.wait()
+            if self._pending and self._failed is None:
+                self._flush()
+            self._file.close()
+
+    def _flush(self):
+        """Write and sync the queued lines. Called with the condition held; releases it during I/O."""
+        batch, self._pending = self._pending, []
+        upto = self._seq
+        self._flushing = True
+        self._cond.release()
+        try:
+            data = b"".join(batch)
+            self._file.write(data)
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+        except BaseException as exc:
+            # What reached the disk is unknown, so stop accepting writes.
+            self._failed = exc
+        finally:
+            self._cond.acquire()
+            self._flushing = False
+            self._cond.notify_all()
+        self._check()
+        self.bytes += len(data)
+        self._durable = upto
+        self.commits += 1
+
+    def _check(self):
+        if self._failed is not None:
+            raise JournalError(
+                "journal write failed; restart to recover from disk"
+            ) from self._failed
+
+
+class _JournaledPortfolios(PortfolioRepository):
+    def __init__(self, storage: JournalStorage):
+        super().__init__()
+        self._storage = storage
+
+    def add(self, portfolio):
+        super().add(portfolio)
+        self._storage.record(("p", portfolio_row(portfolio)))
+
+    def update(self, portfolio, **changes):
+        super().update(portfolio, **changes)
+        self._storage.record(("p", portfolio_row(portfolio)))
+
+
+class _JournaledTradeBook(TradeBook):
+    def __init__(self, storage: JournalStorage, index):
+        super().__init__(index)
+        self._storage = storage
+
+    def append(self, trade):
+        super().append(trade)
+        self._storage.record(("t", trade_row(trade)))
+
+
+class JournalStorage(MemoryStorage):
+    """Memory storage made durable by a write-ahead journal in ``directory``."""
+
+    def __init__(
+        self, directory: str, fsync: bool = FSYNC, snapshot_bytes: int = SNAPSHOT_BYTES
+    ):
+        super().__init__()
+        self.portfolios = _JournaledPortfolios(self)
+        self.trades = TradeStore(
+            book_factory=lambda index: _JournaledTradeBook(self, index)
+        )
+        self.directory = directory
+        self.snapshot_bytes = snapshot_bytes
+        self._local = threading.local()
+        self._snapshot_lock = threading.Lock()
+        # Held while a background snapshot runs, so a large segment starts only one.
+        self._snapshot_started = threading.Lock()
+
+        os.makedirs(directory, exist_ok=True)
+        self._lock_file = open(os.path.join(directory, "LOCK"), "a")
+        try:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            self._lock_file.close()
+            raise JournalError(
+                f"journal directory {directory!r} is in use by another process"
+            ) from None
+
+        self.replay_stats, last_generation = self._replay()
+        self.journal = Journal(directory, last_generation + 1, fsync)
+
+    def record(self, op):
+        ops = getattr(self._local, "ops", None)
+        if ops is not None:
+            ops.append(op)
+        else:
+            self._commit([op])
+
+    @contextmanager
+    def locked(self, portfolio_id: str):
+        """Serialize writes to one portfolio and journal them as one line on release."""
+        with self._locks(portfolio_id):
+            if getattr(self._local, "ops", None) is not None:
+                yield
+                return
+            self._local.ops = ops = []
+            try:
+                yield
+            finally:
+                self._local.ops = None
+                if ops:
+                    self._commit(ops)
+
+    def snapshot(self) -> int:
+        """Write the current state as a snapshot and drop the files it supersedes; returns its generation."""
+        with self._snapshot_lock:
+            generation = self.journal.rotate()
+            path = _path(self.directory, "snapshot", generation)
+            tmp = path + ".tmp"
+            with open(tmp, "wb") as f:
+                ops = []
+                for portfolio in list(self.portfolios.values()):
+                    ops.append(("p", portfolio_row(portfolio)))
+                    if len(ops) >= SNAPSHOT_CHUNK:
+                        f.write(_dumps(ops) + b"\n")
+                        ops = []
+                for _, book in list(self.trades.items()):
+                    for trade in list(book):
+                        ops.append(("t", trade_row(trade)))
+                        if len(ops) >= SNAPSHOT_CHUNK:
+                            f.write(_dumps(ops) + b"\n")
+                            ops = []
+                if ops:
+                    f.write(_dumps(ops) + b"\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, path)
+            _fsync_dir(self.directory)
+            for kind in ("snapshot", "journal"):
+                for old in _generations(self.directory, kind):
+                    if old < generation:
+                        os.remove(_path(self.directory, kind, old))
+            return generation
+
+    def reset(self):
+        super().reset()
+        self.snapshot()
+
+    def close(self):
+        self.journal.close()
+        self._lock_file.close()
+
+    def _commit(self, ops):
+        self.journal.append(ops)
+        if (
+            self.journal.bytes >= self.snapshot_bytes
+            and self._snapshot_started.acquire(blocking=False)
+        ):
+            threading.Thread(
+                target=self._background_snapshot, name="journal-snapshot", daemon=True
+            ).start()
+
+    def _background_snapshot(self):
+        try:
+            self.snapshot()
+        finally:
+            self._snapshot_started.release()
+
+    def _replay(self):
+        """Load the newest snapshot and the journal segments after it; returns ``(stats, last generation)``."""
+        start = time.perf_counter()
+        snapshots = _generations(self.directory, "snapshot")
+        segments = _generations(self.directory, "journal")
+        base = snapshots[-1] if snapshots else 0
+        newest = {}
+        records = (
+            self._load(_path(self.directory, "snapshot", base), newest)
+            if snapshots
+            else 0
+        )
+        snapshot_records = records
+        for generation in segments:
+            if generation >= base:
+                records += self._load(
+                    _path(self.directory, "journal", generation), newest
+                )
+        stats = {
+            "snapshotGeneration": base,
+            "snapshotRecords": snapshot_records,
+            "journalRecords": records - snapshot_records,
+            "seconds": round(time.perf_counter() - start, 3),
+        }
+        return stats, max(segments[-1] if segments else 0, base)
+
+    def _load(self, path, newest: dict) -> int:
+        """Apply the records in ``path``; ``newest`` maps portfolio_id to its latest trade time so far.
+
+        A trade later than that cannot be loaded already, so only older ones
+        pay for the duplicate lookup, which searches sealed segments. Holdings
+        are applied as trades load rather than rebuilt afterwards, so sealed
+        trades are never materialized during replay.
+        """
+        records = 0
+        portfolios, trades, holdings = self.portfolios, self.trades, self.holdings
+        # The base-class methods index without journaling the records again.
+        add_portfolio, append_trade = PortfolioRepository.add, TradeBook.append
+        with open(path, "rb+") as f:
+            offset = 0
+            for line in f:
+                try:
+                    ops = _loads(line)
+                except ValueError:
+                    if f.read(1):
+                        raise JournalError(
+                            f"corrupt record in {path} at byte {offset}"
+                        ) from None
+                    # A line torn by a crash mid-write: it was never acknowledged.
+                    f.truncate(offset)
+                    break
+                offset += len(line)
+                for kind, row in ops:
+                    if kind == "t":
+                        portfolio_id, initiated_at = row[1], row[_INITIATED_AT]
+                        book = trades.book(portfolio_id)
+                        if (
+                            initiated_at > newest.get(portfolio_id, _NO_TRADES)
+                            or book.get(row[0]) is None
+                        ):
+                            trade = trade_from_row(row)
+                            append_trade(book, trade)
+                            holdings.ledger(portfolio_id).apply(trade)
+                            newest[portfolio_id] = max(
+                                initiated_at, newest.get(portfolio_id, _NO_TRADES)
+                            )
+                    else:
+                        add_portfolio(portfolios, portfolio_from_row(row))
+                records += len(ops)
+        return records
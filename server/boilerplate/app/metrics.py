@@ -0,0 +1,243 @@
+"""Request metrics: counts, latency histograms and in-flight requests.
+
+``init_app`` installs request hooks that time every request and record
+its outcome per endpoint (the Flask endpoint name, so cardinality stays
+bounded). Inside a request, ``phase(name)`` attributes time to a phase:
+``parse`` and ``serialize`` are timed by the JSON provider, and routes mark
+``validate`` and ``store``. ``/metrics`` renders the registry in the
+Prometheus text format. Under Lambda, each request is also written to
+stdout as a CloudWatch Embedded Metric Format line.
+
+Metrics are per process. Behind gunicorn each worker keeps its own series,
+and a scrape sees whichever worker answers it.
+
+Recording costs one lock acquisition and a few bisects per request.
+``benchmarks/bench_metrics.py`` measures the overhead, and
+``METRICS_ENABLED=0`` turns the hooks off.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from flask import g, request
+
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+EMF_NAMESPACE = os.environ.get("METRICS_NAMESPACE", "AdvisorPortfolioAPI")
+
+
+class Histogram:
+    __slots__ = ("counts", "sum")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests: dict[tuple[str, str, int], int] = {}
+        self.latency: dict[tuple[str, str], Histogram] = {}
+        self.phases: dict[tuple[str, str], Histogram] = {}
+        self.in_flight = 0
+
+    def started(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def ended(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def observe(
+        self,
+        endpoint: str,
+        method: str,
+        status: int,
+        elapsed: float,
+        phases: dict[str, float],
+    ):
+        with self._lock:
+            key = (endpoint, method, status)
+            self.requests[key] = self.requests.get(key, 0) + 1
+            histogram = self.latency.get((endpoint, method))
+            if histogram is None:
+                histogram = self.latency[(endpoint, method)] = Histogram()
+            histogram.observe(elapsed)
+            for name, seconds in phases.items():
+                histogram = self.phases.get((endpoint, name))
+                if histogram is None:
+                    histogram = self.phases[(endpoint, name)] = Histogram()
+                histogram.observe(seconds)
+
+    def render(self) -> str:
+        """Render all series in the Prometheus text exposition format."""
+        with self._lock:
+            requests = sorted(self.requests.items())
+            latency = sorted(
+                (key, list(h.counts), h.sum) for key, h in self.latency.items()
+            )
+            phases = sorted(
+                (key, list(h.counts), h.sum) for key, h in self.phases.items()
+            )
+            in_flight = self.in_flight
+
+        lines = [
+            "# HELP http_requests_total Requests handled, by endpoint, method and status.",
+            "# TYPE http_requests_total counter",
+        ]
+        for (endpoint, method, status), count in requests:
+            lines.append(
+                f'http_requests_total{{endpoint="{endpoint}",method="{method}",status="{status}"}} {count}'
+            )
+        lines += [
+            "# HELP http_request_duration_seconds Request latency, by endpoint and method.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for (endpoint, method), counts, total in latency:
+            _histogram_lines(
+                lines,
+                "http_request_duration_seconds",
+                f'endpoint="{endpoint}",method="{method}"',
+                counts,
+                total,
+            )
+        lines += [
+            "# HELP http_request_phase_seconds Time spent per request phase, by endpoint.",
+            "# TYPE http_request_phase_seconds histogram",
+        ]
+        for (endpoint, name), counts, total in phases:
+            _histogram_lines(
+                lines,
+                "http_request_phase_seconds",
+                f'endpoint="{endpoint}",phase="{name}"',
+                counts,
+                total,
+            )
+        lines += [
+            "# HELP http_requests_in_flight Requests currently being handled.",
+            "# TYPE http_requests_in_flight gauge",
+            f"http_requests_in_flight {in_flight}",
+        ]
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self.requests.clear()
+            self.latency.clear()
+            self.phases.clear()
+
+
+def _histogram_lines(lines, name, labels, counts, total):
+    cumulative = 0
+    for bound, count in zip(BUCKETS, counts):
+        cumulative += count
+        lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+    cumulative += counts[-1]
+    lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {cumulative}')
+    lines.append(f"{name}_sum{{{labels}}} {total}")
+    lines.append(f"{name}_count{{{labels}}} {cumulative}")
+
+
+def render_samples(samples) -> str:
+    """Render ``(name, type, help, value)`` tuples as unlabelled Prometheus series."""
+    lines = []
+    for name, kind, description, value in samples:
+        lines += [
+            f"# HELP {name} {description}",
+            f"# TYPE {name} {kind}",
+            f"{name} {value}",
+        ]
+    return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+@contextmanager
+def phase(name: str):
+    """Attribute the enclosed time to ``name`` for the current request, if one is being measured."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        phases = g.get("metrics_phases") if g else None
+        if phases is not None:
+            phases[name] = phases.get(name, 0.0) + time.perf_counter() - start
+
+
+def emf_line(endpoint, method, status, elapsed, phases, now_ms) -> str:
+    """One CloudWatch Embedded Metric Format record for a request."""
+    metrics = [{"Name": "Latency", "Unit": "Milliseconds"}]
+    record = {
+        "endpoint": endpoint,
+        "method": method,
+        "status": status,
+        "Latency": round(elapsed * 1000, 3),
+    }
+    for name, seconds in phases.items():
+        metric = f"{name.capitalize()}Latency"
+        metrics.append({"Name": metric, "Unit": "Milliseconds"})
+        record[metric] = round(seconds * 1000, 3)
+    record["_aws"] = {
+        "Timestamp": now_ms,
+        "CloudWatchMetrics": [
+            {
+                "Namespace": EMF_NAMESPACE,
+                "Dimensions": [["endpoint", "method"]],
+                "Metrics": metrics,
+            }
+        ],
+    }
+    return json.dumps(record, separators=(",", ":"))
+
+
+def init_app(app):
+    if os.environ.get("METRICS_ENABLED", "1") == "0":
+        return
+    emit_emf = "AWS_LAMBDA_FUNCTION_NAME" in os.environ
+
+    @app.before_request
+    def _start_timer():
+        g.metrics_start = time.perf_counter()
+        g.metrics_phases = {}
+        registry.started()
+
+    @app.after_request
+    def _record(response):
+        start = g.get("metrics_start")
+        if start is None:
+            return response
+        elapsed = time.perf_counter() - start
+        endpoint = request.endpoint or "unmatched"
+        phases = g.metrics_phases
+        registry.observe(
+            endpoint, request.method, response.status_code, elapsed, phases
+        )
+        if emit_emf:
+            line = emf_line(
+                endpoint,
+                request.method,
+                response.status_code,
+                elapsed,
+                phases,
+                int(time.time() * 1000),
+            )
+            sys.stdout.write(line + "\n")
+        return response
+
+    @app.teardown_request
+    def _finish(exc):
+        if g.pop("metrics_start", None) is not None:
+            registry.ended()
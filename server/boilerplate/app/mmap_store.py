@@ -0,0 +1,916 @@
+"""Read-only snapshot of the stores in a memory-mapped file, shared by every worker.
+
+``STORAGE_BACKEND=mmap`` serves the portfolios, trades and holdings saved
+in the snapshot at ``MMAP_SNAPSHOT_PATH``. Build one from the store another
+backend keeps::
+
+    STORAGE_BACKEND=sqlite python -m app.mmap_store build portfolios.snap
+
+Trades are stored in columns of fixed-width values, each book's trades
+contiguous and in time order. Alongside them are precomputed orders: by
+trade id and by status within each book, and by ticker and by time across
+books. Every gunicorn worker maps the same file read-only and reads the
+columns in place through ``memoryview``, so the history is held once in
+the OS page cache however many workers there are, and a worker's own
+memory holds only the trades it materializes for a request. Opening a
+snapshot decodes its JSON manifest and the portfolios, and nothing per
+trade, so startup time does not grow with the history.
+
+Writes land in a per-process delta: a memory ``TradeStore`` for new
+trades, plus the portfolio and holdings objects, which are loaded into
+memory on open (portfolios) or first use (holdings) because they are small
+and updated in place. The delta is neither shared with other workers nor
+durable, so the backend suits read-mostly serving of reference and
+historical data. Publish new data by building a new snapshot and
+restarting the workers. ``build`` writes a temporary file and renames it
+over the old one, so workers still mapping the old file read it intact.
+
+The file is native-endian, for the platform that built it. It starts with
+an 8-byte magic and the offset and length of the JSON manifest, which
+lists the sections that follow, each 8-byte aligned.
+"""
+
+from __future__ import annotations
+
+import argparse
+import heapq
+import io
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import NamedTuple
+
+from app.models import (
+    READ_CHUNK,
+    Holdings,
+    HoldingsStore,
+    MemoryStorage,
+    Position,
+    Trade,
+    TradeColumns,
+    TradeStore,
+    create_storage,
+    from_micros,
+    iter_by_key,
+    portfolio_from_row,
+    portfolio_row,
+    take_page,
+    to_micros,
+    trade_key,
+    uuid_bytes,
+    uuid_str,
+)
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised when orjson is not installed
+    orjson = None
+
+MAGIC = b"PFSNAP01"
+_HEADER = struct.Struct("=8sQQ")
+_ITEMSIZES = {code: array(code).itemsize for code in "BIldq"}
+# Label-coded trade fields, in the order of their code sections.
+_LABELS = ("instrument_type", "side", "order_type", "status", "compliance_status")
+_NO_TIME = -(2**63)
+_NAN = float("nan")
+
+
+def _dumps(value) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, separators=(",", ":")).encode()
+
+
+def _loads(data):
+    return orjson.loads(data) if orjson is not None else json.loads(bytes(data))
+
+
+class SnapshotError(RuntimeError):
+    """A snapshot file is corrupt or was built on another platform."""
+
+
+def write_snapshot(storage, path: str) -> dict:
+    """Write every portfolio, trade and holding in ``storage`` to a snapshot at ``path``; returns its manifest."""
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        manifest = _write(storage, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return manifest
+
+
+def _write(storage, f) -> dict:
+    """Write ``storage`` to the seekable binary file ``f``.
+
+    Books are read through the portfolios, which every backend can list.
+    """
+    timestamps, ticker_codes, quantities, prices = (
+        array("q"),
+        array("l"),
+        array("d"),
+        array("d"),
+    )
+    limit_prices, executed_at, settled_at = array("d"), array("q"), array("q")
+    labels = {name: {} for name in _LABELS}
+    codes = {name: [] for name in _LABELS}
+    trade_ids, tickers = [], []
+    id_order, status_rows = array("I"), array("I")
+    portfolios, books, holdings = [], [], bytearray()
+
+    for portfolio in storage.portfolios.values():
+        portfolios.append(portfolio_row(portfolio))
+        book = storage.trades.get(portfolio.portfolio_id)
+        trades = list(book) if book is not None else []
+        if not trades:
+            continue
+        start = len(timestamps)
+        local, by_status = {}, {}
+        for trade in trades:
+            by_status.setdefault(trade.status, []).append(len(timestamps))
+            for name in _LABELS:
+                value = getattr(trade, name)
+                codes[name].append(labels[name].setdefault(value, len(labels[name])))
+            trade_ids.append(trade.trade_id)
+            tickers.append(trade.ticker)
+            timestamps.append(to_micros(trade.initiated_at))
+            ticker_codes.append(local.setdefault(trade.ticker, len(local)))
+            quantities.append(
+                trade.quantity if trade.side == "buy" else -trade.quantity
+            )
+            prices.append(trade.price_per_unit)
+            limit_prices.append(
+                _NAN if trade.limit_price is None else trade.limit_price
+            )
+            executed_at.append(
+                _NO_TIME if trade.executed_at is None else to_micros(trade.executed_at)
+            )
+            settled_at.append(
+                _NO_TIME if trade.settled_at is None else to_micros(trade.settled_at)
+            )
+        statuses = {}
+        for status, rows in by_status.items():
+            statuses[status] = [len(status_rows), len(rows)]
+            status_rows.extend(rows)
+        # Canonical UUIDs sort the same as strings and as raw bytes.
+        id_order.extend(
+            sorted(range(start, len(timestamps)), key=trade_ids.__getitem__)
+        )
+        positions = _dumps(
+            [
+                [p.ticker, p.quantity, p.cost_basis]
+                for p in storage.holdings.ledger(portfolio.portfolio_id).positions()
+            ]
+        )
+        books.append(
+            {
+                "portfolioId": portfolio.portfolio_id,
+                "start": start,
+                "count": len(trades),
+                "tickers": list(local),
+                "statuses": statuses,
+                "holdings": [len(holdings), len(positions)],
+            }
+        )
+        holdings += positions
+
+    n = len(timestamps)
+    by_ticker = sorted(
+        range(n), key=lambda row: (tickers[row], timestamps[row], trade_ids[row])
+    )
+    ticker_index, at = {}, 0
+    for i in range(1, n + 1):
+        if i == n or tickers[by_ticker[i]] != tickers[by_ticker[at]]:
+            ticker_index[tickers[by_ticker[at]]] = [at, i - at]
+            at = i
+    by_time = sorted(range(n), key=lambda row: (timestamps[row], trade_ids[row]))
+
+    raw_ids = [uuid_bytes(trade_id) for trade_id in trade_ids]
+    sections = {
+        "timestamps": timestamps,
+        "tickerCodes": ticker_codes,
+        "quantities": quantities,
+        "prices": prices,
+        "limitPrices": limit_prices,
+        "executedAt": executed_at,
+        "settledAt": settled_at,
+        "idOrder": id_order,
+        "statusRows": status_rows,
+        "tickerRows": array("I", by_ticker),
+        "timeRows": array("I", by_time),
+        "holdings": holdings,
+    }
+    for name in _LABELS:
+        sections[name] = array("B" if len(labels[name]) <= 0x100 else "I", codes[name])
+    if None in raw_ids:
+        text = [trade_id.encode() for trade_id in trade_ids]
+        offsets = array("q", [0])
+        for encoded in text:
+            offsets.append(offsets[-1] + len(encoded))
+        sections["idOffsets"], sections["idText"] = offsets, b"".join(text)
+    else:
+        sections["ids"] = b"".join(raw_ids)
+
+    f.write(_HEADER.pack(MAGIC, 0, 0))
+    layout = {}
+    for name, data in sections.items():
+        f.write(b"\0" * (-f.tell() % 8))
+        view = memoryview(data)
+        layout[name] = [
+            f.tell(),
+            view.nbytes,
+            data.typecode if isinstance(data, array) else "B",
+        ]
+        f.write(view)
+    manifest = {
+        "format": 1,
+        "byteorder": sys.byteorder,
+        "itemsizes": _ITEMSIZES,
+        "trades": n,
+        "labels": {name: list(labels[name]) for name in _LABELS},
+        "books": books,
+        "tickers": ticker_index,
+        "portfolios": portfolios,
+        "sections": layout,
+    }
+    blob = _dumps(manifest)
+    f.write(b"\0" * (-f.tell() % 8))
+    offset = f.tell()
+    f.write(blob)
+    f.seek(0)
+    f.write(_HEADER.pack(MAGIC, offset, len(blob)))
+    f.seek(0, io.SEEK_END)
+    return manifest
+
+
+class _Book(NamedTuple):
+    """A book's rows in the snapshot: ``start`` and ``count``, its tickers by code, and its status runs."""
+
+    portfolio_id: str
+    start: int
+    count: int
+    tickers: list[str]
+    statuses: dict[str, list[int]]
+    holdings: list[int]
+
+
+class MappedSnapshot:
+    """The columns of a snapshot, read in place from ``buffer`` (a read-only mmap, or bytes).
+
+    Rows are numbered across the whole file; a book is a contiguous run.
+    """
+
+    def __init__(self, buffer):
+        self._buffer = buffer
+        view = memoryview(buffer)
+        if len(view) < _HEADER.size:
+            raise SnapshotError("snapshot is truncated")
+        magic, offset, length = _HEADER.unpack_from(view)
+        if magic != MAGIC or offset + length > len(view):
+            raise SnapshotError("not a portfolio snapshot, or truncated")
+        manifest = _loads(view[offset : offset + length])
+        if (
+            manifest["byteorder"] != sys.byteorder
+            or manifest["itemsizes"] != _ITEMSIZES
+        ):
+            raise SnapshotError(
+                "snapshot was built on a platform with a different byte order or word size"
+            )
+
+        sections = {
+            name: view[start : start + size].cast(code)
+            for name, (start, size, code) in manifest["sections"].items()
+        }
+        self.trade_count = manifest["trades"]
+        self.portfolio_rows = manifest["portfolios"]
+        self.timestamps = sections["timestamps"]
+        self.ticker_codes = sections["tickerCodes"]
+        self.quantities = sections["quantities"]
+        self.prices = sections["prices"]
+        self._limit_prices = sections["limitPrices"]
+        self._executed_at = sections["executedAt"]
+        self._settled_at = sections["settledAt"]
+        self._id_order = sections["idOrder"]
+        self._status_rows = sections["statusRows"]
+        self._ticker_rows = sections["tickerRows"]
+        self._time_rows = sections["timeRows"]
+        self._holdings = sections["holdings"]
+        self._raw_ids = sections.get("ids")
+        self._id_offsets = sections.get("idOffsets")
+        self._id_text = sections.get("idText")
+        self._labels = tuple(manifest["labels"][name] for name in _LABELS)
+        self._codes = tuple(sections[name] for name in _LABELS)
+        self._label_codes = {
+            name: {label: code for code, label in enumerate(labels)}
+            for name, labels in zip(_LABELS, self._labels)
+        }
+        self._tickers = manifest["tickers"]
+        self._books = [
+            _Book(
+                b["portfolioId"],
+                b["start"],
+                b["count"],
+                b["tickers"],
+                b["statuses"],
+                b["holdings"],
+            )
+            for b in manifest["books"]
+        ]
+        self._by_portfolio = {book.portfolio_id: book for book in self._books}
+        self._starts = [book.start for book in self._books]
+
+    @classmethod
+    def open(cls, path: str) -> MappedSnapshot:
+        with open(path, "rb") as f:
+            try:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise SnapshotError(f"snapshot {path!r} is empty") from None
+        return cls(buffer)
+
+    @classmethod
+    def empty(cls) -> MappedSnapshot:
+        f = io.BytesIO()
+        _write(MemoryStorage(), f)
+        return cls(f.getvalue())
+
+    def book(self, portfolio_id) -> _Book:
+        """The rows of ``portfolio_id``'s trades; an empty run if it has none."""
+        return self._by_portfolio.get(portfolio_id) or _Book(
+            portfolio_id, 0, 0, [], {}, [0, 0]
+        )
+
+    def portfolio_ids(self) -> list[str]:
+        return list(self._by_portfolio)
+
+    def positions(self, portfolio_id) -> list[Position]:
+        offset, length = self.book(portfolio_id).holdings
+        if not length:
+            return []
+        return [
+            Position(*values)
+            for values in _loads(self._holdings[offset : offset + length])
+        ]
+
+    def count(self, book: _Book, status=None) -> int:
+        if status is None:
+            return book.count
+        return book.statuses.get(status, (0, 0))[1]
+
+    def ticker_count(self, ticker) -> int:
+        return self._tickers.get(ticker, (0, 0))[1]
+
+    def rows(self, book: _Book, status, start: int, end: int):
+        """Rows ``start:end`` of ``book``'s trades, or of those with ``status``, in time order."""
+        if status is None:
+            return range(book.start + start, book.start + end)
+        offset = book.statuses.get(status, (0, 0))[0]
+        return self._status_rows[offset + start : offset + end]
+
+    def status_end(self, book: _Book, status, position: int) -> int:
+        """How many of ``book``'s trades with ``status`` come before ``position`` in the book."""
+        if status is None:
+            return position
+        offset, count = book.statuses.get(status, (0, 0))
+        return (
+            bisect_left(
+                self._status_rows, book.start + position, offset, offset + count
+            )
+            - offset
+        )
+
+    def find(self, book: _Book, trade_id, initiated_at=None) -> int:
+        """Row of ``trade_id`` in ``book``, or -1.
+
+        Given its ``initiated_at``, only rows at that instant are compared;
+        otherwise the book's id order is bisected.
+        """
+        start, end = book.start, book.start + book.count
+        if initiated_at is not None:
+            timestamps, at = self.timestamps, to_micros(initiated_at)
+            for row in range(
+                bisect_left(timestamps, at, start, end),
+                bisect_right(timestamps, at, start, end),
+            ):
+                if self.trade_id(row) == trade_id:
+                    return row
+            return -1
+        key = trade_id if self._raw_ids is None else uuid_bytes(trade_id)
+        if key is None:
+            return -1
+        order = self._id_order
+        i = bisect_left(order, key, start, end, key=self._id)
+        if i < end and self._id(order[i]) == key:
+            return order[i]
+        return -1
+
+    def trade_id(self, row: int) -> str:
+        if self._raw_ids is not None:
+            return uuid_str(bytes(self._raw_ids[16 * row : 16 * row + 16]))
+        offsets = self._id_offsets
+        return bytes(self._id_text[offsets[row] : offsets[row + 1]]).decode()
+
+    def trades(self, rows, book: _Book) -> list[Trade]:
+        """Materialize the trades at ``rows`` of ``book``, in that order."""
+        timestamps, ticker_codes, quantities, prices = (
+            self.timestamps,
+            self.ticker_codes,
+            self.quantities,
+            self.prices,
+        )
+        limit_prices, executed_at, settled_at = (
+            self._limit_prices,
+            self._executed_at,
+            self._settled_at,
+        )
+        instrument_types, sides, order_types, statuses, compliance = self._labels
+        instrument_codes, side_codes, order_codes, status_codes, compliance_codes = (
+            self._codes
+        )
+        portfolio_id, tickers = book.portfolio_id, book.tickers
+        out = []
+        for row in rows:
+            limit_price, executed, settled = (
+                limit_prices[row],
+                executed_at[row],
+                settled_at[row],
+            )
+            out.append(
+                Trade(
+                    portfolio_id=portfolio_id,
+                    instrument_type=instrument_types[instrument_codes[row]],
+                    ticker=tickers[ticker_codes[row]],
+                    side=sides[side_codes[row]],
+                    quantity=abs(quantities[row]),
+                    order_type=order_types[order_codes[row]],
+                    limit_price=None if limit_price != limit_price else limit_price,
+                    trade_id=self.trade_id(row),
+                    price_per_unit=prices[row],
+                    status=statuses[status_codes[row]],
+                    compliance_status=compliance[compliance_codes[row]],
+                    initiated_at=from_micros(timestamps[row]),
+                    executed_at=None if executed == _NO_TIME else from_micros(executed),
+                    settled_at=None if settled == _NO_TIME else from_micros(settled),
+                )
+            )
+        return out
+
+    def iter_newest(self, book: _Book, before=None, since=None):
+        """Iterate ``book``'s trades newest-first; see ``TradeBook.iter_newest``."""
+        timestamps = self.timestamps
+        end = book.start + book.count
+        if before is not None:
+            end = bisect_right(timestamps, to_micros(before[0]), book.start, end)
+        low = (
+            book.start
+            if since is None
+            else bisect_left(timestamps, to_micros(since), book.start, end)
+        )
+        return iter_by_key(
+            timestamps, lambda rows: self.trades(rows, book), low, end, before
+        )
+
+    def search(
+        self,
+        ticker=None,
+        since=None,
+        before=None,
+        side=None,
+        status=None,
+        books=None,
+        limit=20,
+    ) -> tuple[list[Trade], bool]:
+        """Up to ``limit`` trades newest-first; the snapshot's share of ``TradeIndex.search``.
+
+        ``books`` are ``_Book`` runs to keep. Side and status are checked on
+        the code columns, so only matching trades are materialized.
+        """
+        side_code = None if side is None else self._label_codes["side"].get(side, -1)
+        status_code = (
+            None if status is None else self._label_codes["status"].get(status, -1)
+        )
+        if -1 in (side_code, status_code):
+            return [], False
+        if ticker is None:
+            refs = self._time_rows
+        else:
+            offset, count = self._tickers.get(ticker, (0, 0))
+            refs = self._ticker_rows[offset : offset + count]
+        timestamps, key = self.timestamps, self.timestamps.__getitem__
+        end = len(refs)
+        if before is not None:
+            at = to_micros(before[0])
+            end = bisect_left(refs, at, key=key)
+            while (
+                end < len(refs)
+                and timestamps[refs[end]] == at
+                and self.trade_id(refs[end]) < before[1]
+            ):
+                end += 1
+        start = (
+            0 if since is None else bisect_left(refs, to_micros(since), 0, end, key=key)
+        )
+        starts = None if books is None else {book.start for book in books if book.count}
+        sides, statuses = self._codes[1], self._codes[3]
+        page = []
+        for i in range(end - 1, start - 1, -1):
+            row = refs[i]
+            if side_code is not None and sides[row] != side_code:
+                continue
+            if status_code is not None and statuses[row] != status_code:
+                continue
+            book = self._books[bisect_right(self._starts, row) - 1]
+            if starts is not None and book.start not in starts:
+                continue
+            if len(page) == limit:
+                return page, True
+            page.extend(self.trades((row,), book))
+        return page, False
+
+    def _id(self, row: int):
+        if self._raw_ids is not None:
+            return bytes(self._raw_ids[16 * row : 16 * row + 16])
+        return self.trade_id(row)
+
+
+class MappedTradeBook:
+    """Trades for one portfolio: its snapshot rows, then this process's newer trades.
+
+    Positions below the snapshot's count are snapshot rows. Appends go to
+    ``delta``, a memory TradeBook created on the first one. Like TradeBook,
+    this assumes trades arrive in initiated_at order, so every delta trade
+    sorts after the snapshot's.
+    """
+
+    def __init__(self, store: MappedTradeStore, portfolio_id: str):
+        self.portfolio_id = portfolio_id
+        self._store = store
+        self._snapshot = store.snapshot
+        self._history = store.snapshot.book(portfolio_id)
+        self.delta = store.delta.get(portfolio_id)
+
+    def __len__(self):
+        return self._history.count + (0 if self.delta is None else len(self.delta))
+
+    @property
+    def version(self) -> int:
+        return len(self)
+
+    @property
+    def newest_at(self):
+        if self.delta is not None and len(self.delta):
+            return self.delta.newest_at
+        history = self._history
+        return (
+            from_micros(self._snapshot.timestamps[history.start + history.count - 1])
+            if history.count
+            else None
+        )
+
+    def __iter__(self):
+        return self.iter_ordered()
+
+    def append(self, trade: Trade):
+        if self.delta is None:
+            self.delta = self._store.delta.book(self.portfolio_id)
+        self.delta.append(trade)
+
+    def extend(self, trades):
+        for trade in trades:
+            self.append(trade)
+
+    def get(self, trade_id):
+        if self.delta is not None:
+            trade = self.delta.get(trade_id)
+            if trade is not None:
+                return trade
+        row = self._snapshot.find(self._history, trade_id)
+        return None if row < 0 else self._snapshot.trades((row,), self._history)[0]
+
+    def count(self, status=None) -> int:
+        count = self._snapshot.count(self._history, status)
+        return count if self.delta is None else count + self.delta.count(status)
+
+    def page(self, status=None, offset=0, limit=20) -> list[Trade]:
+        """Return ``limit`` trades newest-first, skipping ``offset``."""
+        end = self.count(status) - offset
+        if end <= 0:
+            return []
+        return self._slice(status, max(0, end - limit), end)
+
+    def page_after(self, after, status=None, limit=20) -> tuple[list[Trade], bool]:
+        """Return up to ``limit`` trades older than the ``(initiated_at, id)`` key ``after``.
+
+        The second element reports whether older trades remain.
+        """
+        snapshot, history = self._snapshot, self._history
+        page, more = (
+            ([], False)
+            if self.delta is None
+            else self.delta.page_after(after, status, limit)
+        )
+        if len(page) == limit:
+            return page, more or snapshot.count(history, status) > 0
+        initiated_at, trade_id = after
+        row = snapshot.find(history, trade_id, initiated_at)
+        if row >= 0:
+            position = row - history.start
+        elif (
+            page
+            or more
+            or self.delta is not None
+            and self.delta.get(trade_id) is not None
+        ):
+            position = history.count
+        else:
+            position = (
+                bisect_left(
+                    snapshot.timestamps,
+                    to_micros(initiated_at),
+                    history.start,
+                    history.start + history.count,
+                )
+                - history.start
+            )
+        end = snapshot.status_end(history, status, position)
+        start = max(0, end - (limit - len(page)))
+        return (
+            page
+            + snapshot.trades(snapshot.rows(history, status, start, end), history)[
+                ::-1
+            ],
+            start > 0,
+        )
+
+    def columns(self) -> TradeColumns:
+        """The snapshot's columns in place, or a copy joined with the delta's once it has trades."""
+        snapshot, history = self._snapshot, self._history
+        rows = slice(history.start, history.start + history.count)
+        columns = TradeColumns(
+            snapshot.timestamps[rows],
+            snapshot.ticker_codes[rows],
+            snapshot.quantities[rows],
+            snapshot.prices[rows],
+            list(history.tickers),
+        )
+        if self.delta is None or not len(self.delta):
+            return columns
+        delta = self.delta.columns()
+        codes = {ticker: code for code, ticker in enumerate(columns.tickers)}
+        remap = [codes.setdefault(ticker, len(codes)) for ticker in delta.tickers]
+        return TradeColumns(
+            _copy("q", columns.timestamps) + delta.timestamps,
+            _copy("l", columns.ticker_codes)
+            + array("l", [remap[code] for code in delta.ticker_codes]),
+            _copy("d", columns.quantities) + delta.quantities,
+            _copy("d", columns.prices) + delta.prices,
+            list(codes),
+        )
+
+    def iter_ordered(self, after=None):
+        """Iterate trades oldest-first, optionally resuming after the key ``after``."""
+        snapshot, history = self._snapshot, self._history
+        start, resume = 0, None
+        if after is not None:
+            row = snapshot.find(history, after[1], after[0])
+            if row >= 0:
+                start = row - history.start + 1
+            else:
+                start = (
+                    bisect_right(
+                        snapshot.timestamps,
+                        to_micros(after[0]),
+                        history.start,
+                        history.start + history.count,
+                    )
+                    - history.start
+                )
+                resume = after
+        while start < history.count:
+            stop = min(history.count, start + READ_CHUNK)
+            yield from snapshot.trades(
+                range(history.start + start, history.start + stop), history
+            )
+            start = stop
+        if self.delta is not None:
+            yield from self.delta.iter_ordered(resume)
+
+    def iter_newest(self, before=None, since=None):
+        """Iterate trades newest-first below the key ``before``, down to ``since``.
+
+        The delta's oldest trades can share a timestamp with the snapshot's
+        newest, so the two are merged on ``trade_key``.
+        """
+        history = self._snapshot.iter_newest(self._history, before, since)
+        if self.delta is None:
+            return history
+        return heapq.merge(
+            self.delta.iter_newest(before, since),
+            history,
+            key=trade_key,
+            reverse=True,
+        )
+
+    def _slice(self, status, start, end) -> list[Trade]:
+        """Positions ``start:end`` of the trades with ``status`` (or all), newest-first."""
+        snapshot, history = self._snapshot, self._history
+        count = snapshot.count(history, status)
+        page = []
+        if end > count:
+            page = self.delta.page(
+                status,
+                self.delta.count(status) - (end - count),
+                end - max(start, count),
+            )
+        if start < count:
+            page += snapshot.trades(
+                snapshot.rows(history, status, start, min(end, count)), history
+            )[::-1]
+        return page
+
+
+def _copy(typecode: str, view) -> array:
+    out = array(typecode)
+    out.frombytes(view.cast("B"))
+    return out
+
+
+class MappedTradeStore:
+    """Trade books over a snapshot, with a memory ``TradeStore`` (``delta``) for new trades."""
+
+    def __init__(self, snapshot: MappedSnapshot):
+        self.snapshot = snapshot
+        self.delta = TradeStore()
+        self._books: dict[str, MappedTradeBook] = {}
+
+    def __contains__(self, portfolio_id):
+        return self.snapshot.book(portfolio_id).count > 0 or portfolio_id in self.delta
+
+    def get(self, portfolio_id):
+        return self.book(portfolio_id) if portfolio_id in self else None
+
+    def items(self):
+        portfolio_ids = dict.fromkeys(self.snapshot.portfolio_ids())
+        portfolio_ids.update(
+            dict.fromkeys(portfolio_id for portfolio_id, _ in list(self.delta.items()))
+        )
+        return [
+            (portfolio_id, self.book(portfolio_id)) for portfolio_id in portfolio_ids
+        ]
+
+    def book(self, portfolio_id) -> MappedTradeBook:
+        book = self._books.get(portfolio_id)
+        if book is None:
+            book = self._books.setdefault(
+                portfolio_id, MappedTradeBook(self, portfolio_id)
+            )
+        return book
+
+    def query(
+        self,
+        ticker=None,
+        side=None,
+        status=None,
+        since=None,
+        until=None,
+        portfolio_ids=None,
+        after=None,
+        limit=20,
+    ) -> tuple[list[Trade], bool]:
+        """Trades across portfolios matching every given filter, newest-first; see ``TradeStore.query``.
+
+        The snapshot and the delta are searched apart, a page each, and merged.
+        """
+        before = after
+        if until is not None and (before is None or (until, "") < before):
+            before = (until, "")
+        books = None
+        if portfolio_ids is not None:
+            books = [self.book(pid) for pid in set(portfolio_ids) if pid in self]
+            ticker_count = (
+                None
+                if ticker is None
+                else self.snapshot.ticker_count(ticker) + self.delta.index.count(ticker)
+            )
+            if ticker is None or sum(len(book) for book in books) < ticker_count:
+
+                def match(trade):
+                    return (
+                        (side is None or trade.side == side)
+                        and (status is None or trade.status == status)
+                        and (ticker is None or trade.ticker == ticker)
+                    )
+
+                streams = [book.iter_newest(before, since) for book in books]
+                return take_page(
+                    filter(match, heapq.merge(*streams, key=trade_key, reverse=True)),
+                    limit,
+                )
+        page, more = self.snapshot.search(
+            ticker,
+            since,
+            before,
+            side,
+            status,
+            None if books is None else [book._history for book in books],
+            limit,
+        )
+        recent, more_recent = self.delta.index.search(
+            ticker,
+            since,
+            before,
+            side,
+            status,
+            (
+                None
+                if books is None
+                else [book.delta for book in books if book.delta is not None]
+            ),
+            limit,
+        )
+        merged = list(heapq.merge(recent, page, key=trade_key, reverse=True))
+        return merged[:limit], more or more_recent or len(merged) > limit
+
+    def clear(self):
+        self.snapshot = MappedSnapshot.empty()
+        self._books.clear()
+        self.delta.clear()
+
+
+class _MappedHoldingsStore(HoldingsStore):
+    """Holdings ledgers seeded from the snapshot on first use."""
+
+    def __init__(self, snapshot: MappedSnapshot):
+        super().__init__()
+        self.snapshot = snapshot
+
+    def ledger(self, portfolio_id) -> Holdings:
+        ledger = self._ledgers.get(portfolio_id)
+        if ledger is None:
+            ledger = Holdings()
+            ledger.restore(self.snapshot.positions(portfolio_id))
+            ledger = self._ledgers.setdefault(portfolio_id, ledger)
+        return ledger
+
+    def clear(self):
+        super().clear()
+        self.snapshot = MappedSnapshot.empty()
+
+
+class MappedStorage(MemoryStorage):
+    """Memory storage layered over the snapshot at ``path``; see the module docstring."""
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.path = path
+        snapshot = MappedSnapshot.open(path)
+        self.trades = MappedTradeStore(snapshot)
+        self.holdings = _MappedHoldingsStore(snapshot)
+        for row in snapshot.portfolio_rows:
+            self.portfolios.add(portfolio_from_row(row))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m app.mmap_store", description="Build a memory-mapped snapshot."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser(
+        "build", help="snapshot the store of STORAGE_BACKEND (sqlite or journal)"
+    )
+    build.add_argument(
+        "path",
+        nargs="?",
+        default=os.environ.get("MMAP_SNAPSHOT_PATH", "portfolios.snap"),
+    )
+    build.add_argument(
+        "--backend",
+        choices=("sqlite", "journal"),
+        default=os.environ.get("STORAGE_BACKEND", "sqlite"),
+    )
+    args = parser.parse_args(argv)
+
+    storage = create_storage(args.backend)
+    try:
+        manifest = write_snapshot(storage, args.path)
+    finally:
+        if hasattr(storage, "close"):
+            storage.close()
+    print(
+        json.dumps(
+            {
+                "path": args.path,
+                "portfolios": len(manifest["portfolios"]),
+                "trades": manifest["trades"],
+                "bytes": os.path.getsize(args.path),
+            }
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
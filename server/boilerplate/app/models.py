@@ -1,21 +1,64 @@
 from __future__ import annotations
 
+import heapq
+import itertools
+import os
+import sys
+import threading
 import uuid
-from datetime import datetime, timezone
-
-from marshmallow import Schema, fields, validate, post_load
+import zlib
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import NamedTuple
 
+from app.pricing import get_price
 
 # ---------------------------------------------------------------------------
 # Domain models
 # ---------------------------------------------------------------------------
 
 
+# Models use __slots__ to keep per-object memory down, and cache the ISO form
+# of timestamps so list responses don't re-run isoformat() on every read.
+
+
 class Portfolio:
-    def __init__(self, client_id, portfolio_name, investment_objective,
-                 risk_tolerance="moderate", benchmark_index="", currency="USD",
-                 status="active", portfolio_id=None, advisor_id=None,
-                 total_value=0.0, created_at=None, updated_at=None):
+    __slots__ = (
+        "portfolio_id",
+        "client_id",
+        "advisor_id",
+        "portfolio_name",
+        "status",
+        "investment_objective",
+        "risk_tolerance",
+        "total_value",
+        "currency",
+        "benchmark_index",
+        "created_at",
+        "_created_at_iso",
+        "_updated_at",
+        "_updated_at_iso",
+        "version",
+    )
+
+    def __init__(
+        self,
+        client_id,
+        portfolio_name,
+        investment_objective,
+        risk_tolerance="moderate",
+        benchmark_index="",
+        currency="USD",
+        status="active",
+        portfolio_id=None,
+        advisor_id=None,
+        total_value=0.0,
+        created_at=None,
+        updated_at=None,
+        version=1,
+    ):
         self.portfolio_id = portfolio_id or str(uuid.uuid4())
         self.client_id = client_id
         self.advisor_id = advisor_id or str(uuid.uuid4())
@@ -28,9 +71,25 @@ class Portfolio:
         self.benchmark_index = benchmark_index
         now = datetime.now(timezone.utc)
         self.created_at = created_at or now
+        self._created_at_iso = None
         self.updated_at = updated_at or now
+        # Bumped by the repository on every update; drives ETags.
+        self.version = version
+
+    @property
+    def updated_at(self):
+        return self._updated_at
+
+    @updated_at.setter
+    def updated_at(self, value):
+        self._updated_at = value
+        self._updated_at_iso = None
 
     def to_dict(self):
+        if self._created_at_iso is None:
+            self._created_at_iso = self.created_at.isoformat()
+        if self._updated_at_iso is None:
+            self._updated_at_iso = self._updated_at.isoformat()
         return {
             "portfolioId": self.portfolio_id,
             "clientId": self.client_id,
@@ -42,16 +101,49 @@ class Portfolio:
             "totalValue": self.total_value,
             "currency": self.currency,
             "benchmarkIndex": self.benchmark_index,
-            "createdAt": self.created_at.isoformat(),
-            "updatedAt": self.updated_at.isoformat(),
+            "createdAt": self._created_at_iso,
+            "updatedAt": self._updated_at_iso,
         }
 
 
 class Trade:
-    def __init__(self, portfolio_id, instrument_type, ticker, side, quantity,
-                 order_type="market", limit_price=None, trade_id=None,
-                 price_per_unit=None, status="pending", compliance_status="approved",
-                 initiated_at=None, executed_at=None, settled_at=None):
+    __slots__ = (
+        "trade_id",
+        "portfolio_id",
+        "instrument_type",
+        "ticker",
+        "side",
+        "quantity",
+        "order_type",
+        "limit_price",
+        "price_per_unit",
+        "total_amount",
+        "currency",
+        "status",
+        "compliance_status",
+        "initiated_at",
+        "executed_at",
+        "settled_at",
+        "_initiated_at_iso",
+    )
+
+    def __init__(
+        self,
+        portfolio_id,
+        instrument_type,
+        ticker,
+        side,
+        quantity,
+        order_type="market",
+        limit_price=None,
+        trade_id=None,
+        price_per_unit=None,
+        status="pending",
+        compliance_status="approved",
+        initiated_at=None,
+        executed_at=None,
+        settled_at=None,
+    ):
         self.trade_id = trade_id or str(uuid.uuid4())
         self.portfolio_id = portfolio_id
         self.instrument_type = instrument_type
@@ -60,17 +152,19 @@ class Trade:
         self.quantity = quantity
         self.order_type = order_type
         self.limit_price = limit_price
-        self.price_per_unit = price_per_unit or round(150.0 + (hash(ticker) % 200), 2)
+        self.price_per_unit = price_per_unit or get_price(ticker)
         self.total_amount = round(self.price_per_unit * quantity, 2)
         self.currency = "USD"
         self.status = status
         self.compliance_status = compliance_status
-        now = datetime.now(timezone.utc)
-        self.initiated_at = initiated_at or now
+        self.initiated_at = initiated_at or datetime.now(timezone.utc)
+        self._initiated_at_iso = None
         self.executed_at = executed_at
         self.settled_at = settled_at
 
     def to_dict(self):
+        if self._initiated_at_iso is None:
+            self._initiated_at_iso = self.initiated_at.isoformat()
         d = {
             "tradeId": self.trade_id,
             "portfolioId": self.portfolio_id,
@@ -83,7 +177,7 @@ class Trade:
             "currency": self.currency,
             "status": self.status,
             "complianceStatus": self.compliance_status,
-            "initiatedAt": self.initiated_at.isoformat(),
+            "initiatedAt": self._initiated_at_iso,
         }
         if self.executed_at:
             d["executedAt"] = self.executed_at.isoformat()
@@ -92,8 +186,196 @@ class Trade:
         return d
 
 
+class Position:
+    """Quantity and cost basis held in one ticker.
+
+    Buys add at their trade price; sells relieve cost basis at the average
+    cost. Positions never go short: selling more than is held closes it.
+    """
+
+    __slots__ = ("ticker", "quantity", "cost_basis")
+
+    def __init__(self, ticker, quantity=0.0, cost_basis=0.0):
+        self.ticker = ticker
+        self.quantity = quantity
+        self.cost_basis = cost_basis
+
+    @property
+    def average_cost(self):
+        return self.cost_basis / self.quantity if self.quantity > 0 else 0.0
+
+    def apply(self, trade: Trade):
+        quantity = trade.quantity
+        self.fill(quantity if trade.side == "buy" else -quantity, trade.price_per_unit)
+
+    def fill(self, quantity, price):
+        """Apply a fill of signed ``quantity`` (sells negative) at ``price``."""
+        if quantity >= 0:
+            self.quantity += quantity
+            self.cost_basis += quantity * price
+            return
+        sold = min(-quantity, self.quantity)
+        self.cost_basis -= sold * self.average_cost
+        self.quantity -= sold
+        if self.quantity <= 0:
+            self.quantity = self.cost_basis = 0.0
+
+    def to_dict(self):
+        return {
+            "ticker": self.ticker,
+            "quantity": self.quantity,
+            "costBasis": round(self.cost_basis, 2),
+            "averageCost": round(self.average_cost, 4),
+        }
+
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def to_micros(value: datetime | None):
+    """Convert an aware datetime to integer microseconds since the epoch."""
+    if value is None:
+        return None
+    return (value - _EPOCH) // timedelta(microseconds=1)
+
+
+def from_micros(value):
+    if value is None:
+        return None
+    return _EPOCH + timedelta(microseconds=value)
+
+
+# Field order of persisted rows, shared by the SQLite and journal backends.
+# Timestamps are stored as epoch microseconds.
+PORTFOLIO_FIELDS = (
+    "portfolio_id",
+    "client_id",
+    "advisor_id",
+    "portfolio_name",
+    "status",
+    "investment_objective",
+    "risk_tolerance",
+    "total_value",
+    "currency",
+    "benchmark_index",
+    "created_at",
+    "updated_at",
+    "version",
+)
+TRADE_FIELDS = (
+    "trade_id",
+    "portfolio_id",
+    "instrument_type",
+    "ticker",
+    "side",
+    "quantity",
+    "order_type",
+    "limit_price",
+    "price_per_unit",
+    "status",
+    "compliance_status",
+    "initiated_at",
+    "executed_at",
+    "settled_at",
+)
+TIMESTAMP_FIELDS = {
+    "created_at",
+    "updated_at",
+    "initiated_at",
+    "executed_at",
+    "settled_at",
+}
+
+
+def portfolio_row(portfolio: Portfolio) -> tuple:
+    return tuple(
+        (
+            to_micros(getattr(portfolio, name))
+            if name in TIMESTAMP_FIELDS
+            else getattr(portfolio, name)
+        )
+        for name in PORTFOLIO_FIELDS
+    )
+
+
+def portfolio_from_row(row) -> Portfolio:
+    values = dict(zip(PORTFOLIO_FIELDS, row))
+    values["created_at"] = from_micros(values["created_at"])
+    values["updated_at"] = from_micros(values["updated_at"])
+    return Portfolio(**values)
+
+
+def trade_row(trade: Trade) -> tuple:
+    return tuple(
+        (
+            to_micros(getattr(trade, name))
+            if name in TIMESTAMP_FIELDS
+            else getattr(trade, name)
+        )
+        for name in TRADE_FIELDS
+    )
+
+
+def trade_from_row(row) -> Trade:
+    values = dict(zip(TRADE_FIELDS, row))
+    for name in ("initiated_at", "executed_at", "settled_at"):
+        values[name] = from_micros(values[name])
+    return Trade(**values)
+
+
+class TradeColumns(NamedTuple):
+    """Array-backed view of a trade history in time order, for analytics.
+
+    ``quantities`` are signed (sells negative) and ``ticker_codes`` index
+    into ``tickers``.
+    """
+
+    timestamps: array  # int64 epoch microseconds
+    ticker_codes: array
+    quantities: array
+    prices: array
+    tickers: list[str]
+
+    @classmethod
+    def empty(cls, tickers: list[str] | None = None) -> TradeColumns:
+        return cls(
+            array("q"),
+            array("I"),
+            array("d"),
+            array("d"),
+            [] if tickers is None else tickers,
+        )
+
+
+class TickerCodes:
+    """Interned tickers numbered in order of first use, for ``TradeColumns.ticker_codes``.
+
+    A store's books share one table (``TradeIndex.tickers``), so a ticker
+    costs one entry however many books trade it, and a book's ``tickers``
+    can list some it never traded.
+    """
+
+    __slots__ = ("tickers", "_codes", "_lock")
+
+    def __init__(self):
+        self.tickers: list[str] = []
+        self._codes: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def code(self, ticker: str) -> int:
+        code = self._codes.get(ticker)
+        if code is None:
+            with self._lock:
+                code = self._codes.get(ticker)
+                if code is None:
+                    # Listed before it is published, so every code has its ticker.
+                    self.tickers.append(sys.intern(ticker))
+                    code = self._codes[ticker] = len(self.tickers) - 1
+        return code
+
+
 # ---------------------------------------------------------------------------
-# Marshmallow schemas
+# Reference data (the request schemas built on it are in app.schemas)
 # ---------------------------------------------------------------------------
 
 OBJECTIVES = ["growth", "income", "balanced", "preservation", "aggressive-growth"]
@@ -103,61 +385,1265 @@ INSTRUMENT_TYPES = ["equity", "fixed-income", "etf", "mutual-fund", "option"]
 TRADE_SIDES = ["buy", "sell"]
 ORDER_TYPES = ["market", "limit", "stop", "stop-limit"]
 TRADE_STATUSES = ["pending", "executed", "settled", "cancelled", "rejected"]
+# Reporting periods for /performance and their length in days (None: calendar-based).
+PERIOD_DAYS = {
+    "1d": 1,
+    "1w": 7,
+    "1m": 30,
+    "3m": 91,
+    "6m": 182,
+    "1y": 365,
+    "ytd": None,
+    "inception": None,
+}
+
+
+# ---------------------------------------------------------------------------
+# Stores
+#
+# Routes only talk to the store interface below: PortfolioRepository for
+# portfolios, and TradeStore/TradeBook for per-portfolio trades. The
+# in-memory classes here are the default backend and what the tests use;
+# app.sqlite_store provides a persistent backend with the same methods,
+# selected with STORAGE_BACKEND=sqlite.
+# ---------------------------------------------------------------------------
+
+# Portfolio fields with a per-value index, usable as list filters.
+PORTFOLIO_INDEXES = ("status", "client_id", "advisor_id")
+# Trades a TradeBook seals at a time into a columnar TradeSegment; 0 never
+# seals. A book's newest HOT_TRADES trades always stay Trade objects, so
+# the newest trades are read without materializing. Both are small because
+# live trades cost several times what sealed ones do: in a book of 500,
+# every 8 more kept live add about 8 bytes a trade.
+SEGMENT_SIZE = int(os.environ.get("TRADE_SEGMENT_SIZE", 8))
+HOT_TRADES = int(os.environ.get("TRADE_HOT_TRADES", 8))
+# Sealed segments are joined this many at a time, up to JOINED_SEGMENT_SIZE trades.
+SEGMENT_JOIN = 4
+JOINED_SEGMENT_SIZE = 4096
+
+
+class PortfolioRepository:
+    """In-memory portfolio store with maintained secondary indexes.
 
+    Alongside the id -> Portfolio map, ``(created_at, portfolio_id)`` keys are
+    kept in ascending order globally and per status, client and advisor.
+    Listing newest-first is a slice off the end of the relevant index, and
+    totals are index lengths, so a page costs O(log n + limit) instead of a
+    full sort. Filtering on several indexed fields walks the smallest of
+    their indexes.
+    """
 
-class PortfolioInitiateSchema(Schema):
-    clientId = fields.String(required=True)
-    portfolioName = fields.String(required=True, validate=validate.Length(min=1, max=255))
-    investmentObjective = fields.String(required=True, validate=validate.OneOf(OBJECTIVES))
-    riskTolerance = fields.String(load_default="moderate", validate=validate.OneOf(RISK_LEVELS))
-    benchmarkIndex = fields.String(load_default="")
-    currency = fields.String(load_default="USD", validate=validate.Regexp(r"^[A-Z]{3}$"))
-
-    @post_load
-    def make_portfolio(self, data, **kwargs):
-        return Portfolio(
-            client_id=data["clientId"],
-            portfolio_name=data["portfolioName"],
-            investment_objective=data["investmentObjective"],
-            risk_tolerance=data.get("riskTolerance", "moderate"),
-            benchmark_index=data.get("benchmarkIndex", ""),
-            currency=data.get("currency", "USD"),
+    def __init__(self):
+        self._items: dict[str, Portfolio] = {}
+        self._order: list[tuple[datetime, str]] = []
+        self._by_field: dict[str, dict[str, list[tuple[datetime, str]]]] = {
+            name: {} for name in PORTFOLIO_INDEXES
+        }
+        self._index_lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, portfolio_id):
+        return portfolio_id in self._items
+
+    def get(self, portfolio_id):
+        return self._items.get(portfolio_id)
+
+    def values(self):
+        return self._items.values()
+
+    def add(self, portfolio: Portfolio):
+        with self._index_lock:
+            previous = self._items.get(portfolio.portfolio_id)
+            self._items[portfolio.portfolio_id] = portfolio
+            if previous is not None:
+                if previous.created_at == portfolio.created_at and all(
+                    getattr(previous, name) == getattr(portfolio, name)
+                    for name in PORTFOLIO_INDEXES
+                ):
+                    return
+                self._unindex(previous)
+            key = (portfolio.created_at, portfolio.portfolio_id)
+            insort(self._order, key)
+            for name, index in self._by_field.items():
+                insort(index.setdefault(getattr(portfolio, name), []), key)
+
+    def update(self, portfolio: Portfolio, **changes):
+        """Apply attribute changes, moving the portfolio between indexes if needed.
+
+        The version is bumped after the changes land, so a reader never sees
+        a new version paired with old field values.
+        """
+        moved = [
+            name
+            for name in PORTFOLIO_INDEXES
+            if name in changes and changes[name] != getattr(portfolio, name)
+        ]
+        if not moved:
+            for name, value in changes.items():
+                setattr(portfolio, name, value)
+            portfolio.version += 1
+            return
+        with self._index_lock:
+            old = {name: getattr(portfolio, name) for name in moved}
+            for name, value in changes.items():
+                setattr(portfolio, name, value)
+            key = (portfolio.created_at, portfolio.portfolio_id)
+            for name in moved:
+                index = self._by_field[name]
+                _remove_key(index.get(old[name], []), key)
+                insort(index.setdefault(getattr(portfolio, name), []), key)
+            portfolio.version += 1
+
+    def count(self, status=None, client_id=None, advisor_id=None) -> int:
+        return len(self._index(status, client_id, advisor_id))
+
+    def portfolio_ids(self, client_id=None, advisor_id=None) -> list[str]:
+        """IDs of the portfolios held by ``client_id`` and/or managed by ``advisor_id``, oldest first."""
+        return [
+            pid for _, pid in self._index(client_id=client_id, advisor_id=advisor_id)
+        ]
+
+    def page(
+        self, status=None, offset=0, limit=20, client_id=None, advisor_id=None
+    ) -> list[Portfolio]:
+        """Return ``limit`` portfolios newest-first, skipping ``offset``."""
+        index = self._index(status, client_id, advisor_id)
+        end = len(index) - offset
+        if end <= 0:
+            return []
+        start = max(0, end - limit)
+        return [self._items[pid] for _, pid in reversed(index[start:end])]
+
+    def page_after(
+        self, after, status=None, limit=20, client_id=None, advisor_id=None
+    ) -> tuple[list[Portfolio], bool]:
+        """Return up to ``limit`` portfolios older than the ``(created_at, id)`` key ``after``.
+
+        The second element reports whether older portfolios remain.
+        """
+        index = self._index(status, client_id, advisor_id)
+        end = bisect_left(index, after)
+        start = max(0, end - limit)
+        return [self._items[pid] for _, pid in reversed(index[start:end])], start > 0
+
+    def iter_ordered(self, status=None, after=None, inclusive=False):
+        """Iterate portfolios oldest-first, optionally starting from the key ``after``."""
+        index = self._index(status)
+        if after is None:
+            start = 0
+        else:
+            start = (
+                bisect_left(index, after) if inclusive else bisect_right(index, after)
+            )
+        for i in range(start, len(index)):
+            yield self._items[index[i][1]]
+
+    def clear(self):
+        self._items.clear()
+        self._order.clear()
+        for index in self._by_field.values():
+            index.clear()
+
+    def _index(self, status=None, client_id=None, advisor_id=None):
+        filters = [
+            (name, value)
+            for name, value in (
+                ("status", status),
+                ("client_id", client_id),
+                ("advisor_id", advisor_id),
+            )
+            if value is not None
+        ]
+        if not filters:
+            return self._order
+        indexes = [self._by_field[name].get(value, []) for name, value in filters]
+        if len(indexes) == 1:
+            return indexes[0]
+        items = self._items
+        return [
+            key
+            for key in min(indexes, key=len)
+            if all(getattr(items[key[1]], name) == value for name, value in filters)
+        ]
+
+    def _unindex(self, portfolio: Portfolio):
+        key = (portfolio.created_at, portfolio.portfolio_id)
+        _remove_key(self._order, key)
+        for name, index in self._by_field.items():
+            _remove_key(index.get(getattr(portfolio, name), []), key)
+
+
+def _remove_key(index: list, key):
+    i = bisect_left(index, key)
+    if i < len(index) and index[i] == key:
+        del index[i]
+
+
+class TradeSegment:
+    """An immutable, column-oriented block of consecutive trades from one book.
+
+    The book already keeps initiated_at, ticker, signed quantity and price
+    for every trade in its ``TradeColumns``; a segment holds the remaining
+    fields, so materializing a trade reads both (``columns`` and ``start``,
+    the segment's first position in the book). Like ``TradeColumns`` it
+    uses ``array`` rather than NumPy, which stays out of the import path.
+
+    The string fields (side, status, ...) are one byte a trade: a code for
+    their combination in a label list that starts from every combination
+    of the fields' constants and is shared by each segment that meets
+    nothing else. Canonical UUID trade
+    ids are 16 raw bytes, with an id-sorted position array and the ids'
+    first two bytes in the same order, so a lookup bisects plain integers.
+    Optional fields (``limit_price``, ``executed_at``, ``settled_at``) are
+    sparse: the positions of the trades that set one, and their values.
+    Trades are materialized from the columns on read; nothing caches them.
+    Books seal small segments and ``join`` them as they age.
+    """
+
+    __slots__ = (
+        "_size",
+        "_portfolio_id",
+        "_ids",
+        "_id_order",
+        "_id_prefixes",
+        "_labels",
+        "_codes",
+        "_optional",
+    )
+
+    def __init__(self, trades: list[Trade]):
+        n = self._size = len(trades)
+        portfolio_ids = {trade.portfolio_id for trade in trades}
+        self._portfolio_id = (
+            portfolio_ids.pop()
+            if len(portfolio_ids) == 1
+            else [t.portfolio_id for t in trades]
         )
+        raw = [uuid_bytes(trade.trade_id) for trade in trades]
+        if None in raw:
+            self._ids = tuple(trade.trade_id for trade in trades)
+        else:
+            self._ids = b"".join(raw)
 
+        self._labels, codes = _encode_labels(
+            [
+                tuple(getattr(trade, name) for name in _SEGMENT_LABELS)
+                for trade in trades
+            ]
+        )
+        self._codes = array(_code_typecode(self._labels), codes)
 
-class PortfolioUpdateSchema(Schema):
-    portfolioName = fields.String(required=True, validate=validate.Length(min=1, max=255))
-    investmentObjective = fields.String(validate=validate.OneOf(OBJECTIVES))
-    riskTolerance = fields.String(validate=validate.OneOf(RISK_LEVELS))
-    status = fields.String(validate=validate.OneOf(PORTFOLIO_STATUSES))
-    benchmarkIndex = fields.String()
+        optional = []
+        for name, typecode, is_time in _SEGMENT_OPTIONAL:
+            positions, values = [], []
+            for i, trade in enumerate(trades):
+                value = getattr(trade, name)
+                if value is not None:
+                    positions.append(i)
+                    values.append(to_micros(value) if is_time else value)
+            optional.append(
+                (array(_index_typecode(n), positions), array(typecode, values))
+                if positions
+                else None
+            )
+        self._optional = tuple(optional)
+        self._index_ids()
 
+    @classmethod
+    def join(cls, segments: list[TradeSegment]) -> TradeSegment:
+        """One segment holding the trades of consecutive ``segments``, built from their columns."""
+        self = cls.__new__(cls)
+        n = self._size = sum(segment._size for segment in segments)
+        portfolio_ids = [segment._portfolio_id for segment in segments]
+        if all(portfolio_id == portfolio_ids[0] for portfolio_id in portfolio_ids):
+            self._portfolio_id = portfolio_ids[0]
+        else:
+            self._portfolio_id = [
+                segment.portfolio_id(i)
+                for segment in segments
+                for i in range(segment._size)
+            ]
+        if all(type(segment._ids) is bytes for segment in segments):
+            self._ids = b"".join(segment._ids for segment in segments)
+        else:
+            self._ids = tuple(
+                segment.trade_id(i)
+                for segment in segments
+                for i in range(segment._size)
+            )
 
-class TradeInitiateSchema(Schema):
-    instrumentType = fields.String(required=True, validate=validate.OneOf(INSTRUMENT_TYPES))
-    ticker = fields.String(required=True, validate=validate.Length(min=1, max=10))
-    side = fields.String(required=True, validate=validate.OneOf(TRADE_SIDES))
-    quantity = fields.Float(required=True, validate=validate.Range(min=0, min_inclusive=False))
-    limitPrice = fields.Float(validate=validate.Range(min=0))
-    orderType = fields.String(load_default="market", validate=validate.OneOf(ORDER_TYPES))
+        labels = segments[0]._labels
+        if all(segment._labels is labels for segment in segments):
+            self._labels, self._codes = labels, array(segments[0]._codes.typecode)
+            for segment in segments:
+                self._codes += segment._codes
+        else:
+            self._labels, codes = _encode_labels(
+                [
+                    segment._labels[code]
+                    for segment in segments
+                    for code in segment._codes
+                ]
+            )
+            self._codes = array(_code_typecode(self._labels), codes)
 
+        optional = []
+        for field, (_, typecode, _) in enumerate(_SEGMENT_OPTIONAL):
+            positions, values, offset = array(_index_typecode(n)), array(typecode), 0
+            for segment in segments:
+                column = segment._optional[field]
+                if column is not None:
+                    positions.extend([offset + i for i in column[0]])
+                    values.extend(column[1])
+                offset += segment._size
+            optional.append((positions, values) if positions else None)
+        self._optional = tuple(optional)
+        self._index_ids()
+        return self
 
-# ---------------------------------------------------------------------------
-# In-memory stores
-# ---------------------------------------------------------------------------
+    def __len__(self):
+        return self._size
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the segment's own columns."""
+        ids = len(self._ids) if type(self._ids) is bytes else 0
+        columns = [self._id_order, self._codes]
+        if self._id_prefixes is not None:
+            columns.append(self._id_prefixes)
+        for column in self._optional:
+            if column is not None:
+                columns += column
+        return ids + sum(len(column) * column.itemsize for column in columns)
+
+    def find(self, trade_id, raw: bytes | None) -> int:
+        """Position of ``trade_id`` in the segment, or -1; ``raw`` is ``uuid_bytes(trade_id)``."""
+        ids, order = self._ids, self._id_order
+        if type(ids) is not bytes:
+            i = bisect_left(order, trade_id, key=ids.__getitem__)
+            if i < self._size and ids[order[i]] == trade_id:
+                return order[i]
+            return -1
+        if raw is None:
+            return -1
+        prefixes, prefix = self._id_prefixes, raw[0] << 8 | raw[1]
+        i = bisect_left(prefixes, prefix)
+        while i < self._size and prefixes[i] == prefix:
+            position = order[i]
+            if ids[16 * position : 16 * position + 16] == raw:
+                return position
+            i += 1
+        return -1
+
+    def trade_id(self, i: int) -> str:
+        ids = self._ids
+        return uuid_str(ids[16 * i : 16 * i + 16]) if type(ids) is bytes else ids[i]
+
+    def portfolio_id(self, i: int) -> str:
+        portfolio_id = self._portfolio_id
+        return portfolio_id if type(portfolio_id) is str else portfolio_id[i]
+
+    def trades(self, positions, columns: TradeColumns, start: int) -> list[Trade]:
+        """Materialize the trades at ``positions``, in that order."""
+        labels, codes = self._labels, self._codes
+        timestamps, ticker_codes, tickers = (
+            columns.timestamps,
+            columns.ticker_codes,
+            columns.tickers,
+        )
+        quantities, prices = columns.quantities, columns.prices
+        ids, portfolio_id = self._ids, self._portfolio_id
+        canonical, shared = type(ids) is bytes, type(portfolio_id) is str
+        limit_prices, executed, settled = self._optional
+        out = []
+        for i in positions:
+            p = start + i
+            instrument_type, side, order_type, status, compliance_status = labels[
+                codes[i]
+            ]
+            out.append(
+                Trade(
+                    portfolio_id if shared else portfolio_id[i],
+                    instrument_type,
+                    tickers[ticker_codes[p]],
+                    side,
+                    abs(quantities[p]),
+                    order_type,
+                    limit_prices and _sparse_value(limit_prices, i),
+                    uuid_str(ids[16 * i : 16 * i + 16]) if canonical else ids[i],
+                    prices[p],
+                    status,
+                    compliance_status,
+                    _EPOCH + timedelta(microseconds=timestamps[p]),
+                    executed and from_micros(_sparse_value(executed, i)),
+                    settled and from_micros(_sparse_value(settled, i)),
+                )
+            )
+        return out
+
+    def _index_ids(self):
+        """Order positions by trade_id, keeping canonical ids' first two bytes alongside."""
+        n, ids = self._size, self._ids
+        if type(ids) is bytes:
+            order = sorted(range(n), key=lambda i: ids[16 * i : 16 * i + 16])
+            self._id_prefixes = array(
+                "H", [ids[16 * i] << 8 | ids[16 * i + 1] for i in order]
+            )
+        else:
+            order = sorted(range(n), key=ids.__getitem__)
+            self._id_prefixes = None
+        self._id_order = array(_index_typecode(n), order)
+
+
+# TradeSegment layout: the label fields, coded together as one combination
+# per trade, starting from every combination of their constants; then the
+# optional fields, in the order ``TradeSegment.trades`` reads them, with
+# their column type; timestamps are epoch microseconds.
+_SEGMENT_LABELS = (
+    "instrument_type",
+    "side",
+    "order_type",
+    "status",
+    "compliance_status",
+)
+_SEGMENT_BASE_LABELS = tuple(
+    itertools.product(
+        INSTRUMENT_TYPES, TRADE_SIDES, ORDER_TYPES, TRADE_STATUSES, ("approved",)
+    )
+)
+_SEGMENT_BASE_CODES = {labels: code for code, labels in enumerate(_SEGMENT_BASE_LABELS)}
+_SEGMENT_OPTIONAL = (
+    ("limit_price", "d", False),
+    ("executed_at", "q", True),
+    ("settled_at", "q", True),
+)
+
+
+def _sparse_value(column, i: int):
+    """The value a sparse ``(positions, values)`` column holds at position ``i``, or ``None``."""
+    at, values = column
+    j = bisect_left(at, i)
+    return values[j] if j < len(at) and at[j] == i else None
+
+
+def _index_typecode(n: int) -> str:
+    """Typecode for positions below ``n``."""
+    return "H" if n <= 0x10000 else "I"
+
+
+def _code_typecode(labels) -> str:
+    return "B" if len(labels) <= 0x100 else "I"
+
+
+def _encode_labels(values) -> tuple[tuple | list, list[int]]:
+    """Codes for label combinations, and their labels: ``_SEGMENT_BASE_LABELS`` unless one is not in it."""
+    labels = _SEGMENT_BASE_LABELS
+    codes = _SEGMENT_BASE_CODES
+    column = []
+    for value in values:
+        code = codes.get(value)
+        if code is None:
+            if labels is _SEGMENT_BASE_LABELS:
+                labels, codes = list(labels), dict(codes)
+            code = codes[value] = len(labels)
+            labels.append(value)
+        column.append(code)
+    return labels, column
+
+
+def uuid_bytes(value) -> bytes | None:
+    """The 16 bytes of a canonical (lowercase, hyphenated) UUID string, else ``None``."""
+    if (
+        type(value) is not str
+        or len(value) != 36
+        or value[8] + value[13] + value[18] + value[23] != "----"
+        or value != value.lower()
+    ):
+        return None
+    try:
+        raw = bytes.fromhex(value.replace("-", ""))
+    except ValueError:
+        return None
+    # fromhex skips whitespace, so a shorter result means the value had some.
+    return raw if len(raw) == 16 else None
+
+
+def uuid_str(raw: bytes) -> str:
+    """The canonical UUID string for 16 bytes from ``uuid_bytes``."""
+    h = raw.hex()
+    return f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+
+
+class TradeBook:
+    """Trades for one portfolio, indexed for point lookups and paging.
+
+    Writers stamp trades under the portfolio lock, no earlier than
+    ``newest_at``, so trades arrive in initiated_at order and a trade's
+    position in append order doubles as the time index; appending an older
+    one raises ``ValueError``. The newest
+    trades are held as Trade objects. Once more than ``HOT_TRADES`` are,
+    the oldest ``SEGMENT_SIZE`` of them are sealed into a columnar
+    TradeSegment and rebuilt on read, so a trade costs about a hundred
+    bytes of memory instead of over five hundred. Per-status buckets hold
+    positions in the same order, so a filtered newest-first page is a
+    slice of one bucket. The fields analytics needs
+    are kept in typed arrays for every trade, so it can read them without
+    touching Trade objects; segments store only the other fields. Appends
+    are also added to ``index``, the store-wide TradeIndex.
+
+    Readers do not lock. The unsealed trades are replaced, never trimmed,
+    when some are sealed, and the new segment is published first, so a
+    reader holding the previous ``_hot`` tuple still finds every trade.
+    """
+
+    def __init__(self, index: TradeIndex | None = None):
+        self._index = index
+        self._serial = None if index is None else index.register(self)
+        # (each segment's first position, the segments), replaced whole when sealing
+        self._sealed: tuple[list[int], list[TradeSegment]] = ([], [])
+        # (position of the first unsealed trade, unsealed trades, their positions by trade_id)
+        self._hot: tuple[int, list[Trade], dict[str, int]] = (0, [], {})
+        self._by_status: dict[str, array] = {}
+        self._tickers = TickerCodes() if index is None else index.tickers
+        self._columns = TradeColumns.empty(self._tickers.tickers)
+
+    def __len__(self):
+        start, trades, _ = self._hot
+        return start + len(trades)
+
+    @property
+    def version(self) -> int:
+        """Books are append-only, so the trade count doubles as a version."""
+        return len(self)
+
+    @property
+    def sealed(self) -> int:
+        """Number of trades held in segments."""
+        return self._hot[0]
+
+    @property
+    def newest_at(self) -> datetime | None:
+        """initiated_at of the newest trade, or ``None`` for an empty book."""
+        n = len(self)
+        return from_micros(self._columns.timestamps[n - 1]) if n else None
+
+    def __iter__(self):
+        return self.iter_ordered()
+
+    def append(self, trade: Trade):
+        start, trades, positions = self._hot
+        position = start + len(trades)
+        at = to_micros(trade.initiated_at)
+        if position and at < self._columns.timestamps[position - 1]:
+            raise ValueError(
+                f"trade {trade.trade_id} is older than the newest trade of its book"
+            )
+        self._by_status.setdefault(trade.status, array("I")).append(position)
+
+        columns = self._columns
+        code = self._tickers.code(trade.ticker)
+        columns.timestamps.append(at)
+        columns.ticker_codes.append(code)
+        columns.quantities.append(
+            trade.quantity if trade.side == "buy" else -trade.quantity
+        )
+        columns.prices.append(trade.price_per_unit)
+
+        trades.append(trade)
+        positions[trade.trade_id] = position
+        if self._index is not None:
+            self._index.add(self._serial, position, trade)
+        if SEGMENT_SIZE and len(trades) >= HOT_TRADES + SEGMENT_SIZE:
+            self._seal()
+
+    def extend(self, trades):
+        for trade in trades:
+            self.append(trade)
+
+    def get(self, trade_id):
+        position = self._position(trade_id)
+        return None if position is None else self._trade_at(position)
+
+    def count(self, status=None) -> int:
+        if status is None:
+            return len(self)
+        return len(self._by_status.get(status, ()))
+
+    def page(self, status=None, offset=0, limit=20) -> list[Trade]:
+        """Return ``limit`` trades newest-first, skipping ``offset``."""
+        end = self.count(status) - offset
+        if end <= 0:
+            return []
+        return self._slice(status, max(0, end - limit), end)
+
+    def page_after(self, after, status=None, limit=20) -> tuple[list[Trade], bool]:
+        """Return up to ``limit`` trades older than the ``(initiated_at, id)`` key ``after``.
+
+        The second element reports whether older trades remain.
+        """
+        initiated_at, trade_id = after
+        position = self._position(trade_id, initiated_at)
+        if position is None:
+            position = bisect_left(
+                self._columns.timestamps, to_micros(initiated_at), 0, len(self)
+            )
+        end = (
+            position
+            if status is None
+            else bisect_left(self._by_status.get(status, ()), position)
+        )
+        start = max(0, end - limit)
+        return self._slice(status, start, end), start > 0
+
+    def columns(self) -> TradeColumns:
+        """Snapshot of the array columns, safe to take without the portfolio lock.
+
+        An append extends the columns before the trade counts towards
+        ``len``, so the first ``len`` entries of each are complete; copying
+        just those keeps a concurrent append from racing the reader.
+        """
+        n = len(self)
+        c = self._columns
+        return TradeColumns(
+            c.timestamps[:n],
+            c.ticker_codes[:n],
+            c.quantities[:n],
+            c.prices[:n],
+            list(c.tickers),
+        )
+
+    def segment_bytes(self) -> int:
+        return sum(segment.nbytes for segment in self._sealed[1])
+
+    def iter_ordered(self, after=None):
+        """Iterate trades oldest-first, optionally resuming after the key ``after``."""
+        end = len(self)
+        if after is None:
+            start = 0
+        else:
+            position = self._position(after[1], after[0])
+            if position is None:
+                start = bisect_right(
+                    self._columns.timestamps, to_micros(after[0]), 0, end
+                )
+            else:
+                start = position + 1
+        while start < end:
+            stop = min(end, start + READ_CHUNK)
+            yield from self._trades_at(range(start, stop))
+            start = stop
+
+    def iter_newest(self, before=None, since=None):
+        """Iterate trades newest-first below the ``(initiated_at, trade_id)`` key ``before``, down to ``since``.
+
+        Trades come in ``trade_key`` order, so streams from several books
+        merge on it. They are materialized in chunks that double from 8,
+        since a caller merging several books usually stops after a page.
+        """
+        timestamps = self._columns.timestamps
+        end = len(self)
+        if before is not None:
+            end = bisect_right(timestamps, to_micros(before[0]), 0, end)
+        low = 0 if since is None else bisect_left(timestamps, to_micros(since), 0, end)
+        return iter_by_key(timestamps, self._trades_at, low, end, before)
+
+    def _slice(self, status, start, end) -> list[Trade]:
+        if status is None:
+            return self._trades_at(range(start, end))[::-1]
+        bucket = self._by_status.get(status, array("I"))
+        return self._trades_at(bucket[start:end])[::-1]
+
+    def _seal(self):
+        """Seal the oldest ``SEGMENT_SIZE`` unsealed trades.
+
+        Every ``SEGMENT_JOIN`` consecutive segments of one size are joined
+        into one, up to ``JOINED_SEGMENT_SIZE`` trades, so a book holds a
+        few segments however small the sealing unit.
+        """
+        start, trades, _ = self._hot
+        starts, segments = self._sealed
+        starts = starts + [start]
+        segments = segments + [TradeSegment(trades[:SEGMENT_SIZE])]
+        while (
+            len(segments) >= SEGMENT_JOIN
+            and len({len(segment) for segment in segments[-SEGMENT_JOIN:]}) == 1
+            and len(segments[-1]) * SEGMENT_JOIN <= JOINED_SEGMENT_SIZE
+        ):
+            starts = starts[: 1 - SEGMENT_JOIN]
+            segments = segments[:-SEGMENT_JOIN] + [
+                TradeSegment.join(segments[-SEGMENT_JOIN:])
+            ]
+        self._sealed = (starts, segments)
+        kept = trades[SEGMENT_SIZE:]
+        start += SEGMENT_SIZE
+        self._hot = (
+            start,
+            kept,
+            {trade.trade_id: start + i for i, trade in enumerate(kept)},
+        )
+
+    def _position(self, trade_id, initiated_at=None):
+        """Position of ``trade_id`` in the book, or ``None``.
+
+        Given its ``initiated_at``, as a cursor carries, only trades at that
+        instant are compared; otherwise each segment is searched.
+        """
+        position = self._hot[2].get(trade_id)
+        if position is not None:
+            return position
+        if initiated_at is not None:
+            timestamps, at = self._columns.timestamps, to_micros(initiated_at)
+            end = len(self)
+            for position in range(
+                bisect_left(timestamps, at, 0, end),
+                bisect_right(timestamps, at, 0, end),
+            ):
+                if self._trade_id_at(position) == trade_id:
+                    return position
+            return None
+        raw = uuid_bytes(trade_id)
+        starts, segments = self._sealed
+        # Newest segment first: lookups mostly concern recent trades.
+        for k in range(len(starts) - 1, -1, -1):
+            i = segments[k].find(trade_id, raw)
+            if i >= 0:
+                return starts[k] + i
+        return None
+
+    def _trade_at(self, position: int) -> Trade:
+        start, trades, _ = self._hot
+        if position >= start:
+            return trades[position - start]
+        starts, segments = self._sealed
+        k = bisect_right(starts, position) - 1
+        return segments[k].trades((position - starts[k],), self._columns, starts[k])[0]
+
+    def _trade_id_at(self, position: int) -> str:
+        start, trades, _ = self._hot
+        if position >= start:
+            return trades[position - start].trade_id
+        starts, segments = self._sealed
+        k = bisect_right(starts, position) - 1
+        return segments[k].trade_id(position - starts[k])
+
+    def _trades_at(self, positions) -> list[Trade]:
+        """Trades at the ascending ``positions``, reading each segment's share in one pass."""
+        start, trades, _ = self._hot
+        starts, segments = self._sealed
+        out = []
+        i, n = 0, len(positions)
+        while i < n:
+            position = positions[i]
+            if position >= start:
+                out.extend(trades[p - start] for p in positions[i:])
+                break
+            k = bisect_right(starts, position) - 1
+            j = bisect_left(positions, starts[k] + len(segments[k]), i)
+            offset = starts[k]
+            out.extend(
+                segments[k].trades(
+                    [p - offset for p in positions[i:j]], self._columns, offset
+                )
+            )
+            i = j
+        return out
+
+
+# Trades materialized at a time when iterating a book.
+READ_CHUNK = 256
+
+
+def trade_key(trade: Trade):
+    """Sort key for newest-first paging; ``before`` cursors compare against it."""
+    return trade.initiated_at, trade.trade_id
+
+
+def take_page(trades, limit) -> tuple[list[Trade], bool]:
+    """The first ``limit`` trades, and whether more followed."""
+    page = []
+    for trade in trades:
+        if len(page) == limit:
+            return page, True
+        page.append(trade)
+    return page, False
+
+
+def iter_by_key(timestamps, read, low: int, end: int, before=None):
+    """Trades at positions ``low:end`` newest-first by ``trade_key``, those below ``before`` only.
+
+    ``timestamps`` is the positions' initiated_at column, in order, and
+    ``read`` materializes a range of positions. Trades sharing a timestamp
+    are stored in append order rather than by trade_id, so each chunk starts
+    on a timestamp boundary and is sorted by key; a cursor then resumes
+    after exactly the trades it has seen.
+    """
+    chunk = 8
+    while end > low:
+        start = max(low, end - chunk)
+        start = bisect_left(timestamps, timestamps[start], low, start)
+        for trade in sorted(read(range(start, end)), key=trade_key, reverse=True):
+            if before is None or trade_key(trade) < before:
+                yield trade
+        # Only the first chunk can hold trades at before's timestamp.
+        before = None
+        end = start
+        chunk = min(chunk * 2, READ_CHUNK)
+
+
+# Side and status codes kept in the index; anything else is coded _OTHER_CODE.
+_SIDE_CODES = {side: code for code, side in enumerate(TRADE_SIDES)}
+_STATUS_CODES = {status: code for code, status in enumerate(TRADE_STATUSES)}
+_OTHER_CODE = 15
+_POSITION_BITS = 32
+
+
+class _Postings:
+    """One index list: a packed ``(book, position)`` reference and a side/status code per trade."""
+
+    __slots__ = ("refs", "codes")
+
+    def __init__(self):
+        self.refs = array("q")
+        self.codes = array("B")
+
+    def __len__(self):
+        return len(self.refs)
+
+
+class TradeIndex:
+    """Trades across every portfolio, by ticker and by hour of initiated_at.
+
+    Every list is kept in ``(initiated_at, trade_id)`` order. A time range,
+    either within one ticker or over the hour buckets it spans, is found by
+    bisection and read newest-first, so a query costs O(log n + result)
+    rather than a scan of every book. New trades are almost always the
+    newest in their lists and are appended; only late arrivals are
+    bisected into place.
+
+    Entries are a book's serial and the trade's position in it, packed into
+    one integer, with a side/status code alongside; initiated_at is read
+    from the book's timestamp column. The index holds no Trade objects, so
+    sealed trades stay columnar, and side, status and portfolio filters are
+    checked on the codes: only trades that match are materialized.
+    ``tickers`` numbers tickers for every book's ``TradeColumns``, so the
+    table is held once per store.
+    """
+
+    BUCKET_US = 3600 * 1_000_000
+
+    def __init__(self):
+        self._books: list[TradeBook] = []
+        self._by_ticker: dict[str, _Postings] = {}
+        self._buckets: dict[int, _Postings] = {}
+        self._bucket_ids: list[int] = []
+        self._lock = threading.Lock()
+        self.tickers = TickerCodes()
+
+    def register(self, book: TradeBook) -> int:
+        """Assign ``book`` the serial its entries will carry."""
+        with self._lock:
+            self._books.append(book)
+            return len(self._books) - 1
+
+    def add(self, serial: int, position: int, trade: Trade):
+        with self._lock:
+            self._add(serial << _POSITION_BITS | position, trade)
+
+    def _add(self, ref: int, trade: Trade):
+        at = to_micros(trade.initiated_at)
+        code = _SIDE_CODES.get(trade.side, _OTHER_CODE) << 4 | _STATUS_CODES.get(
+            trade.status, _OTHER_CODE
+        )
+        bucket_id = at // self.BUCKET_US
+        postings = self._by_ticker.get(trade.ticker)
+        if postings is None:
+            postings = self._by_ticker[trade.ticker] = _Postings()
+        self._insert(postings, at, ref, code, trade.trade_id)
+        bucket = self._buckets.get(bucket_id)
+        if bucket is None:
+            bucket = self._buckets[bucket_id] = _Postings()
+            insort(self._bucket_ids, bucket_id)
+        self._insert(bucket, at, ref, code, trade.trade_id)
+
+    def count(self, ticker) -> int:
+        return len(self._by_ticker.get(ticker, ()))
+
+    def search(
+        self,
+        ticker=None,
+        since=None,
+        before=None,
+        side=None,
+        status=None,
+        books=None,
+        limit=20,
+    ) -> tuple[list[Trade], bool]:
+        """Up to ``limit`` trades newest-first with ``since <= initiated_at``
+        and a key below ``before``, filtered by ``side``, ``status`` and
+        membership of ``books``; also reports whether more remain.
+
+        Runs under the index lock, as an insert mid-walk would shift the
+        positions being read.
+        """
+        side_code = None if side is None else _SIDE_CODES.get(side, _OTHER_CODE)
+        status_code = None if status is None else _STATUS_CODES.get(status, _OTHER_CODE)
+        serials = None if books is None else {book._serial for book in books}
+        with self._lock:
+            if ticker is not None:
+                lists = [self._by_ticker.get(ticker, _Postings())]
+            else:
+                ids = self._bucket_ids
+                hi = (
+                    len(ids)
+                    if before is None
+                    else bisect_right(ids, to_micros(before[0]) // self.BUCKET_US)
+                )
+                lo = (
+                    0
+                    if since is None
+                    else bisect_left(ids, to_micros(since) // self.BUCKET_US)
+                )
+                lists = [self._buckets[ids[i]] for i in range(hi - 1, lo - 1, -1)]
+            page = []
+            for postings in lists:
+                refs, codes = postings.refs, postings.codes
+                for i in self._newest_first(postings, since, before):
+                    code, ref = codes[i], refs[i]
+                    if side_code is not None and code >> 4 != side_code:
+                        continue
+                    if status_code is not None and code & 15 != status_code:
+                        continue
+                    if serials is not None and ref >> _POSITION_BITS not in serials:
+                        continue
+                    trade = self._trade(ref)
+                    # Codes only separate known values; compare the rest exactly.
+                    if (
+                        side_code == _OTHER_CODE
+                        and trade.side != side
+                        or status_code == _OTHER_CODE
+                        and trade.status != status
+                    ):
+                        continue
+                    if len(page) == limit:
+                        return page, True
+                    page.append(trade)
+            return page, False
+
+    def _insert(self, postings: _Postings, at: int, ref: int, code: int, trade_id: str):
+        refs = postings.refs
+        i = len(refs)
+        if i and self._time(refs[-1]) >= at:
+            i = bisect_right(refs, at, key=self._time)
+            while (
+                i
+                and self._time(refs[i - 1]) == at
+                and self._trade_id(refs[i - 1]) > trade_id
+            ):
+                i -= 1
+        if i == len(refs):
+            refs.append(ref)
+            postings.codes.append(code)
+        else:
+            refs.insert(i, ref)
+            postings.codes.insert(i, code)
+
+    def _newest_first(self, postings: _Postings, since, before) -> range:
+        """Positions in ``postings`` with ``since <= initiated_at`` and a key below ``before``, newest first."""
+        refs = postings.refs
+        end = len(refs)
+        if before is not None:
+            at = to_micros(before[0])
+            end = bisect_left(refs, at, key=self._time)
+            while (
+                end < len(refs)
+                and self._time(refs[end]) == at
+                and self._trade_id(refs[end]) < before[1]
+            ):
+                end += 1
+        start = (
+            0
+            if since is None
+            else bisect_left(refs, to_micros(since), 0, end, key=self._time)
+        )
+        return range(end - 1, start - 1, -1)
+
+    def _time(self, ref: int) -> int:
+        return self._books[ref >> _POSITION_BITS]._columns.timestamps[
+            ref & _POSITION_MASK
+        ]
+
+    def _trade(self, ref: int) -> Trade:
+        return self._books[ref >> _POSITION_BITS]._trade_at(ref & _POSITION_MASK)
+
+    def _trade_id(self, ref: int) -> str:
+        return self._books[ref >> _POSITION_BITS]._trade_id_at(ref & _POSITION_MASK)
+
+    def clear(self):
+        with self._lock:
+            self._books.clear()
+            self._by_ticker.clear()
+            self._buckets.clear()
+            self._bucket_ids.clear()
 
-_portfolios: dict[str, Portfolio] = {}
-_trades: dict[str, list[Trade]] = {}  # keyed by portfolio_id
 
+_POSITION_MASK = (1 << _POSITION_BITS) - 1
 
-def get_portfolio_store() -> dict[str, Portfolio]:
-    return _portfolios
 
+class TradeStore:
+    """Trade books keyed by portfolio_id, created on first write.
 
-def get_trade_store() -> dict[str, list[Trade]]:
-    return _trades
+    ``index`` holds every trade in every book for cross-portfolio queries.
+    ``book_factory`` is called with it to create a book.
+    """
+
+    def __init__(self, book_factory=TradeBook):
+        self._books: dict[str, TradeBook] = {}
+        self._book_factory = book_factory
+        self.index = TradeIndex()
+
+    def __contains__(self, portfolio_id):
+        return portfolio_id in self._books
+
+    def get(self, portfolio_id):
+        return self._books.get(portfolio_id)
+
+    def items(self):
+        return self._books.items()
+
+    def book(self, portfolio_id) -> TradeBook:
+        book = self._books.get(portfolio_id)
+        if book is None:
+            book = self._books.setdefault(portfolio_id, self._book_factory(self.index))
+        return book
+
+    def query(
+        self,
+        ticker=None,
+        side=None,
+        status=None,
+        since=None,
+        until=None,
+        portfolio_ids=None,
+        after=None,
+        limit=20,
+    ) -> tuple[list[Trade], bool]:
+        """Trades across portfolios matching every given filter, newest-first.
+
+        ``after`` is the ``(initiated_at, trade_id)`` key of the last trade
+        already returned. The query walks whichever source is smaller: the
+        ticker's index, or the books of ``portfolio_ids``, merged by time.
+        With neither, it walks the time buckets.
+        """
+        before = after
+        if until is not None and (before is None or (until, "") < before):
+            before = (until, "")
+        books = None
+        if portfolio_ids is not None:
+            books = [
+                self._books[pid] for pid in set(portfolio_ids) if pid in self._books
+            ]
+            if ticker is None or sum(len(book) for book in books) < self.index.count(
+                ticker
+            ):
+
+                def match(trade):
+                    return (
+                        (side is None or trade.side == side)
+                        and (status is None or trade.status == status)
+                        and (ticker is None or trade.ticker == ticker)
+                    )
+
+                streams = [book.iter_newest(before, since) for book in books]
+                return take_page(
+                    filter(match, heapq.merge(*streams, key=trade_key, reverse=True)),
+                    limit,
+                )
+        return self.index.search(ticker, since, before, side, status, books, limit)
+
+    def clear(self):
+        self._books.clear()
+        self.index.clear()
+
+
+class Holdings:
+    """Open positions for one portfolio, keyed by ticker.
+
+    Maintained incrementally as trades are booked, so reading holdings is
+    O(#positions) rather than a rescan of the trade history. ``rebuild``
+    recomputes the same state from the trades for recovery, and
+    ``rebuild_columns`` from a book's ``TradeColumns``, without
+    materializing its trades.
+    """
+
+    def __init__(self):
+        self._positions: dict[str, Position] = {}
+
+    def __len__(self):
+        return len(self._positions)
+
+    def get(self, ticker):
+        return self._positions.get(ticker)
+
+    def positions(self) -> list[Position]:
+        return sorted(self._positions.values(), key=lambda position: position.ticker)
+
+    def apply(self, trade: Trade):
+        position = self._positions.get(trade.ticker) or Position(trade.ticker)
+        position.apply(trade)
+        if position.quantity > 0:
+            self._positions[trade.ticker] = position
+        else:
+            self._positions.pop(trade.ticker, None)
+
+    def extend(self, trades):
+        for trade in trades:
+            self.apply(trade)
+
+    def rebuild(self, trades):
+        self._positions.clear()
+        self.extend(trades)
+
+    def rebuild_columns(self, columns: TradeColumns):
+        self.restore(positions_from_columns(columns))
+
+    def restore(self, positions):
+        """Replace the open positions with ``positions``, as saved in a snapshot."""
+        self._positions = {
+            position.ticker: position for position in positions if position.quantity > 0
+        }
+
+
+def positions_from_columns(columns: TradeColumns) -> list[Position]:
+    """Positions after every fill in ``columns``, closed ones included."""
+    tickers, positions = columns.tickers, {}
+    for code, quantity, price in zip(
+        columns.ticker_codes, columns.quantities, columns.prices
+    ):
+        position = positions.get(code)
+        if position is None:
+            position = positions[code] = Position(tickers[code])
+        position.fill(quantity, price)
+    return list(positions.values())
+
+
+class HoldingsStore:
+    """Holdings ledgers keyed by portfolio_id, created on first write."""
+
+    def __init__(self):
+        self._ledgers: dict[str, Holdings] = {}
+
+    def ledger(self, portfolio_id) -> Holdings:
+        ledger = self._ledgers.get(portfolio_id)
+        if ledger is None:
+            ledger = self._ledgers.setdefault(portfolio_id, Holdings())
+        return ledger
+
+    def clear(self):
+        self._ledgers.clear()
+
+
+class LockStripes:
+    """A fixed pool of locks that keys hash onto.
+
+    Writers to the same portfolio serialize on one stripe while writers to
+    different portfolios almost always proceed in parallel, without keeping
+    a lock object per portfolio. crc32 keeps the mapping stable across
+    processes, unlike the randomized built-in ``hash``.
+    """
+
+    def __init__(self, stripes=64):
+        self._locks = [threading.Lock() for _ in range(stripes)]
+
+    def __call__(self, key: str) -> threading.Lock:
+        return self._locks[zlib.crc32(key.encode()) % len(self._locks)]
+
+
+class MemoryStorage:
+    """Process-local storage backend."""
+
+    def __init__(self):
+        self.portfolios = PortfolioRepository()
+        self.trades = TradeStore()
+        self.holdings = HoldingsStore()
+        self._locks = LockStripes()
+
+    @contextmanager
+    def locked(self, portfolio_id: str):
+        """Serialize read-modify-write sequences on one portfolio and its trades."""
+        with self._locks(portfolio_id):
+            yield
+
+    def reset(self):
+        self.portfolios.clear()
+        self.trades.clear()
+        self.holdings.clear()
+
+
+def create_storage(backend: str):
+    if backend == "memory":
+        return MemoryStorage()
+    if backend == "sqlite":
+        from app.sqlite_store import SQLiteStorage
+
+        return SQLiteStorage(os.environ.get("SQLITE_PATH", "portfolios.db"))
+    if backend == "journal":
+        from app.journal import JournalStorage
+
+        return JournalStorage(os.environ.get("JOURNAL_DIR", "journal"))
+    if backend == "mmap":
+        from app.mmap_store import MappedStorage
+
+        return MappedStorage(os.environ.get("MMAP_SNAPSHOT_PATH", "portfolios.snap"))
+    raise ValueError(f"Unknown STORAGE_BACKEND {backend!r}")
+
+
+_storage = None
+_storage_lock = threading.Lock()
+
+
+def get_storage():
+    global _storage
+    if _storage is None:
+        # Threaded servers can race here on their first requests. Two backends
+        # would mean two lock sets, and SQLite's per-instance connections
+        # would then deadlock a nested write against its own outer transaction.
+        with _storage_lock:
+            if _storage is None:
+                _storage = create_storage(os.environ.get("STORAGE_BACKEND", "memory"))
+    return _storage
+
+
+def set_storage(storage):
+    global _storage
+    _storage = storage
+
+
+def get_portfolio_store() -> PortfolioRepository:
+    return get_storage().portfolios
+
+
+def get_trade_store() -> TradeStore:
+    return get_storage().trades
+
+
+def get_holdings_store() -> HoldingsStore:
+    return get_storage().holdings
+
+
+def portfolio_lock(portfolio_id: str):
+    """Context manager guarding updates to a portfolio's trades and totals."""
+    return get_storage().locked(portfolio_id)
 
 
 def reset_stores():
-    _portfolios.clear()
-    _trades.clear()
+    get_storage().reset()
+
+
+def rebuild_holdings(portfolio_id: str) -> Holdings:
+    """Recompute a portfolio's holdings from its trade history."""
+    with portfolio_lock(portfolio_id):
+        ledger = get_holdings_store().ledger(portfolio_id)
+        ledger.rebuild_columns(get_trade_store().book(portfolio_id).columns())
+    return ledger
@@ -0,0 +1,30 @@
+"""Opaque keyset cursors for the list endpoints.
+
+A cursor encodes the ``(timestamp, id)`` key of the last item on a page.
+Resuming from it is a bisect into the store's ordered index, so walking a
+collection costs linear total time and is stable under concurrent inserts.
+"""
+
+from __future__ import annotations
+
+import base64
+import json
+from datetime import datetime
+
+
+def encode_cursor(timestamp: datetime, item_id: str) -> str:
+    raw = json.dumps([timestamp.isoformat(), item_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, str]:
+    """Decode a cursor produced by :func:`encode_cursor`; raises ``ValueError`` if malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        timestamp, item_id = json.loads(raw)
+        timestamp = datetime.fromisoformat(timestamp)
+    except (TypeError, ValueError) as exc:
+        raise ValueError("Invalid cursor") from exc
+    if timestamp.tzinfo is None:
+        raise ValueError("Invalid cursor")
+    return timestamp, str(item_id)
@@ -0,0 +1,152 @@
+"""Per-(portfolio, period) cache for /performance metrics.
+
+Dashboards poll /performance far more often than portfolios trade, so
+results are cached in a bounded LRU with a TTL. Entries are validated
+against the trade book's version (its trade count), so a trade written by
+another worker is never served stale. Positions are marked to current
+quotes (see ``app.analytics``), and those are not versioned: a cached
+windowed result reflects a quote move once its TTL runs out.
+
+Inception-to-date metrics are not cached as results at all. Each portfolio
+keeps a ``RunningPerformance`` state instead, and ``initiate_trade`` folds
+new trades into it in O(1). Windowed periods (1m, ytd, ...) slide with
+time, so new trades just invalidate them.
+
+``app.analytics`` (and with it NumPy) is imported on the first miss rather
+than at startup, so cold starts that never serve /performance skip it.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from app.models import PERIOD_DAYS, TradeColumns
+
+CACHE_SIZE = int(os.environ.get("PERFORMANCE_CACHE_SIZE", 4096))
+CACHE_TTL = float(os.environ.get("PERFORMANCE_CACHE_TTL", 60))
+
+_RUNNING = "inception"
+_WINDOWED = [period for period in PERIOD_DAYS if period != _RUNNING]
+
+
+class _Entry:
+    __slots__ = ("version", "benchmark_index", "value", "expires")
+
+    def __init__(self, version, benchmark_index, value, expires):
+        self.version = version
+        self.benchmark_index = benchmark_index
+        self.value = value
+        self.expires = expires
+
+
+class PerformanceCache:
+    def __init__(self, maxsize=CACHE_SIZE, ttl=CACHE_TTL, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: OrderedDict[tuple[str, str], _Entry] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.incremental_updates = 0
+
+    def metrics(self, portfolio, period, book, now=None):
+        """Return ``(metrics, hit)`` for ``portfolio`` over ``period``.
+
+        ``book`` is ``None`` for a portfolio with no trades. A miss reads the
+        book's columns without the portfolio lock, which on SQLite would open
+        a write transaction. Columns are a consistent prefix of the history
+        on their own; the result is cached only if the book's version is the
+        same after computing as before reading them, so it matches that
+        version.
+        """
+        version = 0 if book is None else len(book)
+        key = (portfolio.portfolio_id, period)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.version == version:
+                if period == _RUNNING:
+                    self._hit(key)
+                    return entry.value.metrics(portfolio.benchmark_index, now), True
+                if (
+                    entry.benchmark_index == portfolio.benchmark_index
+                    and entry.expires > self._clock()
+                ):
+                    self._hit(key)
+                    return entry.value, True
+            self.misses += 1
+
+        from app.analytics import RunningPerformance, compute_performance
+
+        columns = TradeColumns.empty() if book is None else book.columns()
+        if period == _RUNNING:
+            value = RunningPerformance.from_columns(columns)
+            result = value.metrics(portfolio.benchmark_index, now)
+        else:
+            value = result = compute_performance(
+                columns, period, portfolio.benchmark_index, now=now
+            )
+
+        if book is not None and len(book) != version:
+            return result, False
+        with self._lock:
+            current = self._entries.get(key)
+            if current is None or current.version <= version:
+                self._entries[key] = _Entry(
+                    version, portfolio.benchmark_index, value, self._clock() + self.ttl
+                )
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return result, False
+
+    def record_trades(self, portfolio_id, trades, version):
+        """Account for ``trades`` just appended to a book, now at ``version``.
+
+        Must be called while the portfolio lock is held, so versions advance
+        in the same order the trades were appended.
+        """
+        with self._lock:
+            for period in _WINDOWED:
+                if self._entries.pop((portfolio_id, period), None) is not None:
+                    self.invalidations += 1
+            entry = self._entries.get((portfolio_id, _RUNNING))
+            if entry is None:
+                return
+            if entry.version != version - len(trades):
+                del self._entries[(portfolio_id, _RUNNING)]
+                self.invalidations += 1
+                return
+            for trade in trades:
+                entry.value.apply(trade)
+            entry.version = version
+            self.incremental_updates += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "incrementalUpdates": self.incremental_updates,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _hit(self, key):
+        self.hits += 1
+        self._entries.move_to_end(key)
+
+
+performance_cache = PerformanceCache()
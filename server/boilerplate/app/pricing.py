@@ -0,0 +1,90 @@
+"""Quote source for pricing market orders.
+
+Prices come from a quote snapshot: a ``ticker,price`` CSV that is read once
+per process. The path is set by ``PRICE_QUOTES_PATH`` and defaults to the
+bundled ``quotes.csv``. A ticker missing from the snapshot gets a
+placeholder price derived from the crc32 of its symbol. Every gunicorn
+worker and Lambda cold start therefore quotes the same price for the same
+ticker, which the per-process randomized built-in ``hash`` did not.
+
+``PriceProvider`` is the interface; ``set_price_provider`` swaps in
+another source, such as a live quote feed.
+"""
+
+from __future__ import annotations
+
+import csv
+import os
+import threading
+import zlib
+from abc import ABC, abstractmethod
+from pathlib import Path
+
+QUOTES_PATH = os.environ.get(
+    "PRICE_QUOTES_PATH", str(Path(__file__).with_name("quotes.csv"))
+)
+
+
+def fallback_price(ticker: str) -> float:
+    """Placeholder quote for tickers missing from the snapshot, stable across processes."""
+    return round(150.0 + zlib.crc32(ticker.upper().encode()) % 200, 2)
+
+
+class PriceProvider(ABC):
+    """Interface for quote sources; subclasses implement ``get_prices``."""
+
+    @abstractmethod
+    def get_prices(self, tickers) -> dict[str, float]:
+        """Current price of each of ``tickers``, keyed by the ticker as given."""
+
+    def get_price(self, ticker: str) -> float:
+        return self.get_prices([ticker])[ticker]
+
+
+class QuoteTable(PriceProvider):
+    """Prices from a ``ticker,price`` CSV snapshot, loaded into memory once."""
+
+    def __init__(self, path: str = QUOTES_PATH):
+        self.path = path
+        self._quotes: dict[str, float] = {}
+        if os.path.exists(path):
+            with open(path, newline="") as f:
+                for row in csv.DictReader(f):
+                    self._quotes[row["ticker"].strip().upper()] = float(row["price"])
+
+    def __len__(self):
+        return len(self._quotes)
+
+    def get_prices(self, tickers) -> dict[str, float]:
+        quotes = self._quotes
+        return {
+            ticker: quotes.get(ticker.upper()) or fallback_price(ticker)
+            for ticker in tickers
+        }
+
+
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def get_price_provider() -> PriceProvider:
+    global _provider
+    if _provider is None:
+        with _provider_lock:
+            if _provider is None:
+                _provider = QuoteTable()
+    return _provider
+
+
+def set_price_provider(provider):
+    global _provider
+    _provider = provider
+
+
+def get_price(ticker: str) -> float:
+    return get_price_provider().get_price(ticker)
+
+
+def get_prices(tickers) -> dict[str, float]:
+    """Quote many tickers in one call, e.g. for a trade batch."""
+    return get_price_provider().get_prices(tickers)
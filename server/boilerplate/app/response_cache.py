@@ -0,0 +1,98 @@
+"""Conditional GETs and a cache of rendered JSON bodies.
+
+Read endpoints describe what their response depends on as a version tuple,
+e.g. the portfolio's version counter or the trade book's length. That tuple
+becomes a strong ETag. A request whose ``If-None-Match`` matches it gets a
+304 without touching the models. Otherwise the encoded body is looked up by
+``(path and query, version)`` in a bounded LRU, so repeat reads of an
+unchanged resource skip ``to_dict`` and JSON encoding as well.
+
+Versions change whenever the data does, so entries never need
+invalidating; stale versions simply age out of the LRU.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from collections import OrderedDict
+
+from flask import current_app, request
+
+CACHE_SIZE = int(os.environ.get("RESPONSE_CACHE_SIZE", 2048))
+# Bodies larger than this are served but not kept, bounding cache memory.
+MAX_BODY_BYTES = int(os.environ.get("RESPONSE_CACHE_MAX_BODY_BYTES", 256 * 1024))
+
+
+class ResponseCache:
+    def __init__(self, maxsize=CACHE_SIZE, max_body_bytes=MAX_BODY_BYTES):
+        self.maxsize = maxsize
+        self.max_body_bytes = max_body_bytes
+        self._entries: OrderedDict[tuple, bytes] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def get(self, key):
+        with self._lock:
+            body = self._entries.get(key)
+            if body is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return body
+
+    def put(self, key, body: bytes):
+        if len(body) > self.max_body_bytes:
+            return
+        with self._lock:
+            self._entries[key] = body
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def record_not_modified(self):
+        with self._lock:
+            self.not_modified += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "notModified": self.not_modified,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+response_cache = ResponseCache()
+
+
+def conditional_json(version: tuple, render):
+    """Respond to the current GET with ``render()`` as JSON, tagged with ``version``.
+
+    Returns ``(response, cached)``. ``render`` is called only when neither
+    the client's ETag nor the body cache can answer.
+    """
+    etag = ".".join(str(part) for part in version)
+    if request.if_none_match.contains(etag):
+        response_cache.record_not_modified()
+        resp = current_app.response_class(status=304)
+        resp.set_etag(etag)
+        return resp, True
+
+    key = (request.full_path, version)
+    body = response_cache.get(key)
+    cached = body is not None
+    if not cached:
+        body = current_app.json.response(render()).get_data()
+        response_cache.put(key, body)
+    resp = current_app.response_class(body, mimetype=current_app.json.mimetype)
+    resp.set_etag(etag)
+    return resp, cached
@@ -1,22 +1,40 @@
 from __future__ import annotations
 
+import json
+import time
 from datetime import datetime, timezone
 
-from flask import Blueprint, jsonify, request
-from marshmallow import ValidationError
+from flask import Blueprint, Response, jsonify, request
 
 from app.models import (
-    Portfolio, Trade,
-    PortfolioInitiateSchema, PortfolioUpdateSchema, TradeInitiateSchema,
-    get_portfolio_store, get_trade_store,
+    Trade,
+    PERIOD_DAYS,
+    get_holdings_store,
+    get_portfolio_store,
+    get_trade_store,
+    portfolio_lock,
 )
+from app.export import (
+    EXPORT_FORMATS,
+    PORTFOLIO_COLUMNS,
+    TRADE_COLUMNS,
+    decode_trade_cursor,
+    export_response,
+    iter_portfolio_rows,
+    iter_trade_rows,
+)
+from app.idempotency import idempotency_store, idempotent
+from app.metrics import phase, registry, render_samples
+from app.pagination import decode_cursor, encode_cursor
+from app.performance_cache import performance_cache
+from app.pricing import get_prices
+from app.response_cache import conditional_json, response_cache
 
 ops_bp = Blueprint("ops", __name__)
 api_bp = Blueprint("api", __name__)
 
-portfolio_initiate_schema = PortfolioInitiateSchema()
-portfolio_update_schema = PortfolioUpdateSchema()
-trade_initiate_schema = TradeInitiateSchema()
+# Handlers that validate input import app.schemas (and marshmallow) on first
+# use, keeping them off the cold-start path; see app.DEFERRED_MODULES.
 
 
 # ---------------------------------------------------------------------------
@@ -26,12 +44,86 @@ trade_initiate_schema = TradeInitiateSchema()
 
 @ops_bp.route("/health", methods=["GET"])
 def health_check():
-    return jsonify({
-        "status": "healthy",
-        "service": "advisor-portfolio-api",
-        "version": "1.0.0",
-        "timestamp": datetime.now(timezone.utc).isoformat(),
-    })
+    return jsonify(
+        {
+            "status": "healthy",
+            "service": "advisor-portfolio-api",
+            "version": "1.0.0",
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+        }
+    )
+
+
+@ops_bp.route("/metrics", methods=["GET"])
+def metrics():
+    cache = performance_cache.stats()
+    responses = response_cache.stats()
+    idempotency = idempotency_store.stats()
+    body = registry.render() + render_samples(
+        [
+            (
+                "performance_cache_entries",
+                "gauge",
+                "Entries in the /performance cache.",
+                cache["size"],
+            ),
+            (
+                "performance_cache_hits_total",
+                "counter",
+                "Performance cache hits.",
+                cache["hits"],
+            ),
+            (
+                "performance_cache_misses_total",
+                "counter",
+                "Performance cache misses.",
+                cache["misses"],
+            ),
+            (
+                "performance_cache_evictions_total",
+                "counter",
+                "Performance cache LRU evictions.",
+                cache["evictions"],
+            ),
+            (
+                "response_cache_entries",
+                "gauge",
+                "Rendered bodies in the response cache.",
+                responses["size"],
+            ),
+            (
+                "response_cache_hits_total",
+                "counter",
+                "Reads served from a cached body.",
+                responses["hits"],
+            ),
+            (
+                "response_cache_not_modified_total",
+                "counter",
+                "Reads answered 304 Not Modified.",
+                responses["notModified"],
+            ),
+            (
+                "idempotency_keys",
+                "gauge",
+                "Responses kept for Idempotency-Key retries.",
+                idempotency["size"],
+            ),
+            (
+                "idempotency_replays_total",
+                "counter",
+                "Retries answered with a kept response.",
+                idempotency["replays"],
+            ),
+            (
+                "idempotency_coalesced_total",
+                "counter",
+                "Requests that waited on an in-flight request with their key.",
+                idempotency["coalesced"],
+            ),
+        ]
+    )
+    return Response(body, content_type="text/plain; version=0.0.4; charset=utf-8")
 
 
 # ---------------------------------------------------------------------------
@@ -48,72 +140,147 @@ def list_portfolios():
     limit = max(1, min(limit, 100))
     offset = max(0, offset)
 
-    all_items = sorted(store.values(), key=lambda p: p.created_at, reverse=True)
-    if status_filter:
-        all_items = [p for p in all_items if p.status == status_filter]
-    page = all_items[offset:offset + limit]
-
-    return jsonify({
-        "portfolios": [p.to_dict() for p in page],
-        "total": len(all_items),
-        "limit": limit,
-        "offset": offset,
-    })
+    status_filter = status_filter or None
+    filters = {
+        "client_id": request.args.get("clientId") or None,
+        "advisor_id": request.args.get("advisorId") or None,
+    }
+    cursor = request.args.get("cursor")
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        return jsonify({"error": "bad_request", "message": "Invalid cursor"}), 400
+
+    with phase("store"):
+        total = store.count(status_filter, **filters)
+        if after:
+            page, has_more = store.page_after(
+                after, status=status_filter, limit=limit, **filters
+            )
+            offset = 0
+        else:
+            page = store.page(
+                status=status_filter, offset=offset, limit=limit, **filters
+            )
+            has_more = offset + len(page) < total
+
+    last = page[-1] if page else None
+    return jsonify(
+        {
+            "portfolios": page,
+            "total": total,
+            "limit": limit,
+            "offset": offset,
+            "nextCursor": (
+                encode_cursor(last.created_at, last.portfolio_id)
+                if has_more and last
+                else None
+            ),
+        }
+    )
 
 
 @api_bp.route("/portfolios", methods=["POST"])
+@idempotent
 def initiate_portfolio():
     json_data = request.get_json(silent=True)
     if not json_data:
-        return jsonify({"error": "bad_request", "message": "Request body must be JSON"}), 400
+        return (
+            jsonify({"error": "bad_request", "message": "Request body must be JSON"}),
+            400,
+        )
+
+    from app.schemas import ValidationError, portfolio_initiate_schema
 
     try:
-        portfolio = portfolio_initiate_schema.load(json_data)
+        with phase("validate"):
+            portfolio = portfolio_initiate_schema.load(json_data)
     except ValidationError as err:
-        return jsonify({"error": "validation_error", "message": "Invalid input", "details": err.messages}), 400
+        return (
+            jsonify(
+                {
+                    "error": "validation_error",
+                    "message": "Invalid input",
+                    "details": err.messages,
+                }
+            ),
+            400,
+        )
 
     store = get_portfolio_store()
-    store[portfolio.portfolio_id] = portfolio
-    return jsonify(portfolio.to_dict()), 201
+    with phase("store"):
+        store.add(portfolio)
+    return jsonify(portfolio), 201
 
 
 @api_bp.route("/portfolios/<portfolio_id>", methods=["GET"])
 def get_portfolio(portfolio_id):
     store = get_portfolio_store()
-    portfolio = store.get(portfolio_id)
+    with phase("store"):
+        portfolio = store.get(portfolio_id)
     if not portfolio:
-        return jsonify({"error": "not_found", "message": f"Portfolio {portfolio_id} not found"}), 404
-    return jsonify(portfolio.to_dict())
+        return (
+            jsonify(
+                {"error": "not_found", "message": f"Portfolio {portfolio_id} not found"}
+            ),
+            404,
+        )
+    return conditional_json((portfolio.version,), lambda: portfolio)[0]
 
 
 @api_bp.route("/portfolios/<portfolio_id>", methods=["PUT"])
 def update_portfolio(portfolio_id):
     store = get_portfolio_store()
-    portfolio = store.get(portfolio_id)
+    with phase("store"):
+        portfolio = store.get(portfolio_id)
     if not portfolio:
-        return jsonify({"error": "not_found", "message": f"Portfolio {portfolio_id} not found"}), 404
+        return (
+            jsonify(
+                {"error": "not_found", "message": f"Portfolio {portfolio_id} not found"}
+            ),
+            404,
+        )
 
     json_data = request.get_json(silent=True)
     if not json_data:
-        return jsonify({"error": "bad_request", "message": "Request body must be JSON"}), 400
+        return (
+            jsonify({"error": "bad_request", "message": "Request body must be JSON"}),
+            400,
+        )
+
+    from app.schemas import ValidationError, portfolio_update_schema
 
     try:
-        validated = portfolio_update_schema.load(json_data)
+        with phase("validate"):
+            validated = portfolio_update_schema.load(json_data)
     except ValidationError as err:
-        return jsonify({"error": "validation_error", "message": "Invalid input", "details": err.messages}), 400
-
-    portfolio.portfolio_name = validated["portfolioName"]
+        return (
+            jsonify(
+                {
+                    "error": "validation_error",
+                    "message": "Invalid input",
+                    "details": err.messages,
+                }
+            ),
+            400,
+        )
+
+    changes = {"portfolio_name": validated["portfolioName"]}
     if "investmentObjective" in validated:
-        portfolio.investment_objective = validated["investmentObjective"]
+        changes["investment_objective"] = validated["investmentObjective"]
     if "riskTolerance" in validated:
-        portfolio.risk_tolerance = validated["riskTolerance"]
+        changes["risk_tolerance"] = validated["riskTolerance"]
     if "status" in validated:
-        portfolio.status = validated["status"]
+        changes["status"] = validated["status"]
     if "benchmarkIndex" in validated:
-        portfolio.benchmark_index = validated["benchmarkIndex"]
-    portfolio.updated_at = datetime.now(timezone.utc)
+        changes["benchmark_index"] = validated["benchmarkIndex"]
+    changes["updated_at"] = datetime.now(timezone.utc)
+    with phase("store"), portfolio_lock(portfolio_id):
+        # Re-read under the lock so the version bump can't be lost to a concurrent writer.
+        portfolio = store.get(portfolio_id)
+        store.update(portfolio, **changes)
 
-    return jsonify(portfolio.to_dict())
+    return jsonify(portfolio)
 
 
 # ---------------------------------------------------------------------------
@@ -125,44 +292,334 @@ def update_portfolio(portfolio_id):
 def list_trades(portfolio_id):
     portfolio_store = get_portfolio_store()
     if portfolio_id not in portfolio_store:
-        return jsonify({"error": "not_found", "message": f"Portfolio {portfolio_id} not found"}), 404
+        return (
+            jsonify(
+                {"error": "not_found", "message": f"Portfolio {portfolio_id} not found"}
+            ),
+            404,
+        )
 
     trade_store = get_trade_store()
     limit = request.args.get("limit", 20, type=int)
     offset = request.args.get("offset", 0, type=int)
-    status_filter = request.args.get("status")
+    status_filter = request.args.get("status") or None
     limit = max(1, min(limit, 100))
+    offset = max(0, offset)
 
-    trades = trade_store.get(portfolio_id, [])
-    if status_filter:
-        trades = [t for t in trades if t.status == status_filter]
-    trades_sorted = sorted(trades, key=lambda t: t.initiated_at, reverse=True)
-    page = trades_sorted[offset:offset + limit]
-
-    return jsonify({
-        "trades": [t.to_dict() for t in page],
-        "total": len(trades_sorted),
-        "limit": limit,
-        "offset": offset,
-    })
+    cursor = request.args.get("cursor")
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        return jsonify({"error": "bad_request", "message": "Invalid cursor"}), 400
+
+    # A read must not create a book; a portfolio without one has no trades.
+    book = trade_store.get(portfolio_id)
+    version = 0 if book is None else book.version
+
+    def render():
+        nonlocal offset
+        with phase("store"):
+            if book is None:
+                total, page, has_more = 0, [], False
+            elif after:
+                total = book.count(status_filter)
+                page, has_more = book.page_after(
+                    after, status=status_filter, limit=limit
+                )
+            else:
+                total = book.count(status_filter)
+                page = book.page(status=status_filter, offset=offset, limit=limit)
+                has_more = offset + len(page) < total
+            if after:
+                offset = 0
+
+        last = page[-1] if page else None
+        return {
+            "trades": page,
+            "total": total,
+            "limit": limit,
+            "offset": offset,
+            "nextCursor": (
+                encode_cursor(last.initiated_at, last.trade_id)
+                if has_more and last
+                else None
+            ),
+        }
+
+    # Read the version before the page so a cached body is never older than its tag.
+    return conditional_json((version,), render)[0]
 
 
 @api_bp.route("/portfolios/<portfolio_id>/trades", methods=["POST"])
+@idempotent
 def initiate_trade(portfolio_id):
     portfolio_store = get_portfolio_store()
     if portfolio_id not in portfolio_store:
-        return jsonify({"error": "not_found", "message": f"Portfolio {portfolio_id} not found"}), 404
+        return (
+            jsonify(
+                {"error": "not_found", "message": f"Portfolio {portfolio_id} not found"}
+            ),
+            404,
+        )
 
     json_data = request.get_json(silent=True)
     if not json_data:
-        return jsonify({"error": "bad_request", "message": "Request body must be JSON"}), 400
+        return (
+            jsonify({"error": "bad_request", "message": "Request body must be JSON"}),
+            400,
+        )
+
+    from app.schemas import ValidationError, trade_initiate_schema
 
     try:
-        validated = trade_initiate_schema.load(json_data)
+        with phase("validate"):
+            validated = trade_initiate_schema.load(json_data)
     except ValidationError as err:
-        return jsonify({"error": "validation_error", "message": "Invalid input", "details": err.messages}), 400
+        return (
+            jsonify(
+                {
+                    "error": "validation_error",
+                    "message": "Invalid input",
+                    "details": err.messages,
+                }
+            ),
+            400,
+        )
+
+    trade = _build_trade(portfolio_id, validated)
+
+    with phase("store"), portfolio_lock(portfolio_id):
+        book = get_trade_store().book(portfolio_id)
+        _stamp(book, [trade])
+        book.append(trade)
+        performance_cache.record_trades(portfolio_id, [trade], len(book))
+        get_holdings_store().ledger(portfolio_id).apply(trade)
+
+        # Update portfolio total value
+        portfolio = portfolio_store.get(portfolio_id)
+        total_value = _apply_trade_value(portfolio.total_value, trade)
+        portfolio_store.update(
+            portfolio, total_value=total_value, updated_at=datetime.now(timezone.utc)
+        )
+
+    return jsonify(trade), 201
 
-    trade = Trade(
+
+BATCH_MAX_TRADES = 5000
+
+
+@api_bp.route("/portfolios/<portfolio_id>/trades/batch", methods=["POST"])
+def initiate_trade_batch(portfolio_id):
+    portfolio_store = get_portfolio_store()
+    portfolio = portfolio_store.get(portfolio_id)
+    if not portfolio:
+        return (
+            jsonify(
+                {"error": "not_found", "message": f"Portfolio {portfolio_id} not found"}
+            ),
+            404,
+        )
+
+    with phase("parse"):
+        items, parse_errors = _read_batch_body()
+    if not items:
+        return (
+            jsonify(
+                {
+                    "error": "bad_request",
+                    "message": "Request body must be a non-empty array of trades",
+                }
+            ),
+            400,
+        )
+    if len(items) > BATCH_MAX_TRADES:
+        return (
+            jsonify(
+                {
+                    "error": "payload_too_large",
+                    "message": f"Batch exceeds {BATCH_MAX_TRADES} trades",
+                }
+            ),
+            413,
+        )
+
+    from app.schemas import ValidationError, trade_initiate_schema
+
+    errors = {}
+    try:
+        with phase("validate"):
+            validated = trade_initiate_schema.load(items, many=True)
+    except ValidationError as err:
+        errors = err.messages
+        validated = err.valid_data
+    errors.update(parse_errors)
+
+    prices = get_prices(
+        {data["ticker"] for index, data in enumerate(validated) if index not in errors}
+    )
+    results = []
+    accepted = []
+    for index, data in enumerate(validated):
+        if index in errors:
+            results.append(
+                {
+                    "index": index,
+                    "status": 400,
+                    "error": "validation_error",
+                    "details": errors[index],
+                }
+            )
+            continue
+        trade = _build_trade(portfolio_id, data, prices[data["ticker"]])
+        accepted.append(trade)
+        results.append({"index": index, "status": 201, "trade": trade})
+
+    if not accepted:
+        return (
+            jsonify(
+                {
+                    "error": "validation_error",
+                    "message": "No valid trades in batch",
+                    "details": {
+                        str(index): messages for index, messages in errors.items()
+                    },
+                }
+            ),
+            400,
+        )
+
+    with phase("store"), portfolio_lock(portfolio_id):
+        book = get_trade_store().book(portfolio_id)
+        _stamp(book, accepted)
+        book.extend(accepted)
+        performance_cache.record_trades(portfolio_id, accepted, len(book))
+        get_holdings_store().ledger(portfolio_id).extend(accepted)
+        portfolio = portfolio_store.get(portfolio_id)
+        total_value = portfolio.total_value
+        for trade in accepted:
+            total_value = _apply_trade_value(total_value, trade)
+        portfolio_store.update(
+            portfolio, total_value=total_value, updated_at=datetime.now(timezone.utc)
+        )
+
+    return jsonify(
+        {
+            "accepted": len(accepted),
+            "rejected": len(results) - len(accepted),
+            "results": results,
+        }
+    ), (201 if len(accepted) == len(results) else 207)
+
+
+@api_bp.route("/trades", methods=["GET"])
+def search_trades():
+    limit = max(1, min(request.args.get("limit", 20, type=int), 100))
+
+    from app.schemas import ValidationError, trade_query_schema
+
+    try:
+        with phase("validate"):
+            filters = trade_query_schema.load(
+                {k: v for k, v in request.args.items() if v}
+            )
+    except ValidationError as err:
+        return (
+            jsonify(
+                {
+                    "error": "validation_error",
+                    "message": "Invalid input",
+                    "details": err.messages,
+                }
+            ),
+            400,
+        )
+
+    cursor = request.args.get("cursor")
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        return jsonify({"error": "bad_request", "message": "Invalid cursor"}), 400
+
+    with phase("store"):
+        portfolio_ids = _query_portfolio_ids(filters)
+        if portfolio_ids == []:
+            page, has_more = [], False
+        else:
+            page, has_more = get_trade_store().query(
+                ticker=filters.get("ticker"),
+                side=filters.get("side"),
+                status=filters.get("status"),
+                since=filters.get("since"),
+                until=filters.get("until"),
+                portfolio_ids=portfolio_ids,
+                after=after,
+                limit=limit,
+            )
+
+    last = page[-1] if page else None
+    return jsonify(
+        {
+            "trades": page,
+            "limit": limit,
+            "nextCursor": (
+                encode_cursor(last.initiated_at, last.trade_id)
+                if has_more and last
+                else None
+            ),
+        }
+    )
+
+
+@api_bp.route("/portfolios/<portfolio_id>/trades/<trade_id>", methods=["GET"])
+def get_trade(portfolio_id, trade_id):
+    portfolio_store = get_portfolio_store()
+    if portfolio_id not in portfolio_store:
+        return (
+            jsonify(
+                {"error": "not_found", "message": f"Portfolio {portfolio_id} not found"}
+            ),
+            404,
+        )
+
+    trade_store = get_trade_store()
+    with phase("store"):
+        book = trade_store.get(portfolio_id)
+        trade = book.get(trade_id) if book else None
+    if not trade:
+        return (
+            jsonify({"error": "not_found", "message": f"Trade {trade_id} not found"}),
+            404,
+        )
+
+    return jsonify(trade)
+
+
+@api_bp.route("/portfolios/<portfolio_id>/holdings", methods=["GET"])
+def get_holdings(portfolio_id):
+    portfolio_store = get_portfolio_store()
+    if portfolio_id not in portfolio_store:
+        return (
+            jsonify(
+                {"error": "not_found", "message": f"Portfolio {portfolio_id} not found"}
+            ),
+            404,
+        )
+
+    with phase("store"):
+        positions = get_holdings_store().ledger(portfolio_id).positions()
+    return jsonify(
+        {
+            "portfolioId": portfolio_id,
+            "holdings": positions,
+            "totalCostBasis": round(
+                sum(position.cost_basis for position in positions), 2
+            ),
+        }
+    )
+
+
+def _build_trade(portfolio_id, validated, price=None) -> Trade:
+    return Trade(
         portfolio_id=portfolio_id,
         instrument_type=validated["instrumentType"],
         ticker=validated["ticker"],
@@ -170,35 +627,127 @@ def initiate_trade(portfolio_id):
         quantity=validated["quantity"],
         order_type=validated.get("orderType", "market"),
         limit_price=validated.get("limitPrice"),
+        price_per_unit=price,
     )
 
-    trade_store = get_trade_store()
-    trade_store.setdefault(portfolio_id, []).append(trade)
 
-    # Update portfolio total value
-    portfolio = portfolio_store[portfolio_id]
+def _stamp(book, trades):
+    """Set ``initiated_at`` on trades about to be added to ``book``.
+
+    Called under the portfolio lock so books receive trades in time order.
+    The wall clock can step backwards (an NTP correction), so stamps never
+    go below the book's newest trade: a trade older than its sealed history
+    could not be stored.
+    """
+    floor = book.newest_at
+    for trade in trades:
+        now = datetime.now(timezone.utc)
+        floor = now if floor is None or now > floor else floor
+        trade.initiated_at = floor
+
+
+def _query_portfolio_ids(filters):
+    """Portfolios a trade search is restricted to, or None for all of them."""
+    portfolio_id = filters.get("portfolioId")
+    if "clientId" not in filters and "advisorId" not in filters:
+        return None if portfolio_id is None else [portfolio_id]
+    ids = get_portfolio_store().portfolio_ids(
+        client_id=filters.get("clientId"), advisor_id=filters.get("advisorId")
+    )
+    if portfolio_id is not None:
+        return [portfolio_id] if portfolio_id in ids else []
+    return ids
+
+
+def _apply_trade_value(total_value, trade):
     if trade.side == "buy":
-        portfolio.total_value += trade.total_amount
-    else:
-        portfolio.total_value = max(0, portfolio.total_value - trade.total_amount)
-    portfolio.updated_at = datetime.now(timezone.utc)
+        return total_value + trade.total_amount
+    return max(0, total_value - trade.total_amount)
+
+
+def _read_batch_body():
+    """Parse a batch body as a JSON array or NDJSON.
+
+    Returns ``(items, errors)``; NDJSON lines that are not valid JSON are kept
+    as ``None`` placeholders so result indexes match input lines.
+    """
+    if request.mimetype == "application/x-ndjson":
+        items, errors = [], {}
+        for line in request.get_data(as_text=True).splitlines():
+            if not line.strip():
+                continue
+            try:
+                items.append(json.loads(line))
+            except ValueError:
+                errors[len(items)] = {"_schema": ["Invalid JSON."]}
+                items.append(None)
+        return items, errors
 
-    return jsonify(trade.to_dict()), 201
+    json_data = request.get_json(silent=True)
+    if not isinstance(json_data, list):
+        return [], {}
+    return json_data, {}
 
 
-@api_bp.route("/portfolios/<portfolio_id>/trades/<trade_id>", methods=["GET"])
-def get_trade(portfolio_id, trade_id):
-    portfolio_store = get_portfolio_store()
-    if portfolio_id not in portfolio_store:
-        return jsonify({"error": "not_found", "message": f"Portfolio {portfolio_id} not found"}), 404
+# ---------------------------------------------------------------------------
+# Export
+# ---------------------------------------------------------------------------
 
-    trade_store = get_trade_store()
-    trades = trade_store.get(portfolio_id, [])
-    trade = next((t for t in trades if t.trade_id == trade_id), None)
-    if not trade:
-        return jsonify({"error": "not_found", "message": f"Trade {trade_id} not found"}), 404
 
-    return jsonify(trade.to_dict())
+@api_bp.route("/export/portfolios", methods=["GET"])
+def export_portfolios():
+    fmt = request.args.get("format", "ndjson")
+    if fmt not in EXPORT_FORMATS:
+        return (
+            jsonify(
+                {"error": "bad_request", "message": f"Unsupported export format {fmt}"}
+            ),
+            400,
+        )
+
+    cursor = request.args.get("cursor")
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        return jsonify({"error": "bad_request", "message": "Invalid cursor"}), 400
+
+    rows = iter_portfolio_rows(
+        get_portfolio_store(), status=request.args.get("status") or None, after=after
+    )
+    return export_response(rows, fmt, PORTFOLIO_COLUMNS, "portfolios")
+
+
+@api_bp.route("/export/trades", methods=["GET"])
+def export_trades():
+    fmt = request.args.get("format", "ndjson")
+    if fmt not in EXPORT_FORMATS:
+        return (
+            jsonify(
+                {"error": "bad_request", "message": f"Unsupported export format {fmt}"}
+            ),
+            400,
+        )
+
+    portfolio_store = get_portfolio_store()
+    portfolio_id = request.args.get("portfolioId") or None
+    if portfolio_id is not None and portfolio_id not in portfolio_store:
+        return (
+            jsonify(
+                {"error": "not_found", "message": f"Portfolio {portfolio_id} not found"}
+            ),
+            404,
+        )
+
+    cursor = request.args.get("cursor")
+    try:
+        after = decode_trade_cursor(cursor) if cursor else None
+    except ValueError:
+        return jsonify({"error": "bad_request", "message": "Invalid cursor"}), 400
+
+    rows = iter_trade_rows(
+        portfolio_store, get_trade_store(), portfolio_id=portfolio_id, after=after
+    )
+    return export_response(rows, fmt, TRADE_COLUMNS, "trades")
 
 
 # ---------------------------------------------------------------------------
@@ -211,20 +760,49 @@ def get_portfolio_performance(portfolio_id):
     portfolio_store = get_portfolio_store()
     portfolio = portfolio_store.get(portfolio_id)
     if not portfolio:
-        return jsonify({"error": "not_found", "message": f"Portfolio {portfolio_id} not found"}), 404
+        return (
+            jsonify(
+                {"error": "not_found", "message": f"Portfolio {portfolio_id} not found"}
+            ),
+            404,
+        )
 
     period = request.args.get("period", "1m")
-
-    # Generate representative performance metrics
-    return jsonify({
-        "portfolioId": portfolio_id,
-        "period": period,
-        "totalReturn": 8.42,
-        "annualizedReturn": 12.15,
-        "benchmarkReturn": 7.89,
-        "alpha": 0.53,
-        "sharpeRatio": 1.34,
-        "maxDrawdown": -3.21,
-        "volatility": 11.7,
-        "asOfDate": datetime.now(timezone.utc).strftime("%Y-%m-%d"),
-    })
+    if period not in PERIOD_DAYS:
+        return (
+            jsonify(
+                {
+                    "error": "validation_error",
+                    "message": "Invalid input",
+                    "details": {
+                        "period": [f"Must be one of: {', '.join(PERIOD_DAYS)}."]
+                    },
+                }
+            ),
+            400,
+        )
+
+    now = datetime.now(timezone.utc)
+    # A read must not create a book; a portfolio without one has no trades.
+    book = get_trade_store().get(portfolio_id)
+    version = 0 if book is None else book.version
+    computed = {}
+
+    def render():
+        with phase("compute"):
+            metrics, computed["hit"] = performance_cache.metrics(
+                portfolio, period, book, now=now
+            )
+        return {
+            "portfolioId": portfolio_id,
+            "period": period,
+            **metrics,
+            "asOfDate": now.strftime("%Y-%m-%d"),
+        }
+
+    # Metrics also drift with time, so responses are tagged with the cache TTL
+    # window they were computed in as well as the portfolio and book versions.
+    window = int(time.time() // max(performance_cache.ttl, 1))
+    resp, cached = conditional_json((portfolio.version, version, window), render)
+    resp.headers["X-Cache"] = "HIT" if cached or computed.get("hit") else "MISS"
+    return resp
@@ -0,0 +1,114 @@
+"""Marshmallow schemas for request bodies and query strings.
+
+Kept out of ``app.models`` so marshmallow stays off the cold-start import
+path: routes import this module on the first request that validates input,
+or at startup with ``STARTUP_MODE=eager`` (see ``app.DEFERRED_MODULES``).
+The create endpoints are the hot write path and load through
+``CompiledSchema``; see ``app.validation``.
+"""
+
+from __future__ import annotations
+
+from datetime import timezone
+
+from marshmallow import (
+    EXCLUDE,
+    Schema,
+    ValidationError,
+    fields,
+    post_load,
+    validate,
+    validates_schema,
+)
+
+from app.models import (
+    INSTRUMENT_TYPES,
+    OBJECTIVES,
+    ORDER_TYPES,
+    PORTFOLIO_STATUSES,
+    RISK_LEVELS,
+    TRADE_SIDES,
+    TRADE_STATUSES,
+    Portfolio,
+)
+from app.validation import CompiledSchema
+
+
+class PortfolioInitiateSchema(Schema):
+    clientId = fields.String(required=True)
+    portfolioName = fields.String(
+        required=True, validate=validate.Length(min=1, max=255)
+    )
+    investmentObjective = fields.String(
+        required=True, validate=validate.OneOf(OBJECTIVES)
+    )
+    riskTolerance = fields.String(
+        load_default="moderate", validate=validate.OneOf(RISK_LEVELS)
+    )
+    benchmarkIndex = fields.String(load_default="")
+    currency = fields.String(
+        load_default="USD", validate=validate.Regexp(r"^[A-Z]{3}$")
+    )
+
+    @post_load
+    def make_portfolio(self, data, **kwargs):
+        return Portfolio(
+            client_id=data["clientId"],
+            portfolio_name=data["portfolioName"],
+            investment_objective=data["investmentObjective"],
+            risk_tolerance=data.get("riskTolerance", "moderate"),
+            benchmark_index=data.get("benchmarkIndex", ""),
+            currency=data.get("currency", "USD"),
+        )
+
+
+class PortfolioUpdateSchema(Schema):
+    portfolioName = fields.String(
+        required=True, validate=validate.Length(min=1, max=255)
+    )
+    investmentObjective = fields.String(validate=validate.OneOf(OBJECTIVES))
+    riskTolerance = fields.String(validate=validate.OneOf(RISK_LEVELS))
+    status = fields.String(validate=validate.OneOf(PORTFOLIO_STATUSES))
+    benchmarkIndex = fields.String()
+
+
+class TradeInitiateSchema(Schema):
+    instrumentType = fields.String(
+        required=True, validate=validate.OneOf(INSTRUMENT_TYPES)
+    )
+    ticker = fields.String(required=True, validate=validate.Length(min=1, max=10))
+    side = fields.String(required=True, validate=validate.OneOf(TRADE_SIDES))
+    quantity = fields.Float(
+        required=True, validate=validate.Range(min=0, min_inclusive=False)
+    )
+    limitPrice = fields.Float(validate=validate.Range(min=0))
+    orderType = fields.String(
+        load_default="market", validate=validate.OneOf(ORDER_TYPES)
+    )
+
+
+class TradeQuerySchema(Schema):
+    """Filters for the cross-portfolio trade search; ``since`` is inclusive, ``until`` exclusive."""
+
+    class Meta:
+        unknown = EXCLUDE
+
+    ticker = fields.String(validate=validate.Length(min=1, max=10))
+    side = fields.String(validate=validate.OneOf(TRADE_SIDES))
+    status = fields.String(validate=validate.OneOf(TRADE_STATUSES))
+    portfolioId = fields.String()
+    clientId = fields.String()
+    advisorId = fields.String()
+    since = fields.AwareDateTime(default_timezone=timezone.utc)
+    until = fields.AwareDateTime(default_timezone=timezone.utc)
+
+    @validates_schema
+    def check_range(self, data, **kwargs):
+        if "since" in data and "until" in data and data["since"] >= data["until"]:
+            raise ValidationError("Must be later than since.", "until")
+
+
+portfolio_initiate_schema = CompiledSchema(PortfolioInitiateSchema())
+portfolio_update_schema = PortfolioUpdateSchema()
+trade_initiate_schema = CompiledSchema(TradeInitiateSchema())
+trade_query_schema = TradeQuerySchema()
@@ -0,0 +1,84 @@
+"""JSON provider that serializes domain models directly.
+
+Anything with a ``to_dict()`` method (``Portfolio``, ``Trade``) can be
+passed straight to ``jsonify``. Bodies are encoded with orjson when it is
+installed. The stdlib encoder is used instead when orjson is missing, in
+debug mode, when the caller passes encoder options, and for values orjson
+would write differently: non-ASCII text, which the stdlib escapes,
+integers beyond 64 bits, and floats below 1e-4 or from 1e16 up, which the
+stdlib writes as ``1e-05`` and ``1e+16`` and orjson as ``0.00001`` and
+``1e16``. Both paths therefore give the same bytes, except for NaN and
+infinities, which orjson writes as ``null`` and the stdlib as the invalid
+JSON ``NaN`` and ``Infinity``. Request parsing and response encoding are
+timed as the ``parse`` and ``serialize`` metrics phases.
+"""
+
+from __future__ import annotations
+
+import re
+
+from flask.json.provider import DefaultJSONProvider
+
+from app.metrics import phase
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised when orjson is not installed
+    orjson = None
+
+# A number orjson writes in a form the stdlib does not: an exponent without
+# its sign (``1e16``) or a small float in positional form (``0.00001``).
+# Compact output puts every number right after ``:``, ``,`` or ``[``; a
+# string that happens to match only costs a fall back to the stdlib.
+_FLOAT_FORM_DIFFERS = re.compile(rb"(?:^|[:,\[])-?(?:[0-9]+(?:\.[0-9]+)?e|0\.0000)")
+
+
+class ModelJSONProvider(DefaultJSONProvider):
+    @staticmethod
+    def default(o):
+        to_dict = getattr(o, "to_dict", None)
+        if to_dict is not None:
+            return to_dict()
+        return DefaultJSONProvider.default(o)
+
+    def dumps(self, obj, **kwargs):
+        if orjson is not None and not kwargs:
+            out = self._orjson_dumps(obj)
+            if out is not None:
+                return out.decode()
+        # Compact like responses (and orjson), so NDJSON exports match either way.
+        kwargs.setdefault("separators", (",", ":"))
+        return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        with phase("parse"):
+            if orjson is None or kwargs:
+                return super().loads(s, **kwargs)
+            return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        with phase("serialize"):
+            if orjson is None or self._app.debug:
+                return super().response(*args, **kwargs)
+            body = self._orjson_dumps(self._prepare_response_obj(args, kwargs))
+            if body is None:
+                return super().response(*args, **kwargs)
+            return self._app.response_class(body + b"\n", mimetype=self.mimetype)
+
+    def _orjson_dumps(self, obj) -> bytes | None:
+        """``obj`` encoded by orjson, or ``None`` where the stdlib encoder's output would differ.
+
+        Dates go through ``default`` as they do there. Non-ASCII text, which
+        the stdlib escapes, integers beyond 64 bits and floats that orjson
+        formats differently are left to it.
+        """
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        try:
+            out = orjson.dumps(obj, default=self.default, option=option)
+        except orjson.JSONEncodeError:
+            return None
+        if not out.isascii() or _FLOAT_FORM_DIFFERS.search(out):
+            return None
+        return out
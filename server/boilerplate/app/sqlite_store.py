@@ -0,0 +1,689 @@
+"""SQLite storage backend.
+
+Implements the same store interface as the in-memory classes in
+``app.models`` so routes work unchanged, but keeps state in a single
+database file that every gunicorn worker (or a Lambda container with an
+attached filesystem) shares and that survives restarts.
+
+- WAL journaling lets readers run alongside the single writer.
+- Each thread of each worker process opens one connection and reuses it;
+  statements are constant strings, so sqlite3's per-connection statement
+  cache keeps them prepared.
+- Listing indexes mirror the in-memory ones: ``(created_at, portfolio_id)``
+  globally and per status, client and advisor for portfolios, and
+  ``(portfolio_id, initiated_at)`` and ``(portfolio_id, status, initiated_at)``
+  for trades. Cross-portfolio trade queries use ``(ticker, initiated_at)``
+  and ``(initiated_at)``. Row counts are maintained by triggers so list
+  totals don't scan.
+- Holdings are one row per open position, keyed ``(portfolio_id, ticker)``.
+
+Timestamps are stored as integer microseconds since the epoch so they sort
+and compare correctly in SQL.
+"""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+from array import array
+from contextlib import contextmanager
+
+from app.models import (
+    PORTFOLIO_FIELDS,
+    TIMESTAMP_FIELDS,
+    TRADE_FIELDS,
+    Holdings,
+    LockStripes,
+    Portfolio,
+    Position,
+    Trade,
+    TradeColumns,
+    from_micros,
+    portfolio_from_row,
+    portfolio_row,
+    positions_from_columns,
+    to_micros,
+    trade_from_row,
+    trade_row,
+)
+
+_ITER_BATCH = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS portfolios (
+    portfolio_id TEXT PRIMARY KEY,
+    client_id TEXT NOT NULL,
+    advisor_id TEXT NOT NULL,
+    portfolio_name TEXT NOT NULL,
+    status TEXT NOT NULL,
+    investment_objective TEXT NOT NULL,
+    risk_tolerance TEXT NOT NULL,
+    total_value REAL NOT NULL,
+    currency TEXT NOT NULL,
+    benchmark_index TEXT NOT NULL,
+    created_at INTEGER NOT NULL,
+    updated_at INTEGER NOT NULL,
+    version INTEGER NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS portfolios_created ON portfolios (created_at, portfolio_id);
+CREATE INDEX IF NOT EXISTS portfolios_status_created ON portfolios (status, created_at, portfolio_id);
+CREATE INDEX IF NOT EXISTS portfolios_client_created ON portfolios (client_id, created_at, portfolio_id);
+CREATE INDEX IF NOT EXISTS portfolios_advisor_created ON portfolios (advisor_id, created_at, portfolio_id);
+
+CREATE TABLE IF NOT EXISTS trades (
+    seq INTEGER PRIMARY KEY,
+    trade_id TEXT NOT NULL UNIQUE,
+    portfolio_id TEXT NOT NULL,
+    instrument_type TEXT NOT NULL,
+    ticker TEXT NOT NULL,
+    side TEXT NOT NULL,
+    quantity REAL NOT NULL,
+    order_type TEXT NOT NULL,
+    limit_price REAL,
+    price_per_unit REAL NOT NULL,
+    status TEXT NOT NULL,
+    compliance_status TEXT NOT NULL,
+    initiated_at INTEGER NOT NULL,
+    executed_at INTEGER,
+    settled_at INTEGER
+);
+CREATE INDEX IF NOT EXISTS trades_portfolio_time ON trades (portfolio_id, initiated_at, seq);
+CREATE INDEX IF NOT EXISTS trades_portfolio_status_time ON trades (portfolio_id, status, initiated_at, seq);
+CREATE INDEX IF NOT EXISTS trades_ticker_time ON trades (ticker, initiated_at, seq);
+CREATE INDEX IF NOT EXISTS trades_time ON trades (initiated_at, seq);
+
+CREATE TABLE IF NOT EXISTS holdings (
+    portfolio_id TEXT NOT NULL,
+    ticker TEXT NOT NULL,
+    quantity REAL NOT NULL,
+    cost_basis REAL NOT NULL,
+    PRIMARY KEY (portfolio_id, ticker)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS row_counts (
+    scope TEXT NOT NULL,
+    status TEXT NOT NULL,
+    n INTEGER NOT NULL,
+    PRIMARY KEY (scope, status)
+);
+
+CREATE TRIGGER IF NOT EXISTS portfolios_count_insert AFTER INSERT ON portfolios BEGIN
+    INSERT INTO row_counts (scope, status, n) VALUES ('portfolios', '', 1), ('portfolios', NEW.status, 1)
+        ON CONFLICT (scope, status) DO UPDATE SET n = n + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS portfolios_count_delete AFTER DELETE ON portfolios BEGIN
+    UPDATE row_counts SET n = n - 1 WHERE scope = 'portfolios' AND status IN ('', OLD.status);
+END;
+CREATE TRIGGER IF NOT EXISTS portfolios_count_status AFTER UPDATE OF status ON portfolios
+WHEN OLD.status <> NEW.status BEGIN
+    UPDATE row_counts SET n = n - 1 WHERE scope = 'portfolios' AND status = OLD.status;
+    INSERT INTO row_counts (scope, status, n) VALUES ('portfolios', NEW.status, 1)
+        ON CONFLICT (scope, status) DO UPDATE SET n = n + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS trades_count_insert AFTER INSERT ON trades BEGIN
+    INSERT INTO row_counts (scope, status, n) VALUES (NEW.portfolio_id, '', 1), (NEW.portfolio_id, NEW.status, 1)
+        ON CONFLICT (scope, status) DO UPDATE SET n = n + 1;
+END;
+"""
+
+_SELECT_PORTFOLIO = f"SELECT {', '.join(PORTFOLIO_FIELDS)} FROM portfolios"
+_SELECT_TRADE = f"SELECT {', '.join(TRADE_FIELDS)} FROM trades"
+_INSERT_PORTFOLIO = (
+    f"INSERT INTO portfolios ({', '.join(PORTFOLIO_FIELDS)}) "
+    f"VALUES ({', '.join('?' for _ in PORTFOLIO_FIELDS)})"
+)
+_INSERT_TRADE = f"INSERT INTO trades ({', '.join(TRADE_FIELDS)}) VALUES ({', '.join('?' for _ in TRADE_FIELDS)})"
+
+
+def _migrate(conn: sqlite3.Connection):
+    """Add columns introduced after a database file was created."""
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(portfolios)")}
+    if "version" not in columns:
+        conn.execute(
+            "ALTER TABLE portfolios ADD COLUMN version INTEGER NOT NULL DEFAULT 1"
+        )
+
+
+class SQLiteStorage:
+    """SQLite storage backend; one connection per thread per worker process."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._schema_pid = None
+        self._locks = LockStripes()
+        self.portfolios = SQLitePortfolioRepository(self)
+        self.trades = SQLiteTradeStore(self)
+        self.holdings = SQLiteHoldingsStore(self)
+
+    def connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        # Autocommit mode: writes go through transaction() so they can nest.
+        conn = sqlite3.connect(
+            self.path, timeout=30, cached_statements=256, isolation_level=None
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        with self._schema_lock:
+            if self._schema_pid != os.getpid():
+                conn.executescript(SCHEMA)
+                _migrate(conn)
+                self._schema_pid = os.getpid()
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        self._local.depth = 0
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        """Run writes in one IMMEDIATE transaction; nested calls join the outer one."""
+        conn = self.connection()
+        if self._local.depth:
+            self._local.depth += 1
+            try:
+                yield conn
+            finally:
+                self._local.depth -= 1
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        self._local.depth = 1
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        else:
+            conn.execute("COMMIT")
+        finally:
+            self._local.depth = 0
+
+    @contextmanager
+    def locked(self, portfolio_id: str):
+        """Stripe lock within this worker plus a write transaction across workers.
+
+        BEGIN IMMEDIATE takes SQLite's write lock up front, so a portfolio
+        read inside the block cannot be changed by another process before
+        the block's writes commit.
+        """
+        with self._locks(portfolio_id), self.transaction():
+            yield
+
+    def count(self, scope: str, status=None) -> int:
+        row = (
+            self.connection()
+            .execute(
+                "SELECT n FROM row_counts WHERE scope = ? AND status = ?",
+                (scope, status or ""),
+            )
+            .fetchone()
+        )
+        return row[0] if row else 0
+
+    def reset(self):
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM trades")
+            conn.execute("DELETE FROM portfolios")
+            conn.execute("DELETE FROM holdings")
+            conn.execute("DELETE FROM row_counts")
+
+
+class SQLitePortfolioRepository:
+    def __init__(self, storage: SQLiteStorage):
+        self._storage = storage
+
+    def __len__(self):
+        return self.count()
+
+    def __contains__(self, portfolio_id):
+        row = (
+            self._storage.connection()
+            .execute(
+                "SELECT 1 FROM portfolios WHERE portfolio_id = ?",
+                (portfolio_id,),
+            )
+            .fetchone()
+        )
+        return row is not None
+
+    def get(self, portfolio_id):
+        row = (
+            self._storage.connection()
+            .execute(
+                f"{_SELECT_PORTFOLIO} WHERE portfolio_id = ?",
+                (portfolio_id,),
+            )
+            .fetchone()
+        )
+        return portfolio_from_row(row) if row else None
+
+    def values(self):
+        return self.iter_ordered()
+
+    def add(self, portfolio: Portfolio):
+        with self._storage.transaction() as conn:
+            if portfolio.portfolio_id in self:
+                conn.execute(
+                    "DELETE FROM portfolios WHERE portfolio_id = ?",
+                    (portfolio.portfolio_id,),
+                )
+            conn.execute(_INSERT_PORTFOLIO, portfolio_row(portfolio))
+
+    def update(self, portfolio: Portfolio, **changes):
+        """Apply attribute changes to ``portfolio`` and persist them, bumping its version."""
+        for name in changes:
+            if name not in PORTFOLIO_FIELDS or name in ("portfolio_id", "version"):
+                raise ValueError(f"Cannot update portfolio field {name!r}")
+        for name, value in changes.items():
+            setattr(portfolio, name, value)
+        assignments = ", ".join(f"{name} = ?" for name in changes)
+        params = [
+            to_micros(v) if k in TIMESTAMP_FIELDS else v for k, v in changes.items()
+        ]
+        with self._storage.transaction() as conn:
+            conn.execute(
+                f"UPDATE portfolios SET {assignments}, version = version + 1 WHERE portfolio_id = ?",
+                (*params, portfolio.portfolio_id),
+            )
+            row = conn.execute(
+                "SELECT version FROM portfolios WHERE portfolio_id = ?",
+                (portfolio.portfolio_id,),
+            ).fetchone()
+        if row:
+            portfolio.version = row[0]
+
+    def count(self, status=None, client_id=None, advisor_id=None) -> int:
+        if client_id is None and advisor_id is None:
+            return self._storage.count("portfolios", status)
+        where, params = self._filter_clause(status, client_id, advisor_id)
+        return (
+            self._storage.connection()
+            .execute(f"SELECT COUNT(*) FROM portfolios{where}", params)
+            .fetchone()[0]
+        )
+
+    def portfolio_ids(self, client_id=None, advisor_id=None) -> list[str]:
+        where, params = self._filter_clause(None, client_id, advisor_id)
+        rows = self._storage.connection().execute(
+            f"SELECT portfolio_id FROM portfolios{where} ORDER BY created_at, portfolio_id",
+            params,
+        )
+        return [row[0] for row in rows]
+
+    def page(
+        self, status=None, offset=0, limit=20, client_id=None, advisor_id=None
+    ) -> list[Portfolio]:
+        where, params = self._filter_clause(status, client_id, advisor_id)
+        rows = (
+            self._storage.connection()
+            .execute(
+                f"{_SELECT_PORTFOLIO}{where} ORDER BY created_at DESC, portfolio_id DESC LIMIT ? OFFSET ?",
+                (*params, limit, offset),
+            )
+            .fetchall()
+        )
+        return [portfolio_from_row(row) for row in rows]
+
+    def page_after(
+        self, after, status=None, limit=20, client_id=None, advisor_id=None
+    ) -> tuple[list[Portfolio], bool]:
+        where, params = self._filter_clause(
+            status, client_id, advisor_id, "(created_at, portfolio_id) < (?, ?)"
+        )
+        rows = (
+            self._storage.connection()
+            .execute(
+                f"{_SELECT_PORTFOLIO}{where} ORDER BY created_at DESC, portfolio_id DESC LIMIT ?",
+                (*params, to_micros(after[0]), after[1], limit + 1),
+            )
+            .fetchall()
+        )
+        return [portfolio_from_row(row) for row in rows[:limit]], len(rows) > limit
+
+    def iter_ordered(self, status=None, after=None, inclusive=False):
+        op = ">=" if inclusive else ">"
+        key = (to_micros(after[0]), after[1]) if after else None
+        while True:
+            if key is None:
+                where, params = self._filter_clause(status)
+            else:
+                where, params = self._filter_clause(
+                    status, extra=f"(created_at, portfolio_id) {op} (?, ?)"
+                )
+                params = (*params, *key)
+            rows = (
+                self._storage.connection()
+                .execute(
+                    f"{_SELECT_PORTFOLIO}{where} ORDER BY created_at, portfolio_id LIMIT ?",
+                    (*params, _ITER_BATCH),
+                )
+                .fetchall()
+            )
+            for row in rows:
+                yield portfolio_from_row(row)
+            if len(rows) < _ITER_BATCH:
+                return
+            key, op = (rows[-1][PORTFOLIO_FIELDS.index("created_at")], rows[-1][0]), ">"
+
+    def clear(self):
+        self._storage.reset()
+
+    @staticmethod
+    def _filter_clause(status=None, client_id=None, advisor_id=None, extra=None):
+        clauses, params = [], ()
+        for column, value in (
+            ("status", status),
+            ("client_id", client_id),
+            ("advisor_id", advisor_id),
+        ):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params = (*params, value)
+        if extra:
+            clauses.append(extra)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+class SQLiteTradeBook:
+    """Trades for one portfolio, ordered by ``(initiated_at, seq)``."""
+
+    def __init__(self, storage: SQLiteStorage, portfolio_id: str):
+        self._storage = storage
+        self.portfolio_id = portfolio_id
+
+    def __len__(self):
+        return self.count()
+
+    @property
+    def version(self) -> int:
+        return self.count()
+
+    @property
+    def newest_at(self):
+        row = (
+            self._storage.connection()
+            .execute(
+                "SELECT MAX(initiated_at) FROM trades WHERE portfolio_id = ?",
+                (self.portfolio_id,),
+            )
+            .fetchone()
+        )
+        return from_micros(row[0])
+
+    def __iter__(self):
+        return self.iter_ordered()
+
+    def append(self, trade: Trade):
+        self.extend([trade])
+
+    def extend(self, trades):
+        with self._storage.transaction() as conn:
+            conn.executemany(_INSERT_TRADE, [trade_row(t) for t in trades])
+
+    def get(self, trade_id):
+        row = (
+            self._storage.connection()
+            .execute(
+                f"{_SELECT_TRADE} WHERE trade_id = ? AND portfolio_id = ?",
+                (trade_id, self.portfolio_id),
+            )
+            .fetchone()
+        )
+        return trade_from_row(row) if row else None
+
+    def count(self, status=None) -> int:
+        return self._storage.count(self.portfolio_id, status)
+
+    def page(self, status=None, offset=0, limit=20) -> list[Trade]:
+        where, params = self._where(status)
+        rows = (
+            self._storage.connection()
+            .execute(
+                f"{_SELECT_TRADE}{where} ORDER BY initiated_at DESC, seq DESC LIMIT ? OFFSET ?",
+                (*params, limit, offset),
+            )
+            .fetchall()
+        )
+        return [trade_from_row(row) for row in rows]
+
+    def page_after(self, after, status=None, limit=20) -> tuple[list[Trade], bool]:
+        where, params = self._where(status, "(initiated_at, seq) < (?, ?)")
+        rows = (
+            self._storage.connection()
+            .execute(
+                f"{_SELECT_TRADE}{where} ORDER BY initiated_at DESC, seq DESC LIMIT ?",
+                (*params, *self._key_params(after), limit + 1),
+            )
+            .fetchall()
+        )
+        return [trade_from_row(row) for row in rows[:limit]], len(rows) > limit
+
+    def columns(self) -> TradeColumns:
+        columns = TradeColumns(array("q"), array("l"), array("d"), array("d"), [])
+        codes = {}
+        rows = self._storage.connection().execute(
+            "SELECT initiated_at, ticker, side, quantity, price_per_unit FROM trades "
+            "WHERE portfolio_id = ? ORDER BY initiated_at, seq",
+            (self.portfolio_id,),
+        )
+        for initiated_at, ticker, side, quantity, price in rows:
+            code = codes.get(ticker)
+            if code is None:
+                code = codes[ticker] = len(columns.tickers)
+                columns.tickers.append(ticker)
+            columns.timestamps.append(initiated_at)
+            columns.ticker_codes.append(code)
+            columns.quantities.append(quantity if side == "buy" else -quantity)
+            columns.prices.append(price)
+        return columns
+
+    def iter_ordered(self, after=None):
+        conn = self._storage.connection()
+        key = self._key_params(after, unknown_seq=2**63 - 1) if after else None
+        while True:
+            if key is None:
+                where, params = self._where(None)
+            else:
+                where, params = self._where(None, "(initiated_at, seq) > (?, ?)")
+                params = (*params, *key)
+            rows = conn.execute(
+                f"SELECT {', '.join(TRADE_FIELDS)}, seq FROM trades{where} ORDER BY initiated_at, seq LIMIT ?",
+                (*params, _ITER_BATCH),
+            ).fetchall()
+            for row in rows:
+                yield trade_from_row(row[:-1])
+            if len(rows) < _ITER_BATCH:
+                return
+            key = (rows[-1][11], rows[-1][-1])
+
+    def _key_params(self, after, unknown_seq=0):
+        return _key_params(self._storage.connection(), after, unknown_seq)
+
+    def _where(self, status, extra=None):
+        clauses, params = ["portfolio_id = ?"], (self.portfolio_id,)
+        if status is not None:
+            clauses.append("status = ?")
+            params = (*params, status)
+        if extra:
+            clauses.append(extra)
+        return " WHERE " + " AND ".join(clauses), params
+
+
+def _key_params(conn, after, unknown_seq=0):
+    """Resolve a ``(initiated_at, trade_id)`` key to ``(initiated_at, seq)``.
+
+    An unknown trade id falls back to its timestamp alone, with
+    ``unknown_seq`` deciding which side of that timestamp to land on.
+    """
+    row = conn.execute(
+        "SELECT initiated_at, seq FROM trades WHERE trade_id = ?", (after[1],)
+    ).fetchone()
+    return row if row else (to_micros(after[0]), unknown_seq)
+
+
+class SQLiteTradeStore:
+    def __init__(self, storage: SQLiteStorage):
+        self._storage = storage
+
+    def __contains__(self, portfolio_id):
+        return self._storage.count(portfolio_id) > 0
+
+    def get(self, portfolio_id):
+        return (
+            SQLiteTradeBook(self._storage, portfolio_id)
+            if portfolio_id in self
+            else None
+        )
+
+    def book(self, portfolio_id) -> SQLiteTradeBook:
+        return SQLiteTradeBook(self._storage, portfolio_id)
+
+    def query(
+        self,
+        ticker=None,
+        side=None,
+        status=None,
+        since=None,
+        until=None,
+        portfolio_ids=None,
+        after=None,
+        limit=20,
+    ) -> tuple[list[Trade], bool]:
+        """Trades across portfolios matching every given filter, newest-first; see ``TradeStore.query``."""
+        conn = self._storage.connection()
+        clauses, params = [], []
+        for column, value in (("ticker", ticker), ("side", side), ("status", status)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if since is not None:
+            clauses.append("initiated_at >= ?")
+            params.append(to_micros(since))
+        if until is not None:
+            clauses.append("initiated_at < ?")
+            params.append(to_micros(until))
+        if portfolio_ids is not None:
+            clauses.append(f"portfolio_id IN ({', '.join('?' for _ in portfolio_ids)})")
+            params.extend(portfolio_ids)
+        if after is not None:
+            clauses.append("(initiated_at, seq) < (?, ?)")
+            params.extend(_key_params(conn, after))
+        where = (" WHERE " + " AND ".join(clauses)) if clauses else ""
+        rows = conn.execute(
+            f"{_SELECT_TRADE}{where} ORDER BY initiated_at DESC, seq DESC LIMIT ?",
+            (*params, limit + 1),
+        ).fetchall()
+        return [trade_from_row(row) for row in rows[:limit]], len(rows) > limit
+
+    def clear(self):
+        self._storage.reset()
+
+
+class SQLiteHoldings:
+    """Open positions for one portfolio, one row per ticker."""
+
+    def __init__(self, storage: SQLiteStorage, portfolio_id: str):
+        self._storage = storage
+        self.portfolio_id = portfolio_id
+
+    def __len__(self):
+        row = (
+            self._storage.connection()
+            .execute(
+                "SELECT COUNT(*) FROM holdings WHERE portfolio_id = ?",
+                (self.portfolio_id,),
+            )
+            .fetchone()
+        )
+        return row[0]
+
+    def get(self, ticker):
+        row = (
+            self._storage.connection()
+            .execute(
+                "SELECT ticker, quantity, cost_basis FROM holdings WHERE portfolio_id = ? AND ticker = ?",
+                (self.portfolio_id, ticker),
+            )
+            .fetchone()
+        )
+        return Position(*row) if row else None
+
+    def positions(self) -> list[Position]:
+        rows = (
+            self._storage.connection()
+            .execute(
+                "SELECT ticker, quantity, cost_basis FROM holdings WHERE portfolio_id = ? ORDER BY ticker",
+                (self.portfolio_id,),
+            )
+            .fetchall()
+        )
+        return [Position(*row) for row in rows]
+
+    def apply(self, trade: Trade):
+        self.extend([trade])
+
+    def extend(self, trades):
+        with self._storage.transaction():
+            touched = {}
+            for trade in trades:
+                position = touched.get(trade.ticker)
+                if position is None:
+                    position = touched[trade.ticker] = self.get(
+                        trade.ticker
+                    ) or Position(trade.ticker)
+                position.apply(trade)
+            self._write(touched.values())
+
+    def rebuild(self, trades):
+        ledger = Holdings()
+        ledger.extend(trades)
+        self._replace(ledger.positions())
+
+    def rebuild_columns(self, columns: TradeColumns):
+        self._replace(positions_from_columns(columns))
+
+    def _replace(self, positions):
+        with self._storage.transaction() as conn:
+            conn.execute(
+                "DELETE FROM holdings WHERE portfolio_id = ?", (self.portfolio_id,)
+            )
+            self._write(positions)
+
+    def _write(self, positions):
+        conn = self._storage.connection()
+        open_positions = []
+        for position in positions:
+            if position.quantity > 0:
+                open_positions.append(
+                    (
+                        self.portfolio_id,
+                        position.ticker,
+                        position.quantity,
+                        position.cost_basis,
+                    )
+                )
+            else:
+                conn.execute(
+                    "DELETE FROM holdings WHERE portfolio_id = ? AND ticker = ?",
+                    (self.portfolio_id, position.ticker),
+                )
+        conn.executemany(
+            "INSERT INTO holdings (portfolio_id, ticker, quantity, cost_basis) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (portfolio_id, ticker) DO UPDATE SET "
+            "quantity = excluded.quantity, cost_basis = excluded.cost_basis",
+            open_positions,
+        )
+
+
+class SQLiteHoldingsStore:
+    def __init__(self, storage: SQLiteStorage):
+        self._storage = storage
+
+    def ledger(self, portfolio_id) -> SQLiteHoldings:
+        return SQLiteHoldings(self._storage, portfolio_id)
+
+    def clear(self):
+        self._storage.reset()
@@ -0,0 +1,188 @@
+"""Compiled fast path for loading request bodies with marshmallow schemas.
+
+``CompiledSchema(schema)`` reads a schema's declared fields and validators
+once and offers the same ``load(data, many=False)``. Input that is already
+valid and needs no coercion is checked with exact type tests, frozenset
+membership for ``OneOf``, the validator's precompiled pattern for
+``Regexp`` and plain comparisons for ``Length`` and ``Range``. The result
+then goes through the schema's post_load hooks, as marshmallow would
+run them.
+
+Anything else goes to the schema itself: invalid input, and input
+marshmallow would coerce, such as a number sent as a string. So error
+messages, ``valid_data`` and every conversion are marshmallow's own, and
+the error contract in ``openapi.yaml`` cannot drift. Only valid requests
+take the fast path; they are the common case, and a rejected one costs
+only the failed fast check on top of the load it already paid for.
+
+Schemas using a field or validator the compiler does not know raise
+``TypeError`` at construction rather than being loaded differently.
+"""
+
+from __future__ import annotations
+
+import math
+
+from marshmallow import (
+    EXCLUDE,
+    RAISE,
+    Schema,
+    ValidationError,
+    fields,
+    missing,
+    validate,
+)
+
+# Returned by a compiled check for input it leaves to marshmallow.
+_DEFER = object()
+
+
+def _string(value):
+    return value if type(value) is str else _DEFER
+
+
+def _float(value):
+    # bool is a subclass of int that marshmallow rejects; strings it would parse are deferred.
+    if type(value) is float:
+        return value if math.isfinite(value) else _DEFER
+    if type(value) is int:
+        try:
+            value = float(value)
+        except OverflowError:
+            return _DEFER
+        return value if math.isfinite(value) else _DEFER
+    return _DEFER
+
+
+_CONVERTERS = {fields.String: _string, fields.Float: _float}
+
+
+def _check(validator):
+    """A predicate equivalent to ``validator`` on already converted values."""
+    if type(validator) is validate.OneOf:
+        choices = frozenset(validator.choices)
+        return choices.__contains__
+    if type(validator) is validate.Regexp:
+        match = validator.regex.match
+        return lambda value: match(value) is not None
+    if type(validator) is validate.Length:
+        low, high, equal = validator.min, validator.max, validator.equal
+        if equal is not None:
+            return lambda value: len(value) == equal
+        return lambda value: (low is None or len(value) >= low) and (
+            high is None or len(value) <= high
+        )
+    if type(validator) is validate.Range:
+        low, high = validator.min, validator.max
+        low_ok = (
+            (lambda value: True)
+            if low is None
+            else (
+                (lambda value: value >= low)
+                if validator.min_inclusive
+                else (lambda value: value > low)
+            )
+        )
+        high_ok = (
+            (lambda value: True)
+            if high is None
+            else (
+                (lambda value: value <= high)
+                if validator.max_inclusive
+                else (lambda value: value < high)
+            )
+        )
+        return lambda value: low_ok(value) and high_ok(value)
+    raise TypeError(f"cannot compile validator {validator!r}")
+
+
+def _compile_field(name, field):
+    convert = _CONVERTERS.get(type(field))
+    if convert is None or field.allow_none:
+        raise TypeError(f"cannot compile field {name!r} ({type(field).__name__})")
+    checks = tuple(_check(validator) for validator in field.validators)
+
+    def load(value):
+        value = convert(value)
+        if value is _DEFER:
+            return _DEFER
+        for check in checks:
+            if not check(value):
+                return _DEFER
+        return value
+
+    default = field.load_default
+    return (
+        field.data_key or name,
+        field.attribute or name,
+        field.required,
+        default,
+        load,
+    )
+
+
+class CompiledSchema:
+    """``schema.load`` with a compiled path for valid input; see the module docstring."""
+
+    def __init__(self, schema: Schema):
+        if schema.unknown not in (RAISE, EXCLUDE):
+            raise TypeError(f"cannot compile unknown={schema.unknown!r}")
+        self.schema = schema
+        self._fields = tuple(
+            _compile_field(name, field) for name, field in schema.load_fields.items()
+        )
+        self._keys = frozenset(key for key, *_ in self._fields)
+        self._reject_unknown = schema.unknown == RAISE
+        hooks = []
+        for tag, processors in schema._hooks.items():
+            if tag in ("pre_dump", "post_dump"):
+                continue
+            if tag != "post_load" and processors:
+                raise TypeError(f"cannot compile {tag} hooks")
+            for attr, pass_many, options in processors:
+                if pass_many or options.get("pass_original"):
+                    raise TypeError(f"cannot compile post_load hook {attr!r}")
+                hooks.append(getattr(schema, attr))
+        self._post_load = tuple(hooks)
+
+    def load(self, data, many=False):
+        if not many:
+            result = self._load(data)
+            return self.schema.load(data) if result is _DEFER else result
+        if not isinstance(data, list):
+            return self.schema.load(data, many=True)
+        results, errors = [], {}
+        for index, item in enumerate(data):
+            result = self._load(item, many=True)
+            if result is _DEFER:
+                try:
+                    result = self.schema.load(item)
+                except ValidationError as err:
+                    errors[index] = err.messages
+                    result = err.valid_data
+            results.append(result)
+        if errors:
+            raise ValidationError(errors, data=data, valid_data=results)
+        return results
+
+    def _load(self, data, many=False):
+        if type(data) is not dict:
+            return _DEFER
+        if self._reject_unknown and not self._keys.issuperset(data):
+            return _DEFER
+        out = {}
+        for key, attr, required, default, load in self._fields:
+            value = data.get(key, missing)
+            if value is missing:
+                if required:
+                    return _DEFER
+                if default is not missing:
+                    out[attr] = default() if callable(default) else default
+                continue
+            value = load(value)
+            if value is _DEFER:
+                return _DEFER
+            out[attr] = value
+        for hook in self._post_load:
+            out = hook(out, many=many, partial=None)
+        return out
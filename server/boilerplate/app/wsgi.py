@@ -3,8 +3,16 @@ from app import create_app
 
 app = create_app()
 
-# Lambda handler for API Gateway HTTP API
-handler = make_lambda_handler(app)
+# Lambda handler for API Gateway HTTP API. NDJSON exports are text, so keep
+# them out of the base64 binary path.
+handler = make_lambda_handler(
+    app,
+    non_binary_content_type_prefixes=(
+        "text/",
+        "application/json",
+        "application/x-ndjson",
+    ),
+)
 
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5000)
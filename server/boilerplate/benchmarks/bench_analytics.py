@@ -0,0 +1,92 @@
+"""Time /performance metric computation over a large trade history.
+
+Seeds a TradeBook with random-walk prices over a year and times
+``compute_performance`` for every period, then the cached path: a warm
+``PerformanceCache`` hit and the incremental inception update applied per
+new trade.
+
+Usage:
+    python -m benchmarks.bench_analytics [--trades 100000] [--tickers 50]
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+from datetime import datetime, timedelta, timezone
+
+from app.analytics import PERIOD_DAYS, compute_performance
+from app.models import Portfolio, Trade, TradeBook
+from app.performance_cache import PerformanceCache
+from benchmarks.common import report, timed
+
+
+def seed_book(trades: int, tickers: int) -> TradeBook:
+    rng = random.Random(42)
+    now = datetime.now(timezone.utc)
+    start = now - timedelta(days=365)
+    step = timedelta(days=365) / trades
+    prices = {f"T{i:03d}": 100.0 for i in range(tickers)}
+    book = TradeBook()
+    for i in range(trades):
+        ticker = f"T{rng.randrange(tickers):03d}"
+        prices[ticker] = round(prices[ticker] * (1 + rng.gauss(0.0003, 0.01)), 2)
+        book.append(Trade(
+            portfolio_id="bench", instrument_type="equity", ticker=ticker,
+            side="buy" if rng.random() < 0.6 else "sell", quantity=rng.randint(1, 20),
+            price_per_unit=prices[ticker], initiated_at=start + step * i,
+        ))
+    return book
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--trades", type=int, default=100_000)
+    parser.add_argument("--tickers", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    book = seed_book(args.trades, args.tickers)
+    columns = book.columns()
+    results = {}
+    for period in PERIOD_DAYS:
+        compute_performance(columns, period)
+        with timed() as t:
+            for _ in range(args.rounds):
+                metrics = compute_performance(columns, period)
+        results[period] = {"ms": round(t.elapsed / args.rounds * 1000, 2), "metrics": metrics}
+    cache = bench_cache(book, args.rounds)
+    report({"trades": args.trades, "tickers": args.tickers, "periods": results, "cache": cache})
+
+
+def bench_cache(book: TradeBook, rounds: int):
+    cache = PerformanceCache()
+    portfolio = Portfolio(
+        client_id="bench", portfolio_name="bench", investment_objective="growth", portfolio_id="bench",
+    )
+    with timed() as cold:
+        cache.metrics(portfolio, "inception", book)
+    with timed() as warm:
+        for _ in range(rounds):
+            cache.metrics(portfolio, "inception", book)
+
+    last = list(book)[-1]
+    with timed() as update:
+        for _ in range(rounds):
+            trade = Trade(
+                portfolio_id="bench", instrument_type="equity", ticker=last.ticker, side="buy", quantity=1,
+                price_per_unit=last.price_per_unit, initiated_at=last.initiated_at,
+            )
+            book.append(trade)
+            cache.record_trades("bench", [trade], len(book))
+            cache.metrics(portfolio, "inception", book)
+    return {
+        "coldMs": round(cold.elapsed * 1000, 2),
+        "hitMs": round(warm.elapsed / rounds * 1000, 3),
+        "tradeThenReadMs": round(update.elapsed / rounds * 1000, 3),
+        "stats": cache.stats(),
+    }
+
+
+if __name__ == "__main__":
+    main()
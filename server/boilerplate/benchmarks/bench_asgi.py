@@ -0,0 +1,113 @@
+"""Compare concurrency scaling of gunicorn sync, gthread and uvicorn workers.
+
+All three configurations run under gunicorn with the same routes, the same
+number of worker processes and the same SQLite file; only the worker class
+differs (``sync``, ``gthread`` with ``ASGI_THREADS`` threads, and
+``uvicorn_worker.UvicornWorker`` serving ``app.asgi``). Quotes come from a simulated remote feed that
+sleeps for ``--quote-latency-ms`` on every lookup, so creating a trade
+blocks on I/O the way a live price source would. ``getPortfolio`` does no
+remote I/O and serves as the CPU-bound baseline.
+
+For each server, operation, and client concurrency level, the report gives
+ops/sec and p50/p99 latency. A gunicorn sync worker handles one request at
+a time, so its trade throughput stays near ``workers / latency`` however
+many clients wait. gthread and uvicorn both run up to ``ASGI_THREADS``
+handlers per worker.
+
+Requires ``requirements-asgi.txt``.
+
+Usage:
+    python -m benchmarks.bench_asgi [--workers 2] [--concurrency 1 8 32 64] [--requests 400]
+        [--quote-latency-ms 20]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import time
+
+from app import create_app
+from app.pricing import QuoteTable, set_price_provider
+from benchmarks.bench_load import drive, gunicorn_server, seed
+from benchmarks.common import report, trade_payload
+
+
+class RemoteQuotes(QuoteTable):
+    """Quote table that waits like a network round trip on every lookup."""
+
+    def __init__(self, latency):
+        super().__init__()
+        self.latency = latency
+
+    def get_prices(self, tickers):
+        time.sleep(self.latency)
+        return super().get_prices(tickers)
+
+
+def _app_with_remote_quotes():
+    app = create_app()
+    set_price_provider(RemoteQuotes(float(os.environ.get("BENCH_QUOTE_LATENCY_MS", 20)) / 1000))
+    return app
+
+
+def make_wsgi():
+    """gunicorn app factory: ``benchmarks.bench_asgi:make_wsgi()``."""
+    return _app_with_remote_quotes()
+
+
+def make_asgi():
+    """gunicorn app factory for uvicorn workers: ``benchmarks.bench_asgi:make_asgi()``."""
+    from app.asgi import asgi_app
+
+    return asgi_app(_app_with_remote_quotes())
+
+
+def run_server(driver, args):
+    portfolios = seed(driver, 20, 50)
+    ops = {
+        "initiateTrade": lambda rng: (
+            "POST", f"/api/v1/portfolios/{rng.choice(portfolios)[0]}/trades", trade_payload(rng.randrange(1000)),
+        ),
+        "getPortfolio": lambda rng: ("GET", f"/api/v1/portfolios/{rng.choice(portfolios)[0]}", None),
+    }
+    results = {}
+    for name, factory in ops.items():
+        results[name] = {}
+        for concurrency in args.concurrency:
+            requests = max(args.requests, concurrency * 4)
+            stats = drive(driver, factory, requests, concurrency)
+            results[name][f"c{concurrency}"] = {
+                key: stats[key] for key in ("opsPerSec", "p50Ms", "p99Ms", "errors")
+            }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 64])
+    parser.add_argument("--requests", type=int, default=400, help="requests per operation and concurrency level")
+    parser.add_argument("--quote-latency-ms", type=float, default=20)
+    args = parser.parse_args()
+
+    env = {"BENCH_QUOTE_LATENCY_MS": str(args.quote_latency_ms)}
+    threads = int(os.environ.get("ASGI_THREADS", 32))
+    results = {
+        "config": {
+            "workers": args.workers, "requests": args.requests, "quoteLatencyMs": args.quote_latency_ms,
+            "threads": threads,
+        },
+    }
+    with gunicorn_server(args.workers, "benchmarks.bench_asgi:make_wsgi()", env) as driver:
+        results["gunicornSync"] = run_server(driver, args)
+    with gunicorn_server(args.workers, "benchmarks.bench_asgi:make_wsgi()", env, "gthread", threads) as driver:
+        results["gunicornGthread"] = run_server(driver, args)
+    with gunicorn_server(args.workers, "benchmarks.bench_asgi:make_asgi()", env, "uvicorn_worker.UvicornWorker") \
+            as driver:
+        results["uvicornAsgi"] = run_server(driver, args)
+    report(results)
+
+
+if __name__ == "__main__":
+    main()
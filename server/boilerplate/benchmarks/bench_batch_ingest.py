@@ -0,0 +1,50 @@
+"""Compare single-trade POSTs with the batch ingestion endpoint.
+
+Usage:
+    python -m benchmarks.bench_batch_ingest [--trades 5000] [--batch-size 1000]
+"""
+
+from __future__ import annotations
+
+import argparse
+
+from benchmarks.common import create_portfolio, fresh_client, report, timed, trade_payload
+
+
+def run(trades: int, batch_size: int) -> dict:
+    payloads = [trade_payload(i) for i in range(trades)]
+
+    client = fresh_client()
+    portfolio_id = create_portfolio(client)
+    with timed() as single:
+        for payload in payloads:
+            client.post(f"/api/v1/portfolios/{portfolio_id}/trades", json=payload)
+
+    client = fresh_client()
+    portfolio_id = create_portfolio(client)
+    with timed() as batch:
+        for start in range(0, trades, batch_size):
+            client.post(
+                f"/api/v1/portfolios/{portfolio_id}/trades/batch",
+                json=payloads[start:start + batch_size],
+            )
+
+    return {
+        "trades": trades,
+        "batchSize": batch_size,
+        "singleTradesPerSec": round(trades / single.elapsed),
+        "batchTradesPerSec": round(trades / batch.elapsed),
+        "speedup": round(single.elapsed / batch.elapsed, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--trades", type=int, default=5000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+    report(run(args.trades, args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
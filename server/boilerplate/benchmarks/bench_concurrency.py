@@ -0,0 +1,61 @@
+"""Trade-ingestion throughput as the number of request threads grows.
+
+Each thread posts trades through its own Flask test client, either all to
+one portfolio (contended stripe) or each to its own portfolio (independent
+stripes). Set STORAGE_BACKEND/SQLITE_PATH to benchmark another backend.
+
+Usage:
+    python -m benchmarks.bench_concurrency [--trades-per-thread 500] [--threads 1 2 4 8]
+"""
+
+from __future__ import annotations
+
+import argparse
+import threading
+
+from benchmarks.common import create_portfolio, fresh_client, report, timed, trade_payload
+
+
+def run(threads: int, trades_per_thread: int, shared: bool) -> float:
+    client = fresh_client()
+    app = client.application
+    shared_id = create_portfolio(client)
+    portfolio_ids = [shared_id if shared else create_portfolio(client, f"P{n}") for n in range(threads)]
+    barrier = threading.Barrier(threads + 1)
+
+    def worker(portfolio_id):
+        thread_client = app.test_client()
+        barrier.wait()
+        for i in range(trades_per_thread):
+            thread_client.post(f"/api/v1/portfolios/{portfolio_id}/trades", json=trade_payload(i))
+
+    workers = [threading.Thread(target=worker, args=(pid,)) for pid in portfolio_ids]
+    for w in workers:
+        w.start()
+    with timed() as t:
+        barrier.wait()
+        for w in workers:
+            w.join()
+    return round(threads * trades_per_thread / t.elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--trades-per-thread", type=int, default=500)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+    report({
+        "tradesPerThread": args.trades_per_thread,
+        "results": [
+            {
+                "threads": n,
+                "sharedPortfolioTradesPerSec": run(n, args.trades_per_thread, shared=True),
+                "separatePortfoliosTradesPerSec": run(n, args.trades_per_thread, shared=False),
+            }
+            for n in args.threads
+        ],
+    })
+
+
+if __name__ == "__main__":
+    main()
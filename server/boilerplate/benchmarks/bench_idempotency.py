@@ -0,0 +1,63 @@
+"""Measure what client retries of POST /trades cost with and without Idempotency-Key.
+
+Creates ``--trades`` trades in one portfolio, each sent once and then
+retried ``--retries`` times, as a client does after a timeout it cannot
+interpret. Three client strategies:
+
+- ``blind``: retry the POST as is, creating duplicates.
+- ``listFirst``: before each retry, list the portfolio's trades (the
+  first ``--page`` of them) to check whether the trade landed; the
+  workaround clients use today.
+- ``idempotencyKey``: retry the POST with the same ``Idempotency-Key``,
+  which replays the stored response.
+
+``cpuMsPerTrade`` is server-side CPU (``time.process_time``) per logical
+trade including its retries, and ``tradesStored`` shows the duplicates.
+
+Usage:
+    python -m benchmarks.bench_idempotency [--trades 2000] [--retries 2] [--page 100]
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+import uuid
+
+from benchmarks.common import create_portfolio, fresh_client, report, trade_payload
+
+
+def run(strategy, trades, retries, page):
+    client = fresh_client()
+    portfolio_id = create_portfolio(client)
+    url = f"/api/v1/portfolios/{portfolio_id}/trades"
+    start = time.process_time()
+    for i in range(trades):
+        payload = trade_payload(i)
+        headers = {"Idempotency-Key": str(uuid.uuid4())} if strategy == "idempotencyKey" else None
+        client.post(url, json=payload, headers=headers)
+        for _ in range(retries):
+            if strategy == "listFirst":
+                client.get(f"{url}?limit={page}")
+                continue
+            client.post(url, json=payload, headers=headers)
+    elapsed = time.process_time() - start
+    stored = client.get(f"{url}?limit=1").get_json()["total"]
+    return {"cpuMsPerTrade": round(elapsed / trades * 1000, 3), "tradesStored": stored}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--trades", type=int, default=2000)
+    parser.add_argument("--retries", type=int, default=2, help="retries per trade")
+    parser.add_argument("--page", type=int, default=100, help="trades listed per check in listFirst")
+    args = parser.parse_args()
+
+    report({
+        strategy: run(strategy, args.trades, args.retries, args.page)
+        for strategy in ("blind", "listFirst", "idempotencyKey")
+    })
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""Measure journal replay throughput, snapshot cost and group-commit batching.
+
+Writes a journal of ``--trades`` trades over ``--portfolios`` portfolios,
+laid out as the API writes it: one line per trade, holding the trade and
+the portfolio total it moved. Each trade is therefore two records. It then
+times three things:
+
+- ``journalReplay``: startup replaying the whole journal.
+- ``snapshot``: writing a snapshot of that state.
+- ``snapshotReplay``: startup from the snapshot plus a ``--tail``-trade
+  journal tail. This is the restart cost once snapshots are in place, and
+  it depends on the amount of data rather than the number of updates.
+
+``groupCommit`` appends with fsync on from 1, 8 and 32 threads and reports
+appends/sec and appends per fsync.
+
+Usage:
+    python -m benchmarks.bench_journal [--trades 1000000] [--portfolios 1000] [--tail 10000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import os
+import resource
+import shutil
+import tempfile
+import threading
+import uuid
+
+from app.journal import Journal, JournalStorage, _dumps
+from benchmarks.common import report, timed
+
+_START_US = 1_700_000_000_000_000
+
+
+def write_journal(directory, generation, portfolios, trades, start=0):
+    """Write ``trades`` trade lines (trade plus portfolio total) as one journal segment."""
+    portfolio_rows = [
+        [str(uuid.UUID(int=n + 1)), f"client-{n}", str(uuid.UUID(int=10**9 + n)), f"Portfolio {n}", "active",
+         "growth", "moderate", 0.0, "USD", "SPX", _START_US, _START_US, 1]
+        for n in range(portfolios)
+    ]
+    path = os.path.join(directory, f"journal-{generation:08d}.ndjson")
+    with open(path, "ab") as f:
+        if start == 0:
+            f.write(_dumps([("p", row) for row in portfolio_rows]) + b"\n")
+        for i in range(start, start + trades):
+            row = portfolio_rows[i % portfolios]
+            at = _START_US + i * 1000
+            price = 100.0 + i % 50
+            trade = (str(uuid.UUID(int=2**64 + i)), row[0], "equity", f"T{i % 40}", "buy", 1 + i % 7, "market",
+                     None, price, "pending", "approved", at, None, None)
+            row[7] = round(row[7] + price * trade[5], 2)
+            row[11] = at
+            row[12] += 1
+            f.write(_dumps([("t", trade), ("p", row)]) + b"\n")
+    return os.path.getsize(path)
+
+
+def _replay(directory):
+    gc.collect()
+    with timed() as t:
+        storage = JournalStorage(directory, fsync=False)
+    stats = storage.replay_stats
+    records = stats["snapshotRecords"] + stats["journalRecords"]
+    return storage, {
+        "seconds": round(t.elapsed, 2),
+        "records": records,
+        "recordsPerSec": round(records / t.elapsed),
+        "snapshotRecords": stats["snapshotRecords"],
+        "journalRecords": stats["journalRecords"],
+    }
+
+
+def group_commit(directory, threads, appends_per_thread=200):
+    journal = Journal(directory, threads, fsync=True)
+    barrier = threading.Barrier(threads)
+    record = [("t", ["0" * 36, "0" * 36, "equity", "AAPL", "buy", 1, "market", None, 100.0, "pending",
+                     "approved", _START_US, None, None])]
+
+    def writer():
+        barrier.wait()
+        for _ in range(appends_per_thread):
+            journal.append(record)
+
+    workers = [threading.Thread(target=writer) for _ in range(threads)]
+    with timed() as t:
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+    stats = journal.stats()
+    journal.close()
+    return {
+        "appendsPerSec": round(stats["appends"] / t.elapsed),
+        "appendsPerFsync": round(stats["appends"] / stats["commits"], 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--trades", type=int, default=1_000_000)
+    parser.add_argument("--portfolios", type=int, default=1000)
+    parser.add_argument("--tail", type=int, default=10_000, help="trades journaled after the snapshot")
+    parser.add_argument("--dir", help="scratch directory (default: a temporary one)")
+    args = parser.parse_args()
+
+    directory = args.dir or tempfile.mkdtemp(prefix="bench-journal-")
+    try:
+        with timed() as t:
+            journal_bytes = write_journal(directory, 1, args.portfolios, args.trades)
+        written = {"seconds": round(t.elapsed, 2), "megabytes": round(journal_bytes / 2**20, 1)}
+
+        storage, journal_replay = _replay(directory)
+        with timed() as t:
+            generation = storage.snapshot()
+        snapshot_bytes = os.path.getsize(os.path.join(directory, f"snapshot-{generation:08d}.ndjson"))
+        snapshot = {"seconds": round(t.elapsed, 2), "megabytes": round(snapshot_bytes / 2**20, 1)}
+        storage.close()
+        del storage
+
+        write_journal(directory, generation, args.portfolios, args.tail, start=args.trades)
+        storage, snapshot_replay = _replay(directory)
+        storage.close()
+        del storage
+
+        commit_dir = os.path.join(directory, "group-commit")
+        os.makedirs(commit_dir)
+        results = {
+            "trades": args.trades,
+            "portfolios": args.portfolios,
+            "journalWritten": written,
+            "journalReplay": journal_replay,
+            "snapshot": snapshot,
+            "snapshotReplay": snapshot_replay,
+            "groupCommit": {f"threads{n}": group_commit(commit_dir, n) for n in (1, 8, 32)},
+            "peakRssMb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        }
+    finally:
+        if not args.dir:
+            shutil.rmtree(directory, ignore_errors=True)
+    report(results)
+
+
+if __name__ == "__main__":
+    main()
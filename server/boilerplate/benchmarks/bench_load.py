@@ -0,0 +1,318 @@
+"""Load test every API operation through the test client and a real gunicorn.
+
+Seeds N portfolios x M trades and then drives each operation in
+``openapi.yaml`` for a fixed number of requests, spread over
+``--concurrency`` threads. Results are reported per operation: ops/sec,
+p50/p95/p99 latency in milliseconds, and non-2xx responses. Peak RSS is
+reported per target.
+
+Targets:
+- ``test-client``: in process, using the configured ``STORAGE_BACKEND``.
+- ``gunicorn``: ``--workers`` real processes serving HTTP on localhost.
+  These use SQLite, so every worker sees the seeded data. Peak RSS is
+  summed over the master and worker processes.
+
+Usage:
+    python -m benchmarks.bench_load [--target test-client gunicorn] [--portfolios 50] [--trades 200]
+        [--requests 500] [--concurrency 4] [--workers 2]
+"""
+
+from __future__ import annotations
+
+import argparse
+import http.client
+import json
+import os
+import random
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from benchmarks.common import fresh_client, percentile, report, trade_payload
+
+
+class TestClientDriver:
+    def __init__(self):
+        self._client = fresh_client()
+        self._app = self._client.application
+        self._local = threading.local()
+
+    def request(self, method, path, body=None):
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = self._app.test_client()
+        resp = client.open(path, method=method, json=body)
+        return resp.status_code, resp.get_data()
+
+    def peak_rss_kb(self):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+class HttpDriver:
+    """Keep-alive HTTP client, one connection per thread."""
+
+    def __init__(self, port, server_pid):
+        self.port = port
+        self.server_pid = server_pid
+        self._local = threading.local()
+
+    def request(self, method, path, body=None):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=60)
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        payload = json.dumps(body).encode() if body is not None else None
+        try:
+            conn.request(method, path, body=payload, headers=headers)
+            resp = conn.getresponse()
+        except (http.client.HTTPException, OSError):
+            conn.close()
+            self._local.conn = None
+            raise
+        return resp.status, resp.read()
+
+    def peak_rss_kb(self):
+        pids = [self.server_pid, *_child_pids(self.server_pid)]
+        return sum(_vm_hwm_kb(pid) for pid in pids)
+
+
+def _child_pids(parent):
+    children = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        if int(fields[1]) == parent:
+            children.append(int(entry))
+    return children
+
+
+def _vm_hwm_kb(pid):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+@contextmanager
+def http_server(command, env=None):
+    """Run a server on a free localhost port against a scratch SQLite file.
+
+    ``command`` is an argv list with ``{port}`` placeholders. Yields an
+    ``HttpDriver`` once ``/health`` answers.
+    """
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {
+            **os.environ,
+            "STORAGE_BACKEND": "sqlite",
+            "SQLITE_PATH": os.path.join(tmp, "load.db"),
+            "METRICS_ENABLED": os.environ.get("METRICS_ENABLED", "1"),
+            **(env or {}),
+        }
+        proc = subprocess.Popen([arg.format(port=port) for arg in command], env=env)
+        try:
+            driver = HttpDriver(port, proc.pid)
+            deadline = time.monotonic() + 30
+            while True:
+                try:
+                    if driver.request("GET", "/health")[0] == 200:
+                        break
+                except OSError:
+                    pass
+                if time.monotonic() > deadline or proc.poll() is not None:
+                    raise RuntimeError(f"server did not become healthy: {' '.join(command)}")
+                time.sleep(0.1)
+            yield driver
+        finally:
+            proc.terminate()
+            proc.wait(timeout=30)
+
+
+def gunicorn_server(workers, app="app.wsgi:app", env=None, worker_class="sync", threads=1):
+    return http_server([
+        sys.executable, "-m", "gunicorn", "--bind", "127.0.0.1:{port}", "--workers", str(workers),
+        "--worker-class", worker_class, "--threads", str(threads), "--log-level", "warning", app,
+    ], env)
+
+
+def seed(driver, portfolios, trades):
+    """Create portfolios with trades via the batch endpoint; returns ``[(portfolio_id, [trade_id, ...])]``."""
+    seeded = []
+    for n in range(portfolios):
+        _, body = driver.request("POST", "/api/v1/portfolios", {
+            "clientId": f"client-{n}", "portfolioName": f"Load {n}", "investmentObjective": "growth",
+            "benchmarkIndex": "SPX",
+        })
+        portfolio_id = json.loads(body)["portfolioId"]
+        trade_ids = []
+        for start in range(0, trades, 1000):
+            batch = [trade_payload(i) for i in range(start, min(trades, start + 1000))]
+            _, body = driver.request("POST", f"/api/v1/portfolios/{portfolio_id}/trades/batch", batch)
+            trade_ids += [r["trade"]["tradeId"] for r in json.loads(body)["results"] if r["status"] == 201]
+        seeded.append((portfolio_id, trade_ids))
+    return seeded
+
+
+def operations(seeded):
+    """One request factory per API operation: ``name -> rng -> (method, path, body)``."""
+    first_page_cursor = {}
+
+    def pick(rng):
+        return rng.choice(seeded)
+
+    def portfolio_page_2(rng):
+        return "GET", f"/api/v1/portfolios?limit=20&cursor={first_page_cursor['cursor']}", None
+
+    ops = {
+        "healthCheck": lambda rng: ("GET", "/health", None),
+        "listPortfolios": lambda rng: ("GET", "/api/v1/portfolios?limit=20", None),
+        "listPortfoliosCursorPage": portfolio_page_2,
+        "initiatePortfolio": lambda rng: ("POST", "/api/v1/portfolios", {
+            "clientId": "load", "portfolioName": "Load", "investmentObjective": "income",
+        }),
+        "getPortfolio": lambda rng: ("GET", f"/api/v1/portfolios/{pick(rng)[0]}", None),
+        "updatePortfolio": lambda rng: ("PUT", f"/api/v1/portfolios/{pick(rng)[0]}", {
+            "portfolioName": f"Renamed {rng.randrange(1000)}",
+        }),
+        "listTrades": lambda rng: ("GET", f"/api/v1/portfolios/{pick(rng)[0]}/trades?limit=20", None),
+        "initiateTrade": lambda rng: (
+            "POST", f"/api/v1/portfolios/{pick(rng)[0]}/trades", trade_payload(rng.randrange(1000)),
+        ),
+        "initiateTradeBatch": lambda rng: (
+            "POST", f"/api/v1/portfolios/{pick(rng)[0]}/trades/batch",
+            [trade_payload(rng.randrange(1000)) for _ in range(50)],
+        ),
+        "getTrade": _get_trade(pick),
+        "searchTrades": lambda rng: (
+            "GET", f"/api/v1/trades?ticker={trade_payload(rng.randrange(5))['ticker']}&side=sell&limit=20", None,
+        ),
+        "getPortfolioHoldings": lambda rng: ("GET", f"/api/v1/portfolios/{pick(rng)[0]}/holdings", None),
+        "getPortfolioPerformance": lambda rng: (
+            "GET", f"/api/v1/portfolios/{pick(rng)[0]}/performance?period={rng.choice(['1m', '1y', 'inception'])}",
+            None,
+        ),
+        "exportPortfolios": lambda rng: ("GET", "/api/v1/export/portfolios?format=csv", None),
+        "exportTrades": lambda rng: ("GET", f"/api/v1/export/trades?portfolioId={pick(rng)[0]}", None),
+        "getMetrics": lambda rng: ("GET", "/metrics", None),
+    }
+    return ops, first_page_cursor
+
+
+def _get_trade(pick):
+    def op(rng):
+        portfolio_id, trade_ids = pick(rng)
+        return "GET", f"/api/v1/portfolios/{portfolio_id}/trades/{rng.choice(trade_ids)}", None
+    return op
+
+
+def drive(driver, factory, requests, concurrency):
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+
+    def worker(n, count):
+        rng = random.Random(n)
+        local = []
+        failed = 0
+        for _ in range(count):
+            method, path, body = factory(rng)
+            start = time.perf_counter()
+            try:
+                status = driver.request(method, path, body)[0]
+            except OSError:
+                status = 0
+            local.append(time.perf_counter() - start)
+            failed += not 200 <= status < 300
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    share = [requests // concurrency + (n < requests % concurrency) for n in range(concurrency)]
+    threads = [threading.Thread(target=worker, args=(n, count)) for n, count in enumerate(share)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": requests,
+        "opsPerSec": round(requests / elapsed, 1),
+        "p50Ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95Ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99Ms": round(percentile(latencies, 99) * 1000, 3),
+        "errors": errors[0],
+    }
+
+
+def run_target(driver, args):
+    start = time.perf_counter()
+    seeded = seed(driver, args.portfolios, args.trades)
+    seed_seconds = time.perf_counter() - start
+
+    ops, cursor = operations(seeded)
+    _, body = driver.request("GET", "/api/v1/portfolios?limit=1")
+    cursor["cursor"] = json.loads(body)["nextCursor"]
+
+    results = {}
+    for name, factory in ops.items():
+        if args.only and name not in args.only:
+            continue
+        requests = max(args.concurrency, args.requests // 10) if name in _HEAVY_OPS else args.requests
+        results[name] = drive(driver, factory, requests, args.concurrency)
+    return {
+        "seedSeconds": round(seed_seconds, 2),
+        "operations": results,
+        "peakRssMb": round(driver.peak_rss_kb() / 1024, 1),
+    }
+
+
+# Operations that touch a whole portfolio; run at a tenth of --requests.
+_HEAVY_OPS = {"initiateTradeBatch", "exportPortfolios", "exportTrades"}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--target", nargs="+", choices=["test-client", "gunicorn"], default=["test-client", "gunicorn"])
+    parser.add_argument("--portfolios", type=int, default=50)
+    parser.add_argument("--trades", type=int, default=200, help="trades seeded per portfolio")
+    parser.add_argument("--requests", type=int, default=500, help="requests per operation")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn worker processes")
+    parser.add_argument("--only", nargs="*", help="operation names to run (default: all)")
+    args = parser.parse_args()
+
+    results = {
+        "config": {
+            "portfolios": args.portfolios, "tradesPerPortfolio": args.trades, "requestsPerOperation": args.requests,
+            "concurrency": args.concurrency, "workers": args.workers,
+            "storageBackend": os.environ.get("STORAGE_BACKEND", "memory"),
+        },
+    }
+    if "test-client" in args.target:
+        results["testClient"] = run_target(TestClientDriver(), args)
+    if "gunicorn" in args.target:
+        with gunicorn_server(args.workers) as driver:
+            results["gunicorn"] = run_target(driver, args)
+    report(results)
+
+
+if __name__ == "__main__":
+    main()
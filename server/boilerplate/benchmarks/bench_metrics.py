@@ -0,0 +1,87 @@
+"""Measure the per-request overhead of the metrics middleware.
+
+Drives the same request mix through two apps, one with
+``METRICS_ENABLED=0`` and one with the hooks on. The mix is: create a
+trade, read a trade page, and read a portfolio. Each app writes to its own
+portfolio, and short rounds alternate between the two so machine noise
+hits both alike. The end-to-end difference is noisy at this scale, so the
+report also times the recording path directly.
+
+Usage:
+    python -m benchmarks.bench_metrics [--requests 600] [--rounds 20]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+
+from app import create_app
+from app.metrics import MetricsRegistry, registry
+from benchmarks.common import create_portfolio, report, timed, trade_payload
+
+
+def make_client(enabled: bool):
+    os.environ["METRICS_ENABLED"] = "1" if enabled else "0"
+    try:
+        return create_app().test_client()
+    finally:
+        os.environ.pop("METRICS_ENABLED")
+
+
+def run_mix(client, portfolio_id, requests):
+    trades_url = f"/api/v1/portfolios/{portfolio_id}/trades"
+    with timed() as t:
+        for i in range(requests // 3):
+            client.post(trades_url, json=trade_payload(i))
+            client.get(f"{trades_url}?limit=20")
+            client.get(f"/api/v1/portfolios/{portfolio_id}")
+    return t.elapsed / (requests // 3 * 3)
+
+
+def recording_cost(requests):
+    """Seconds per request spent in the registry for a typical request with four phases."""
+    local = MetricsRegistry()
+    phases = {"parse": 1e-5, "validate": 5e-5, "store": 2e-5, "serialize": 3e-5}
+    with timed() as t:
+        for _ in range(requests):
+            local.started()
+            local.observe("api.initiate_trade", "POST", 201, 1e-3, phases)
+            local.ended()
+    return t.elapsed / requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=600)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    clients = {"off": make_client(False), "on": make_client(True)}
+    portfolios = {mode: create_portfolio(client) for mode, client in clients.items()}
+    for mode, client in clients.items():
+        run_mix(client, portfolios[mode], 300)  # warm up
+
+    samples = {"off": [], "on": []}
+    for i in range(args.rounds):
+        order = ("off", "on") if i % 2 else ("on", "off")
+        for mode in order:
+            samples[mode].append(run_mix(clients[mode], portfolios[mode], args.requests))
+
+    off = statistics.median(samples["off"]) * 1e6
+    on = statistics.median(samples["on"]) * 1e6
+    report({
+        "requestsPerRound": args.requests,
+        "rounds": args.rounds,
+        "usPerRequestOff": round(off, 1),
+        "usPerRequestOn": round(on, 1),
+        "overheadUs": round(on - off, 1),
+        "overheadPct": round((on - off) / off * 100, 2),
+        "registryUsPerRequest": round(recording_cost(100_000) * 1e6, 2),
+        "seriesRecorded": len(registry.latency) + len(registry.phases),
+    })
+
+
+if __name__ == "__main__":
+    main()
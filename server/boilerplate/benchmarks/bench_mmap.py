@@ -0,0 +1,152 @@
+"""Measure worker memory and startup with a shared mapped snapshot against loading into dicts.
+
+Writes a journal of ``--trades`` trades over ``--portfolios`` portfolios
+(see ``bench_journal``), loads it once, and saves it twice: as a journal
+snapshot, and as a memory-mapped snapshot (``app.mmap_store``). It then
+starts ``--workers`` processes at once in each mode, like gunicorn workers:
+
+- ``dicts``: each loads the journal snapshot into its own memory store,
+  which is what the journal backend does on startup.
+- ``mmap``: each opens the mapped snapshot.
+
+Once loaded, every worker reads every trade, as serving history
+eventually does, and the workers are measured together while all are
+alive. ``openSeconds`` is the median time to open the store.
+``rssMbPerWorker`` counts mapped file pages in every worker that touched
+them. ``anonymousMbPerWorker`` (heap and other memory no other process can
+share) and ``pssMbTotal`` (proportional set size, which splits shared
+pages between the processes sharing them) show what each extra worker
+actually costs. ``baselineRssMb`` is a worker's RSS after imports, before
+opening the store. Workers load concurrently, so on fewer cores than
+workers ``openSeconds`` includes waiting for a CPU.
+
+Usage:
+    python -m benchmarks.bench_mmap [--trades 500000] [--portfolios 1000] [--workers 1,2,4]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.bench_journal import write_journal
+from benchmarks.common import report, timed
+
+
+def smaps() -> dict:
+    """This process's memory in MB, from ``/proc/self/smaps_rollup``."""
+    fields = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            name, _, value = line.partition(":")
+            if value.strip().endswith("kB"):
+                fields[name] = int(value.split()[0]) / 1024
+    return {
+        "rssMb": round(fields["Rss"], 1),
+        "pssMb": round(fields["Pss"], 1),
+        "anonymousMb": round(fields["Anonymous"], 1),
+    }
+
+
+def child(args):
+    """Open the store, read every trade, report ready, then measure when told to."""
+    from app.journal import JournalStorage
+    from app.mmap_store import MappedStorage
+
+    baseline = smaps()["rssMb"]
+    start = time.perf_counter()
+    if args.child == "mmap":
+        storage = MappedStorage(args.path)
+    else:
+        storage = JournalStorage(args.path, fsync=False)
+    opened = time.perf_counter() - start
+    trades = sum(len(list(book)) for _, book in storage.trades.items())
+    print(json.dumps({"openSeconds": opened, "baselineRssMb": baseline, "trades": trades}), flush=True)
+    sys.stdin.readline()
+    print(json.dumps(smaps()), flush=True)
+
+
+def run_workers(mode, paths):
+    workers = [
+        subprocess.Popen([sys.executable, "-m", "benchmarks.bench_mmap", "--child", mode, "--path", path],
+                         stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+        for path in paths
+    ]
+    ready = [json.loads(worker.stdout.readline()) for worker in workers]
+    for worker in workers:
+        worker.stdin.write("measure\n")
+        worker.stdin.flush()
+    memory = [json.loads(worker.stdout.readline()) for worker in workers]
+    for worker in workers:
+        worker.wait()
+    return {
+        "openSeconds": round(statistics.median(r["openSeconds"] for r in ready), 3),
+        "baselineRssMb": round(statistics.mean(r["baselineRssMb"] for r in ready), 1),
+        "rssMbPerWorker": round(statistics.mean(m["rssMb"] for m in memory), 1),
+        "anonymousMbPerWorker": round(statistics.mean(m["anonymousMb"] for m in memory), 1),
+        "pssMbTotal": round(sum(m["pssMb"] for m in memory), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--trades", type=int, default=500_000)
+    parser.add_argument("--portfolios", type=int, default=1000)
+    parser.add_argument("--workers", default="1,2,4", help="comma-separated worker counts")
+    parser.add_argument("--child", choices=("dicts", "mmap"), help=argparse.SUPPRESS)
+    parser.add_argument("--path", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args)
+        return
+
+    from app.journal import JournalStorage
+    from app.mmap_store import write_snapshot
+
+    root = tempfile.mkdtemp(prefix="bench-mmap-")
+    try:
+        source = os.path.join(root, "source")
+        os.makedirs(source)
+        write_journal(source, 1, args.portfolios, args.trades)
+        storage = JournalStorage(source, fsync=False)
+        generation = storage.snapshot()
+        snapshot = os.path.join(source, f"snapshot-{generation:08d}.ndjson")
+        mapped = os.path.join(root, "portfolios.snap")
+        with timed() as build:
+            write_snapshot(storage, mapped)
+        storage.close()
+
+        counts = [int(n) for n in args.workers.split(",")]
+        results = {
+            "trades": args.trades,
+            "portfolios": args.portfolios,
+            "journalSnapshotMb": round(os.path.getsize(snapshot) / 2**20, 1),
+            "mappedSnapshotMb": round(os.path.getsize(mapped) / 2**20, 1),
+            "buildSeconds": round(build.elapsed, 2),
+            "dicts": {},
+            "mmap": {},
+        }
+        for n in counts:
+            # A journal directory belongs to one process, so each worker gets a hard link of the snapshot.
+            directories = []
+            for k in range(n):
+                directory = os.path.join(root, f"dicts-{n}-{k}")
+                os.makedirs(directory)
+                os.link(snapshot, os.path.join(directory, os.path.basename(snapshot)))
+                directories.append(directory)
+            results["dicts"][n] = run_workers("dicts", directories)
+            results["mmap"][n] = run_workers("mmap", [mapped] * n)
+        report(results)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""Measure cross-portfolio queries against secondary indexes versus full scans.
+
+Builds an in-memory store with ``--trades`` trades spread evenly over the
+last ``--days`` days, across ``--portfolios`` portfolios (five per client)
+and ``--tickers`` tickers, with AAPL making up 5% of trades. It then
+times typical compliance questions two ways:
+
+- ``indexed``: the store query behind ``GET /api/v1/trades`` and the
+  ``clientId`` filter on ``GET /api/v1/portfolios``.
+- ``scan``: visiting every portfolio and trade, the only way to answer
+  these questions before the indexes existed.
+
+Each query asks for one page of ``--limit`` results. The report gives the
+median milliseconds of each, the number of matches returned, and the
+speedup. ``build`` reports the cost of maintaining the trade index on
+append, compared with appending to the books alone. ``endpoint`` is the
+median latency of each indexed query through the Flask test client.
+
+``--sqlite`` runs the same indexed queries against a SQLite copy of the
+data.
+
+Usage:
+    python -m benchmarks.bench_queries [--trades 1000000] [--portfolios 2000] [--sqlite]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlencode
+
+from app import create_app
+from app.models import MemoryStorage, Portfolio, Trade, TradeBook, set_storage
+from benchmarks.common import report, timed
+
+
+def build(args):
+    rng = random.Random(42)
+    storage = MemoryStorage()
+    now = datetime.now(timezone.utc)
+    start = now - timedelta(days=args.days)
+    portfolios = []
+    for n in range(args.portfolios):
+        portfolio = Portfolio(
+            client_id=f"client-{n // 5}", portfolio_name=f"Portfolio {n}", investment_objective="growth",
+            advisor_id=f"advisor-{n % 50}", created_at=start - timedelta(seconds=args.portfolios - n),
+        )
+        storage.portfolios.add(portfolio)
+        portfolios.append(portfolio.portfolio_id)
+
+    tickers = [f"T{n:03d}" for n in range(args.tickers - 1)]
+    step = args.days * 86400 / args.trades
+    trades = [
+        Trade(
+            portfolio_id=portfolios[rng.randrange(len(portfolios))], instrument_type="equity",
+            ticker="AAPL" if rng.random() < 0.05 else tickers[rng.randrange(len(tickers))],
+            side="buy" if rng.random() < 0.6 else "sell",
+            quantity=1 + rng.randrange(100), price_per_unit=100.0,
+            initiated_at=start + timedelta(seconds=i * step),
+        )
+        for i in range(args.trades)
+    ]
+
+    plain = {}
+    with timed() as books_only:
+        for trade in trades:
+            book = plain.get(trade.portfolio_id)
+            if book is None:
+                book = plain[trade.portfolio_id] = TradeBook()
+            book.append(trade)
+    del plain
+    with timed() as indexed:
+        for trade in trades:
+            storage.trades.book(trade.portfolio_id).append(trade)
+    build_stats = {
+        "booksOnlySeconds": round(books_only.elapsed, 2),
+        "withIndexSeconds": round(indexed.elapsed, 2),
+        "indexOverheadUsPerTrade": round((indexed.elapsed - books_only.elapsed) / args.trades * 1e6, 2),
+    }
+    return storage, trades, now, build_stats
+
+
+def scan_trades(storage, limit, ticker=None, side=None, since=None, portfolio_ids=None):
+    """Answer a trade query by visiting every book, as was required before the index."""
+    matches = [
+        trade
+        for portfolio_id, book in storage.trades.items()
+        if portfolio_ids is None or portfolio_id in portfolio_ids
+        for trade in book
+        if (ticker is None or trade.ticker == ticker)
+        and (side is None or trade.side == side)
+        and (since is None or trade.initiated_at >= since)
+    ]
+    matches.sort(key=lambda t: (t.initiated_at, t.trade_id), reverse=True)
+    return matches[:limit]
+
+
+def scan_portfolios(storage, client_id, limit):
+    matches = [p for p in storage.portfolios.values() if p.client_id == client_id]
+    matches.sort(key=lambda p: (p.created_at, p.portfolio_id), reverse=True)
+    return matches[:limit]
+
+
+def median_ms(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - start)
+    return round(statistics.median(samples) * 1000, 3), result
+
+
+def queries(storage, now, limit):
+    """``name -> (indexed, scan, endpoint query string)`` for each compliance question."""
+    hour_ago = now - timedelta(hours=1)
+    day_ago = now - timedelta(days=1)
+    trades = storage.trades
+    return {
+        "aaplSellsLastHour": (
+            lambda: trades.query(ticker="AAPL", side="sell", since=hour_ago, limit=limit)[0],
+            lambda: scan_trades(storage, limit, ticker="AAPL", side="sell", since=hour_ago),
+            {"ticker": "AAPL", "side": "sell", "since": hour_ago.isoformat()},
+        ),
+        "aaplAllTime": (
+            lambda: trades.query(ticker="AAPL", limit=limit)[0],
+            lambda: scan_trades(storage, limit, ticker="AAPL"),
+            {"ticker": "AAPL"},
+        ),
+        "clientTradesLastDay": (
+            lambda: trades.query(portfolio_ids=storage.portfolios.portfolio_ids(client_id="client-7"),
+                                 since=day_ago, limit=limit)[0],
+            lambda: scan_trades(storage, limit, since=day_ago, portfolio_ids={
+                p.portfolio_id for p in storage.portfolios.values() if p.client_id == "client-7"
+            }),
+            {"clientId": "client-7", "since": day_ago.isoformat()},
+        ),
+        "firmTradesLastHour": (
+            lambda: trades.query(since=hour_ago, limit=limit)[0],
+            lambda: scan_trades(storage, limit, since=hour_ago),
+            {"since": hour_ago.isoformat()},
+        ),
+        "clientPortfolios": (
+            lambda: storage.portfolios.page(client_id="client-7", limit=limit),
+            lambda: scan_portfolios(storage, "client-7", limit),
+            None,
+        ),
+    }
+
+
+def run_sqlite(storage, trades, now, limit, repeat):
+    from app.sqlite_store import SQLiteStorage
+
+    path = os.path.join(tempfile.mkdtemp(prefix="bench-queries-"), "bench.db")
+    sqlite = SQLiteStorage(path)
+    with sqlite.transaction():
+        for portfolio in storage.portfolios.values():
+            sqlite.portfolios.add(portfolio)
+        for portfolio_id, book in storage.trades.items():
+            sqlite.trades.book(portfolio_id).extend(list(book))
+    hour_ago = now - timedelta(hours=1)
+    day_ago = now - timedelta(days=1)
+    results = {}
+    for name, fn in {
+        "aaplSellsLastHour": lambda: sqlite.trades.query(ticker="AAPL", side="sell", since=hour_ago, limit=limit)[0],
+        "aaplAllTime": lambda: sqlite.trades.query(ticker="AAPL", limit=limit)[0],
+        "clientTradesLastDay": lambda: sqlite.trades.query(
+            portfolio_ids=sqlite.portfolios.portfolio_ids(client_id="client-7"), since=day_ago, limit=limit)[0],
+        "firmTradesLastHour": lambda: sqlite.trades.query(since=hour_ago, limit=limit)[0],
+        "clientPortfolios": lambda: sqlite.portfolios.page(client_id="client-7", limit=limit),
+    }.items():
+        ms, result = median_ms(fn, repeat)
+        results[name] = {"ms": ms, "results": len(result)}
+    os.remove(path)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--trades", type=int, default=1_000_000)
+    parser.add_argument("--portfolios", type=int, default=2000)
+    parser.add_argument("--tickers", type=int, default=200)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=20, help="timed runs per indexed query")
+    parser.add_argument("--scan-repeat", type=int, default=3, help="timed runs per full scan")
+    parser.add_argument("--sqlite", action="store_true", help="also time the indexed queries on SQLite")
+    args = parser.parse_args()
+
+    storage, trades, now, build_stats = build(args)
+    set_storage(storage)
+    client = create_app().test_client()
+
+    results = {"trades": args.trades, "portfolios": args.portfolios, "build": build_stats, "queries": {}}
+    for name, (indexed, scan, params) in queries(storage, now, args.limit).items():
+        indexed_ms, found = median_ms(indexed, args.repeat)
+        scan_ms, expected = median_ms(scan, args.scan_repeat)
+        assert [t.to_dict() for t in found] == [t.to_dict() for t in expected], name
+        entry = {
+            "results": len(found),
+            "indexedMs": indexed_ms,
+            "scanMs": scan_ms,
+            "speedup": round(scan_ms / indexed_ms) if indexed_ms else None,
+        }
+        if params is not None:
+            url = f"/api/v1/trades?{urlencode({**params, 'limit': args.limit})}"
+            entry["endpointMs"], resp = median_ms(lambda: client.get(url), args.repeat)
+            assert resp.status_code == 200, resp.get_json()
+        results["queries"][name] = entry
+    if args.sqlite:
+        results["sqlite"] = run_sqlite(storage, trades, now, args.limit, args.repeat)
+    set_storage(None)
+    report(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""Measure memory and read cost of columnar trade segments against Trade objects.
+
+Each mode runs in a fresh interpreter, because freed objects do not give
+their memory back to the OS and would skew a second build in the same
+process. ``objects`` sets ``TRADE_SEGMENT_SIZE=0``, so every trade stays a
+Trade object. ``segments`` keeps each book's newest ``--hot-trades``
+trades live and seals older ones ``--segment-size`` at a time.
+Each builds a memory store of ``--trades`` trades over ``--portfolios``
+portfolios the way the API books them (pending market orders, with a few
+limit orders), creating each Trade only to append it.
+
+The report gives RSS growth per trade for each mode, with peak RSS, build
+time and the share of trades sealed. It also gives median latencies for a
+newest-first page, a deep page, a point lookup of an old trade and two
+cross-portfolio queries through the index, and the time to rebuild every
+portfolio's holdings two ways: from the book's columns, as
+``rebuild_holdings`` does, and from its Trade objects, which materializes
+every sealed trade.
+
+Usage:
+    python -m benchmarks.bench_segments [--trades 1000000] [--portfolios 2000] [--segment-size 8]
+        [--hot-trades 8]
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import os
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+from benchmarks.common import report, timed
+
+
+def rss_bytes() -> int:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def median_us(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return round(statistics.median(samples) * 1e6, 1)
+
+
+def child(args):
+    from app.models import Holdings, MemoryStorage, Trade
+
+    rng = random.Random(42)
+    tickers = [f"T{n:03d}" for n in range(199)] + ["AAPL"]
+    portfolios = [f"portfolio-{n}" for n in range(args.portfolios)]
+    now = datetime.now(timezone.utc)
+    start = now - timedelta(days=30)
+    step = 30 * 86400 / args.trades
+
+    gc.collect()
+    baseline = rss_bytes()
+    storage = MemoryStorage()
+    old_ids = []
+    with timed() as build:
+        for i in range(args.trades):
+            limit = rng.random() < 0.02
+            trade = Trade(
+                portfolio_id=portfolios[rng.randrange(len(portfolios))], instrument_type="equity",
+                ticker=tickers[rng.randrange(len(tickers))], side="buy" if rng.random() < 0.6 else "sell",
+                quantity=float(1 + rng.randrange(100)), order_type="limit" if limit else "market",
+                limit_price=99.0 if limit else None, price_per_unit=100.0 + rng.randrange(1000) / 100,
+                initiated_at=start + timedelta(seconds=i * step),
+            )
+            storage.trades.book(trade.portfolio_id).append(trade)
+            if i % (args.trades // 100) == 0:
+                old_ids.append((trade.portfolio_id, trade.trade_id))
+            del trade
+    gc.collect()
+    grown = rss_bytes() - baseline
+
+    books = [book for _, book in storage.trades.items()]
+    sealed = sum(book.sealed for book in books)
+    rng = random.Random(7)
+    hour_ago = now - timedelta(hours=1)
+    repeat = args.repeat
+
+    with timed() as column_pass:
+        for book in books:
+            Holdings().rebuild_columns(book.columns())
+    with timed() as object_pass:
+        for book in books:
+            Holdings().rebuild(book)
+    report_ = {
+        "rssMb": round(grown / 2**20, 1),
+        "bytesPerTrade": round(grown / args.trades),
+        "peakRssMb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "buildSeconds": round(build.elapsed, 2),
+        "sealedShare": round(sealed / args.trades, 3),
+        "segmentBytesPerSealedTrade": round(sum(b.segment_bytes() for b in books) / sealed, 1) if sealed else None,
+        "latencyUs": {
+            "newestPage": median_us(lambda: rng.choice(books).page(limit=20), repeat),
+            "deepPage": median_us(lambda: rng.choice(books).page(offset=300, limit=20), repeat),
+            "getOldTrade": median_us(lambda: storage.trades.get(rng.choice(old_ids)[0]).get(
+                rng.choice(old_ids)[1]), repeat),
+            "tickerQuery": median_us(lambda: storage.trades.query(ticker="AAPL", limit=100), repeat),
+            "lastHourSells": median_us(lambda: storage.trades.query(side="sell", since=hour_ago, limit=100), repeat),
+        },
+        "columnPassSeconds": round(column_pass.elapsed, 2),
+        "objectPassSeconds": round(object_pass.elapsed, 2),
+    }
+    print(json.dumps(report_))
+
+
+def run_mode(args, segment_size):
+    env = {**os.environ, "TRADE_SEGMENT_SIZE": str(segment_size), "TRADE_HOT_TRADES": str(args.hot_trades)}
+    out = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_segments", "--child", "--trades", str(args.trades),
+         "--portfolios", str(args.portfolios), "--repeat", str(args.repeat)],
+        capture_output=True, text=True, check=True, env=env,
+    )
+    return json.loads(out.stdout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--trades", type=int, default=1_000_000)
+    parser.add_argument("--portfolios", type=int, default=2000)
+    parser.add_argument("--segment-size", type=int, default=8)
+    parser.add_argument("--hot-trades", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=200, help="timed runs per latency")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args)
+        return
+
+    objects = run_mode(args, 0)
+    segments = run_mode(args, args.segment_size)
+    report({
+        "trades": args.trades,
+        "portfolios": args.portfolios,
+        "segmentSize": args.segment_size,
+        "hotTrades": args.hot_trades,
+        "objects": objects,
+        "segments": segments,
+        "rssReduction": round(objects["rssMb"] / segments["rssMb"], 1),
+    })
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Micro-benchmark for model memory and list-response serialization.
+
+Reports bytes per Portfolio/Trade object and list pages encoded per second
+with Flask's stdlib provider versus ``ModelJSONProvider``.
+
+Usage:
+    python -m benchmarks.bench_serialization [--objects 20000] [--page-size 100]
+"""
+
+from __future__ import annotations
+
+import argparse
+import tracemalloc
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from app.models import Portfolio, Trade
+from app.serialization import ModelJSONProvider, orjson
+from benchmarks.common import report, timed, trade_payload
+
+
+def _make_portfolio(i):
+    return Portfolio(client_id=f"client-{i}", portfolio_name=f"Portfolio {i}", investment_objective="growth")
+
+
+def _make_trade(i):
+    payload = trade_payload(i)
+    return Trade(
+        portfolio_id="bench-portfolio",
+        instrument_type=payload["instrumentType"],
+        ticker=payload["ticker"],
+        side=payload["side"],
+        quantity=payload["quantity"],
+    )
+
+
+def bytes_per_object(factory, count):
+    tracemalloc.start()
+    objects = [factory(i) for i in range(count)]
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return round(current / len(objects))
+
+
+def pages_per_sec(provider_class, page, rounds):
+    app = Flask(__name__)
+    app.json = provider_class(app)
+    with app.app_context():
+        if provider_class is DefaultJSONProvider:
+            def encode():
+                return app.json.response({"trades": [t.to_dict() for t in page]})
+        else:
+            def encode():
+                return app.json.response({"trades": page})
+        encode()
+        with timed() as t:
+            for _ in range(rounds):
+                encode()
+    return round(rounds / t.elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--objects", type=int, default=20000)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=2000)
+    args = parser.parse_args()
+
+    page = [_make_trade(i) for i in range(args.page_size)]
+    report({
+        "orjson": orjson is not None,
+        "portfolioBytes": bytes_per_object(_make_portfolio, args.objects),
+        "tradeBytes": bytes_per_object(_make_trade, args.objects),
+        "pageSize": args.page_size,
+        "stdlibPagesPerSec": pages_per_sec(DefaultJSONProvider, page, args.rounds),
+        "modelProviderPagesPerSec": pages_per_sec(ModelJSONProvider, page, args.rounds),
+    })
+
+
+if __name__ == "__main__":
+    main()
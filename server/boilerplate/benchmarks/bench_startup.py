@@ -0,0 +1,95 @@
+"""Measure cold-start cost of the Lambda entry point.
+
+Each run is a fresh interpreter, as on a cold container. It times
+``import app.wsgi`` (init), the first ``/health`` request, and the first
+``/performance`` request, which pulls in the deferred analytics imports.
+Runs cover ``STARTUP_MODE=lazy`` and ``STARTUP_MODE=eager``. A third set
+uses lazy mode with no usable bytecode cache. That is what a Lambda
+package without precompiled ``.pyc`` files pays, because the read-only
+filesystem means sources are recompiled on every cold start. One final
+run under ``python -X importtime`` lists the slowest imports by cumulative
+time.
+
+Usage:
+    python -m benchmarks.bench_startup [--runs 10] [--top 15]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.common import report
+
+_CHILD = """
+import json, time
+start = time.perf_counter()
+import app.wsgi
+init = time.perf_counter()
+client = app.wsgi.app.test_client()
+client.get("/health")
+health = time.perf_counter()
+portfolio_id = client.post("/api/v1/portfolios", json={
+    "clientId": "bench", "portfolioName": "Cold", "investmentObjective": "growth",
+}).get_json()["portfolioId"]
+created = time.perf_counter()
+client.get(f"/api/v1/portfolios/{portfolio_id}/performance")
+performance = time.perf_counter()
+print(json.dumps({
+    "initMs": (init - start) * 1000,
+    "firstHealthMs": (health - init) * 1000,
+    "firstPerformanceMs": (performance - created) * 1000,
+}))
+"""
+
+
+def _run(mode, code=_CHILD, extra_args=(), env=None):
+    env = {**os.environ, "STARTUP_MODE": mode, "STORAGE_BACKEND": "memory", **(env or {})}
+    return subprocess.run(
+        [sys.executable, *extra_args, "-c", code], capture_output=True, text=True, check=True, env=env,
+    )
+
+
+def cold_starts(mode, runs, env=None):
+    samples = [json.loads(_run(mode, env=env).stdout) for _ in range(runs)]
+    return {key: round(statistics.median(s[key] for s in samples), 1) for key in samples[0]}
+
+
+def slowest_imports(top):
+    """Parse ``-X importtime`` output into the ``top`` modules by cumulative microseconds."""
+    rows = []
+    for line in _run("lazy", "import app.wsgi", ("-X", "importtime")).stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative), name.strip()))
+    rows.sort(reverse=True)
+    return [{"module": name, "cumulativeMs": round(us / 1000, 1)} for us, name in rows[:top]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as empty_cache:
+        uncompiled = cold_starts("lazy", args.runs, {
+            "PYTHONPYCACHEPREFIX": empty_cache, "PYTHONDONTWRITEBYTECODE": "1",
+        })
+    report({
+        "runs": args.runs,
+        "lazy": cold_starts("lazy", args.runs),
+        "eager": cold_starts("eager", args.runs),
+        "lazyWithoutBytecode": uncompiled,
+        "slowestImports": slowest_imports(args.top),
+    })
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Measure CPU per request for marshmallow validation against the compiled fast path.
+
+``load`` times ``--rounds`` loads of one payload with each loader: a
+valid trade, a valid portfolio, and an invalid trade (which the compiled
+path hands back to marshmallow for its messages). ``endpoint`` times
+``POST /api/v1/portfolios`` and ``POST /api/v1/portfolios/<id>/trades``
+through the Flask test client with the routes using either loader. All
+figures are CPU microseconds (``time.process_time``) per call.
+
+Usage:
+    python -m benchmarks.bench_validation [--rounds 20000] [--requests 3000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+
+from app import schemas
+from app.schemas import PortfolioInitiateSchema, TradeInitiateSchema
+from app.validation import CompiledSchema
+from benchmarks.common import create_portfolio, fresh_client, report, trade_payload
+
+PORTFOLIO = {"clientId": "bench-client", "portfolioName": "Benchmark", "investmentObjective": "growth",
+             "riskTolerance": "aggressive", "currency": "USD"}
+INVALID_TRADE = {"instrumentType": "equity", "ticker": "AAPL", "side": "hold", "quantity": 0}
+
+
+def cpu_us(fn, rounds):
+    fn()
+    start = time.process_time()
+    for _ in range(rounds):
+        fn()
+    return round((time.process_time() - start) / rounds * 1e6, 2)
+
+
+def invalid(loader, payload):
+    def load():
+        try:
+            loader.load(payload)
+        except Exception:
+            pass
+    return load
+
+
+def time_loads(rounds):
+    results = {}
+    for name, schema_class, payload in [
+        ("trade", TradeInitiateSchema, trade_payload(1)),
+        ("portfolio", PortfolioInitiateSchema, PORTFOLIO),
+    ]:
+        marshmallow, compiled = schema_class(), CompiledSchema(schema_class())
+        before = cpu_us(lambda: marshmallow.load(payload), rounds)
+        after = cpu_us(lambda: compiled.load(payload), rounds)
+        results[name] = {"marshmallowUs": before, "compiledUs": after, "speedup": round(before / after, 1)}
+    before = cpu_us(invalid(TradeInitiateSchema(), INVALID_TRADE), rounds)
+    after = cpu_us(invalid(CompiledSchema(TradeInitiateSchema()), INVALID_TRADE), rounds)
+    results["invalidTrade"] = {"marshmallowUs": before, "compiledUs": after}
+    return results
+
+
+def time_endpoints(requests, compiled):
+    if compiled:
+        schemas.portfolio_initiate_schema = CompiledSchema(PortfolioInitiateSchema())
+        schemas.trade_initiate_schema = CompiledSchema(TradeInitiateSchema())
+    else:
+        schemas.portfolio_initiate_schema = PortfolioInitiateSchema()
+        schemas.trade_initiate_schema = TradeInitiateSchema()
+    client = fresh_client()
+    portfolio_id = create_portfolio(client)
+    counter = iter(range(10 ** 9))
+    return {
+        "createPortfolioUs": cpu_us(lambda: client.post("/api/v1/portfolios", json=PORTFOLIO), requests),
+        "createTradeUs": cpu_us(
+            lambda: client.post(f"/api/v1/portfolios/{portfolio_id}/trades", json=trade_payload(next(counter))),
+            requests,
+        ),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=20000, help="loads per loader and payload")
+    parser.add_argument("--requests", type=int, default=3000, help="requests per endpoint and loader")
+    args = parser.parse_args()
+
+    original = schemas.portfolio_initiate_schema, schemas.trade_initiate_schema
+    try:
+        endpoints = {
+            "marshmallow": time_endpoints(args.requests, compiled=False),
+            "compiled": time_endpoints(args.requests, compiled=True),
+        }
+    finally:
+        schemas.portfolio_initiate_schema, schemas.trade_initiate_schema = original
+    report({"load": time_loads(args.rounds), "endpoint": endpoints})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Shared helpers for the benchmark scripts.
+
+Benchmarks are run from the project root as modules, e.g.
+``python -m benchmarks.bench_batch_ingest``, and print a JSON report on
+stdout so results can be diffed between commits.
+"""
+
+from __future__ import annotations
+
+import json
+import sys
+import time
+from contextlib import contextmanager
+
+from app import create_app
+from app.models import reset_stores
+
+
+def fresh_client():
+    reset_stores()
+    return create_app().test_client()
+
+
+def create_portfolio(client, name="Benchmark"):
+    resp = client.post("/api/v1/portfolios", json={
+        "clientId": "bench-client",
+        "portfolioName": name,
+        "investmentObjective": "growth",
+    })
+    return resp.get_json()["portfolioId"]
+
+
+def trade_payload(i):
+    return {
+        "instrumentType": "equity",
+        "ticker": ("AAPL", "MSFT", "NVDA", "AMZN", "GOOG")[i % 5],
+        "side": "buy" if i % 3 else "sell",
+        "quantity": 1 + i % 10,
+    }
+
+
+class Timer:
+    elapsed = 0.0
+
+
+@contextmanager
+def timed():
+    timer = Timer()
+    start = time.perf_counter()
+    try:
+        yield timer
+    finally:
+        timer.elapsed = time.perf_counter() - start
+
+
+def percentile(sorted_samples, pct):
+    if not sorted_samples:
+        return 0.0
+    index = min(len(sorted_samples) - 1, int(round(pct / 100 * (len(sorted_samples) - 1))))
+    return sorted_samples[index]
+
+
+def report(results: dict):
+    json.dump(results, sys.stdout, indent=2)
+    sys.stdout.write("\n")
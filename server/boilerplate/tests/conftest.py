@@ -0,0 +1,38 @@
+import pytest
+
+from app import create_app
+from app.idempotency import idempotency_store
+from app.journal import JournalStorage
+from app.mmap_store import MappedStorage, write_snapshot
+from app.models import MemoryStorage, set_storage
+from app.performance_cache import performance_cache
+from app.response_cache import response_cache
+from app.sqlite_store import SQLiteStorage
+
+
+@pytest.fixture(params=["memory", "sqlite", "journal", "mmap"])
+def storage(request, tmp_path):
+    if request.param == "sqlite":
+        backend = SQLiteStorage(str(tmp_path / "portfolios.db"))
+    elif request.param == "journal":
+        backend = JournalStorage(str(tmp_path / "journal"), fsync=False)
+    elif request.param == "mmap":
+        # An empty snapshot: everything the tests write lands in the delta.
+        write_snapshot(MemoryStorage(), str(tmp_path / "portfolios.snap"))
+        backend = MappedStorage(str(tmp_path / "portfolios.snap"))
+    else:
+        backend = MemoryStorage()
+    set_storage(backend)
+    yield backend
+    set_storage(None)
+    # The caches are process-wide; entries from one test must not answer the next.
+    for cache in (response_cache, performance_cache, idempotency_store):
+        cache.clear()
+    if request.param == "journal":
+        backend.close()
+
+
+@pytest.fixture
+def client(storage):
+    app = create_app()
+    return app.test_client()
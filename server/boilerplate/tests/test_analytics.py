@@ -0,0 +1,229 @@
+import os
+import subprocess
+import sys
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app import pricing
+from app.analytics import RunningPerformance, compute_performance
+from app.models import Portfolio, Trade, TradeBook, TradeStore, get_trade_store
+from app.performance_cache import PerformanceCache
+from app.pricing import PriceProvider
+
+NOW = datetime(2025, 6, 30, 12, tzinfo=timezone.utc)
+
+
+class FixedPrices(PriceProvider):
+    def __init__(self, **prices):
+        self.prices = prices
+
+    def get_prices(self, tickers):
+        return {ticker: self.prices[ticker] for ticker in tickers}
+
+
+def _book(*trades):
+    book = TradeBook()
+    for days_ago, ticker, side, quantity, price in trades:
+        book.append(Trade(
+            portfolio_id="p1", instrument_type="equity", ticker=ticker, side=side, quantity=quantity,
+            price_per_unit=price, initiated_at=NOW - timedelta(days=days_ago),
+        ))
+    return book
+
+
+def test_gain_on_repricing_is_return_not_deposit():
+    # 10 @ 100, then a later trade marks AAPL at 110: gain 100 on an opening value of 1000,
+    # with the 110 purchase counted as a half-day flow (Modified Dietz).
+    book = _book((5, "AAPL", "buy", 10, 100.0), (4, "AAPL", "buy", 1, 110.0))
+    metrics = compute_performance(book.columns(), "1m", now=NOW, quotes={"AAPL": 110.0})
+    assert metrics["totalReturn"] == pytest.approx(100 / 1055 * 100, abs=0.01)
+    assert metrics["maxDrawdown"] == 0
+
+
+def test_drawdown_and_window():
+    book = _book(
+        (40, "MSFT", "buy", 10, 100.0),
+        (20, "MSFT", "buy", 1, 80.0),   # -20% mark-down, inside inception but outside 1w
+        (3, "MSFT", "buy", 1, 88.0),
+    )
+    quotes = {"MSFT": 88.0}
+    inception = compute_performance(book.columns(), "inception", now=NOW, quotes=quotes)
+    assert inception["maxDrawdown"] < -15
+    week = compute_performance(book.columns(), "1w", now=NOW, quotes=quotes)
+    assert week["maxDrawdown"] == 0
+    assert week["totalReturn"] > 0
+
+
+def test_running_performance_matches_full_recompute():
+    history = [
+        (40, "MSFT", "buy", 10, 100.0), (40, "AAPL", "buy", 5, 50.0), (20, "MSFT", "buy", 1, 80.0),
+        (12, "AAPL", "sell", 2, 60.0), (3, "MSFT", "buy", 1, 88.0), (3, "MSFT", "sell", 4, 90.0),
+    ]
+    full = _book(*history)
+    quotes = {"MSFT": 95.0, "AAPL": 55.0}
+    expected = compute_performance(full.columns(), "inception", benchmark_index="SPX", now=NOW, quotes=quotes)
+
+    # Rebuilt from a prefix, then fed the rest one trade at a time.
+    running = RunningPerformance.from_columns(_book(*history[:3]).columns())
+    for trade in list(full)[3:]:
+        running.apply(trade)
+    assert running.metrics("SPX", NOW, quotes) == pytest.approx(expected, abs=0.01)
+    assert RunningPerformance.from_columns(full.columns()).metrics("SPX", NOW, quotes) == pytest.approx(
+        expected, abs=0.01)
+    # The same on the day of the last trade, when the re-mark joins that day's return.
+    same_day = NOW - timedelta(days=3)
+    assert running.metrics("SPX", same_day, quotes) == pytest.approx(
+        compute_performance(full.columns(), "inception", benchmark_index="SPX", now=same_day, quotes=quotes), abs=0.01)
+
+
+def test_positions_are_marked_to_current_quotes(monkeypatch):
+    book = _book((5, "AAPL", "buy", 10, 100.0), (4, "AAPL", "buy", 1, 120.0))
+    # Day -4 gains 10 * (120 - 100) on 1000 + 120 / 2; today re-marks 11 shares from 120 to 130 on 1320.
+    expected = (1 + 200 / 1060) * (1 + 110 / 1320) - 1
+    metrics = compute_performance(book.columns(), "inception", now=NOW, quotes={"AAPL": 130.0})
+    assert metrics["totalReturn"] == pytest.approx(expected * 100, abs=0.01)
+    running = RunningPerformance.from_columns(book.columns())
+    assert running.metrics(now=NOW, quotes={"AAPL": 130.0}) == metrics
+
+    # By default the quotes come from the pricing module.
+    monkeypatch.setattr(pricing, "_provider", FixedPrices(AAPL=130.0))
+    assert compute_performance(book.columns(), "inception", now=NOW) == metrics
+    assert running.metrics(now=NOW) == metrics
+
+
+def test_books_share_the_store_ticker_table():
+    store = TradeStore()
+    other, book = store.book("p2"), store.book("p1")
+    other.append(Trade("p2", "equity", "TSLA", "buy", 1, price_per_unit=200.0, initiated_at=NOW - timedelta(days=6)))
+    for trade in _book((5, "AAPL", "buy", 10, 100.0), (4, "AAPL", "sell", 2, 120.0)):
+        book.append(trade)
+
+    quotes = {"AAPL": 130.0}
+    assert book.columns().tickers[0] == "TSLA"
+    expected = compute_performance(_book((5, "AAPL", "buy", 10, 100.0), (4, "AAPL", "sell", 2, 120.0)).columns(),
+                                   "inception", now=NOW, quotes=quotes)
+    assert compute_performance(book.columns(), "inception", now=NOW, quotes=quotes) == expected
+    assert RunningPerformance.from_columns(book.columns()).metrics(now=NOW, quotes=quotes) == expected
+
+
+def test_performance_cache_hits_and_invalidates_on_trade(client):
+    portfolio_id = client.post("/api/v1/portfolios", json={
+        "clientId": "c1", "portfolioName": "Growth", "investmentObjective": "growth",
+    }).get_json()["portfolioId"]
+    trade = {"instrumentType": "equity", "ticker": "AAPL", "side": "buy", "quantity": 10}
+    client.post(f"/api/v1/portfolios/{portfolio_id}/trades", json=trade)
+
+    for period in ("inception", "1m"):
+        url = f"/api/v1/portfolios/{portfolio_id}/performance?period={period}"
+        assert client.get(url).headers["X-Cache"] == "MISS"
+        assert client.get(url).headers["X-Cache"] == "HIT"
+
+    client.post(f"/api/v1/portfolios/{portfolio_id}/trades", json=trade)
+    # Inception state absorbed the trade incrementally; the windowed entry was dropped.
+    inception = client.get(f"/api/v1/portfolios/{portfolio_id}/performance?period=inception")
+    assert inception.headers["X-Cache"] == "HIT"
+    assert client.get(f"/api/v1/portfolios/{portfolio_id}/performance?period=1m").headers["X-Cache"] == "MISS"
+
+
+def test_performance_miss_does_not_take_the_write_lock(client, storage, monkeypatch):
+    portfolio_id = client.post("/api/v1/portfolios", json={
+        "clientId": "c1", "portfolioName": "Growth", "investmentObjective": "growth",
+    }).get_json()["portfolioId"]
+    client.post(f"/api/v1/portfolios/{portfolio_id}/trades", json={
+        "instrumentType": "equity", "ticker": "AAPL", "side": "buy", "quantity": 10,
+    })
+
+    def locked(portfolio_id):
+        raise AssertionError("/performance took the portfolio lock")
+
+    monkeypatch.setattr(storage, "locked", locked)
+    resp = client.get(f"/api/v1/portfolios/{portfolio_id}/performance?period=inception")
+    assert resp.status_code == 200
+    assert resp.headers["X-Cache"] == "MISS"
+
+
+def test_performance_result_is_not_cached_if_the_book_moved(monkeypatch):
+    cache = PerformanceCache()
+    portfolio = Portfolio(client_id="c1", portfolio_name="p", investment_objective="growth", portfolio_id="p1")
+    book = _book((2, "AAPL", "buy", 10, 100.0))
+    columns = book.columns
+
+    def columns_then_append():
+        snapshot = columns()
+        book.append(Trade("p1", "equity", "AAPL", "buy", 5, price_per_unit=110.0, initiated_at=NOW))
+        return snapshot
+
+    monkeypatch.setattr(book, "columns", columns_then_append)
+    assert cache.metrics(portfolio, "1m", book, now=NOW)[1] is False
+    monkeypatch.setattr(book, "columns", columns)
+    assert cache.metrics(portfolio, "1m", book, now=NOW)[1] is False
+    assert cache.metrics(portfolio, "1m", book, now=NOW)[1] is True
+
+
+def test_performance_endpoint_uses_trade_history(client):
+    portfolio_id = client.post("/api/v1/portfolios", json={
+        "clientId": "c1", "portfolioName": "Growth", "investmentObjective": "growth", "benchmarkIndex": "SPX",
+    }).get_json()["portfolioId"]
+    data = client.get(f"/api/v1/portfolios/{portfolio_id}/performance?period=1y").get_json()
+    assert data["period"] == "1y"
+    assert data["totalReturn"] == 0
+    assert data["benchmarkReturn"] == pytest.approx(10.0, abs=0.1)
+    assert get_trade_store().get(portfolio_id) is None
+
+    resp = client.get(f"/api/v1/portfolios/{portfolio_id}/performance?period=2y")
+    assert resp.status_code == 400
+
+
+def test_performance_reflects_fill_prices_and_current_quotes(client, monkeypatch):
+    portfolio_id = client.post("/api/v1/portfolios", json={
+        "clientId": "c1", "portfolioName": "Growth", "investmentObjective": "growth",
+    }).get_json()["portfolioId"]
+    trade = {"instrumentType": "equity", "ticker": "AAPL", "side": "buy", "quantity": 10}
+    for price in (100.0, 120.0):
+        monkeypatch.setattr(pricing, "_provider", FixedPrices(AAPL=price))
+        client.post(f"/api/v1/portfolios/{portfolio_id}/trades", json=trade)
+    monkeypatch.setattr(pricing, "_provider", FixedPrices(AAPL=150.0))
+
+    # One day: 10 * (120 - 100) from the second fill plus 20 * (150 - 120) from the quote, on 2200 / 2.
+    data = client.get(f"/api/v1/portfolios/{portfolio_id}/performance?period=inception").get_json()
+    assert data["totalReturn"] == pytest.approx(800 / 1100 * 100, abs=0.01)
+    data = client.get(f"/api/v1/portfolios/{portfolio_id}/performance?period=1m").get_json()
+    assert data["totalReturn"] == pytest.approx(800 / 1100 * 100, abs=0.01)
+
+
+def test_holdings_and_performance_agree_after_an_oversell(client, monkeypatch):
+    portfolio_id = client.post("/api/v1/portfolios", json={
+        "clientId": "c1", "portfolioName": "Growth", "investmentObjective": "growth",
+    }).get_json()["portfolioId"]
+    url = f"/api/v1/portfolios/{portfolio_id}"
+    monkeypatch.setattr(pricing, "_provider", FixedPrices(AAPL=100.0))
+    for side, quantity in (("buy", 10), ("sell", 15), ("buy", 4)):
+        client.post(f"{url}/trades", json={"instrumentType": "equity", "ticker": "AAPL", "side": side,
+                                           "quantity": quantity})
+    monkeypatch.setattr(pricing, "_provider", FixedPrices(AAPL=150.0))
+
+    # The oversell closed the position rather than going 5 short, so 4 are held...
+    [holding] = client.get(f"{url}/holdings").get_json()["holdings"]
+    assert holding["quantity"] == 4
+    # ...and performance marks those 4 up by 50 on net flows of 1000 - 1000 + 400.
+    data = client.get(f"{url}/performance?period=inception").get_json()
+    assert data["totalReturn"] == pytest.approx(4 * 50 / 200 * 100, abs=0.01)
+    running = RunningPerformance()
+    for trade in get_trade_store().get(portfolio_id):
+        running.apply(trade)
+    assert running.positions == {"AAPL": 4}
+
+
+def test_numpy_is_deferred_until_first_performance_request():
+    code = (
+        "import sys, app.wsgi\n"
+        "assert 'numpy' not in sys.modules\n"
+        "client = app.wsgi.app.test_client()\n"
+        "pid = client.post('/api/v1/portfolios', json={'clientId': 'c', 'portfolioName': 'p',"
+        " 'investmentObjective': 'growth'}).get_json()['portfolioId']\n"
+        "assert client.get(f'/api/v1/portfolios/{pid}/performance').status_code == 200\n"
+        "assert 'numpy' in sys.modules\n"
+    )
+    env = {**os.environ, "STARTUP_MODE": "lazy", "STORAGE_BACKEND": "memory"}
+    subprocess.run([sys.executable, "-c", code], check=True, env=env)
@@ -0,0 +1,91 @@
+import asyncio
+import json
+
+import pytest
+
+pytest.importorskip("a2wsgi", reason="requires requirements-asgi.txt")
+
+from app.asgi import asgi_app  # noqa: E402
+
+
+@pytest.fixture
+def bridge(client):
+    return asgi_app(client.application, threads=4)
+
+
+def call(bridge, method, path, body=None, headers=(), chunk_size=None):
+    """Run one HTTP request through the ASGI app; returns ``(status, headers, body, sent messages)``."""
+    raw = json.dumps(body).encode() if body is not None else b""
+    path, _, query = path.partition("?")
+    scope = {
+        "type": "http", "http_version": "1.1", "method": method, "scheme": "http", "path": path,
+        "root_path": "", "query_string": query.encode(), "server": ("testserver", 80),
+        "client": ("127.0.0.1", 5000),
+        "headers": [
+            (b"content-type", b"application/json"), (b"content-length", str(len(raw)).encode()),
+            *((k.encode(), v.encode()) for k, v in headers),
+        ],
+    }
+    size = chunk_size or max(len(raw), 1)
+    incoming = [
+        {"type": "http.request", "body": raw[i:i + size], "more_body": i + size < len(raw)}
+        for i in range(0, max(len(raw), 1), size)
+    ]
+    sent = []
+
+    async def receive():
+        return incoming.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(bridge(scope, receive, send))
+    start = sent[0]
+    return (
+        start["status"],
+        {k.decode(): v.decode() for k, v in start["headers"]},
+        b"".join(m.get("body", b"") for m in sent[1:]),
+        sent,
+    )
+
+
+def test_routes_match_wsgi(client, bridge):
+    status, headers, body, sent = call(bridge, "POST", "/api/v1/portfolios", {
+        "clientId": "client-1", "portfolioName": "Async", "investmentObjective": "growth",
+    }, chunk_size=7)
+    assert status == 201
+    assert headers["content-type"] == "application/json"
+    assert not sent[-1].get("more_body")
+    portfolio_id = json.loads(body)["portfolioId"]
+
+    status, _, body, _ = call(bridge, "GET", f"/api/v1/portfolios/{portfolio_id}")
+    assert status == 200
+    assert json.loads(body) == client.get(f"/api/v1/portfolios/{portfolio_id}").get_json()
+
+    status, _, body, _ = call(bridge, "GET", "/api/v1/portfolios?cursor=not-a-cursor")
+    assert status == 400
+    assert json.loads(body)["error"] == "bad_request"
+
+
+def test_conditional_get_passes_headers_through(bridge):
+    _, _, body, _ = call(bridge, "POST", "/api/v1/portfolios", {
+        "clientId": "client-1", "portfolioName": "Async", "investmentObjective": "growth",
+    })
+    url = f"/api/v1/portfolios/{json.loads(body)['portfolioId']}"
+    _, headers, _, _ = call(bridge, "GET", url)
+    status, _, body, _ = call(bridge, "GET", url, headers=[("if-none-match", headers["etag"])])
+    assert status == 304
+    assert body == b""
+
+
+def test_streamed_export_is_forwarded_in_chunks(bridge):
+    for name in ("Alpha", "Beta", "Gamma"):
+        call(bridge, "POST", "/api/v1/portfolios", {
+            "clientId": "client-1", "portfolioName": name, "investmentObjective": "growth",
+        })
+    status, headers, body, sent = call(bridge, "GET", "/api/v1/export/portfolios?format=csv")
+    assert status == 200
+    assert headers["content-type"].startswith("text/csv")
+    assert len(body.decode().splitlines()) == 4
+    assert all(m["more_body"] for m in sent[1:-1])
+    assert not sent[-1].get("more_body")
@@ -0,0 +1,92 @@
+import threading
+import time
+
+import pytest
+
+from app import models
+from app.models import MemoryStorage, get_storage, set_storage
+
+THREADS = 8
+TRADES_PER_THREAD = 40
+
+
+def test_concurrent_buys_do_not_lose_updates(client, storage):
+    # A trade appended out of time order raises, so it would show up as a failed request.
+    app = client.application
+    resp = client.post("/api/v1/portfolios", json={
+        "clientId": "client-1", "portfolioName": "Contended", "investmentObjective": "growth",
+    })
+    portfolio_id = resp.get_json()["portfolioId"]
+    barrier = threading.Barrier(THREADS)
+    failures = []
+
+    def trade(n, i):
+        return {"instrumentType": "equity", "ticker": f"T{n}", "side": "buy", "quantity": 1 + i % 5}
+
+    def worker(n):
+        thread_client = app.test_client()
+        url = f"/api/v1/portfolios/{portfolio_id}/trades"
+        barrier.wait()
+        if n % 2:
+            for i in range(0, TRADES_PER_THREAD, 5):
+                r = thread_client.post(f"{url}/batch", json=[trade(n, i + k) for k in range(5)])
+                if r.status_code != 201:
+                    failures.append(r.status_code)
+            return
+        for i in range(TRADES_PER_THREAD):
+            r = thread_client.post(url, json=trade(n, i))
+            if r.status_code != 201:
+                failures.append(r.status_code)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(THREADS)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert failures == []
+    book = storage.trades.book(portfolio_id)
+    assert len(book) == THREADS * TRADES_PER_THREAD
+    timestamps = list(book.columns().timestamps)
+    assert timestamps == sorted(timestamps)
+    expected = sum(t.total_amount for t in book)
+    assert storage.portfolios.get(portfolio_id).total_value == pytest.approx(expected)
+
+    walked, cursor = [], None
+    while True:
+        query = f"?limit=37&cursor={cursor}" if cursor else "?limit=37"
+        page = client.get(f"/api/v1/portfolios/{portfolio_id}/trades{query}").get_json()
+        walked += [t["tradeId"] for t in page["trades"]]
+        cursor = page["nextCursor"]
+        if not cursor:
+            break
+    assert sorted(walked) == sorted(t.trade_id for t in book)
+    assert len(set(walked)) == len(walked)
+
+
+def test_first_requests_share_one_storage_backend(monkeypatch):
+    created = []
+
+    def slow_create(backend):
+        created.append(backend)
+        time.sleep(0.01)
+        return MemoryStorage()
+
+    monkeypatch.setattr(models, "create_storage", slow_create)
+    set_storage(None)
+    barrier = threading.Barrier(THREADS)
+    seen = []
+
+    def worker():
+        barrier.wait()
+        seen.append(get_storage())
+
+    threads = [threading.Thread(target=worker) for _ in range(THREADS)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    set_storage(None)
+
+    assert len(created) == 1
+    assert all(s is seen[0] for s in seen)
@@ -0,0 +1,49 @@
+from app.models import Portfolio
+
+TRADE = {"instrumentType": "equity", "ticker": "AAPL", "side": "buy", "quantity": 1}
+
+
+def _create_portfolio(client):
+    return client.post("/api/v1/portfolios", json={
+        "clientId": "c1", "portfolioName": "Growth", "investmentObjective": "growth",
+    }).get_json()["portfolioId"]
+
+
+def test_portfolio_etag_revalidates_until_changed(client):
+    url = f"/api/v1/portfolios/{_create_portfolio(client)}"
+    etag = client.get(url).headers["ETag"]
+
+    resp = client.get(url, headers={"If-None-Match": etag})
+    assert resp.status_code == 304
+    assert resp.get_data() == b""
+
+    client.put(url, json={"portfolioName": "Renamed"})
+    resp = client.get(url, headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+    assert resp.get_json()["portfolioName"] == "Renamed"
+
+    client.post(f"{url}/trades", json=TRADE)  # total value changes
+    assert client.get(url).headers["ETag"] not in (etag, resp.headers["ETag"])
+
+
+def test_trade_list_etag_tracks_book(client):
+    url = f"/api/v1/portfolios/{_create_portfolio(client)}/trades?limit=5"
+    etag = client.get(url).headers["ETag"]
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+    client.post(url.split("?")[0], json=TRADE)
+    resp = client.get(url, headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+    assert resp.get_json()["total"] == 1
+
+
+def test_unchanged_reads_skip_serialization(client, monkeypatch):
+    url = f"/api/v1/portfolios/{_create_portfolio(client)}"
+    calls = []
+    to_dict = Portfolio.to_dict
+    monkeypatch.setattr(Portfolio, "to_dict", lambda self: calls.append(1) or to_dict(self))
+
+    first = client.get(url)
+    second = client.get(url)
+    assert second.get_data() == first.get_data()
+    assert len(calls) == 1
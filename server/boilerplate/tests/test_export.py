@@ -0,0 +1,71 @@
+import csv
+import io
+import json
+
+import pytest
+
+from app import export
+
+
+@pytest.fixture
+def seeded(client):
+    portfolio_ids = []
+    for name in ("Alpha", "Beta"):
+        resp = client.post("/api/v1/portfolios", json={
+            "clientId": "client-1", "portfolioName": name, "investmentObjective": "growth",
+        })
+        portfolio_id = resp.get_json()["portfolioId"]
+        portfolio_ids.append(portfolio_id)
+        for quantity in range(1, 6):
+            client.post(f"/api/v1/portfolios/{portfolio_id}/trades", json={
+                "instrumentType": "equity", "ticker": "AAPL", "side": "buy", "quantity": quantity,
+            })
+    return portfolio_ids
+
+
+def _ndjson(resp):
+    return [json.loads(line) for line in resp.get_data(as_text=True).splitlines()]
+
+
+def test_export_trades_streams_all_portfolios(client, seeded):
+    resp = client.get("/api/v1/export/trades")
+    assert resp.status_code == 200
+    assert resp.is_streamed
+    assert resp.mimetype == "application/x-ndjson"
+    rows = _ndjson(resp)
+    assert len(rows) == 10
+    assert [r["portfolioId"] for r in rows] == [seeded[0]] * 5 + [seeded[1]] * 5
+
+
+def test_export_trades_csv_for_one_portfolio(client, seeded):
+    resp = client.get(f"/api/v1/export/trades?format=csv&portfolioId={seeded[1]}")
+    rows = list(csv.DictReader(io.StringIO(resp.get_data(as_text=True))))
+    assert len(rows) == 5
+    assert [float(r["quantity"]) for r in rows] == [1, 2, 3, 4, 5]
+
+
+def test_export_portfolios(client, seeded):
+    rows = _ndjson(client.get("/api/v1/export/portfolios"))
+    assert [r["portfolioId"] for r in rows] == seeded
+
+
+def test_export_rejects_unknown_format(client):
+    assert client.get("/api/v1/export/trades?format=xml").status_code == 400
+
+
+def test_export_under_lambda_truncates_and_resumes(client, seeded, monkeypatch):
+    monkeypatch.setenv("AWS_LAMBDA_FUNCTION_NAME", "advisor-portfolio-api")
+    monkeypatch.setattr(export, "LAMBDA_MAX_BYTES", 1500)
+    monkeypatch.setattr(export, "CHUNK_ROWS", 1)
+
+    rows, cursor, responses = [], None, 0
+    while True:
+        url = "/api/v1/export/trades" + (f"?cursor={cursor}" if cursor else "")
+        resp = client.get(url)
+        responses += 1
+        rows.extend(_ndjson(resp))
+        cursor = resp.headers.get("X-Export-Next-Cursor")
+        if not cursor:
+            break
+    assert responses > 1
+    assert len({r["tradeId"] for r in rows}) == len(rows) == 10
@@ -0,0 +1,69 @@
+import pytest
+
+from app import models
+from app.models import Holdings, Trade, TradeBook, get_holdings_store, rebuild_holdings
+
+
+def _trade(ticker, side, quantity, price):
+    return Trade(
+        portfolio_id="p1", instrument_type="equity", ticker=ticker, side=side, quantity=quantity,
+        price_per_unit=price,
+    )
+
+
+def test_sells_relieve_cost_at_average_and_close_positions():
+    ledger = Holdings()
+    ledger.extend([
+        _trade("AAPL", "buy", 10, 100.0),
+        _trade("AAPL", "buy", 10, 120.0),
+        _trade("AAPL", "sell", 5, 150.0),
+        _trade("MSFT", "buy", 3, 50.0),
+        _trade("MSFT", "sell", 5, 55.0),
+        _trade("TSLA", "sell", 1, 10.0),
+    ])
+    [aapl] = ledger.positions()
+    assert aapl.quantity == 15
+    assert aapl.average_cost == pytest.approx(110.0)
+    assert aapl.cost_basis == pytest.approx(1650.0)
+
+
+def test_rebuild_from_columns_matches_rebuild_from_trades(monkeypatch):
+    monkeypatch.setattr(models, "SEGMENT_SIZE", 4)
+    fills = [(["AAPL", "MSFT", "VTI"][i % 3], "sell" if i % 4 == 3 else "buy", 1 + i % 5, 100.0 + i) for i in range(30)]
+    fills[10:12] = [("MSFT", "sell", 50, 90.0), ("MSFT", "buy", 2, 95.0)]  # closes and reopens MSFT
+    trades = [_trade(*fill) for fill in fills]
+    book = TradeBook()
+    book.extend(trades)
+
+    expected, ledger = Holdings(), Holdings()
+    expected.rebuild(trades)
+    ledger.rebuild_columns(book.columns())
+    assert [p.to_dict() for p in ledger.positions()] == [p.to_dict() for p in expected.positions()]
+
+
+def test_holdings_endpoint_matches_rebuild(client):
+    portfolio_id = client.post("/api/v1/portfolios", json={
+        "clientId": "c1", "portfolioName": "Growth", "investmentObjective": "growth",
+    }).get_json()["portfolioId"]
+    url = f"/api/v1/portfolios/{portfolio_id}"
+    client.post(f"{url}/trades", json={"instrumentType": "equity", "ticker": "AAPL", "side": "buy", "quantity": 10})
+    client.post(f"{url}/trades/batch", json=[
+        {"instrumentType": "equity", "ticker": "MSFT", "side": "buy", "quantity": 4},
+        {"instrumentType": "equity", "ticker": "AAPL", "side": "sell", "quantity": 3},
+        {"instrumentType": "etf", "ticker": "VTI", "side": "buy", "quantity": 2},
+        {"instrumentType": "etf", "ticker": "VTI", "side": "sell", "quantity": 2},
+    ])
+
+    incremental = client.get(f"{url}/holdings").get_json()
+    assert [h["ticker"] for h in incremental["holdings"]] == ["AAPL", "MSFT"]
+    assert incremental["holdings"][0]["quantity"] == 7
+
+    # Simulate a lost ledger and recover it from the trade history.
+    get_holdings_store().ledger(portfolio_id).rebuild([])
+    assert client.get(f"{url}/holdings").get_json()["holdings"] == []
+    rebuild_holdings(portfolio_id)
+    assert client.get(f"{url}/holdings").get_json() == incremental
+
+
+def test_holdings_not_found(client):
+    assert client.get("/api/v1/portfolios/missing/holdings").status_code == 404
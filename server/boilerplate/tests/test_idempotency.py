@@ -0,0 +1,141 @@
+import threading
+import time
+import uuid
+
+import pytest
+
+from app import routes
+from app.idempotency import IdempotencyStore
+
+THREADS = 8
+TRADE = {"instrumentType": "equity", "ticker": "AAPL", "side": "buy", "quantity": 10}
+PORTFOLIO = {"clientId": "client-1", "portfolioName": "Growth", "investmentObjective": "growth"}
+
+
+def _key():
+    return {"Idempotency-Key": str(uuid.uuid4())}
+
+
+def _create_portfolio(client):
+    return client.post("/api/v1/portfolios", json=PORTFOLIO).get_json()["portfolioId"]
+
+
+def test_retried_trade_is_replayed_not_duplicated(client, storage):
+    portfolio_id = _create_portfolio(client)
+    url = f"/api/v1/portfolios/{portfolio_id}/trades"
+    headers = _key()
+
+    first = client.post(url, json=TRADE, headers=headers)
+    retry = client.post(url, json=TRADE, headers=headers)
+    assert first.status_code == retry.status_code == 201
+    assert retry.get_json() == first.get_json()
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert "Idempotent-Replayed" not in first.headers
+
+    assert len(storage.trades.book(portfolio_id)) == 1
+    assert storage.portfolios.get(portfolio_id).total_value == pytest.approx(first.get_json()["totalAmount"])
+
+    # Without a key, or with a new one, the same body is a new trade.
+    assert client.post(url, json=TRADE).status_code == 201
+    assert client.post(url, json=TRADE, headers=_key()).status_code == 201
+    assert len(storage.trades.book(portfolio_id)) == 3
+
+
+def test_retried_portfolio_is_replayed(client, storage):
+    headers = _key()
+    first = client.post("/api/v1/portfolios", json=PORTFOLIO, headers=headers)
+    retry = client.post("/api/v1/portfolios", json=PORTFOLIO, headers=headers)
+    assert retry.status_code == 201
+    assert retry.get_json()["portfolioId"] == first.get_json()["portfolioId"]
+    assert storage.portfolios.count(None) == 1
+
+
+def test_keys_are_scoped_to_the_path(client, storage):
+    headers = _key()
+    first, second = _create_portfolio(client), _create_portfolio(client)
+    client.post(f"/api/v1/portfolios/{first}/trades", json=TRADE, headers=headers)
+    resp = client.post(f"/api/v1/portfolios/{second}/trades", json=TRADE, headers=headers)
+    assert resp.status_code == 201
+    assert "Idempotent-Replayed" not in resp.headers
+    assert len(storage.trades.book(second)) == 1
+
+
+def test_key_reused_with_a_different_body_is_rejected(client):
+    url = f"/api/v1/portfolios/{_create_portfolio(client)}/trades"
+    headers = _key()
+    client.post(url, json=TRADE, headers=headers)
+    resp = client.post(url, json={**TRADE, "quantity": 11}, headers=headers)
+    assert resp.status_code == 422
+    assert resp.get_json()["error"] == "idempotency_key_reused"
+
+
+@pytest.mark.parametrize("key", ["", "k" * 256])
+def test_invalid_keys_are_rejected(client, key):
+    resp = client.post("/api/v1/portfolios", json=PORTFOLIO, headers={"Idempotency-Key": key})
+    assert resp.status_code == 400
+    assert resp.get_json()["error"] == "bad_request"
+
+
+def test_failed_requests_are_not_kept(client, storage):
+    url = f"/api/v1/portfolios/{_create_portfolio(client)}/trades"
+    headers = _key()
+    assert client.post(url, json={**TRADE, "side": "hold"}, headers=headers).status_code == 400
+    resp = client.post(url, json={**TRADE, "side": "hold"}, headers=headers)
+    assert resp.status_code == 400
+    assert "Idempotent-Replayed" not in resp.headers
+
+
+def test_concurrent_retries_are_coalesced(client, storage, monkeypatch):
+    app = client.application
+    portfolio_id = _create_portfolio(client)
+    url = f"/api/v1/portfolios/{portfolio_id}/trades"
+    headers = _key()
+    build_trade = routes._build_trade
+    calls = []
+
+    def slow_build_trade(*args, **kwargs):
+        calls.append(1)
+        time.sleep(0.05)
+        return build_trade(*args, **kwargs)
+
+    monkeypatch.setattr(routes, "_build_trade", slow_build_trade)
+    barrier = threading.Barrier(THREADS)
+    responses = []
+
+    def worker():
+        thread_client = app.test_client()
+        barrier.wait()
+        resp = thread_client.post(url, json=TRADE, headers=headers)
+        responses.append((resp.status_code, resp.get_json()["tradeId"]))
+
+    threads = [threading.Thread(target=worker) for _ in range(THREADS)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert len(set(responses)) == 1
+    assert responses[0][0] == 201
+    assert len(storage.trades.book(portfolio_id)) == 1
+
+
+def test_store_expires_evicts_and_times_out():
+    now = [0.0]
+    store = IdempotencyStore(maxsize=2, ttl=10, wait_timeout=0, clock=lambda: now[0])
+    for key in ("a", "b", "c"):
+        _, flight = store.begin(key, b"body")
+        store.finish(key, flight, 201, key.encode(), "application/json")
+    assert store.stats()["evictions"] == 1
+    assert store.begin("a", b"body")[1] is not None  # evicted, so "a" is new again
+
+    response, _ = store.begin("c", b"body")
+    assert response.body == b"c"
+    now[0] = 11
+    _, flight = store.begin("c", b"body")
+    assert flight is not None  # expired
+
+    # "a" and "c" are still in flight: a concurrent request gives up after wait_timeout.
+    assert store.begin("c", b"body") == (None, None)
+    store.finish("c", flight, 500, b"", None)
+    assert store.begin("c", b"body")[1] is not None
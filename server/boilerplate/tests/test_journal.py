@@ -0,0 +1,193 @@
+import os
+import threading
+import time
+
+import pytest
+
+from app import create_app, journal
+from app.journal import JournalError, JournalStorage
+from app.models import portfolio_row, set_storage, trade_row
+
+
+@pytest.fixture
+def journal_dir(tmp_path):
+    return str(tmp_path / "journal")
+
+
+@pytest.fixture
+def open_storage(journal_dir):
+    opened = []
+
+    def open_(**kwargs):
+        backend = JournalStorage(journal_dir, fsync=False, **kwargs)
+        opened.append(backend)
+        set_storage(backend)
+        return backend, create_app().test_client()
+
+    yield open_
+    set_storage(None)
+    for backend in opened:
+        backend.close()
+
+
+def _seed(client):
+    ids = []
+    for name in ("Alpha", "Beta"):
+        portfolio_id = client.post("/api/v1/portfolios", json={
+            "clientId": "client-1", "portfolioName": name, "investmentObjective": "growth",
+        }).get_json()["portfolioId"]
+        ids.append(portfolio_id)
+        client.post(f"/api/v1/portfolios/{portfolio_id}/trades", json={
+            "instrumentType": "equity", "ticker": "AAPL", "side": "buy", "quantity": 10,
+        })
+        client.post(f"/api/v1/portfolios/{portfolio_id}/trades/batch", json=[
+            {"instrumentType": "etf", "ticker": "SPY", "side": "buy", "quantity": 3},
+            {"instrumentType": "equity", "ticker": "AAPL", "side": "sell", "quantity": 4},
+        ])
+    client.put(f"/api/v1/portfolios/{ids[1]}", json={"status": "suspended", "portfolioName": "Beta 2"})
+    return ids
+
+
+def _state(client, ids):
+    state = {"list": client.get("/api/v1/portfolios?limit=100").get_json()}
+    for portfolio_id in ids:
+        resp = client.get(f"/api/v1/portfolios/{portfolio_id}")
+        state[portfolio_id] = (
+            resp.get_json(),
+            resp.headers["ETag"],
+            client.get(f"/api/v1/portfolios/{portfolio_id}/trades?limit=100").get_json(),
+            client.get(f"/api/v1/portfolios/{portfolio_id}/holdings").get_json(),
+        )
+    return state
+
+
+def _segments(journal_dir):
+    return sorted(name for name in os.listdir(journal_dir) if name.startswith("journal-"))
+
+
+def test_restart_replays_the_journal(open_storage):
+    backend, client = open_storage()
+    ids = _seed(client)
+    before = _state(client, ids)
+    backend.close()
+
+    backend, client = open_storage()
+    assert _state(client, ids) == before
+    # 2 creates, then per portfolio 3 trades and 2 total updates, and one PUT.
+    assert backend.replay_stats["journalRecords"] == 2 + 2 * 5 + 1
+
+
+def test_snapshot_bounds_replay_to_the_tail(open_storage, journal_dir):
+    backend, client = open_storage()
+    ids = _seed(client)
+    generation = backend.snapshot()
+    client.post(f"/api/v1/portfolios/{ids[0]}/trades", json={
+        "instrumentType": "equity", "ticker": "MSFT", "side": "buy", "quantity": 1,
+    })
+    before = _state(client, ids)
+    backend.close()
+    assert _segments(journal_dir) == [f"journal-{generation:08d}.ndjson"]
+
+    backend, client = open_storage()
+    assert _state(client, ids) == before
+    assert backend.replay_stats["snapshotGeneration"] == generation
+    assert backend.replay_stats["snapshotRecords"] == 2 + 6
+    assert backend.replay_stats["journalRecords"] == 2
+
+
+def test_records_written_during_a_snapshot_replay_idempotently(open_storage):
+    backend, client = open_storage()
+    ids = _seed(client)
+    before = _state(client, ids)
+    # As if these lines landed in the new segment after the snapshot had read the stores.
+    tail = [("p", portfolio_row(p)) for p in backend.portfolios.values()]
+    tail += [("t", trade_row(t)) for _, book in backend.trades.items() for t in book]
+    backend.snapshot()
+    backend.journal.append(tail)
+    backend.close()
+
+    _, client = open_storage()
+    assert _state(client, ids) == before
+
+
+def test_torn_final_line_is_dropped(open_storage, journal_dir):
+    backend, client = open_storage()
+    ids = _seed(client)
+    before = _state(client, ids)
+    backend.close()
+    path = os.path.join(journal_dir, _segments(journal_dir)[-1])
+    size = os.path.getsize(path)
+    with open(path, "ab") as f:
+        f.write(b'[["t",["torn-trade","')
+
+    _, client = open_storage()
+    assert _state(client, ids) == before
+    assert os.path.getsize(path) == size
+
+
+def test_corrupt_record_before_the_end_fails_loudly(open_storage, journal_dir):
+    backend, client = open_storage()
+    _seed(client)
+    backend.close()
+    path = os.path.join(journal_dir, _segments(journal_dir)[-1])
+    with open(path, "rb") as f:
+        lines = f.readlines()
+    lines[1] = b"not json\n"
+    with open(path, "wb") as f:
+        f.writelines(lines)
+
+    with pytest.raises(JournalError, match="corrupt record"):
+        open_storage()
+
+
+def test_directory_belongs_to_one_process(open_storage, journal_dir):
+    open_storage()
+    with pytest.raises(JournalError, match="in use"):
+        JournalStorage(journal_dir)
+
+
+def test_group_commit_shares_fsyncs(journal_dir, monkeypatch):
+    real_fsync = os.fsync
+
+    def slow_fsync(fd):
+        time.sleep(0.002)
+        real_fsync(fd)
+
+    monkeypatch.setattr(journal.os, "fsync", slow_fsync)
+    backend = JournalStorage(journal_dir, fsync=True)
+    barrier = threading.Barrier(16)
+
+    def writer(n):
+        barrier.wait()
+        for i in range(20):
+            backend.journal.append([["x", n, i]])
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(16)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    stats = backend.journal.stats()
+    backend.close()
+
+    assert stats["appends"] == 320
+    assert stats["commits"] < stats["appends"] / 2
+
+
+def test_large_segment_triggers_a_background_snapshot(open_storage, journal_dir):
+    backend, client = open_storage(snapshot_bytes=2048)
+    ids = _seed(client)
+    for _ in range(10):
+        client.post(f"/api/v1/portfolios/{ids[0]}/trades", json={
+            "instrumentType": "equity", "ticker": "AAPL", "side": "buy", "quantity": 1,
+        })
+    deadline = time.monotonic() + 5
+    while not any(n.startswith("snapshot-") for n in os.listdir(journal_dir)) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    with backend._snapshot_started:
+        before = _state(client, ids)
+    backend.close()
+
+    backend, client = open_storage()
+    assert backend.replay_stats["snapshotGeneration"] > 0
+    assert _state(client, ids) == before
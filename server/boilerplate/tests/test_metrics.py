@@ -0,0 +1,40 @@
+import json
+
+from app import create_app
+from app.metrics import registry
+
+
+def _create_portfolio(client):
+    return client.post("/api/v1/portfolios", json={
+        "clientId": "c1", "portfolioName": "Growth", "investmentObjective": "growth",
+    })
+
+
+def test_metrics_exposes_counts_latency_and_phases(client):
+    registry.reset()
+    _create_portfolio(client)
+    client.post("/api/v1/portfolios", json={"clientId": "c1"})
+
+    resp = client.get("/metrics")
+    assert resp.status_code == 200
+    assert resp.content_type.startswith("text/plain; version=0.0.4")
+    body = resp.get_data(as_text=True)
+    assert 'http_requests_total{endpoint="api.initiate_portfolio",method="POST",status="201"} 1' in body
+    assert 'http_requests_total{endpoint="api.initiate_portfolio",method="POST",status="400"} 1' in body
+    assert 'http_request_duration_seconds_count{endpoint="api.initiate_portfolio",method="POST"} 2' in body
+    for name in ("parse", "validate", "store", "serialize"):
+        assert f'http_request_phase_seconds_count{{endpoint="api.initiate_portfolio",phase="{name}"}}' in body
+    assert "http_requests_in_flight 1" in body  # the /metrics request itself
+
+
+def test_emf_lines_under_lambda(storage, monkeypatch, capsys):
+    monkeypatch.setenv("AWS_LAMBDA_FUNCTION_NAME", "portfolio-api")
+    client = create_app().test_client()
+    _create_portfolio(client)
+
+    [line] = [line for line in capsys.readouterr().out.splitlines() if line.startswith("{")]
+    record = json.loads(line)
+    assert record["endpoint"] == "api.initiate_portfolio"
+    assert record["status"] == 201
+    metric_names = {m["Name"] for m in record["_aws"]["CloudWatchMetrics"][0]["Metrics"]}
+    assert {"Latency", "ValidateLatency", "StoreLatency"} <= metric_names
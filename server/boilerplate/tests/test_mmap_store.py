@@ -0,0 +1,190 @@
+import json
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app import create_app
+from app.mmap_store import MappedSnapshot, MappedStorage, SnapshotError, main, write_snapshot
+from app.models import MemoryStorage, Portfolio, Trade, set_storage
+from app.sqlite_store import SQLiteStorage
+
+START = datetime(2024, 5, 1, 14, 30, tzinfo=timezone.utc)
+
+
+def _dicts(trades):
+    return [t.to_dict() for t in trades]
+
+
+def _fill(storage, n=300, portfolios=4, seed=3):
+    """Portfolios and trades over them in time order, with holdings; returns the portfolio ids."""
+    rng = random.Random(seed)
+    ids = []
+    for k in range(portfolios):
+        portfolio = Portfolio(client_id=f"client-{k % 2}", portfolio_name=f"P{k}", investment_objective="growth")
+        storage.portfolios.add(portfolio)
+        ids.append(portfolio.portfolio_id)
+    for i in range(n):
+        at = START + timedelta(minutes=i // 3)  # runs of equal timestamps
+        trade = Trade(
+            portfolio_id=rng.choice(ids), instrument_type=rng.choice(["equity", "etf"]),
+            ticker=rng.choice(["AAPL", "MSFT", "VTI"]), side=rng.choice(["buy", "sell"]), quantity=float(1 + i % 9),
+            order_type="limit" if i % 4 == 0 else "market", limit_price=99.5 if i % 4 == 0 else None,
+            price_per_unit=100.0 + i / 8, status=rng.choice(["pending", "executed", "held"]), initiated_at=at,
+            executed_at=at + timedelta(seconds=5) if i % 3 else None,
+        )
+        storage.trades.book(trade.portfolio_id).append(trade)
+        storage.holdings.ledger(trade.portfolio_id).apply(trade)
+    return ids
+
+
+@pytest.fixture
+def stores(tmp_path):
+    """The same data in a memory store and in a mapped snapshot of it."""
+    memory = MemoryStorage()
+    ids = _fill(memory)
+    write_snapshot(memory, str(tmp_path / "portfolios.snap"))
+    return memory, MappedStorage(str(tmp_path / "portfolios.snap")), ids
+
+
+def _assert_books_match(memory, mapped, portfolio_id):
+    plain, book = memory.trades.book(portfolio_id), mapped.trades.book(portfolio_id)
+    assert len(book) == len(plain)
+    assert _dicts(book) == _dicts(plain)
+    for status in (None, "pending", "held", "settled"):
+        assert book.count(status) == plain.count(status)
+        for offset in (0, 5, 40, 500):
+            assert _dicts(book.page(status, offset, 7)) == _dicts(plain.page(status, offset, 7))
+    for trade in list(plain)[::11]:
+        key = (trade.initiated_at, trade.trade_id)
+        for status in (None, "held"):
+            page, more = book.page_after(key, status, 6)
+            expected, expected_more = plain.page_after(key, status, 6)
+            assert (_dicts(page), more) == (_dicts(expected), expected_more)
+        assert _dicts(book.iter_ordered(after=key)) == _dicts(plain.iter_ordered(after=key))
+        assert _dicts(book.iter_newest(before=key)) == _dicts(plain.iter_newest(before=key))
+        assert book.get(trade.trade_id).to_dict() == trade.to_dict()
+    columns, expected = book.columns(), plain.columns()
+    assert list(columns.timestamps) == list(expected.timestamps)
+    assert [columns.tickers[c] for c in columns.ticker_codes] == [expected.tickers[c] for c in expected.ticker_codes]
+    assert list(columns.quantities) == list(expected.quantities)
+    assert [p.to_dict() for p in mapped.holdings.ledger(portfolio_id).positions()] == [
+        p.to_dict() for p in memory.holdings.ledger(portfolio_id).positions()]
+
+
+def _walk(store, **filters):
+    seen, after = [], None
+    while True:
+        page, more = store.query(after=after, limit=13, **filters)
+        seen += page
+        if not more:
+            return seen
+        after = (page[-1].initiated_at, page[-1].trade_id)
+
+
+def _queries(ids):
+    return [
+        {},
+        {"ticker": "AAPL"},
+        {"ticker": "NVDA"},
+        {"ticker": "MSFT", "side": "sell", "status": "held"},
+        {"since": START + timedelta(minutes=20), "until": START + timedelta(minutes=70)},
+        {"portfolio_ids": ids[:2], "ticker": "VTI"},
+        {"portfolio_ids": ids[:2], "status": "pending"},
+        {"status": "settled"},
+    ]
+
+
+def test_mapped_books_read_like_memory_books(stores):
+    memory, mapped, ids = stores
+    assert [p.portfolio_id for p in mapped.portfolios.page(limit=10)] == [
+        p.portfolio_id for p in memory.portfolios.page(limit=10)]
+    for portfolio_id in ids:
+        _assert_books_match(memory, mapped, portfolio_id)
+    assert mapped.trades.book(ids[0]).get("missing") is None
+    assert mapped.trades.get("nobody") is None
+    # With no delta, a book's columns are read in place from the mapping.
+    assert isinstance(mapped.trades.book(ids[0]).columns().timestamps, memoryview)
+    for filters in _queries(ids):
+        assert _dicts(_walk(mapped.trades, **filters)) == _dicts(_walk(memory.trades, **filters)), filters
+
+
+def test_new_trades_layer_over_the_snapshot(stores):
+    memory, mapped, ids = stores
+    for i in range(40):
+        trade = Trade(
+            portfolio_id=ids[i % 3], instrument_type="equity", ticker=["AAPL", "NVDA"][i % 2], side="buy",
+            quantity=2.0, price_per_unit=50.0, initiated_at=START + timedelta(hours=3, minutes=i // 2),
+        )
+        for storage in (memory, mapped):
+            storage.trades.book(trade.portfolio_id).append(trade)
+            storage.holdings.ledger(trade.portfolio_id).apply(trade)
+    for portfolio_id in ids:
+        _assert_books_match(memory, mapped, portfolio_id)
+    for filters in _queries(ids):
+        assert _dicts(_walk(mapped.trades, **filters)) == _dicts(_walk(memory.trades, **filters)), filters
+
+
+def test_writes_stay_in_their_process(tmp_path):
+    memory = MemoryStorage()
+    ids = _fill(memory, n=30, portfolios=2)
+    path = str(tmp_path / "portfolios.snap")
+    write_snapshot(memory, path)
+    first, second = MappedStorage(path), MappedStorage(path)
+
+    trade = Trade(portfolio_id=ids[0], instrument_type="equity", ticker="AAPL", side="buy", quantity=1.0,
+                  price_per_unit=10.0, initiated_at=START + timedelta(days=1))
+    first.trades.book(ids[0]).append(trade)
+    first.portfolios.update(first.portfolios.get(ids[0]), portfolio_name="Renamed")
+    assert first.trades.book(ids[0]).get(trade.trade_id) is not None
+    assert second.trades.book(ids[0]).get(trade.trade_id) is None
+    assert second.portfolios.get(ids[0]).portfolio_name == "P0"
+
+    first.reset()
+    assert len(first.portfolios) == 0 and first.trades.get(ids[0]) is None
+    assert len(second.trades.book(ids[0])) == len(memory.trades.book(ids[0]))
+
+
+def test_snapshot_keeps_non_uuid_ids(tmp_path):
+    memory = MemoryStorage()
+    ids = _fill(memory, n=20, portfolios=1)
+    legacy = Trade(portfolio_id=ids[0], instrument_type="equity", ticker="AAPL", side="sell", quantity=1.0,
+                   price_per_unit=10.0, trade_id="legacy-0042", initiated_at=START + timedelta(days=1))
+    memory.trades.book(ids[0]).append(legacy)
+    write_snapshot(memory, str(tmp_path / "portfolios.snap"))
+    mapped = MappedStorage(str(tmp_path / "portfolios.snap"))
+
+    assert mapped.trades.book(ids[0]).get("legacy-0042").to_dict() == legacy.to_dict()
+    _assert_books_match(memory, mapped, ids[0])
+
+
+def test_api_serves_a_snapshot_built_by_the_command(tmp_path, monkeypatch, capsys):
+    sqlite = SQLiteStorage(str(tmp_path / "portfolios.db"))
+    ids = _fill(sqlite, n=60, portfolios=2)
+    monkeypatch.setenv("SQLITE_PATH", str(tmp_path / "portfolios.db"))
+    main(["build", str(tmp_path / "portfolios.snap"), "--backend", "sqlite"])
+    assert json.loads(capsys.readouterr().out)["trades"] == 60
+
+    set_storage(MappedStorage(str(tmp_path / "portfolios.snap")))
+    try:
+        client = create_app().test_client()
+        listed = client.get(f"/api/v1/portfolios/{ids[0]}/trades?limit=100").get_json()
+        assert _dicts(sqlite.trades.book(ids[0]).page(limit=100)) == listed["trades"]
+        assert client.get(f"/api/v1/portfolios/{ids[0]}/performance?period=1m").status_code == 200
+        resp = client.post(f"/api/v1/portfolios/{ids[0]}/trades", json={
+            "instrumentType": "equity", "ticker": "AAPL", "side": "buy", "quantity": 1,
+        })
+        assert resp.status_code == 201
+        assert client.get(f"/api/v1/trades?portfolioId={ids[0]}&limit=1").get_json()["trades"][0] == resp.get_json()
+    finally:
+        set_storage(None)
+
+
+def test_rejects_files_that_are_not_snapshots(tmp_path):
+    path = tmp_path / "portfolios.snap"
+    path.write_bytes(b"")
+    with pytest.raises(SnapshotError):
+        MappedSnapshot.open(str(path))
+    path.write_bytes(b"NOTASNAP" + bytes(64))
+    with pytest.raises(SnapshotError):
+        MappedSnapshot.open(str(path))
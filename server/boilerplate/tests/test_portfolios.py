@@ -0,0 +1,65 @@
+from datetime import datetime, timedelta, timezone
+
+from app.models import Portfolio, get_portfolio_store
+
+
+def _seed(count, status="active"):
+    store = get_portfolio_store()
+    base = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    portfolios = []
+    for i in range(count):
+        p = Portfolio(
+            client_id="client-1",
+            portfolio_name=f"Portfolio {i}",
+            investment_objective="growth",
+            status=status,
+            created_at=base + timedelta(minutes=i),
+        )
+        store.add(p)
+        portfolios.append(p)
+    return portfolios
+
+
+def test_list_portfolios_newest_first_with_offset(client):
+    seeded = _seed(5)
+    resp = client.get("/api/v1/portfolios?limit=2&offset=1")
+    data = resp.get_json()
+    assert data["total"] == 5
+    assert [p["portfolioId"] for p in data["portfolios"]] == [
+        seeded[3].portfolio_id, seeded[2].portfolio_id,
+    ]
+
+
+def test_list_portfolios_status_index_follows_updates(client):
+    seeded = _seed(3)
+    resp = client.put(
+        f"/api/v1/portfolios/{seeded[1].portfolio_id}",
+        json={"portfolioName": "Renamed", "status": "suspended"},
+    )
+    assert resp.status_code == 200
+
+    suspended = client.get("/api/v1/portfolios?status=suspended").get_json()
+    assert suspended["total"] == 1
+    assert suspended["portfolios"][0]["portfolioName"] == "Renamed"
+
+    active = client.get("/api/v1/portfolios?status=active").get_json()
+    assert active["total"] == 2
+    assert seeded[1].portfolio_id not in [p["portfolioId"] for p in active["portfolios"]]
+
+
+def test_offset_past_end_returns_empty_page(client):
+    _seed(2)
+    data = client.get("/api/v1/portfolios?offset=10").get_json()
+    assert data["portfolios"] == []
+    assert data["total"] == 2
+
+
+def test_list_portfolios_cursor_pages_by_status(client):
+    seeded = _seed(5)
+    _seed(2, status="closed")
+    first = client.get("/api/v1/portfolios?status=active&limit=3").get_json()
+    assert first["nextCursor"]
+    second = client.get(f"/api/v1/portfolios?status=active&limit=3&cursor={first['nextCursor']}").get_json()
+    assert second["nextCursor"] is None
+    ids = [p["portfolioId"] for p in first["portfolios"] + second["portfolios"]]
+    assert ids == [p.portfolio_id for p in reversed(seeded)]
@@ -0,0 +1,44 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from app.pricing import PriceProvider, QuoteTable, fallback_price
+
+
+def test_quote_table_prices_from_snapshot_with_stable_fallback(tmp_path):
+    path = tmp_path / "quotes.csv"
+    path.write_text("ticker,price\nAAPL,227.52\n")
+    table = QuoteTable(str(path))
+    prices = table.get_prices(["AAPL", "aapl", "ZZZZ"])
+    assert prices == {"AAPL": 227.52, "aapl": 227.52, "ZZZZ": fallback_price("ZZZZ")}
+
+    # The fallback must not depend on per-process hash randomization.
+    code = "from app.pricing import fallback_price; print(fallback_price('ZZZZ'))"
+    for seed in ("1", "2"):
+        out = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, check=True,
+            env={**os.environ, "PYTHONHASHSEED": seed},
+        ).stdout
+        assert float(out) == fallback_price("ZZZZ")
+
+
+def test_price_provider_requires_get_prices():
+    class Incomplete(PriceProvider):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_batch_trades_use_snapshot_prices(client):
+    portfolio_id = client.post("/api/v1/portfolios", json={
+        "clientId": "c1", "portfolioName": "Growth", "investmentObjective": "growth",
+    }).get_json()["portfolioId"]
+    resp = client.post(f"/api/v1/portfolios/{portfolio_id}/trades/batch", json=[
+        {"instrumentType": "equity", "ticker": "AAPL", "side": "buy", "quantity": 1},
+        {"instrumentType": "equity", "ticker": "AAPL", "side": "buy", "quantity": 2},
+    ])
+    prices = [result["trade"]["pricePerUnit"] for result in resp.get_json()["results"]]
+    assert prices == [QuoteTable().get_price("AAPL")] * 2
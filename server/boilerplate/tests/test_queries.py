@@ -0,0 +1,245 @@
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app import models, routes
+from app.models import Trade, TradeStore
+
+
+def _portfolio(client, client_id, name="Growth"):
+    resp = client.post("/api/v1/portfolios", json={
+        "clientId": client_id, "portfolioName": name, "investmentObjective": "growth",
+    })
+    return resp.get_json()
+
+
+def _trade(client, portfolio_id, ticker, side="buy", quantity=1):
+    resp = client.post(f"/api/v1/portfolios/{portfolio_id}/trades", json={
+        "instrumentType": "equity", "ticker": ticker, "side": side, "quantity": quantity,
+    })
+    assert resp.status_code == 201
+    return resp.get_json()
+
+
+@pytest.fixture
+def firm(client):
+    """Three portfolios over two clients, with interleaved trades (oldest first)."""
+    a1 = _portfolio(client, "client-a", "A1")
+    a2 = _portfolio(client, "client-a", "A2")
+    b1 = _portfolio(client, "client-b", "B1")
+    trades = []
+    for portfolio, ticker, side in [
+        (a1, "AAPL", "buy"), (b1, "AAPL", "buy"), (a2, "MSFT", "buy"), (a1, "AAPL", "sell"),
+        (b1, "MSFT", "buy"), (b1, "AAPL", "sell"), (a2, "AAPL", "sell"), (a1, "NVDA", "buy"),
+    ]:
+        trades.append(_trade(client, portfolio["portfolioId"], ticker, side))
+    return {"a1": a1, "a2": a2, "b1": b1, "trades": trades}
+
+
+def _ids(trades):
+    return [t["tradeId"] for t in trades]
+
+
+def _search(client, **params):
+    resp = client.get("/api/v1/trades", query_string=params)
+    assert resp.status_code == 200, resp.get_json()
+    return resp.get_json()
+
+
+def test_list_portfolios_by_client_and_advisor(client, firm):
+    data = client.get("/api/v1/portfolios?clientId=client-a").get_json()
+    assert data["total"] == 2
+    assert [p["portfolioName"] for p in data["portfolios"]] == ["A2", "A1"]
+
+    advisor = firm["b1"]["advisorId"]
+    data = client.get(f"/api/v1/portfolios?advisorId={advisor}").get_json()
+    assert [p["portfolioId"] for p in data["portfolios"]] == [firm["b1"]["portfolioId"]]
+
+    client.put(f"/api/v1/portfolios/{firm['a1']['portfolioId']}", json={"portfolioName": "A1", "status": "closed"})
+    data = client.get("/api/v1/portfolios?clientId=client-a&status=closed").get_json()
+    assert data["total"] == 1
+    assert data["portfolios"][0]["portfolioName"] == "A1"
+    assert client.get("/api/v1/portfolios?clientId=nobody").get_json()["total"] == 0
+
+
+def test_list_portfolios_by_client_cursor_pages(client):
+    names = [_portfolio(client, "client-c", f"C{n}")["portfolioName"] for n in range(5)]
+    _portfolio(client, "client-d")
+    seen = []
+    data = client.get("/api/v1/portfolios?clientId=client-c&limit=2").get_json()
+    seen += [p["portfolioName"] for p in data["portfolios"]]
+    while data["nextCursor"]:
+        data = client.get(f"/api/v1/portfolios?clientId=client-c&limit=2&cursor={data['nextCursor']}").get_json()
+        seen += [p["portfolioName"] for p in data["portfolios"]]
+    assert seen == names[::-1]
+
+
+def test_search_trades_across_portfolios(client, firm):
+    trades = firm["trades"]
+    assert _ids(_search(client)["trades"]) == _ids(trades[::-1])
+    aapl = [trades[6], trades[5], trades[3], trades[1], trades[0]]
+    assert _ids(_search(client, ticker="AAPL")["trades"]) == _ids(aapl)
+    assert _ids(_search(client, ticker="AAPL", side="sell")["trades"]) == _ids([trades[6], trades[5], trades[3]])
+    assert _search(client, ticker="TSLA") == {"trades": [], "limit": 20, "nextCursor": None}
+
+
+def test_search_trades_by_client_advisor_and_portfolio(client, firm):
+    trades = firm["trades"]
+    by_client = _search(client, clientId="client-a")["trades"]
+    assert _ids(by_client) == _ids([trades[7], trades[6], trades[3], trades[2], trades[0]])
+    assert _ids(_search(client, clientId="client-a", ticker="AAPL", side="sell")["trades"]) == _ids(
+        [trades[6], trades[3]])
+
+    advisor = firm["b1"]["advisorId"]
+    assert _ids(_search(client, advisorId=advisor)["trades"]) == _ids([trades[5], trades[4], trades[1]])
+
+    a2 = firm["a2"]["portfolioId"]
+    assert _ids(_search(client, portfolioId=a2)["trades"]) == _ids([trades[6], trades[2]])
+    assert _ids(_search(client, portfolioId=a2, clientId="client-a")["trades"]) == _ids([trades[6], trades[2]])
+    assert _search(client, portfolioId=a2, clientId="client-b")["trades"] == []
+    assert _search(client, clientId="nobody")["trades"] == []
+
+
+def test_search_trades_time_range(client, firm):
+    trades = firm["trades"]
+    since = trades[3]["initiatedAt"]
+    until = trades[6]["initiatedAt"]
+    data = _search(client, since=since, until=until)
+    # since is inclusive, until exclusive.
+    assert _ids(data["trades"]) == _ids([trades[5], trades[4], trades[3]])
+    assert _ids(_search(client, since=since, until=until, ticker="AAPL")["trades"]) == _ids([trades[5], trades[3]])
+
+    later = (datetime.fromisoformat(trades[-1]["initiatedAt"]) + timedelta(hours=2)).isoformat()
+    assert _search(client, since=later)["trades"] == []
+    earlier = (datetime.fromisoformat(trades[0]["initiatedAt"]) - timedelta(days=1)).isoformat()
+    assert len(_search(client, since=earlier, clientId="client-a")["trades"]) == 5
+
+
+def test_search_trades_cursor_walks_every_match_once(client, firm):
+    expected = _ids(t for t in firm["trades"][::-1] if t["ticker"] == "AAPL")
+    seen = []
+    data = _search(client, ticker="AAPL", limit=2)
+    seen += _ids(data["trades"])
+    while data["nextCursor"]:
+        # Newer trades must not shift the pages still to come.
+        _trade(client, firm["a1"]["portfolioId"], "AAPL")
+        data = _search(client, ticker="AAPL", limit=2, cursor=data["nextCursor"])
+        seen += _ids(data["trades"])
+    assert seen == expected
+
+    seen = []
+    data = _search(client, clientId="client-a", limit=3)
+    seen += _ids(data["trades"])
+    while data["nextCursor"]:
+        data = _search(client, clientId="client-a", limit=3, cursor=data["nextCursor"])
+        seen += _ids(data["trades"])
+    # Client A's five trades, plus the two AAPL buys made during the first walk.
+    assert len(seen) == len(set(seen)) == 5 + 2
+
+
+def _walk(client, url):
+    data = client.get(url).get_json()
+    seen = _ids(data["trades"])
+    while data["nextCursor"]:
+        data = client.get(f"{url}&cursor={data['nextCursor']}").get_json()
+        seen += _ids(data["trades"])
+    return seen
+
+
+def test_cursor_walks_trades_sharing_a_timestamp(client, monkeypatch):
+    monkeypatch.setattr(models, "SEGMENT_SIZE", 16)
+    monkeypatch.setattr(models, "HOT_TRADES", 0)
+
+    class Frozen(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return datetime(2025, 1, 2, 3, 4, 5, tzinfo=tz)
+
+    monkeypatch.setattr(routes, "datetime", Frozen)
+    ids = {}
+    for name in ("T1", "T2"):
+        portfolio_id = _portfolio(client, "client-t", name)["portfolioId"]
+        resp = client.post(f"/api/v1/portfolios/{portfolio_id}/trades/batch", json=[
+            {"instrumentType": "equity", "ticker": ("AAPL", "MSFT")[i % 2], "side": "buy", "quantity": 1}
+            for i in range(150)
+        ])
+        assert resp.status_code == 201
+        ids[portfolio_id] = [r["trade"]["tradeId"] for r in resp.get_json()["results"]]
+
+    every = [trade_id for batch in ids.values() for trade_id in batch]
+    for portfolio_id, batch in ids.items():
+        for url in (f"/api/v1/trades?portfolioId={portfolio_id}&limit=7",
+                    f"/api/v1/portfolios/{portfolio_id}/trades?limit=7"):
+            seen = _walk(client, url)
+            assert len(seen) == len(set(seen)) and set(seen) == set(batch), url
+    seen = _walk(client, "/api/v1/trades?clientId=client-t&limit=7")
+    assert len(seen) == len(set(seen)) and set(seen) == set(every)
+    seen = _walk(client, "/api/v1/trades?ticker=AAPL&limit=7")
+    assert len(seen) == len(set(seen)) and set(seen) == set(every[0::2])
+
+
+@pytest.mark.parametrize("query, field", [
+    ("side=hold", "side"),
+    ("status=done", "status"),
+    ("since=yesterday", "since"),
+    ("since=2024-01-02T00:00:00Z&until=2024-01-01T00:00:00Z", "until"),
+])
+def test_search_trades_rejects_bad_filters(client, query, field):
+    resp = client.get(f"/api/v1/trades?{query}")
+    assert resp.status_code == 400
+    body = resp.get_json()
+    assert body["error"] == "validation_error"
+    assert field in body["details"]
+
+
+def test_search_trades_rejects_bad_cursor(client):
+    resp = client.get("/api/v1/trades?cursor=not-a-cursor")
+    assert resp.status_code == 400
+    assert resp.get_json()["error"] == "bad_request"
+
+
+def test_trade_index_matches_a_full_scan_across_hour_buckets():
+    rng = random.Random(7)
+    start = datetime(2024, 3, 1, tzinfo=timezone.utc)
+    store = TradeStore()
+    trades = []
+    for n in range(600):
+        # Books stay in time order; across books, arrival order is shuffled.
+        at = start + timedelta(minutes=n * 7 + rng.randrange(5))
+        trades.append(Trade(
+            portfolio_id=f"p{n % 6}", instrument_type="equity", ticker=rng.choice(["AAPL", "MSFT", "SPY"]),
+            side=rng.choice(["buy", "sell"]), quantity=1, price_per_unit=10.0, initiated_at=at,
+        ))
+    for portfolio_id in sorted({t.portfolio_id for t in trades}, key=lambda _: rng.random()):
+        for trade in trades:
+            if trade.portfolio_id == portfolio_id:
+                store.book(portfolio_id).append(trade)
+
+    newest_first = sorted(trades, key=lambda t: (t.initiated_at, t.trade_id), reverse=True)
+    for filters in [
+        {},
+        {"ticker": "AAPL"},
+        {"ticker": "MSFT", "side": "sell"},
+        {"since": start + timedelta(hours=5, minutes=30), "until": start + timedelta(hours=19)},
+        {"ticker": "SPY", "since": start + timedelta(hours=40)},
+        {"portfolio_ids": ["p1", "p4"], "until": start + timedelta(hours=50)},
+        {"portfolio_ids": ["p2"], "ticker": "AAPL", "side": "buy"},
+    ]:
+        expected = [t for t in newest_first if _matches(t, **filters)]
+        seen, after = [], None
+        while True:
+            page, has_more = store.query(after=after, limit=17, **filters)
+            seen += page
+            if not has_more:
+                break
+            after = (page[-1].initiated_at, page[-1].trade_id)
+        assert [t.trade_id for t in seen] == [t.trade_id for t in expected], filters
+
+
+def _matches(trade, ticker=None, side=None, since=None, until=None, portfolio_ids=None):
+    return ((ticker is None or trade.ticker == ticker)
+            and (side is None or trade.side == side)
+            and (since is None or trade.initiated_at >= since)
+            and (until is None or trade.initiated_at < until)
+            and (portfolio_ids is None or trade.portfolio_id in portfolio_ids))
@@ -0,0 +1,218 @@
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app import models
+from app.journal import JournalStorage
+from app.models import Trade, TradeBook, TradeSegment, TradeStore, uuid_bytes
+
+START = datetime(2024, 5, 1, 14, 30, tzinfo=timezone.utc)
+
+
+@pytest.fixture(autouse=True)
+def seal_from_the_first_trade(monkeypatch):
+    """Most tests here exercise sealing itself, so books keep no live window unless a test sets one."""
+    monkeypatch.setattr(models, "HOT_TRADES", 0)
+
+
+def _trades(n, portfolio_id="p1"):
+    trades = []
+    for i in range(n):
+        at = START + timedelta(minutes=i // 3)  # runs of equal timestamps
+        trades.append(Trade(
+            portfolio_id=portfolio_id, instrument_type=["equity", "etf"][i % 2], ticker=["AAPL", "MSFT", "VTI"][i % 3],
+            side=["buy", "sell"][i % 2], quantity=10.0 + i, order_type="limit" if i % 4 == 0 else "market",
+            limit_price=99.5 if i % 4 == 0 else None, price_per_unit=100.0 + i / 8,
+            status=["pending", "executed", "settled"][i % 3], initiated_at=at,
+            executed_at=at + timedelta(seconds=5) if i % 3 else None,
+        ))
+    return trades
+
+
+def _dicts(trades):
+    return [t.to_dict() for t in trades]
+
+
+def _sealed_book(monkeypatch, trades):
+    monkeypatch.setattr(models, "SEGMENT_SIZE", len(trades))
+    book = TradeBook()
+    book.extend(trades)
+    assert book.sealed == len(trades)
+    return book
+
+
+def test_sealed_trades_round_trip_every_field(monkeypatch):
+    trades = _trades(40)
+    trades.append(Trade(
+        portfolio_id="p1", instrument_type="crypto", ticker="BTC", side="buy", quantity=0.25,
+        price_per_unit=60000.0, status="held", compliance_status="review", initiated_at=START + timedelta(days=1),
+        settled_at=START + timedelta(days=3),
+    ))
+    book = _sealed_book(monkeypatch, trades)
+
+    assert _dicts(book) == _dicts(trades)
+    assert [book.get(t.trade_id).to_dict() for t in trades] == _dicts(trades)
+    assert book.get(Trade("p1", "equity", "X", "buy", 1, price_per_unit=1.0).trade_id) is None
+    # Per trade: 16-byte id, 2-byte id order and id prefix, and a 1-byte code
+    # for its side, status and other labels. Per set limit price (10),
+    # execution (26) and settlement (1): a 2-byte position and an 8-byte
+    # value. The rest is in the book's columns.
+    assert book.segment_bytes() == 41 * (16 + 2 + 2 + 1) + (10 + 26 + 1) * (2 + 8)
+    assert TradeSegment(_trades(8)[1:4]).nbytes == 3 * (16 + 2 + 2 + 1) + 2 * (2 + 8)
+
+
+def test_sealed_trades_keep_non_uuid_ids(monkeypatch):
+    trades = _trades(5)
+    trades[2].trade_id = "legacy-0042"
+    trades[3].trade_id = trades[3].trade_id.upper()
+    book = _sealed_book(monkeypatch, trades)
+
+    assert book.get("legacy-0042").to_dict() == trades[2].to_dict()
+    assert book.get(trades[3].trade_id).to_dict() == trades[3].to_dict()
+    assert book.get(trades[3].trade_id.lower()) is None
+    assert _dicts(book) == _dicts(trades)
+
+
+def test_joined_segment_reads_like_the_segments_joined(monkeypatch):
+    trades = _trades(16)
+    trades[5].status = "held"  # not in TRADE_STATUSES
+    trades[9].trade_id = "legacy-0009"
+    for trade in trades[12:]:
+        trade.portfolio_id = "p2"
+    monkeypatch.setattr(models, "SEGMENT_SIZE", 0)
+    plain = TradeBook()
+    plain.extend(trades)
+    columns = plain.columns()
+
+    joined = TradeSegment.join([TradeSegment(trades[i : i + 4]) for i in range(0, 16, 4)])
+    assert _dicts(joined.trades(range(16), columns, 0)) == _dicts(trades)
+    assert _dicts(joined.trades([11, 2, 14], columns, 0)) == _dicts([trades[11], trades[2], trades[14]])
+    for i, trade in enumerate(trades):
+        assert joined.find(trade.trade_id, uuid_bytes(trade.trade_id)) == i
+    assert joined.find("legacy-0010", None) == -1
+
+
+@pytest.fixture
+def books(monkeypatch):
+    """The same trades in a book that seals every 4 trades and in one that never seals."""
+    trades = _trades(50)
+    monkeypatch.setattr(models, "SEGMENT_SIZE", 4)
+    sealed = TradeBook()
+    sealed.extend(trades)
+    monkeypatch.setattr(models, "SEGMENT_SIZE", 0)
+    plain = TradeBook()
+    plain.extend(trades)
+    return sealed, plain, trades
+
+
+def test_sealed_book_reads_like_an_unsealed_one(books):
+    sealed, plain, trades = books
+    assert sealed.sealed == 48 and plain.sealed == 0
+    # Every four segments of one size are joined: 12 segments of 4 make 3 of 16.
+    assert [len(segment) for segment in sealed._sealed[1]] == [16, 16, 16]
+    assert len(sealed) == len(plain) == 50
+
+    assert _dicts(sealed) == _dicts(plain)
+    for status in (None, "pending", "settled"):
+        assert sealed.count(status) == plain.count(status)
+        for offset in (0, 3, 17, 49):
+            assert _dicts(sealed.page(status, offset, 7)) == _dicts(plain.page(status, offset, 7))
+        after = (trades[30].initiated_at, trades[30].trade_id)
+        page, more = sealed.page_after(after, status, 6)
+        assert (_dicts(page), more) == (lambda p: (_dicts(p[0]), p[1]))(plain.page_after(after, status, 6))
+    for trade in (trades[0], trades[21], trades[49]):
+        assert sealed.get(trade.trade_id).to_dict() == trade.to_dict()
+        key = (trade.initiated_at, trade.trade_id)
+        assert _dicts(sealed.iter_ordered(after=key)) == _dicts(plain.iter_ordered(after=key))
+        assert _dicts(sealed.iter_newest(before=key)) == _dicts(plain.iter_newest(before=key))
+    assert sealed.get("missing") is None
+    assert _dicts(sealed.iter_newest(since=trades[20].initiated_at)) == _dicts(plain.iter_newest(
+        since=trades[20].initiated_at))
+    assert sealed.columns() == plain.columns()
+
+
+def test_newest_trades_stay_live_objects(monkeypatch):
+    monkeypatch.setattr(models, "HOT_TRADES", 10)
+    monkeypatch.setattr(models, "SEGMENT_SIZE", 4)
+    trades = _trades(30)
+    book = TradeBook()
+    book.extend(trades)
+
+    # Sealed four at a time whenever 14 are live, leaving the newest 10.
+    assert book.sealed == 20
+    assert [len(segment) for segment in book._sealed[1]] == [16, 4]
+    newest = trades[-10:]
+    assert all(book.get(t.trade_id) is t for t in newest)
+    assert book.page(limit=10) == newest[::-1]
+    assert _dicts(book) == _dicts(trades)
+
+
+def test_store_queries_sealed_books_through_the_index(monkeypatch):
+    monkeypatch.setattr(models, "SEGMENT_SIZE", 4)
+    store = TradeStore()
+    trades = _trades(30, "p1") + _trades(30, "p2")
+    for trade in trades:
+        store.book(trade.portfolio_id).append(trade)
+    newest_first = sorted(trades, key=lambda t: (t.initiated_at, t.trade_id), reverse=True)
+
+    page, more = store.query(ticker="AAPL", side="buy", status="pending", limit=100)
+    expected = [t for t in newest_first if (t.ticker, t.side, t.status) == ("AAPL", "buy", "pending")]
+    assert (_dicts(page), more) == (_dicts(expected), False)
+    page, _ = store.query(status="settled", portfolio_ids=["p2"], limit=100)
+    assert _dicts(page) == _dicts([t for t in newest_first if t.status == "settled" and t.portfolio_id == "p2"])
+    assert store.query(status="held")[0] == []
+
+
+def test_sealing_cuts_memory_per_trade(monkeypatch):
+    def traced_bytes(segment_size):
+        monkeypatch.setattr(models, "SEGMENT_SIZE", segment_size)
+        tracemalloc.start()
+        store = TradeStore()
+        for i, trade in enumerate(_trades(4000, "p")):
+            store.book(f"p{i % 4}").append(trade)
+        used = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del store
+        return used
+
+    assert traced_bytes(0) > 3 * traced_bytes(64)
+    assert traced_bytes(0) > 4 * traced_bytes(8)
+
+
+def test_journal_replay_restores_sealed_books(monkeypatch, tmp_path):
+    monkeypatch.setattr(models, "SEGMENT_SIZE", 3)
+    trades = _trades(20)
+    backend = JournalStorage(str(tmp_path), fsync=False)
+    for trade in trades:
+        with backend.locked("p1"):
+            backend.trades.book("p1").append(trade)
+            backend.holdings.ledger("p1").apply(trade)
+    backend.snapshot()
+    # Journaled after the snapshot, plus a replayed duplicate of a sealed trade.
+    extra = _trades(23)[20:]
+    for trade in extra:
+        with backend.locked("p1"):
+            backend.trades.book("p1").append(trade)
+            backend.holdings.ledger("p1").apply(trade)
+    backend.record(("t", models.trade_row(trades[4])))
+    holdings = [p.to_dict() for p in backend.holdings.ledger("p1").positions()]
+    backend.close()
+
+    restored = JournalStorage(str(tmp_path), fsync=False)
+    try:
+        book = restored.trades.book("p1")
+        assert book.sealed == 21
+        assert _dicts(book) == _dicts(trades + extra)
+        assert [p.to_dict() for p in restored.holdings.ledger("p1").positions()] == holdings
+    finally:
+        restored.close()
+
+
+def test_out_of_order_trades_are_rejected():
+    trades = _trades(6)
+    book = TradeBook()
+    book.extend(trades[3:])
+    with pytest.raises(ValueError):
+        book.append(trades[0])
+    assert _dicts(book) == _dicts(trades[3:])
@@ -0,0 +1,100 @@
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+from flask.json.provider import DefaultJSONProvider
+
+from app import create_app, serialization
+from app.models import Portfolio, Trade
+
+AT = datetime(2024, 5, 1, 14, 30, 0, 123456, tzinfo=timezone.utc)
+
+
+def _models():
+    portfolio = Portfolio(client_id="client-1", portfolio_name="Crème brûlée 📈", investment_objective="growth",
+                          created_at=AT, updated_at=AT)
+    trade = Trade(portfolio_id=portfolio.portfolio_id, instrument_type="equity", ticker="AAPL", side="sell",
+                  quantity=2.5, limit_price=190.25, price_per_unit=191.0, initiated_at=AT)
+    return portfolio, trade
+
+
+PAYLOADS = [
+    {"zeta": 1, "alpha": [1.5, 0.1 + 0.2, None, True], "mid": {"b": "x", "a": "y"}},
+    {"name": "Zürich – 東京", "emoji": "📈", "ключ": "значение"},
+    {"day": date(2024, 5, 1), "at": AT, "big": 10 ** 20, "negative": -(2 ** 63)},
+    {"small": 0.00001, "tiny": -1.23e-7, "large": 1e16, "huge": 1.2345678901234568e17, "edge": [0.0001, 1e15]},
+    1e16,
+    {"models": list(_models())},
+    list(_models()),
+    "plain string",
+]
+
+
+def _encode(app, obj, with_orjson, monkeypatch):
+    monkeypatch.setattr(serialization, "orjson", serialization.orjson if with_orjson else None)
+    with app.app_context():
+        return app.json.response(obj).get_data(), app.json.dumps(obj)
+
+
+@pytest.mark.parametrize("payload", PAYLOADS)
+def test_orjson_and_stdlib_paths_produce_identical_output(payload, monkeypatch):
+    if serialization.orjson is None:
+        pytest.skip("orjson is not installed")
+    app = create_app()
+    assert _encode(app, payload, True, monkeypatch) == _encode(app, payload, False, monkeypatch)
+
+
+def _plain(obj):
+    """``obj`` with models replaced by their ``to_dict()``, as routes passed them before."""
+    if isinstance(obj, dict):
+        return {key: _plain(value) for key, value in obj.items()}
+    if isinstance(obj, list):
+        return [_plain(value) for value in obj]
+    return obj.to_dict() if hasattr(obj, "to_dict") else obj
+
+
+@pytest.mark.parametrize("payload", PAYLOADS)
+def test_output_matches_previous_jsonify(payload):
+    app = create_app()
+    previous = DefaultJSONProvider(app)
+    with app.app_context():
+        assert app.json.response(payload).get_data() == previous.response(_plain(payload)).get_data()
+
+
+def test_keys_are_sorted_and_non_ascii_escaped():
+    app = create_app()
+    portfolio, _ = _models()
+    with app.app_context():
+        body = app.json.response(portfolio).get_data()
+    assert body.isascii()
+    assert b'"portfolioName":"Cr\\u00e8me br\\u00fbl\\u00e9e \\ud83d\\udcc8"' in body
+    keys = list(app.json.loads(body))
+    assert keys == sorted(keys)
+
+
+def test_slotted_models_serialize_with_cached_timestamps():
+    app = create_app()
+    portfolio, trade = _models()
+    assert not hasattr(portfolio, "__dict__") and not hasattr(trade, "__dict__")
+
+    with app.app_context():
+        data = app.json.loads(app.json.response({"portfolio": portfolio, "trade": trade}).get_data())
+    assert data["portfolio"] == portfolio.to_dict()
+    assert data["trade"] == trade.to_dict()
+    assert data["portfolio"]["createdAt"] == data["portfolio"]["updatedAt"] == AT.isoformat()
+    assert data["trade"]["initiatedAt"] == AT.isoformat()
+
+    # The cached ISO form of updated_at is dropped when it changes.
+    portfolio.updated_at = AT + timedelta(days=1)
+    assert portfolio.to_dict()["updatedAt"] == (AT + timedelta(days=1)).isoformat()
+    assert portfolio.to_dict()["createdAt"] == AT.isoformat()
+
+
+def test_api_responses_serialize_models(client):
+    resp = client.post("/api/v1/portfolios", json={
+        "clientId": "client-1", "portfolioName": "Ünïcode", "investmentObjective": "growth",
+    })
+    assert resp.status_code == 201
+    assert b"\\u00dcn\\u00efcode" in resp.get_data()
+    portfolio = resp.get_json()
+    assert portfolio["portfolioName"] == "Ünïcode"
+    assert client.get(f"/api/v1/portfolios/{portfolio['portfolioId']}").get_json() == portfolio
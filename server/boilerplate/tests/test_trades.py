@@ -0,0 +1,134 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import models, routes
+
+
+@pytest.fixture
+def portfolio_id(client):
+    resp = client.post("/api/v1/portfolios", json={
+        "clientId": "client-1",
+        "portfolioName": "Growth",
+        "investmentObjective": "growth",
+    })
+    return resp.get_json()["portfolioId"]
+
+
+def _buy(client, portfolio_id, ticker="AAPL", quantity=1):
+    resp = client.post(f"/api/v1/portfolios/{portfolio_id}/trades", json={
+        "instrumentType": "equity", "ticker": ticker, "side": "buy", "quantity": quantity,
+    })
+    assert resp.status_code == 201
+    return resp.get_json()
+
+
+def test_get_trade_by_id(client, portfolio_id):
+    trades = [_buy(client, portfolio_id, ticker=t) for t in ("AAPL", "MSFT", "NVDA")]
+    resp = client.get(f"/api/v1/portfolios/{portfolio_id}/trades/{trades[1]['tradeId']}")
+    assert resp.status_code == 200
+    assert resp.get_json()["ticker"] == "MSFT"
+
+    missing = client.get(f"/api/v1/portfolios/{portfolio_id}/trades/does-not-exist")
+    assert missing.status_code == 404
+
+
+def test_list_trades_newest_first_and_status_filter(client, portfolio_id):
+    trades = [_buy(client, portfolio_id, quantity=q) for q in (1, 2, 3)]
+    data = client.get(f"/api/v1/portfolios/{portfolio_id}/trades?limit=2").get_json()
+    assert data["total"] == 3
+    assert [t["tradeId"] for t in data["trades"]] == [trades[2]["tradeId"], trades[1]["tradeId"]]
+
+    pending = client.get(f"/api/v1/portfolios/{portfolio_id}/trades?status=pending").get_json()
+    assert pending["total"] == 3
+    settled = client.get(f"/api/v1/portfolios/{portfolio_id}/trades?status=settled").get_json()
+    assert settled == {"trades": [], "total": 0, "limit": 20, "offset": 0, "nextCursor": None}
+
+
+def test_listing_an_empty_portfolio_does_not_create_a_book(client, portfolio_id):
+    data = client.get(f"/api/v1/portfolios/{portfolio_id}/trades").get_json()
+    assert data == {"trades": [], "total": 0, "limit": 20, "offset": 0, "nextCursor": None}
+    assert models.get_trade_store().get(portfolio_id) is None
+
+
+def test_trade_updates_portfolio_total_value(client, portfolio_id):
+    trade = _buy(client, portfolio_id, quantity=2)
+    portfolio = client.get(f"/api/v1/portfolios/{portfolio_id}").get_json()
+    assert portfolio["totalValue"] == trade["totalAmount"]
+
+
+def test_clock_stepping_back_does_not_break_trade_creation(client, portfolio_id, monkeypatch):
+    monkeypatch.setattr(models, "SEGMENT_SIZE", 4)
+    monkeypatch.setattr(models, "HOT_TRADES", 0)
+    before = [_buy(client, portfolio_id, quantity=q) for q in range(1, 11)]
+
+    class SteppedBack(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return datetime.now(tz) - timedelta(hours=1)
+
+    monkeypatch.setattr(routes, "datetime", SteppedBack)
+    single = _buy(client, portfolio_id)
+    resp = client.post(f"/api/v1/portfolios/{portfolio_id}/trades/batch", json=[
+        {"instrumentType": "equity", "ticker": "MSFT", "side": "buy", "quantity": q} for q in (1, 2)
+    ])
+    assert resp.status_code == 201
+
+    stamps = [t["initiatedAt"] for t in before] + [single["initiatedAt"]]
+    stamps += [r["trade"]["initiatedAt"] for r in resp.get_json()["results"]]
+    assert stamps == sorted(stamps)
+    data = client.get(f"/api/v1/portfolios/{portfolio_id}/trades?limit=3").get_json()
+    assert data["total"] == 13
+    assert data["trades"][2]["tradeId"] == single["tradeId"]
+
+
+def test_list_trades_cursor_walks_every_trade_once(client, portfolio_id):
+    trades = [_buy(client, portfolio_id, quantity=q) for q in range(1, 8)]
+    seen = []
+    url = f"/api/v1/portfolios/{portfolio_id}/trades?limit=3"
+    data = client.get(url).get_json()
+    seen.extend(t["tradeId"] for t in data["trades"])
+    while data["nextCursor"]:
+        # Trades inserted mid-walk are newer than the cursor and must not shift later pages.
+        _buy(client, portfolio_id)
+        data = client.get(f"{url}&cursor={data['nextCursor']}").get_json()
+        seen.extend(t["tradeId"] for t in data["trades"])
+    assert seen == [t["tradeId"] for t in reversed(trades)]
+
+
+def test_list_trades_rejects_malformed_cursor(client, portfolio_id):
+    resp = client.get(f"/api/v1/portfolios/{portfolio_id}/trades?cursor=not-a-cursor")
+    assert resp.status_code == 400
+    assert resp.get_json()["error"] == "bad_request"
+
+
+def test_batch_ingest_reports_partial_failures(client, portfolio_id):
+    good = {"instrumentType": "equity", "ticker": "AAPL", "side": "buy", "quantity": 2}
+    resp = client.post(f"/api/v1/portfolios/{portfolio_id}/trades/batch", json=[good, {"ticker": "AAPL"}, good])
+    assert resp.status_code == 207
+    data = resp.get_json()
+    assert (data["accepted"], data["rejected"]) == (2, 1)
+    assert [r["status"] for r in data["results"]] == [201, 400, 201]
+    assert "instrumentType" in data["results"][1]["details"]
+
+    portfolio = client.get(f"/api/v1/portfolios/{portfolio_id}").get_json()
+    assert portfolio["totalValue"] == pytest.approx(sum(r["trade"]["totalAmount"] for r in data["results"][::2]))
+    assert client.get(f"/api/v1/portfolios/{portfolio_id}/trades").get_json()["total"] == 2
+
+
+def test_batch_ingest_accepts_ndjson(client, portfolio_id):
+    body = "\n".join([
+        '{"instrumentType": "etf", "ticker": "SPY", "side": "buy", "quantity": 1}',
+        "{not json",
+    ])
+    resp = client.post(
+        f"/api/v1/portfolios/{portfolio_id}/trades/batch", data=body, content_type="application/x-ndjson",
+    )
+    assert resp.status_code == 207
+    assert resp.get_json()["results"][1]["details"] == {"_schema": ["Invalid JSON."]}
+
+
+def test_batch_ingest_rejects_all_invalid(client, portfolio_id):
+    resp = client.post(f"/api/v1/portfolios/{portfolio_id}/trades/batch", json=[{"side": "hold"}])
+    assert resp.status_code == 400
+    assert resp.get_json()["error"] == "validation_error"
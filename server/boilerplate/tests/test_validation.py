@@ -0,0 +1,134 @@
+import os
+import subprocess
+import sys
+
+import pytest
+from marshmallow import ValidationError
+
+from app.models import Portfolio
+from app.schemas import PortfolioInitiateSchema, TradeInitiateSchema, TradeQuerySchema
+from app.validation import CompiledSchema
+
+TRADE = {"instrumentType": "equity", "ticker": "AAPL", "side": "buy", "quantity": 10}
+PORTFOLIO = {"clientId": "client-1", "portfolioName": "Growth", "investmentObjective": "growth"}
+
+TRADES = [
+    TRADE,
+    {**TRADE, "quantity": 0.5, "limitPrice": 0, "orderType": "limit"},
+    {**TRADE, "ticker": "A" * 10, "side": "sell", "instrumentType": "option"},
+    {**TRADE, "quantity": "12.5"},  # coerced by marshmallow
+    {**TRADE, "quantity": 10 ** 400},
+    {**TRADE, "quantity": True},
+    {**TRADE, "quantity": 0},
+    {**TRADE, "quantity": -1.5},
+    {**TRADE, "quantity": float("nan")},
+    {**TRADE, "quantity": float("inf")},
+    {**TRADE, "quantity": "lots"},
+    {**TRADE, "quantity": None},
+    {**TRADE, "limitPrice": -0.01},
+    {**TRADE, "ticker": ""},
+    {**TRADE, "ticker": "A" * 11},
+    {**TRADE, "ticker": 7},
+    {**TRADE, "side": "hold"},
+    {**TRADE, "side": ["buy"]},
+    {**TRADE, "orderType": "iceberg"},
+    {**TRADE, "instrumentType": None},
+    {**TRADE, "extra": 1},
+    {"ticker": "AAPL"},
+    {},
+    [],
+    "AAPL",
+    None,
+]
+
+PORTFOLIOS = [
+    PORTFOLIO,
+    {**PORTFOLIO, "riskTolerance": "aggressive", "benchmarkIndex": "SPX", "currency": "EUR"},
+    {**PORTFOLIO, "portfolioName": "x" * 255},
+    {**PORTFOLIO, "portfolioName": ""},
+    {**PORTFOLIO, "portfolioName": "x" * 256},
+    {**PORTFOLIO, "currency": "usd"},
+    {**PORTFOLIO, "currency": "USD\n"},  # the pattern's $ allows a trailing newline
+    {**PORTFOLIO, "currency": "USDX"},
+    {**PORTFOLIO, "investmentObjective": "yolo"},
+    {**PORTFOLIO, "riskTolerance": None},
+    {**PORTFOLIO, "clientId": 12},
+    {**PORTFOLIO, "status": "active"},
+    {"portfolioName": "Growth"},
+    42,
+]
+
+
+def _outcome(schema, data, many=False):
+    """What ``load`` returns or raises, with portfolios reduced to their loaded fields."""
+    try:
+        result = schema.load(data, many=many)
+    except ValidationError as err:
+        return "error", err.messages, err.valid_data
+    if isinstance(result, Portfolio):
+        return "ok", (result.client_id, result.portfolio_name, result.investment_objective,
+                      result.risk_tolerance, result.benchmark_index, result.currency)
+    return "ok", result
+
+
+@pytest.mark.parametrize("schema_class, payloads", [
+    (TradeInitiateSchema, TRADES),
+    (PortfolioInitiateSchema, PORTFOLIOS),
+])
+def test_compiled_schema_loads_and_rejects_like_marshmallow(schema_class, payloads):
+    schema, compiled = schema_class(), CompiledSchema(schema_class())
+    for payload in payloads:
+        assert _outcome(compiled, payload) == _outcome(schema, payload), payload
+
+
+def test_compiled_batch_matches_marshmallow_errors_and_valid_data():
+    schema, compiled = TradeInitiateSchema(), CompiledSchema(TradeInitiateSchema())
+    assert _outcome(compiled, TRADES, many=True) == _outcome(schema, TRADES, many=True)
+    assert _outcome(compiled, TRADES[:3], many=True) == _outcome(schema, TRADES[:3], many=True)
+    assert _outcome(compiled, TRADE, many=True) == _outcome(schema, TRADE, many=True)
+
+
+def test_valid_input_skips_marshmallow(monkeypatch):
+    compiled = CompiledSchema(PortfolioInitiateSchema())
+
+    def fail(*args, **kwargs):
+        raise AssertionError("marshmallow load called")
+
+    monkeypatch.setattr(compiled.schema, "load", fail)
+    portfolio = compiled.load(PORTFOLIO)
+    assert (portfolio.client_id, portfolio.currency, portfolio.risk_tolerance) == ("client-1", "USD", "moderate")
+    with pytest.raises(AssertionError):
+        compiled.load({**PORTFOLIO, "currency": "usd"})
+
+
+def test_unsupported_schemas_are_not_compiled():
+    with pytest.raises(TypeError):
+        CompiledSchema(TradeQuerySchema())
+
+
+def test_api_validation_errors_are_unchanged(client):
+    portfolio_id = client.post("/api/v1/portfolios", json=PORTFOLIO).get_json()["portfolioId"]
+    resp = client.post(f"/api/v1/portfolios/{portfolio_id}/trades", json={**TRADE, "quantity": 0, "side": "hold"})
+    assert resp.status_code == 400
+    assert resp.get_json() == {
+        "error": "validation_error", "message": "Invalid input",
+        "details": {"side": ["Must be one of: buy, sell."], "quantity": ["Must be greater than 0."]},
+    }
+    resp = client.post("/api/v1/portfolios", json={**PORTFOLIO, "currency": "usd", "extra": True})
+    assert resp.get_json()["details"] == {
+        "currency": ["String does not match expected pattern."], "extra": ["Unknown field."],
+    }
+
+
+def test_schemas_and_cors_are_deferred_until_first_request():
+    code = (
+        "import sys, app.wsgi\n"
+        "assert 'marshmallow' not in sys.modules and 'flask_cors' not in sys.modules\n"
+        "client = app.wsgi.app.test_client()\n"
+        "resp = client.post('/api/v1/portfolios', json={'clientId': 'c', 'portfolioName': 'p',"
+        " 'investmentObjective': 'growth'}, headers={'Origin': 'https://example.com'})\n"
+        "assert resp.status_code == 201 and resp.headers['Access-Control-Allow-Origin'] == 'https://example.com'\n"
+        "assert 'marshmallow' in sys.modules and 'flask_cors' in sys.modules\n"
+    )
+    env = {**os.environ, "STARTUP_MODE": "lazy", "STORAGE_BACKEND": "memory"}
+    subprocess.run([sys.executable, "-c", code], check=True, env=env)
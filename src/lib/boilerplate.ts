@@ -2,15 +2,49 @@
 
 const RAW_BASE = "https://raw.githubusercontent.com/postman-cs/lpl-demo/main/server/boilerplate";
 
-const BOILERPLATE_PATHS = [
+export const BOILERPLATE_PATHS = [
   "app/__init__.py",
+  "app/analytics.py",
+  "app/asgi.py",
+  "app/export.py",
+  "app/idempotency.py",
+  "app/journal.py",
+  "app/metrics.py",
+  "app/mmap_store.py",
   "app/models.py",
+  "app/pagination.py",
+  "app/pricing.py",
+  "app/quotes.csv",
+  "app/performance_cache.py",
+  "app/response_cache.py",
   "app/routes.py",
+  "app/serialization.py",
+  "app/sqlite_store.py",
+  "app/validation.py",
   "app/wsgi.py",
   "tests/__init__.py",
+  "tests/test_analytics.py",
+  "tests/test_asgi.py",
+  "tests/conftest.py",
+  "tests/test_concurrency.py",
+  "tests/test_etag.py",
+  "tests/test_export.py",
   "tests/test_health.py",
+  "tests/test_holdings.py",
+  "tests/test_idempotency.py",
+  "tests/test_journal.py",
+  "tests/test_metrics.py",
+  "tests/test_mmap_store.py",
+  "tests/test_portfolios.py",
+  "tests/test_queries.py",
+  "tests/test_segments.py",
+  "tests/test_serialization.py",
+  "tests/test_pricing.py",
+  "tests/test_trades.py",
+  "tests/test_validation.py",
   "requirements.txt",
   "requirements-dev.txt",
+  "requirements-asgi.txt",
   "Dockerfile",
   "openapi.yaml",
 ];
@@ -409,11 +409,18 @@ jobs:
           echo "role_arn=\${ROLE_ARN}" >> "$GITHUB_OUTPUT"
           echo "role_name=\${ROLE_NAME}" >> "$GITHUB_OUTPUT"
 
+      - uses: actions/setup-python@v5
+        with:
+          python-version: "3.11"
+
       - name: Package Lambda
         run: |
           pip install -r requirements.txt -t package/ -q
           cp -r app/ package/app/
           cp openapi.yaml package/
+          rm -rf package/gunicorn package/bin
+          find package -type d \\( -name tests -o -name __pycache__ \\) -prune -exec rm -rf {} +
+          python -m compileall -q -j 0 --invalidation-mode unchecked-hash package/
           cd package && zip -r ../deployment.zip . -q
 
       - name: Deploy Lambda Functions
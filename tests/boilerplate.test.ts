@@ -1,6 +1,7 @@
 import { fetchMock } from "cloudflare:test";
 import { describe, it, expect, beforeEach, afterEach } from "vitest";
 import {
+  BOILERPLATE_PATHS,
   fetchBoilerplate,
   generateGitignore,
   generateEnvExample,
@@ -59,20 +60,15 @@ describe("fetchBoilerplate", () => {
   it("fetches all boilerplate files successfully", async () => {
     const mock = fetchMock.get("https://raw.githubusercontent.com");
 
-    // Mock all 10 boilerplate paths
-    const paths = [
-      "app/__init__.py", "app/models.py", "app/routes.py", "app/wsgi.py",
-      "tests/__init__.py", "tests/test_health.py",
-      "requirements.txt", "requirements-dev.txt", "Dockerfile", "openapi.yaml",
-    ];
-    for (const p of paths) {
+    // Mock every boilerplate path
+    for (const p of BOILERPLATE_PATHS) {
       mock.intercept({
         path: `/postman-cs/lpl-demo/main/server/boilerplate/${p}`,
       }).reply(200, `content-of-${p}`);
     }
 
     const files = await fetchBoilerplate("fake-token");
-    expect(files).toHaveLength(10);
+    expect(files).toHaveLength(BOILERPLATE_PATHS.length);
     expect(files[0].path).toBe("app/__init__.py");
     expect(files[0].content).toBe("content-of-app/__init__.py");
   });
@@ -80,11 +76,7 @@ describe("fetchBoilerplate", () => {
   it("skips files that return non-200", async () => {
     const mock = fetchMock.get("https://raw.githubusercontent.com");
 
-    const paths = [
-      "app/__init__.py", "app/models.py", "app/routes.py", "app/wsgi.py",
-      "tests/__init__.py", "tests/test_health.py",
-      "requirements.txt", "requirements-dev.txt", "Dockerfile", "openapi.yaml",
-    ];
+    const paths = BOILERPLATE_PATHS;
     // First file succeeds, rest fail
     mock.intercept({
       path: `/postman-cs/lpl-demo/main/server/boilerplate/${paths[0]}`,